@@ -2,14 +2,10 @@ import streamlit as st
 import os
 import datetime
 import json
-import pandas as pd
 import time
-import plotly.express as px
-import plotly.graph_objects as go
 from dotenv import load_dotenv
 
 import sys
-import os
 # Ensure root directory is in sys.path for Streamlit Cloud
 root_path = os.path.dirname(os.path.abspath(__file__))
 if root_path not in sys.path:
@@ -42,30 +38,10 @@ os.environ['LC_ALL'] = 'es_ES.UTF-8'
 # ============================================
 
 # --- MODULE IMPORTS ---
-
-# --- MODULE IMPORTS ---
+# Only what the login page needs is imported here. Views import google_services / ai_core /
+# pandas / plotly themselves, and chat/notes are loaded by the router: the first rerun that needs
+# a module pays its import once, every later rerun finds it in sys.modules (no importlib.reload).
 import modules.auth as auth
-import modules.notifications as notif
-import modules.chat_view as chat_view # NEW CHAT MODULE
-import modules.notes_view as notes_view # NEW NOTES MODULE
-import modules.ai_core as ai_core
-import modules.google_services as google_services
-import importlib
-importlib.reload(notes_view)
-importlib.reload(ai_core)
-importlib.reload(google_services)
-
-from modules.google_services import (
-    get_calendar_service, get_tasks_service, get_sheets_service, get_gmail_credentials,
-    fetch_emails_batch, clean_email_body, 
-    get_task_lists, create_task_list, add_task_to_google, 
-    delete_task_google, update_task_google, get_existing_tasks_simple,
-    add_event_to_calendar, delete_event, optimize_event, optimize_event_reminders, update_event_calendar, COLOR_MAP
-)
-from modules.ai_core import (
-    analyze_emails_ai, parse_events_ai, analyze_agenda_ai,
-    generate_work_plan_ai, generate_project_breakdown_ai, analyze_document_vision
-)
 from modules.auth import check_and_update_doc_analysis_quota
 import modules.ui_components as ui # Global import for UI helpers
 
@@ -267,6 +243,7 @@ def card_metric(label, value, icon, subtext=""):
     """, unsafe_allow_html=True)
 
 def render_admin_panel():
+    import pandas as pd
     st.markdown("## 🛡️ Panel de Administración")
     
     tabs = st.tabs(["👥 Crear Usuario", "📋 Lista de Usuarios (Solo Lectura)"])
@@ -411,6 +388,12 @@ def render_login_page():
                     st.error("Acceso Denegado")
 
 def view_dashboard():
+    import pandas as pd
+    import plotly.express as px
+    from modules.google_services import (
+        get_calendar_service, get_tasks_service, get_gmail_credentials, get_task_snapshot,
+        COLOR_MAP, list_fields, watch_fields
+    )
     # --- WEATHER & CONTEXT ---
     # --- WEATHER & CONTEXT REMOVED AS REQUESTED ---
     # import modules.weather_service as ws (Removed)
@@ -503,9 +486,10 @@ def view_dashboard():
                 timeMin=today_start.isoformat() + 'Z',
                 timeMax=today_end.isoformat() + 'Z',
                 singleEvents=True,
-                orderBy='startTime'
+                orderBy='startTime',
+                fields=list_fields('briefing_events')
             ).execute()
-            current_events = events_result.get('items', [])
+            current_events = watch_fields(events_result.get('items', []), 'briefing_events')
             events_hash = hash(str([e.get('id') for e in current_events]))
         except Exception as e:
             # 404 Handling: If calendar not found/authorized, treat as empty or try primary
@@ -519,9 +503,10 @@ def view_dashboard():
                         timeMin=today_start.isoformat() + 'Z',
                         timeMax=today_end.isoformat() + 'Z',
                         singleEvents=True,
-                        orderBy='startTime'
+                        orderBy='startTime',
+                        fields=list_fields('briefing_events')
                     ).execute()
-                     current_events = events_result.get('items', [])
+                     current_events = watch_fields(events_result.get('items', []), 'briefing_events')
                      events_hash = hash(str([e.get('id') for e in current_events]))
                 except:
                      current_events = []
@@ -554,12 +539,7 @@ def view_dashboard():
                 # Top 3 tareas
                 try:
                     tasks_svc = get_tasks_service()
-                    task_lists = tasks_svc.tasklists().list().execute().get('items', [])
-                    all_tasks = []
-                    for tlist in task_lists[:1]:
-                        tasks = tasks_svc.tasks().list(tasklist=tlist['id']).execute().get('items', [])
-                        all_tasks.extend(tasks)
-                    top_tasks = all_tasks[:3]
+                    top_tasks = get_task_snapshot(tasks_svc).top(3)
                 except:
                     top_tasks = []
 
@@ -639,9 +619,10 @@ def view_dashboard():
             # Use astimezone() to include the local system offset (e.g., -03:00)
             t_min = now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
             t_max = now.replace(hour=23, minute=59, second=59, microsecond=999999).isoformat()
-            events = svc.events().list(
-                calendarId=calendar_id, timeMin=t_min, timeMax=t_max, singleEvents=True, orderBy='startTime'
-            ).execute().get('items', [])
+            events = watch_fields(svc.events().list(
+                calendarId=calendar_id, timeMin=t_min, timeMax=t_max, singleEvents=True, orderBy='startTime',
+                fields=list_fields('dashboard_events')
+            ).execute().get('items', []), 'dashboard_events')
     except Exception as e:
         # Fallback: If 404 (Not Found) or 403 (Forbidden), it might be that User doesn't have access but Robot does.
         error_str = str(e)
@@ -653,9 +634,10 @@ def view_dashboard():
                 # Retry with Robot (Service Account)
                 svc_sa = get_calendar_service(force_service_account=True)
                 if svc_sa:
-                    events = svc_sa.events().list(
-                         calendarId=calendar_id, timeMin=t_min, timeMax=t_max, singleEvents=True, orderBy='startTime'
-                    ).execute().get('items', [])
+                    events = watch_fields(svc_sa.events().list(
+                         calendarId=calendar_id, timeMin=t_min, timeMax=t_max, singleEvents=True, orderBy='startTime',
+                         fields=list_fields('dashboard_events')
+                    ).execute().get('items', []), 'dashboard_events')
                     # If success, maybe show a small toast?
                     # st.toast("🔄 Usando cuenta robot para este calendario.")
             except: pass # If fails again, nothing to do
@@ -709,11 +691,12 @@ def view_dashboard():
 
     # --- REAL METRICS: TASKS & EMAILS ---
     pending_tasks_count = 0
+    tasks_snap = None
     tasks_svc = get_tasks_service()
     if tasks_svc:
         try:
-            tasks_list = get_existing_tasks_simple(tasks_svc)
-            pending_tasks_count = len(tasks_list)
+            tasks_snap = get_task_snapshot(tasks_svc)
+            pending_tasks_count = tasks_snap.count()
         except: pass
 
     # Fetch Unread Emails Count (Approx)
@@ -724,7 +707,8 @@ def view_dashboard():
             from googleapiclient.discovery import build
             svc_gmail = build('gmail', 'v1', credentials=creds)
             # Just get profile or messages label count for lighter query
-            results = svc_gmail.users().messages().list(userId='me', q="is:unread -category:promotions -category:social", maxResults=50).execute()
+            results = svc_gmail.users().messages().list(userId='me', q="is:unread -category:promotions -category:social", maxResults=50,
+                                                        fields=list_fields('message_ids', 'messages')).execute()
             if 'messages' in results:
                 unread_emails_count = len(results['messages']) # Capped at 50 for speed
                 if unread_emails_count == 50: unread_emails_count = "50+"
@@ -794,12 +778,9 @@ def view_dashboard():
 
         with ac2:
             st.markdown("###### ✅ Estado de Tareas")
-            # If tasks_list exists (fetched above)
-            if 'tasks_list' in locals() and tasks_list:
-                # Mock status based on notes or title (Tasks API simple doesn't give much)
-                # Or just count by "List" if we had that info. 
-                # Let's count properly.
-                total_t = len(tasks_list)
+            # Task snapshot loaded above for the metric card
+            if tasks_snap is not None and pending_tasks_count:
+                total_t = pending_tasks_count
                 # Visual bar
                 st.progress(max(0.1, min(1.0, 0.5)), text=f"{total_t} Tareas Pendientes") # Dummy progress for now
 
@@ -952,6 +933,8 @@ def view_dashboard():
 
 
 def view_create():
+    from modules.google_services import get_calendar_service, get_tasks_service, add_event_to_calendar, add_task_to_google
+    from modules.ai_core import parse_events_ai
     # Modern header with glassmorphism
     st.markdown("""
     <div style='background: linear-gradient(135deg, rgba(13,215,242,0.1) 0%, rgba(9,168,196,0.05) 100%); 
@@ -1116,6 +1099,7 @@ Saludos."""
                 try:
                     events = parse_events_ai(prompt)
                     st.session_state.draft_events = events
+                    st.session_state.draft_dupes = None  # Screened lazily (one call for the whole batch)
                     
                     if not events:
                         st.warning("La IA analizó el contenido pero no encontró eventos claros.")
@@ -1139,6 +1123,16 @@ Saludos."""
         st.divider()
         st.markdown("### 📝 Eventos Propuestos")
 
+        # Bulk duplicate + conflict screening: ONE windowed fetch for every proposed event
+        if st.session_state.get('draft_dupes') is None or len(st.session_state.draft_dupes) != len(st.session_state.draft_events):
+            from modules.google_services import screen_event_batch
+            dup_cal = st.session_state.get('conf_calendar_id') or st.session_state.get('connected_email') or 'primary'
+            dup_svc = get_calendar_service()
+            dupes, conflicts = (screen_event_batch(dup_svc, dup_cal, st.session_state.draft_events) if dup_svc
+                                else ([None] * len(st.session_state.draft_events), [None] * len(st.session_state.draft_events)))
+            st.session_state.draft_dupes = [m is not None for m in dupes]
+            st.session_state.draft_conflicts = conflicts
+
         for i, ev in enumerate(st.session_state.draft_events):
             # Styling specific to the event card in user's example
             bg_accent = "#18282a"
@@ -1171,6 +1165,16 @@ Saludos."""
             </div>
             """, unsafe_allow_html=True)
 
+            conflict = (st.session_state.get('draft_conflicts') or [None] * (i + 1))[i]
+            if conflict and item_type != 'task':
+                from modules.conflict_detector import describe_conflict
+                st.warning(f"⚠️ {describe_conflict(conflict)}")
+                if conflict['suggestion'] and st.button("🕒 Usar horario sugerido", key=f"btn_suggest_{i}"):
+                    s_new, e_new = conflict['suggestion']
+                    ev['start_time'], ev['end_time'] = s_new.isoformat(), e_new.isoformat()
+                    st.session_state.draft_dupes = None  # Re-screen the batch with the new time
+                    st.rerun()
+
             c_act1, c_act2 = st.columns([1, 4])
             with c_act2:
                 if item_type == 'task':
@@ -1228,19 +1232,22 @@ Saludos."""
                         else:
                             svc = get_calendar_service()
 
-                            # Check for duplicates BEFORE creating
-                            from modules.google_services import check_event_exists
-                            if check_event_exists(svc, cal_id, ev):
+                            # Duplicates were screened in bulk when the batch was rendered
+                            if st.session_state.draft_dupes[i]:
                                 st.warning(f"✅ Ya agendado: '{summary}'")
                                 st.info("Este evento ya existe en tu calendario con datos similares.")
                             else:
                                 ok, msg = add_event_to_calendar(svc, ev, cal_id)
-                                if ok: st.success("¡Evento Creado!")
+                                if ok:
+                                    st.session_state.draft_dupes[i] = True
+                                    st.success("¡Evento Creado!")
                                 else: st.error(msg)
 
 
 def view_planner():
     from modules.google_services import get_calendar_service, get_tasks_service, add_task_to_google, delete_event, update_event_calendar, delete_task_google, update_task_google, get_existing_tasks_simple, get_task_lists, delete_events_bulk, delete_tasks_bulk
+    from modules.google_services import list_fields, watch_fields
+    from modules.ai_core import generate_work_plan_ai, generate_project_breakdown_ai
     # Modern header with glassmorphism
     st.markdown("""
     <div style='background: linear-gradient(135deg, rgba(13,215,242,0.1) 0%, rgba(9,168,196,0.05) 100%); 
@@ -1267,39 +1274,22 @@ def view_planner():
     # Use Configured Calendar ID (Priority: Config > Connected)
     calendar_id = st.session_state.get('conf_calendar_id') or st.session_state.get('connected_email') or 'primary'
 
-    # Common Calendar Fetch (Optimized with TTL)
-    if 'c_events_cache' not in st.session_state:
-        st.session_state.c_events_cache = []
-        st.session_state.c_events_cache_time = None
-
-    # Check if cache needs refresh (TTL: 5 minutes)
-    cache_expired = False
-    if st.session_state.c_events_cache_time:
-        import datetime as dt
-        time_since_cache = (dt.datetime.now() - st.session_state.c_events_cache_time).total_seconds()
-        if time_since_cache > 300:  # 5 minutes = 300 seconds
-            cache_expired = True
-            st.session_state.c_events_cache = []  # Clear expired cache
-
-    # Always fetch if cache empty, expired, or requested (Only if email connected)
-    if (not st.session_state.c_events_cache or cache_expired) and calendar_id:
+    # Common Calendar Store: recurring series arrive once (no singleEvents) and are expanded
+    # locally for the window each view needs. TTL: 5 minutes; warm from the disk cache after restarts.
+    from modules.google_services import load_event_store
+    store = st.session_state.get('event_store')
+    if store is not None and store.calendar_id != calendar_id:
+        store = None
+
+    # Only if email connected
+    if calendar_id:
         svc = get_calendar_service()
         if svc:
+            today = datetime.date.today()
+            t_min = datetime.date(today.year, 1, 1)
+            t_max = datetime.date(today.year + 1, 1, 1)
             try:
-                today = datetime.date.today()
-                t_min = datetime.datetime(today.year, 1, 1).isoformat() + 'Z'
-                t_max = datetime.datetime(today.year, 12, 31, 23, 59, 59).isoformat() + 'Z'
-
-                st.session_state.c_events_cache = svc.events().list(
-                    calendarId=calendar_id, timeMin=t_min, timeMax=t_max, 
-                    singleEvents=True, orderBy='startTime', maxResults=2000,
-                    fields="items(summary,start,end,description,id,colorId)" 
-                ).execute().get('items', [])
-                
-                # Update timestamp
-                import datetime as dt
-                st.session_state.c_events_cache_time = dt.datetime.now()
-                
+                store = load_event_store(svc, calendar_id, t_min, t_max)
             except Exception as e:
                 err_msg = str(e)
                 fallback_success = False
@@ -1310,17 +1300,9 @@ def view_planner():
                     try:
                         svc_sa = get_calendar_service(force_service_account=True)
                         if svc_sa:
-                            st.session_state.c_events_cache = svc_sa.events().list(
-                                calendarId=calendar_id, timeMin=t_min, timeMax=t_max, 
-                                singleEvents=True, orderBy='startTime', maxResults=2000,
-                                fields="items(summary,start,end,description,id,colorId)" 
-                            ).execute().get('items', [])
+                            store = load_event_store(svc_sa, calendar_id, t_min, t_max)
                             fallback_success = True
                             st.toast(f"🤖 Usando cuenta Robot para ver {calendar_id}")
-                            
-                            # Update timestamp
-                            import datetime as dt
-                            st.session_state.c_events_cache_time = dt.datetime.now()
                     except:
                         pass
 
@@ -1330,7 +1312,7 @@ def view_planner():
                         st.info("💡 Tu usuario NO tiene permiso, y la cuenta Robot tampoco. Comparte el calendario con tu email o con la cuenta de servicio.")
                     else:
                         st.error(f"Error cargando calendario: {e}")
-                    st.session_state.c_events_cache = []
+                    store = None
 
     # Simplified Logic from original app.py
     # ... (Logic for fetching calendar context would go here)
@@ -1341,28 +1323,32 @@ def view_planner():
             st.markdown("### 📥 Tareas de Entrada")
 
             use_calendar = st.checkbox("📥 Considerar eventos (Contexto)", value=True)
+            fixed_events = []
 
             # Context Logic
-            if use_calendar and st.session_state.c_events_cache:
+            if use_calendar and store is not None:
+                from modules.scheduler import busy_from_events
                 target_date = datetime.date.today()
                 s_week = target_date - datetime.timedelta(days=target_date.weekday())
                 e_week = s_week + datetime.timedelta(days=6)
+                # Only the current week is expanded
+                week_events = store.events_between(s_week, e_week)
+                # Busy intervals for the local scheduler (tasks are placed only in real free slots)
+                fixed_events = busy_from_events(week_events)
 
                 ctx_lines = []
-                for e in st.session_state.c_events_cache:
+                for e in week_events:
                     try:
                         start_str = e['start'].get('dateTime', e['start'].get('date'))
-                        # Simple check if event is in current week
-                        if start_str > s_week.isoformat() and start_str < e_week.isoformat():
-                            summ = e.get('summary', 'Evento')
-                            ctx_lines.append(f"- {start_str}: {summ}")
+                        summ = e.get('summary', 'Evento')
+                        ctx_lines.append(f"- {start_str}: {summ}")
                     except: pass
                 calendar_context_str = "\\n".join(ctx_lines)
 
             tasks_text = st.text_area("Metas para la semana", height=150, placeholder="- Hacer X\\n- Terminar Y")
             if st.button("Generar Plan", type="primary"):
                 with st.spinner("Optimizando agenda..."):
-                    plan = generate_work_plan_ai(tasks_text, calendar_context_str)
+                    plan = generate_work_plan_ai(tasks_text, calendar_context_str, fixed_events=fixed_events)
                     st.session_state.weekly_plan = plan
                     st.session_state.plan_type = 'weekly'
 
@@ -1461,6 +1447,11 @@ def view_planner():
                         for t in tasks:
                             tasks_to_sync.append({"title": t, "notes": f"Planificado para {day_es}", "due": None})
 
+                # Tasks the local scheduler could not fit (deadline or no free time left)
+                unplaced = st.session_state.weekly_plan.get("Sin asignar", []) if isinstance(st.session_state.weekly_plan, dict) else []
+                if unplaced:
+                    st.warning("⏳ Sin espacio en la semana: " + " · ".join(unplaced))
+
                 st.divider()
                 if st.button("🚀 Sincronizar con Google Tasks"):
                     tasks_svc = get_tasks_service()
@@ -1478,7 +1469,8 @@ def view_planner():
         st.info("Busca eventos largos (>3 días) para desglosarlos.")
 
         long_events_opts = []
-        for e in st.session_state.c_events_cache:
+        year_events = store.events_between(store.range[0], store.range[1]) if store is not None else []
+        for e in year_events:
             try:
                 start = e['start'].get('dateTime', e['start'].get('date'))
                 end = e['end'].get('dateTime', e['end'].get('date'))
@@ -1557,35 +1549,38 @@ def view_planner():
                 if st.button("🚀 Añadir Tareas Seleccionadas a Google Tasks", type="primary"):
                     tasks_svc = get_tasks_service()
                     if tasks_svc:
-                        # 1. Create Parent Task
+                        from modules.google_services import add_project_tasks
                         proj_title = selected_proj.split("|")[0].strip() if selected_proj else "Proyecto Nuevo"
-                        with st.spinner(f"Creando tarea principal '{proj_title}'..."):
-                            parent_task = add_task_to_google(tasks_svc, "@default", proj_title, f"Proyecto generado por AI: {len(tasks_to_add)} tareas.")
+
+                        items = []
+                        for t in tasks_to_add:
+                            # Parse Date
+                            d_obj = None
+                            if t.get('date'):
+                                try: 
+                                    # Try ISO format or simply YYYY-MM-DD
+                                    d_obj = datetime.datetime.fromisoformat(t['date'].strip())
+                                except:
+                                    pass # Fail gracefully, no date
+                            items.append({'title': t['title'], 'notes': t['notes'], 'due_date': d_obj})
+
+                        # Parent first, then subtasks in batch requests (a few round trips in total)
+                        with st.spinner(f"Creando '{proj_title}' con {len(items)} subtareas..."):
+                            parent_task, outcomes = add_project_tasks(
+                                tasks_svc, "@default", proj_title, f"Proyecto generado por AI: {len(items)} tareas.", items
+                            )
 
                         if parent_task:
-                            parent_id = parent_task['id']
-                            st.toast(f"📂 Carpeta creada: {proj_title}")
-
-                            # 2. Add Subtasks
-                            bar = st.progress(0)
-                            for idx, t in enumerate(tasks_to_add):
-                                # Parse Date
-                                d_obj = None
-                                if t.get('date'):
-                                    try: 
-                                        # Try ISO format or simply YYYY-MM-DD
-                                        d_str = t['date'].strip()
-                                        d_obj = datetime.datetime.fromisoformat(d_str)
-                                    except:
-                                        pass # Fail gracefully, no date
-
-                                add_task_to_google(tasks_svc, "@default", t['title'], t['notes'], due_date=d_obj, parent=parent_id)
-                                bar.progress((idx+1)/len(tasks_to_add))
-                                # time.sleep(0.1) # Optional rate limit
-
-                            st.success(f"¡Proyecto '{proj_title}' creado con {len(tasks_to_add)} subtareas!")
-                            time.sleep(2)
-                            st.rerun()
+                            created = [o for o in outcomes if o['status'] == 'created']
+                            failed = [o for o in outcomes if o['status'] != 'created']
+                            if failed:
+                                st.warning(f"⚠️ {len(failed)} subtareas no se pudieron crear:")
+                                for o in failed:
+                                    st.caption(f"❌ {o['title']}: {o['error']}")
+                            st.success(f"¡Proyecto '{proj_title}' creado con {len(created)} subtareas!")
+                            if not failed:
+                                time.sleep(2)
+                                st.rerun()
                         else:
                             st.error("Error creando tarea principal (Parent Task).")
                     else:
@@ -1718,7 +1713,8 @@ def view_planner():
                 for i in range(retries):
                     try:
                         events_res = cal_svc.events().list(
-                            calendarId=cal_id, timeMin=t_min, timeMax=t_max, singleEvents=True, orderBy='startTime'
+                            calendarId=cal_id, timeMin=t_min, timeMax=t_max, singleEvents=True, orderBy='startTime',
+                            fields=list_fields('manager_events')
                         ).execute()
                         break # Success
                     except Exception as e:
@@ -1728,7 +1724,7 @@ def view_planner():
                         else:
                             raise e # Re-raise if retries exhausted
 
-                events_list = events_res.get('items', [])
+                events_list = watch_fields(events_res.get('items', []), 'manager_events')
 
                 if not events_list:
                     st.caption("No se encontraron eventos en este rango.")
@@ -1764,9 +1760,10 @@ def view_planner():
                         if cal_svc_sa:
                             events_res = cal_svc_sa.events().list(
                                calendarId=cal_id, timeMin=t_min, timeMax=t_max, 
-                               singleEvents=True, orderBy='startTime', maxResults=50
+                               singleEvents=True, orderBy='startTime', maxResults=50,
+                               fields=list_fields('manager_events')
                             ).execute()
-                            events_list = events_res.get('items', [])
+                            events_list = watch_fields(events_res.get('items', []), 'manager_events')
 
                             # Render Events WITH FULL CONTROLS (Same as main block)
                             if not events_list:
@@ -1875,7 +1872,8 @@ def view_planner():
 
 
 def view_inbox():
-    from modules.google_services import get_gmail_credentials, archive_old_emails, get_calendar_service, add_event_to_calendar, get_tasks_service, add_task_to_google
+    from modules.google_services import get_gmail_credentials, archive_old_emails, get_calendar_service, add_event_to_calendar, get_tasks_service, add_task_to_google, fetch_emails_batch
+    from modules.ai_core import analyze_emails_ai
 
 
     # Modern header with glassmorphism
@@ -1918,6 +1916,11 @@ def view_inbox():
                 st.toast("Desvinculando cuenta de Google...")
                 auth.update_user_field(user, 'COD_VAL', '')
 
+            # Shared cache entries of this account (other replicas would keep serving them)
+            from modules.google_services import forget_shared_user_cache, forget_credentials
+            forget_shared_user_cache()
+            forget_credentials()
+
             # 2. Clear Local Session State (UI Reset)
             keys_to_clear = ['connected_email', 'google_token', 'calendar_service', 'tasks_service', 'sheets_service', 'docs_service', 'gmail_service', 'user_data_full', 'inbox_target_calendar_id']
             for k in keys_to_clear:
@@ -1985,6 +1988,18 @@ def view_inbox():
             st.progress(min(1.0, use/lim) if lim > 0 else 0, text=f"Cuota Diaria: {use}/{lim} analizados")
 
         max_fetch = st.slider(f"Max Correos a Leer:", 5, effective_limit, effective_limit, help="Definido por Admin.")
+        use_triage = st.toggle("🧹 Filtrar boletines y correos masivos antes de la IA", value=True,
+                               help="Revisa solo los encabezados (List-Unsubscribe, Precedence, no-reply, historial del remitente) y omite lo irrelevante sin descargarlo ni gastar cuota.")
+
+        triage_report = st.session_state.get('inbox_triage_report')
+        if triage_report and triage_report.get('skipped_counts'):
+            from modules.mail_triage import REASON_LABELS
+            skipped_total = sum(triage_report['skipped_counts'].values())
+            with st.expander(f"🧹 Última lectura: {skipped_total} de {triage_report['listed']} correos omitidos", expanded=False):
+                for reason, n in sorted(triage_report['skipped_counts'].items(), key=lambda x: -x[1]):
+                    st.markdown(f"- **{REASON_LABELS.get(reason, reason)}:** {n}")
+                for sk in triage_report['skipped'][:20]:
+                    st.caption(f"{sk['subject'][:60]} — {sk['sender'][:40]} (score {sk['score']})")
 
         # Logic to handle auto-continue after auth reload
         if 'trigger_mail_analysis' not in st.session_state:
@@ -2008,23 +2023,37 @@ def view_inbox():
                 if st.button("🔄 Conectar y Analizar Buzón", use_container_width=True):
                     st.session_state.trigger_mail_analysis = True
             with c_act_b:
-                if st.button("☢️ Limpieza (Promociones > 30d)", help="Opción Nuclear: Archiva promociones antiguas.", use_container_width=True):
-                    with st.spinner("Ejecutando limpieza masiva..."):
-                        from modules.google_services import archive_old_emails, get_gmail_credentials
-                        from googleapiclient.discovery import build
-                        # Ensure creds
-                        creds = get_gmail_credentials()
-                        if creds:
-                            svc = build('gmail', 'v1', credentials=creds)
-                            count = archive_old_emails(svc, hours_old=720) # 30 days
-                            if count >= 0:
-                                st.success(f"✅ Se archivaron {count} correos antiguos.")
-                                time.sleep(2)
-                                st.rerun()
-                            else:
-                                st.error("Error en limpieza.")
-                        else:
-                            st.error("No conectado.")
+                # Interrupted runs (rerun, Detener, error) keep their progress here and resume
+                arch_state = st.session_state.get('archive_state')
+                resuming = bool(arch_state and not arch_state.get('done'))
+                arch_label = "▶️ Reanudar Limpieza" if resuming else "☢️ Limpieza (Promociones > 30d)"
+                if st.button(arch_label, help="Opción Nuclear: Archiva TODAS las promociones antiguas (por lotes de 1000).", use_container_width=True):
+                    from modules.google_services import archive_old_emails, get_gmail_credentials
+                    from googleapiclient.discovery import build
+                    # Ensure creds
+                    creds = get_gmail_credentials()
+                    if creds:
+                        svc = build('gmail', 'v1', credentials=creds)
+                        progress_box = st.empty()
+                        # Clicking Detener reruns the script, which stops this loop; the last checkpoint resumes it
+                        st.button("⏹️ Detener", key="btn_archive_stop")
+
+                        def _checkpoint(rep):
+                            st.session_state.archive_state = rep
+                            progress_box.info(f"📦 {rep['archived']:,} archivados · {rep['listed']:,} listados · {rep['per_second']} correos/s")
+
+                        rep = archive_old_emails(svc, hours_old=720, state=arch_state if resuming else None, on_progress=_checkpoint) # 30 days
+                        st.session_state.archive_state = rep
+                        if rep.get('error'):
+                            st.error(f"Error en limpieza: {rep['error']} (se puede reanudar).")
+                        elif rep.get('done'):
+                            st.success(f"✅ Se archivaron {rep['archived']:,} correos antiguos en {rep['seconds']}s ({rep['per_second']} correos/s).")
+                            time.sleep(2)
+                            st.rerun()
+                    else:
+                        st.error("No conectado.")
+                elif resuming:
+                    st.caption(f"⏸️ Limpieza pausada: {arch_state['archived']:,} archivados hasta ahora.")
 
         else:
             # Ensure analysis doesn't run if quota exceeded even if triggered somehow
@@ -2032,8 +2061,11 @@ def view_inbox():
 
         # --- HISTORIAL GLOBAL INTERACTIVO (Moved Outside Conditional) ---
         all_ids = set()
+        sender_history = {}
         if 'user_data_full' in st.session_state:
             history = auth.get_user_history(st.session_state.user_data_full)
+            from modules.mail_triage import build_sender_history
+            sender_history = build_sender_history(history['mail'])
 
             # Extract IDs for filtering later
             processed_mail = {x['id'] for x in history['mail'] if x.get('id')}
@@ -2167,7 +2199,17 @@ def view_inbox():
 
                     service_gmail = build('gmail', 'v1', credentials=creds)
                     with st.spinner(f"📩 Leyendo desde {start_date} hasta {end_date} (Max {max_fetch})..."):
-                        emails = fetch_emails_batch(service_gmail, start_date=start_date, end_date=end_date, max_results=max_fetch)
+                        if use_triage:
+                            # Headers-only pass first: newsletters/bulk never get downloaded or sent to the AI
+                            from modules.google_services import fetch_emails_triaged
+                            emails, triage_report = fetch_emails_triaged(
+                                service_gmail, start_date=start_date, end_date=end_date, max_results=max_fetch,
+                                sender_history=sender_history, skip_ids=all_ids
+                            )
+                            st.session_state.inbox_triage_report = triage_report
+                        else:
+                            emails = fetch_emails_batch(service_gmail, start_date=start_date, end_date=end_date, max_results=max_fetch)
+                            st.session_state.inbox_triage_report = None
 
 
 
@@ -2192,15 +2234,23 @@ def view_inbox():
                             # === EMERGENCY LOGGING ===
                             st.info(f"📊 DEBUG: Procesando {len(emails)} correos...")
                             
+                            # Invites (.ics / text/calendar) were parsed locally: they skip the LLM
+                            ics_items = [ev for e in emails for ev in e.get('ics_events', [])]
+                            llm_emails = [e for e in emails if not e.get('ics_events')]
+                            if ics_items:
+                                st.info(f"📎 {len(emails) - len(llm_emails)} invitaciones de calendario leídas directamente ({len(ics_items)} eventos, sin IA).")
+
                             analyzed_items = []
                             try:
-                                with st.spinner(f"🧠 La IA está analizando y categorizando {len(emails)} correos..."):
-                                    analyzed_items = analyze_emails_ai(emails)
+                                if llm_emails:
+                                    with st.spinner(f"🧠 La IA está analizando y categorizando {len(llm_emails)} correos..."):
+                                        analyzed_items = analyze_emails_ai(llm_emails)
+                                analyzed_items = ics_items + analyzed_items
                                 
                                 # FORCE debug output check
-                                if 'debug_ai_raw' not in st.session_state or not st.session_state.debug_ai_raw:
+                                if llm_emails and ('debug_ai_raw' not in st.session_state or not st.session_state.debug_ai_raw):
                                     st.error("⚠️ CRITICAL: analyze_emails_ai NO capturó debug output. Posible fallo silencioso.")
-                                else:
+                                elif llm_emails:
                                     st.success(f"✅ Debug capturado: {len(st.session_state.debug_ai_raw)} batches")
                                     
                             except Exception as ai_err:
@@ -2225,13 +2275,18 @@ def view_inbox():
                             if not force_re and 'license_key' in st.session_state:
                                 rich_items = []
                                 if emails:
+                                    from modules.mail_triage import sender_address
+                                    from modules.thread_aggregator import message_ids_of
+                                    actionable_ids = {mid for it in analyzed_items for mid in message_ids_of(it)}
                                     for e in emails:
                                         if e.get('id'):
                                             s_text = e.get('subject', e.get('snippet', 'Sin Asunto'))[:50]
                                             rich_items.append({
                                                 'id': e['id'], 
                                                 's': s_text,
-                                                'd': e.get('date', datetime.date.today().strftime('%Y-%m-%d'))
+                                                'd': e.get('date', datetime.date.today().strftime('%Y-%m-%d')),
+                                                'f': sender_address(e.get('sender')),  # Sender history for triage
+                                                'a': 1 if e['id'] in actionable_ids else 0
                                             })
 
                                 # Call ATOMIC function
@@ -2303,36 +2358,36 @@ def view_inbox():
 
                         if st.button("✅ Confirmar y Aplicar Etiquetas"):
                             with st.spinner("Aplicando etiquetas en Gmail..."):
-                                from modules.google_services import ensure_label, add_label_to_email
+                                from modules.google_services import ensure_label, apply_labels
+                                from modules.thread_aggregator import message_ids_of
                                 from googleapiclient.discovery import build
 
                                 # Re-auth specifically for this action
                                 creds_lbl = get_gmail_credentials()
                                 if creds_lbl:
                                     svc_lbl = build('gmail', 'v1', credentials=creds_lbl)
-                                    count_ok = 0
-
                                     # Ensure Parent
                                     try: ensure_label(svc_lbl, "Agente A2")
                                     except: pass
 
+                                    # Group by label: one batchModify per urgency level
+                                    groups, items_per_label = {}, {}
                                     for item in items:
                                         if item.get('id'):
-                                            lbl_name = f"Agente A2/{item.get('urgency', 'Media')}"
-                                            try:
-                                                lid = ensure_label(svc_lbl, lbl_name)
-                                                if lid:
-                                                    add_label_to_email(svc_lbl, item['id'], lid)
-                                                    count_ok += 1
-                                            except: pass
+                                            lid = ensure_label(svc_lbl, f"Agente A2/{item.get('urgency', 'Media')}")
+                                            if lid:
+                                                groups.setdefault(lid, []).extend(message_ids_of(item))
+                                                items_per_label[lid] = items_per_label.get(lid, 0) + 1
+                                    applied = apply_labels(svc_lbl, groups)
+                                    count_ok = sum(items_per_label[lid] for lid in applied)
 
                                     if count_ok > 0:
                                         # --- SAVE HISTORY: LABELS (RICH METADATA) ---
                                         rich_labels = []
                                         for x in items:
-                                            if x.get('id'):
+                                            for msg_id in message_ids_of(x):
                                                 rich_labels.append({
-                                                    'id': x['id'],
+                                                    'id': msg_id,
                                                     's': x.get('summary', 'Etiquetado'),
                                                     'd': datetime.date.today().strftime('%Y-%m-%d')
                                                 })
@@ -2356,17 +2411,18 @@ def view_inbox():
 
                     # Prepare V2 Items
                     v2_events = []
-                    from modules.google_services import check_event_exists, get_calendar_service, add_event_to_calendar
+                    from modules.google_services import screen_duplicate_events, get_calendar_service, add_event_to_calendar
                     
                     # Use Selected Calendar from Session State (with robust fallback)
                     cal_id = st.session_state.get('inbox_target_calendar_id', st.session_state.get('conf_calendar_id', st.session_state.get('connected_email', 'primary')))
                     
                     service_cal = get_calendar_service()
 
-                    for ev in events:
-                        is_scheduled = False
-                        if service_cal:
-                             is_scheduled = check_event_exists(service_cal, cal_id, ev)
+                    # One windowed fetch for all candidate events (instead of one list call per card)
+                    dupes = screen_duplicate_events(service_cal, cal_id, events) if (service_cal and events) else [None] * len(events)
+
+                    for ev, dup in zip(events, dupes):
+                        is_scheduled = dup is not None
                         
                         # Generate Content HTML with Badge
                         badge = render_date_badge(ev.get('start_time', ''))
@@ -2584,6 +2640,8 @@ def view_inbox():
 
 def view_optimize():
     from modules.google_services import get_calendar_service, get_tasks_service, add_task_to_google, delete_events_bulk, delete_tasks_bulk, deduplicate_calendar_events, deduplicate_tasks, COLOR_MAP
+    from modules.google_services import get_existing_tasks_simple, get_task_lists, update_task_google, optimize_event, optimize_event_reminders, list_fields, watch_fields
+    from modules.ai_core import analyze_agenda_ai
     
     # Modern header with glassmorphism
     st.markdown("""
@@ -2636,9 +2694,10 @@ def view_optimize():
                     timeMax=t_max, 
                     singleEvents=True, 
                     orderBy='startTime',
-                    maxResults=250
+                    maxResults=250,
+                    fields=list_fields('optimizer_events')
                 ).execute()
-                st.session_state.opt_events = res.get('items', [])
+                st.session_state.opt_events = watch_fields(res.get('items', []), 'optimizer_events')
                 if len(st.session_state.opt_events) == 250:
                     st.warning("⚠️ Se alcanzó el límite de 250 eventos. Intenta reducir el rango si faltan datos.")
                 else:
@@ -2658,9 +2717,10 @@ def view_optimize():
                                 timeMax=t_max, 
                                 singleEvents=True, 
                                 orderBy='startTime',
-                                maxResults=250
+                                maxResults=250,
+                                fields=list_fields('optimizer_events')
                             ).execute()
-                            st.session_state.opt_events = res.get('items', [])
+                            st.session_state.opt_events = watch_fields(res.get('items', []), 'optimizer_events')
                             fallback_success = True
                             st.toast(f"🤖 Usando cuenta Robot para ver {calendar_id}")
                             st.success(f"Cargados {len(st.session_state.opt_events)} eventos (vía Robot).")
@@ -2677,29 +2737,62 @@ def view_optimize():
     st.divider()
     st.markdown("### 🧹 Limpieza de Duplicados")
     c_dup1, c_dup2 = st.columns([3, 1])
-    c_dup1.info("Esta herramienta escaneará los eventos en el rango seleccionado y todas tus tareas para eliminar copias exactas.")
+    c_dup1.info("Esta herramienta escaneará los eventos en el rango seleccionado (incluye casi-duplicados: títulos parecidos u horarios desplazados) y todas tus tareas. Primero verás un reporte; nada se borra sin confirmar.")
 
-    if c_dup2.button("♻️ Escanear y Eliminar", type="secondary"):
-        with st.spinner("Buscando y eliminando duplicados..."):
-            from modules.google_services import deduplicate_calendar_events, deduplicate_tasks
+    if c_dup2.button("🔍 Escanear Duplicados", type="secondary"):
+        with st.spinner("Buscando duplicados..."):
+            from modules.google_services import deduplicate_calendar_events
 
             cal_svc = get_calendar_service()
-            task_svc = get_tasks_service()
+            st.session_state.dedup_report = deduplicate_calendar_events(cal_svc, calendar_id, start_date, end_date, dry_run=True) if cal_svc else []
+
+    report = st.session_state.get('dedup_report')
+    if report is not None:
+        selected = []
+        if report:
+            n_found = sum(len(c['duplicates']) for c in report)
+            st.warning(f"Se encontraron **{len(report)} grupos** con **{n_found} eventos duplicados**. Desmarca los grupos que no son duplicados (p. ej. bloques repetidos a propósito).")
+            with st.expander("Ver reporte de duplicados", expanded=True):
+                for i, c in enumerate(report[:50]):
+                    surv = c['survivor']
+                    s_start = surv.get('start', {}).get('dateTime') or surv.get('start', {}).get('date', '')
+                    # Pre-selected only when every copy starts at the same time as the one kept
+                    same_start = all((d.get('start', {}).get('dateTime') or d.get('start', {}).get('date', '')) == s_start
+                                     for d in c['duplicates'])
+                    if st.checkbox(f"✅ **{surv.get('summary', '')}** · {s_start[:16].replace('T', ' ')} _(se conserva, similitud {c['similarity']:.0%})_",
+                                   value=same_start, key=f"dedup_sel_{i}_{surv.get('id', '')}"):
+                        selected.append(c)
+                    for d in c['duplicates']:
+                        d_start = d.get('start', {}).get('dateTime') or d.get('start', {}).get('date', '')
+                        st.caption(f"🗑️ {d.get('summary', '')} · {d_start[:16].replace('T', ' ')}")
+                if len(report) > 50:
+                    # Not reviewed on screen: only deleted on explicit opt-in
+                    if st.checkbox(f"Incluir también los {len(report) - 50} grupos no mostrados", value=False, key="dedup_sel_rest"):
+                        selected.extend(report[50:])
+        n_dups = sum(len(c['duplicates']) for c in selected)
+
+        if st.button(f"♻️ Eliminar {n_dups} eventos duplicados y tareas repetidas", type="primary"):
+            with st.spinner("Eliminando duplicados..."):
+                from modules.google_services import deduplicate_calendar_events, deduplicate_tasks
 
-            deleted_ev = 0
-            if cal_svc:
-                deleted_ev = deduplicate_calendar_events(cal_svc, calendar_id, start_date, end_date)
+                cal_svc = get_calendar_service()
+                task_svc = get_tasks_service()
 
-            deleted_tk = 0
-            if task_svc:
-                deleted_tk = deduplicate_tasks(task_svc)
+                deleted_ev = 0
+                if cal_svc and selected:
+                    deleted_ev = deduplicate_calendar_events(cal_svc, calendar_id, clusters=selected)
 
-            if deleted_ev > 0 or deleted_tk > 0:
-                st.success(f"✅ Limpieza Completada: Se eliminaron **{deleted_ev} eventos** y **{deleted_tk} tareas** duplicadas.")
-                time.sleep(2)
-                st.rerun()
-            else:
-                st.success("✨ No se encontraron duplicados. Tu agenda está limpia.")
+                deleted_tk = 0
+                if task_svc:
+                    deleted_tk = deduplicate_tasks(task_svc)
+
+                st.session_state.dedup_report = None
+                if deleted_ev > 0 or deleted_tk > 0:
+                    st.success(f"✅ Limpieza Completada: Se eliminaron **{deleted_ev} eventos** y **{deleted_tk} tareas** duplicadas.")
+                    time.sleep(2)
+                    st.rerun()
+                else:
+                    st.success("✨ No se encontraron duplicados. Tu agenda está limpia.")
 
     st.divider()
     st.markdown("### 🔔 Optimizador de Recordatorios")
@@ -2836,9 +2929,10 @@ def view_optimize():
                              timeMax=t_max,
                              singleEvents=True,
                              orderBy='startTime',
-                             maxResults=250
+                             maxResults=250,
+                             fields=list_fields('optimizer_events')
                          ).execute()
-                         st.session_state.opt_events = res.get('items', [])
+                         st.session_state.opt_events = watch_fields(res.get('items', []), 'optimizer_events')
                          events_to_optimize = st.session_state.opt_events
                          st.toast(f"✅ Datos actualizados: {len(events_to_optimize)} eventos", icon="✅")
                      except Exception as e:
@@ -2856,9 +2950,10 @@ def view_optimize():
                                          timeMax=t_max, 
                                          singleEvents=True, 
                                          orderBy='startTime',
-                                         maxResults=250
+                                         maxResults=250,
+                                         fields=list_fields('optimizer_events')
                                      ).execute()
-                                     st.session_state.opt_events = res.get('items', [])
+                                     st.session_state.opt_events = watch_fields(res.get('items', []), 'optimizer_events')
                                      events_to_optimize = st.session_state.opt_events
                                      fallback_success = True
                                      st.toast(f"🤖 Usando Robot para actualizar {calendar_id}")
@@ -3106,29 +3201,48 @@ def view_time_insights():
     """, unsafe_allow_html=True)
 
     from modules.ai_core import analyze_time_leaks_weekly
+    from modules.google_services import get_calendar_service, list_fields, watch_fields
     from datetime import datetime, timedelta
     import plotly.graph_objects as go
 
-    st.markdown("🕵️ Analizamos los últimos 7 días de tu calendario para identificar oportunidades de optimización.")
+    st.markdown("🕵️ Analizamos tu calendario (una o varias semanas) para identificar oportunidades de optimización.")
+    window_opts = {"Última semana": 7, "Últimas 4 semanas": 28, "Últimas 12 semanas": 84}
+    window_label = st.selectbox("Ventana de análisis", list(window_opts.keys()))
+    days = window_opts[window_label]
     st.divider()
 
-    if st.button("🔍 Analizar Última Semana", use_container_width=True, type="primary"):
-        with st.spinner("📊 Analizando 7 días de calendario..."):
-            # Obtener eventos de últimos 7 días
-            cal_svc = get_calendar_service()
+    if st.button(f"🔍 Analizar {window_label}", use_container_width=True, type="primary"):
+        with st.spinner(f"📊 Analizando {days} días de calendario..."):
             # Use Configured Calendar ID (Priority: Config > Connected)
             calendar_id = st.session_state.get('conf_calendar_id') or st.session_state.get('connected_email') or 'primary'
             end_date = datetime.now()
-            start_date = end_date - timedelta(days=7)
+            start_date = end_date - timedelta(days=days)
+
+            # Reuse the planner's event store when it covers the window (no extra API call)
+            events = None
+            store = st.session_state.get('event_store')
+            if store is not None and store.calendar_id == calendar_id and store.covers(start_date, end_date):
+                events = store.events_between(start_date, end_date)
+
+            def _list_all(svc):
+                # Every page: large calendars exceed one 2500-event page
+                items, page_token = [], None
+                while True:
+                    events_result = svc.events().list(
+                        calendarId=calendar_id,
+                        timeMin=start_date.isoformat() + 'Z',
+                        timeMax=end_date.isoformat() + 'Z',
+                        singleEvents=True, maxResults=2500, pageToken=page_token,
+                        fields=list_fields('insights_events')
+                    ).execute()
+                    items.extend(watch_fields(events_result.get('items', []), 'insights_events'))
+                    page_token = events_result.get('nextPageToken')
+                    if not page_token:
+                        return items
 
             try:
-                events_result = cal_svc.events().list(
-                    calendarId=calendar_id,
-                    timeMin=start_date.isoformat() + 'Z',
-                    timeMax=end_date.isoformat() + 'Z',
-                    singleEvents=True
-                ).execute()
-                events = events_result.get('items', [])
+                if events is None:
+                    events = _list_all(get_calendar_service())
             except Exception as e:
                 # Disable fallback return - try robot
                 err_msg = str(e)
@@ -3138,13 +3252,7 @@ def view_time_insights():
                     try:
                         svc_sa = get_calendar_service(force_service_account=True)
                         if svc_sa:
-                            events_result = svc_sa.events().list(
-                                calendarId=calendar_id,
-                                timeMin=start_date.isoformat() + 'Z',
-                                timeMax=end_date.isoformat() + 'Z',
-                                singleEvents=True
-                            ).execute()
-                            events = events_result.get('items', [])
+                            events = _list_all(svc_sa)
                             fallback_success = True
                             st.toast(f"🤖 Insights usando Robot para {calendar_id}")
                     except: pass
@@ -3157,8 +3265,8 @@ def view_time_insights():
                 st.warning("⚠️ Muy pocos eventos para análisis significativo (mínimo 3 requeridos)")
                 return
 
-            # Analizar con IA
-            analysis = analyze_time_leaks_weekly(events)
+            # Analizar (vectorizado) + IA sobre agregados
+            analysis = analyze_time_leaks_weekly(events, days=days)
 
             # --- VISUALIZACIÓN ---
             st.markdown("### 📊 Distribución del Tiempo")
@@ -3173,8 +3281,8 @@ def view_time_insights():
                 top_cat = max(analysis['stats'].items(), key=lambda x: x[1]['hours'])
                 st.metric("Mayor Consumo", top_cat[0].replace('_', ' ').title(), help=f"{top_cat[1]['hours']}h")
             with col4:
-                avg_per_day = round(analysis['total_hours'] / 7, 1)
-                st.metric("Promedio/Día", f"{avg_per_day}h", help="Horas promedio por día")
+                avg_per_day = round(analysis['total_hours'] / days, 1)
+                st.metric("Promedio/Día", f"{avg_per_day}h", help=f"Fuera de jornada: {analysis['outside_hours']}h")
 
             st.divider()
 
@@ -3224,6 +3332,42 @@ def view_time_insights():
 
             st.divider()
 
+            # Tendencia semanal + mapa de calor (ya agregados por el motor)
+            col_trend, col_heat = st.columns(2)
+
+            with col_trend:
+                st.markdown("**Tendencia Semanal**")
+                weekly = analysis['weekly']
+                if len(weekly) >= 2:
+                    fig_trend = go.Figure()
+                    for cat in [c for c in weekly.columns if c != 'total']:
+                        fig_trend.add_trace(go.Bar(x=weekly.index, y=weekly[cat], name=cat.replace('_', ' ').title()))
+                    fig_trend.update_layout(
+                        barmode='stack', height=350,
+                        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+                        font=dict(color='#FAFAFA')
+                    )
+                    st.plotly_chart(fig_trend, use_container_width=True)
+                else:
+                    st.caption("Selecciona una ventana de 4+ semanas para ver la tendencia.")
+
+            with col_heat:
+                st.markdown("**Carga por Día y Hora**")
+                fig_heat = go.Figure(data=go.Heatmap(
+                    z=analysis['heatmap'][:, 7:21],
+                    x=[f"{h:02d}:00" for h in range(7, 21)],
+                    y=["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"],
+                    colorscale='Teal'
+                ))
+                fig_heat.update_layout(
+                    height=350, yaxis=dict(autorange='reversed'),
+                    paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+                    font=dict(color='#FAFAFA')
+                )
+                st.plotly_chart(fig_heat, use_container_width=True)
+
+            st.divider()
+
             # Insights de IA
             st.markdown("### 💡 Recomendaciones Estratégicas (IA)")
             st.markdown(analysis['insights'])
@@ -3385,11 +3529,9 @@ def main_app():
             # SIEMPRE guardar, incluso si está vacío
             auth.save_calendar_session(st.session_state.license_key, new_calendar)
             
-            # Limpiar caché al cambiar calendario
-            if 'c_events_cache' in st.session_state:
-                del st.session_state['c_events_cache']
-            if 'c_events_cache_time' in st.session_state:
-                del st.session_state['c_events_cache_time']
+            # Limpiar caché al cambiar calendario (sesión y disco)
+            from modules.google_services import clear_event_cache
+            clear_event_cache()
             if new_calendar:
                 st.toast("🔄 Configuración guardada")
             else:
@@ -3400,7 +3542,7 @@ def main_app():
             st.caption("Si tienes problemas (Error 404/403), asegúrate de compartir tu calendario con el Robot.")
             
             # Load SA to get email
-            from modules.google_services import _load_service_account_creds, get_calendar_service
+            from modules.google_services import _load_service_account_creds, get_calendar_service, list_fields
             sa_creds = _load_service_account_creds()
             
             if sa_creds:
@@ -3419,7 +3561,7 @@ def main_app():
                          # Test SA Access
                          svc_sa = get_calendar_service(force_service_account=True)
                          if svc_sa and current_calendar:
-                             svc_sa.events().list(calendarId=current_calendar, maxResults=1).execute()
+                             svc_sa.events().list(calendarId=current_calendar, maxResults=1, fields=list_fields('event_ids')).execute()
                              st.success(f"✅ ¡Conexión Exitosa con {current_calendar}!")
                          else:
                              st.error("No se pudo iniciar el Robot o falta ID Calendario.")
@@ -3435,10 +3577,8 @@ def main_app():
         with col_cal_1:
             if st.button("🔄 Refrescar", key="btn_refresh", use_container_width=True, 
                         help="Limpiar caché y actualizar eventos"):
-                if 'c_events_cache' in st.session_state:
-                    del st.session_state['c_events_cache']
-                if 'c_events_cache_time' in st.session_state:
-                    del st.session_state['c_events_cache_time']
+                from modules.google_services import clear_event_cache
+                clear_event_cache()
                 st.success("✅ Caché limpiado")
                 st.rerun()
 
@@ -3457,10 +3597,8 @@ def main_app():
                     auth.save_calendar_session(st.session_state.license_key, '')
                 
                 # Clear cache
-                if 'c_events_cache' in st.session_state:
-                    del st.session_state['c_events_cache']
-                if 'c_events_cache_time' in st.session_state:
-                    del st.session_state['c_events_cache_time']
+                from modules.google_services import clear_event_cache
+                clear_event_cache()
                 
                 st.info("📅 Sesión de calendario cerrada")
                 st.rerun()
@@ -3475,7 +3613,7 @@ def main_app():
             keys_to_clear = ['connected_email', 'connected_email_input', 'google_token',
                              'calendar_service', 'tasks_service', 'sheets_service', 'docs_service', 'gmail_service',
                              'authenticated', 'user_data_full', 'license_key',
-                             'c_events_cache', 'c_events_cache_time',
+                             'event_store',
                              'last_flashcards', 'temp_cornell_result', 'processing_note_id',
                              'ai_result_cache']
             for k in keys_to_clear:
@@ -3508,6 +3646,7 @@ def main_app():
                 if st.button("🔄 Cargar Usuarios"):
                     users = auth.get_all_users()
                     if users:
+                        import pandas as pd
                         df_users = pd.DataFrame(users)
                         # Filter relevant columns for display
                         cols_to_show = ['user', 'rol', 'estado', 'cant_corr', 'modelo_ia']
@@ -3570,12 +3709,16 @@ def main_app():
 
     # Main Router
     if selection == "Dashboard": view_dashboard()
-    elif selection == "Chat": chat_view.render_chat_view() # NEW ROUTE
+    elif selection == "Chat":
+        import modules.chat_view as chat_view
+        chat_view.render_chat_view()
     elif selection == "Admin": render_admin_panel() # NEW ADMIN ROUTE
     elif selection == "Create": view_create()
     elif selection == "Planner": view_planner()
     elif selection == "Inbox": view_inbox()
-    elif selection == "Notes": notes_view.view_notes_page()
+    elif selection == "Notes":
+        import modules.notes_view as notes_view
+        notes_view.view_notes_page()
     elif selection == "Optimize": view_optimize()
     elif selection == "Insights": view_time_insights()
     elif selection == "Account": view_account()
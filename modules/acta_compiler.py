@@ -0,0 +1,372 @@
+import json
+import re
+
+# --- CONSTANTS ---
+# Corporate palette (RGB 0-1, Google Docs format)
+NAVY = {'red': 0.0, 'green': 0.2, 'blue': 0.4}
+CYAN_PALE = {'red': 0.88, 'green': 0.97, 'blue': 1.0}
+GRAY_TEXT = {'red': 0.4, 'green': 0.4, 'blue': 0.4}
+
+# Docs API rejects oversized bodies; stay well below the documented payload limit
+MAX_BATCH_BYTES = 2 * 1024 * 1024
+
+SIG_LINE = "__________________________          __________________________"
+SIG_TEXT = "ENCARGADO DE ACTA                    V°B° JEFATURA"
+
+_CONTROL_CHARS = re.compile(r'[\x00-\x08\x0b-\x1f\x7f]')
+
+# --- ACTA STRUCTURE (LAYOUT BLOCKS) ---
+
+def _para(text, size=10, bold=False, align='START', color=None, bg=None, border_bottom=False):
+    return {
+        'type': 'paragraph', 'text': text, 'size': size, 'bold': bold,
+        'align': align, 'color': color, 'bg': bg, 'border_bottom': border_bottom
+    }
+
+def _table(rows, size=9, header=False, label_col=False):
+    return {'type': 'table', 'rows': rows, 'size': size, 'header': header, 'label_col': label_col}
+
+def _clean_text(value):
+    """Normalizes any value into a Docs-safe string (no control chars, \\n line breaks)."""
+    if value is None:
+        return ""
+    text = str(value).replace('\r\n', '\n').replace('\r', '\n')
+    return _CONTROL_CHARS.sub('', text)
+
+def normalize_acta_data(data):
+    """Coerces the AI output (str/dict/other) into the acta dict used by the renderers."""
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except Exception:
+            data = {"asunto": "Acta AI", "desarrollo": data}
+
+    if not isinstance(data, dict):
+        data = {"asunto": "Acta Generada", "desarrollo": str(data)}
+    return data
+
+def _format_desarrollo(desc):
+    # If development is a list/dict (AI being too organized), convert to professional string
+    if isinstance(desc, list):
+        return "\n\n".join([str(item) for item in desc])
+    if isinstance(desc, dict):
+        new_desc = ""
+        for key, val in desc.items():
+            new_desc += f"{key.upper()}:\n{val}\n\n"
+        return new_desc.strip()
+    return desc
+
+def _acuerdo_row(ac):
+    if isinstance(ac, dict):
+        return [
+            ac.get('descripcion', '(-)'),
+            ac.get('responsable', '(-)'),
+            ac.get('plazo', '(-)')
+        ]
+    return [ac, '(-)', '(-)']
+
+def build_acta_blocks(data, raw_transcription=None):
+    """
+    Builds the renderer-agnostic layout of an Acta (ordered paragraph/table blocks).
+    Shared by the Google Docs compiler and the local DOCX renderer so both outputs match.
+    """
+    data = normalize_acta_data(data)
+
+    def section_title(text):
+        return _para(text.upper(), size=12, bold=True, color=NAVY, border_bottom=True)
+
+    blocks = [
+        _para("ACTA DE REUNIÓN", size=20, bold=True, align='CENTER', color=NAVY),
+        _para(data.get('asunto', 'Comité / Reunión General'), size=14, align='CENTER', color=GRAY_TEXT),
+        _para("", size=6),
+    ]
+
+    # 2. INFO BAR (Header table: label | value)
+    blocks.append(_table([
+        ["FECHA", data.get('fecha', '')],
+        ["HORA", f"{data.get('hora_inicio')} - {data.get('hora_termino')}"],
+        ["LUGAR", data.get('lugar', 'No especificado')],
+    ], size=10, label_col=True))
+    blocks.append(_para(""))
+
+    # 3. SECTIONS
+    blocks.append(section_title("1. Asistentes"))
+    for p in data.get('asistentes', []) or []:
+        blocks.append(_para(f"• {p}"))
+    blocks.append(_para(""))
+
+    blocks.append(section_title("2. Puntos a Tratar"))
+    for i, p in enumerate(data.get('tabla_puntos', []) or []):
+        blocks.append(_para(f"{i+1}. {p}"))
+    blocks.append(_para(""))
+
+    blocks.append(section_title("3. Desarrollo"))
+    desc = _format_desarrollo(data.get('desarrollo', 'Sin desarrollo registrado.'))
+    blocks.append(_para(desc, align='JUSTIFIED'))
+    blocks.append(_para(""))
+
+    # ACUERDOS (Real table, header row highlighted)
+    blocks.append(section_title("4. Acuerdos y Compromisos"))
+    acuerdos = data.get('acuerdos', []) or []
+    if acuerdos:
+        rows = [["DESCRIPCIÓN", "RESPONSABLE", "PLAZO"]]
+        rows.extend(_acuerdo_row(ac) for ac in acuerdos)
+        blocks.append(_table(rows, size=9, header=True))
+    else:
+        blocks.append(_para("No hay acuerdos registrados.", align='CENTER'))
+
+    # --- ANEXO: TRANSCRIPCIÓN COMPLETA (if provided) ---
+    if raw_transcription and raw_transcription.strip():
+        blocks.append(_para("\n\n"))  # Page break effect
+        blocks.append(section_title("ANEXO: TRANSCRIPCIÓN COMPLETA"))
+        blocks.append(_para("El siguiente texto corresponde a la transcripción literal del audio de la reunión, sin procesar:", size=9, color=GRAY_TEXT))
+        blocks.append(_para("", size=6))
+        blocks.append(_para(raw_transcription.strip(), size=9, align='JUSTIFIED'))
+        blocks.append(_para(""))
+        blocks.append(_para("--- Fin de la Transcripción ---", size=9, align='CENTER', color=GRAY_TEXT))
+
+    # SIGNATURES
+    blocks.append(_para("\n\n\n"))
+    blocks.append(_para(SIG_LINE, align='CENTER'))
+    blocks.append(_para(SIG_TEXT, size=9, bold=True, align='CENTER'))
+    return blocks
+
+# --- GOOGLE DOCS COMPILER ---
+
+def _u16len(text):
+    """Docs indexes count UTF-16 code units (emojis take 2), not Python chars."""
+    return len(text.encode('utf-16-le')) // 2
+
+def _text_style_request(start, end, size, bold, color=None, bg=None):
+    text_style = {'fontSize': {'magnitude': size, 'unit': 'PT'}, 'bold': bold}
+    fields = 'fontSize,bold'
+    if color:
+        text_style['foregroundColor'] = {'color': {'rgbColor': color}}
+        fields += ',foregroundColor'
+    if bg:
+        text_style['backgroundColor'] = {'color': {'rgbColor': bg}}
+        fields += ',backgroundColor'
+    return {
+        'updateTextStyle': {
+            'range': {'startIndex': start, 'endIndex': end},
+            'textStyle': text_style,
+            'fields': fields
+        }
+    }
+
+def _paragraph_style_request(start, end, align, border_bottom):
+    p_style = {'alignment': align}
+    p_fields = 'alignment'
+    if border_bottom:
+        p_style['borderBottom'] = {
+            'width': {'magnitude': 1.0, 'unit': 'PT'},
+            'padding': {'magnitude': 1.0, 'unit': 'PT'},
+            'dashStyle': 'SOLID',
+            'color': {'color': {'rgbColor': NAVY}}
+        }
+        p_fields += ',borderBottom'
+    return {
+        'updateParagraphStyle': {
+            'range': {'startIndex': start, 'endIndex': end},
+            'paragraphStyle': p_style,
+            'fields': p_fields
+        }
+    }
+
+def _merge_ranges(spans):
+    """Merges adjacent (start, end, key) spans sharing the same style key."""
+    merged = []
+    for start, end, key in spans:
+        if merged and merged[-1][2] == key and merged[-1][1] == start:
+            merged[-1] = (merged[-1][0], end, key)
+        else:
+            merged.append((start, end, key))
+    return merged
+
+def _table_cell_index(table_index, n_cols, row, col):
+    """
+    Content index of cell (row, col) right after insertTable at `table_index`.
+    insertTable adds a newline at the location, then: table(+1), row(+1), cell(+1), each cell
+    holding one empty paragraph (2 units per cell) and each row adding 1 more.
+    """
+    return table_index + 4 + row * (2 * n_cols + 1) + 2 * col
+
+def _compile_table(block, table_index):
+    """Requests to insert a table at a placeholder paragraph and fill it (reverse order keeps indices valid)."""
+    rows = [[_clean_text(c).replace('\n', ' ').strip() or '(-)' for c in row] for row in block['rows']]
+    n_rows = len(rows)
+    n_cols = max(len(r) for r in rows)
+    reqs = [{'insertTable': {'rows': n_rows, 'columns': n_cols, 'location': {'index': table_index}}}]
+
+    if block.get('header'):
+        reqs.append({
+            'updateTableCellStyle': {
+                'tableRange': {
+                    'tableCellLocation': {'tableStartLocation': {'index': table_index + 1}, 'rowIndex': 0, 'columnIndex': 0},
+                    'rowSpan': 1, 'columnSpan': n_cols
+                },
+                'tableCellStyle': {'backgroundColor': {'color': {'rgbColor': CYAN_PALE}}},
+                'fields': 'backgroundColor'
+            }
+        })
+
+    for r in range(n_rows - 1, -1, -1):
+        for c in range(n_cols - 1, -1, -1):
+            text = rows[r][c] if c < len(rows[r]) else '(-)'
+            idx = _table_cell_index(table_index, n_cols, r, c)
+            reqs.append({'insertText': {'location': {'index': idx}, 'text': text}})
+            bold = (block.get('header') and r == 0) or (block.get('label_col') and c == 0)
+            color = NAVY if bold else None
+            reqs.append(_text_style_request(idx, idx + _u16len(text), block['size'], bool(bold), color))
+    return reqs
+
+def compile_docs_requests(blocks, start_index=1):
+    """
+    Compiles layout blocks into a minimal Docs batchUpdate request list in one pass:
+    a single insertText for all body text, merged text/paragraph style ranges, and
+    tables inserted at placeholder paragraphs and filled cell by cell in reverse.
+    """
+    parts = []
+    text_spans = []
+    para_spans = []
+    table_slots = []
+    index = start_index
+
+    for block in blocks:
+        if block['type'] == 'table':
+            # Empty placeholder paragraph; the table lands right before it
+            table_slots.append((index, block))
+            parts.append("\n")
+            index += 1
+            continue
+
+        text = _clean_text(block['text'])
+        lines = text.split('\n')
+        # Keep empty lines as real (styled) paragraphs, like the original layout
+        content = "\n".join(line or " " for line in lines) + "\n"
+        length = _u16len(content)
+
+        text_key = (block['size'], block['bold'], json.dumps(block['color']), json.dumps(block['bg']))
+        text_spans.append((index, index + length, text_key))
+        if block['align'] != 'START' or block['border_bottom']:
+            para_spans.append((index, index + length, (block['align'], block['border_bottom'])))
+        else:
+            para_spans.append((index, index + length, None))
+
+        parts.append(content)
+        index += length
+
+    requests = []
+    full_text = "".join(parts)
+    if full_text:
+        requests.append({'insertText': {'location': {'index': start_index}, 'text': full_text}})
+
+    for start, end, key in _merge_ranges(text_spans):
+        size, bold, color, bg = key
+        requests.append(_text_style_request(start, end, size, bold, json.loads(color), json.loads(bg)))
+
+    for start, end, key in _merge_ranges(para_spans):
+        if key is None:
+            continue  # Default START alignment, nothing to send
+        align, border_bottom = key
+        requests.append(_paragraph_style_request(start, end, align, border_bottom))
+
+    # Last table first: earlier placeholder indexes stay valid
+    for table_index, block in reversed(table_slots):
+        requests.extend(_compile_table(block, table_index))
+
+    return requests
+
+def split_request_batches(requests, max_bytes=MAX_BATCH_BYTES):
+    """Groups requests into as few batchUpdate payloads as the size limit allows (order preserved)."""
+    batches = []
+    current = []
+    current_size = 0
+    for req in requests:
+        size = len(json.dumps(req, ensure_ascii=False).encode('utf-8'))
+        if current and current_size + size > max_bytes:
+            batches.append(current)
+            current = []
+            current_size = 0
+        current.append(req)
+        current_size += size
+    if current:
+        batches.append(current)
+    return batches
+
+# --- LOCAL DOCX RENDERER (OFFLINE EXPORT / DOCS FALLBACK) ---
+
+_DOCX_ALIGN = {'START': 'LEFT', 'CENTER': 'CENTER', 'END': 'RIGHT', 'JUSTIFIED': 'JUSTIFY'}
+
+def _hex_color(rgb):
+    return "".join(f"{int(round(rgb.get(k, 0.0) * 255)):02X}" for k in ('red', 'green', 'blue'))
+
+def render_acta_docx(data, raw_transcription=None):
+    """
+    Renders the same Acta layout as create_meeting_minutes_doc straight to DOCX bytes.
+    Fully local (python-docx): used for instant downloads and as fallback when Docs fails.
+    """
+    import io
+    from docx import Document
+    from docx.shared import Pt, RGBColor
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+
+    def add_bottom_border(paragraph, rgb):
+        p_pr = paragraph._p.get_or_add_pPr()
+        p_bdr = OxmlElement('w:pBdr')
+        bottom = OxmlElement('w:bottom')
+        bottom.set(qn('w:val'), 'single')
+        bottom.set(qn('w:sz'), '8')  # Eighths of a point -> 1pt
+        bottom.set(qn('w:space'), '1')
+        bottom.set(qn('w:color'), _hex_color(rgb))
+        p_bdr.append(bottom)
+        p_pr.append(p_bdr)
+
+    def shade(element_pr, rgb):
+        shd = OxmlElement('w:shd')
+        shd.set(qn('w:val'), 'clear')
+        shd.set(qn('w:color'), 'auto')
+        shd.set(qn('w:fill'), _hex_color(rgb))
+        element_pr.append(shd)
+
+    def style_run(run, size, bold, color=None, bg=None):
+        run.font.size = Pt(size)
+        run.font.bold = bold
+        if color:
+            run.font.color.rgb = RGBColor.from_string(_hex_color(color))
+        if bg:
+            shade(run._r.get_or_add_rPr(), bg)
+
+    document = Document()
+
+    for block in build_acta_blocks(data, raw_transcription):
+        if block['type'] == 'table':
+            rows = [[_clean_text(c).replace('\n', ' ').strip() or '(-)' for c in row] for row in block['rows']]
+            n_cols = max(len(r) for r in rows)
+            table = document.add_table(rows=len(rows), cols=n_cols)
+            table.style = 'Table Grid'
+            for r, row in enumerate(rows):
+                cells = table.rows[r].cells
+                for c in range(n_cols):
+                    text = row[c] if c < len(row) else '(-)'
+                    bold = (block.get('header') and r == 0) or (block.get('label_col') and c == 0)
+                    run = cells[c].paragraphs[0].add_run(text)
+                    style_run(run, block['size'], bool(bold), NAVY if bold else None)
+                    if block.get('header') and r == 0:
+                        shade(cells[c]._tc.get_or_add_tcPr(), CYAN_PALE)
+            continue
+
+        align = getattr(WD_ALIGN_PARAGRAPH, _DOCX_ALIGN.get(block['align'], 'LEFT'))
+        for line in _clean_text(block['text']).split('\n'):
+            paragraph = document.add_paragraph()
+            paragraph.alignment = align
+            if line:
+                style_run(paragraph.add_run(line), block['size'], block['bold'], block['color'], block['bg'])
+            if block['border_bottom']:
+                add_bottom_border(paragraph, NAVY)
+
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
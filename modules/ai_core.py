@@ -4,6 +4,8 @@ import streamlit as st
 from groq import Groq
 import re
 
+from modules.cache_backend import cached
+
 # Load API Key properly
 def _get_groq_client():
     import os
@@ -387,31 +389,35 @@ def _calculate_default_end_time(start_str):
     Fri: Limit 16:00
     """
     import datetime
+    from modules.temporal_parser import default_end_time
     try:
         start_dt = datetime.datetime.fromisoformat(start_str)
-        default_end = start_dt + datetime.timedelta(hours=2)
-        
-        # Work Hour Limits
-        weekday = start_dt.weekday() # 0=Mon, 4=Fri
-        limit_hour = 17 
-        if weekday == 4: # Friday
-            limit_hour = 16
-            
-        limit_dt = start_dt.replace(hour=limit_hour, minute=0, second=0, microsecond=0)
-        
-        # If default end exceeds limit (and start is before limit), cap it.
-        # But if start is already after limit (e.g. evening meeting), keep 2h duration.
-        if start_dt < limit_dt and default_end > limit_dt:
-             return limit_dt.strftime("%Y-%m-%dT%H:%M:%S")
-        
-        return default_end.strftime("%Y-%m-%dT%H:%M:%S")
+        return default_end_time(start_dt).strftime("%Y-%m-%dT%H:%M:%S")
     except:
         return None
 
+def _local_event_parse(text):
+    """Rule-based fast path: a single, unambiguous Spanish event resolves without calling the LLM."""
+    from modules.temporal_parser import parse_temporal
+    try:
+        return parse_temporal(text)
+    except Exception:
+        return None
+
 # --- CORE FUNCTIONS ---
 
 # @st.cache_data(ttl=3600, show_spinner=False) # TEMPORARILY DISABLED FOR TESTING
 def parse_events_ai(text_input):
+    local = _local_event_parse(text_input)
+    if local:
+        return [{
+            "type": "event",
+            "summary": local['summary'],
+            "description": text_input.strip(),
+            "start_time": local['start_time'],
+            "end_time": local['end_time']
+        }]
+
     client = _get_groq_client()
     now = datetime.datetime.now()
     
@@ -474,7 +480,7 @@ def parse_events_ai(text_input):
         st.error(f"AI Parsing Error: {e}")
         return []
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@cached('llm', ttl=3600)
 def analyze_document_vision(text_content, images_base64=[]):
     """
     Analiza texto + imágenes usando Llama 3.2 Vision (11b).
@@ -565,6 +571,13 @@ def analyze_emails_ai(emails, custom_model=None):
     # Model Selection
     model_id = custom_model if custom_model else default_primary
     
+    # One item per conversation: replies in the same thread are merged (new content only)
+    from modules.thread_aggregator import group_by_thread
+    message_count = len(emails)
+    emails = group_by_thread(emails)
+    if len(emails) < message_count:
+        st.toast(f"🧵 {message_count} correos agrupados en {len(emails)} hilos", icon="🧵")
+    
     all_results = []
     total_batches = (len(emails) + BATCH_SIZE - 1) // BATCH_SIZE
     
@@ -662,6 +675,7 @@ def analyze_emails_ai(emails, custom_model=None):
             res['body'] = original.get('body', '') 
             res['sender'] = original.get('sender', '')
             res['subject_original'] = original.get('subject', '')
+            res['message_ids'] = original.get('message_ids', [res['id']])
             final_clean.append(res)
             
     return final_clean
@@ -683,7 +697,7 @@ Instrucciones:
 Borrador:
 """
 
-@st.cache_data(show_spinner=False)
+@cached('llm')
 def generate_reply_email(email_body, intent="Confirmar recepción"):
     client = _get_groq_client()
     try:
@@ -700,7 +714,7 @@ def generate_reply_email(email_body, intent="Confirmar recepción"):
         return f"Error generando borrador: {e}"
 
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@cached('llm', ttl=3600)
 def generate_daily_briefing(events, tasks, unread_count):
     """Genera briefing textual para TTS (max 300 palabras)"""
     import datetime
@@ -807,20 +821,14 @@ RESTRICCIONES:
              except: pass
         return f"Error generando briefing: {e}"
 
+def _get_event_classifier():
+    """Compiled keyword classifier, extended with the user's own keywords if configured."""
+    from modules.event_classifier import get_classifier
+    return get_classifier(st.session_state.get('custom_event_keywords'))
+
 def categorize_event_local(event):
     """Categoriza evento SIN IA (ahorro tokens)"""
-    title = event.get('summary', '').lower()
-    description = event.get('description', '').lower()
-    keywords = {
-        'reuniones_internas': ['reunión', 'sync', 'standup', 'planning', 'retro', '1:1'],
-        'reuniones_externas': ['cliente', 'proveedor', 'demo', 'venta', 'externo'],
-        'trabajo_focalizado': ['desarrollo', 'diseño', 'análisis', 'investigación'],
-        'admin': ['admin', 'correo', 'review', 'reporte'],
-    }
-    for category, words in keywords.items():
-        if any(word in title or word in description for word in words):
-            return category
-    return 'otros'
+    return _get_event_classifier().categorize(event.get('summary', ''), event.get('description', ''))
 
 def calc_event_duration_hours(event):
     """Calcula duración en horas"""
@@ -836,42 +844,13 @@ def calc_event_duration_hours(event):
     except:
         return 0
 
-@st.cache_data(ttl=21600, show_spinner=False)
-def analyze_time_leaks_weekly(events_last_7days):
-    """Analiza distribución semanal con optimización extrema de tokens"""
+@cached('llm', ttl=21600)
+def _time_insights_llm(summary_text):
+    """LLM call on the aggregated summary only (cached by its text)."""
     client = _get_groq_client()
-    
-    categories = {
-        'reuniones_internas': [],
-        'reuniones_externas': [],
-        'trabajo_focalizado': [],
-        'admin': [],
-        'otros': []
-    }
-    
-    total_hours = 0
-    for event in events_last_7days:
-        duration = calc_event_duration_hours(event)
-        category = categorize_event_local(event)
-        categories[category].append({'title': event.get('summary', ''), 'duration': duration})
-        total_hours += duration
-    
-    stats = {}
-    for cat, items in categories.items():
-        cat_hours = sum(e['duration'] for e in items)
-        stats[cat] = {
-            'hours': round(cat_hours, 1),
-            'percentage': round((cat_hours / total_hours * 100) if total_hours > 0 else 0, 1),
-            'count': len(items)
-        }
-    
-    prompt = f"""Analiza distribución semanal y da 3 sugerencias ACCIONABLES:
+    prompt = f"""Analiza distribución del tiempo y da 3 sugerencias ACCIONABLES:
 
-TOTAL: {total_hours:.1f}h (7 días)
-- Reuniones Internas: {stats['reuniones_internas']['percentage']}% ({stats['reuniones_internas']['hours']}h, {stats['reuniones_internas']['count']} reuniones)
-- Reuniones Externas: {stats['reuniones_externas']['percentage']}% ({stats['reuniones_externas']['hours']}h)
-- Trabajo Focalizado: {stats['trabajo_focalizado']['percentage']}% ({stats['trabajo_focalizado']['hours']}h)
-- Admin/Otros: {stats['admin']['percentage']}% + {stats['otros']['percentage']}%
+{summary_text}
 
 FORMATO: Diagnóstico > Top 3 sugerencias con tiempo ahorrado > Acción prioritaria > Score 1-10"""
 
@@ -882,7 +861,7 @@ FORMATO: Diagnóstico > Top 3 sugerencias con tiempo ahorrado > Acción priorita
             temperature=0.4,
             max_tokens=500
         )
-        insights = completion.choices[0].message.content.strip()
+        return completion.choices[0].message.content.strip()
     except Exception as e:
         err_msg = str(e).lower()
         if "rate limit" in err_msg or "429" in err_msg:
@@ -893,29 +872,50 @@ FORMATO: Diagnóstico > Top 3 sugerencias con tiempo ahorrado > Acción priorita
                     temperature=0.4,
                     max_tokens=500
                 )
-                insights = completion.choices[0].message.content.strip()
-             except: insights = f"Error (Fallback Failed): {e}"
-        else:
-             insights = f"Error: {e}"
-    
-    return {
-        'stats': stats,
-        'total_hours': round(total_hours, 1),
-        'insights': insights,
-        'categories': categories
-    }
+                return completion.choices[0].message.content.strip()
+             except: return f"Error (Fallback Failed): {e}"
+        return f"Error: {e}"
+
+def analyze_time_leaks_weekly(events_last_7days, days=7):
+    """
+    Analiza distribución del tiempo (1 o más semanas) con optimización extrema de tokens.
+    El cálculo es vectorizado (modules.time_analytics); la IA solo recibe los agregados.
+    """
+    import modules.time_analytics as time_analytics
+
+    df = time_analytics.events_to_frame(events_last_7days, classify=_get_event_classifier().categorize_series)
+    analytics = time_analytics.compute_time_analytics(df, days)
+    analytics['insights'] = _time_insights_llm(time_analytics.summarize_for_prompt(analytics))
+    return analytics
 
 # @st.cache_data(ttl=86400, show_spinner=False) # REMOVED: To prevent caching fallback errors
 # @st.cache_data(ttl=86400, show_spinner=False)
+AGENDA_LOCAL_CONFIDENCE = 0.8  # Events classified above this skip the LLM entirely
+
 def analyze_agenda_ai(events_list, tasks_list=[]):
     client = _get_groq_client()
-    
-    # Simplify Inputs First
-    s_events = [{"id": e['id'], "summary": e.get('summary', 'Sin Título'), "start": e['start']} for e in events_list]
-    s_tasks = [{"id": t['id'], "title": t.get('title', 'Sin Título'), "due": t.get('due', 'Sin Fecha'), "list_id": t.get('list_id')} for t in tasks_list]
-    
+    from modules.event_classifier import CATEGORY_COLOR_IDS
+
     final_plan = {}
     notes = []
+
+    # --- LOCAL FAST PATH: high-confidence events get their color without the LLM ---
+    classifier = _get_event_classifier()
+    llm_events = []
+    local_count = 0
+    for e in events_list:
+        res = classifier.classify(e.get('summary', ''), e.get('description', ''))
+        color_id = CATEGORY_COLOR_IDS.get(res['category'])
+        if color_id and res['confidence'] >= AGENDA_LOCAL_CONFIDENCE:
+            local_count += 1
+            if str(e.get('colorId', '')) != color_id:
+                final_plan[e['id']] = {"type": "event", "colorId": color_id}
+        else:
+            llm_events.append(e)
+
+    # Simplify Inputs First
+    s_events = [{"id": e['id'], "summary": e.get('summary', 'Sin Título'), "start": e['start']} for e in llm_events]
+    s_tasks = [{"id": t['id'], "title": t.get('title', 'Sin Título'), "due": t.get('due', 'Sin Fecha'), "list_id": t.get('list_id')} for t in tasks_list]
     
     # --- PROCESS EVENTS IN BATCHES ---
     BATCH_EVENTS = 10
@@ -944,6 +944,8 @@ def analyze_agenda_ai(events_list, tasks_list=[]):
     # Combine Note
     full_note = " ".join(notes[:2]) # Keep it brief, maybe first 2 notes
     if not full_note: full_note = "Agenda procesada por lotes para máxima precisión."
+    if local_count:
+        full_note += f" ({local_count} eventos clasificados localmente sin IA.)"
     
     return {
         "optimization_plan": final_plan,
@@ -1042,8 +1044,70 @@ def _call_agenda_ai_chunk(client, payload):
              except: return {}
         return {}
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def generate_work_plan_ai(tasks_text, calendar_context=""):
+PROMPT_TASK_DURATIONS = """
+Estima cuántos MINUTOS de trabajo concentrado requiere cada tarea (mínimo 15, máximo 240).
+Devuelve SOLO un objeto JSON {{"título exacto": minutos}} con los mismos títulos recibidos.
+"""
+
+def estimate_task_durations_ai(titles):
+    """The LLM only estimates durations ({title: minutes}); scheduling arithmetic stays local. {} on failure."""
+    if not titles:
+        return {}
+    try:
+        client = _get_groq_client()
+        completion = client.chat.completions.create(
+            messages=[
+                {"role": "system", "content": PROMPT_TASK_DURATIONS},
+                {"role": "user", "content": "\n".join(f"- {t}" for t in titles)}
+            ],
+            model="llama-3.1-8b-instant",
+            temperature=0.0,
+            max_tokens=512
+        )
+        result = json.loads(_clean_json_output(completion.choices[0].message.content.strip()))
+        if isinstance(result, list):
+            result = result[0] if result and isinstance(result[0], dict) else {}
+        durations = {}
+        for t, m in result.items():
+            try:
+                durations[t] = max(15, min(240, int(float(m))))
+            except (TypeError, ValueError):
+                continue
+        return durations
+    except Exception as e:
+        print(f"Duration estimate error: {e}")
+        return {}
+
+def _local_work_plan(tasks_text, fixed_events, week_start=None):
+    """Deterministic weekly plan: tasks go into real free slots around fixed_events [(start, end, title)]."""
+    from modules.scheduler import parse_task_lines, schedule_tasks, plan_by_day
+    now = datetime.datetime.now()
+    if week_start is None:
+        # On weekends, plan the coming week
+        week_start = now.date() - datetime.timedelta(days=now.weekday())
+        if now.weekday() >= 5:
+            week_start += datetime.timedelta(days=7)
+    tasks = parse_task_lines(tasks_text, now)
+    estimates = estimate_task_durations_ai([t['title'] for t in tasks if not t['minutes']])
+    for t in tasks:
+        t['minutes'] = t['minutes'] or estimates.get(t['title'])
+
+    placements, unscheduled = schedule_tasks(tasks, [(s, e) for s, e, _ in fixed_events], week_start, now)
+    plan = plan_by_day(placements, fixed_events, week_start)
+    if unscheduled:
+        reasons = {'plazo': "no cabe antes del plazo", 'sin_espacio': "sin espacio libre esta semana"}
+        plan["Sin asignar"] = [f"{u['title']} ({u['minutes']} min, {reasons[u['reason']]})" for u in unscheduled]
+    return plan
+
+@cached('llm', ttl=3600)
+def generate_work_plan_ai(tasks_text, calendar_context="", fixed_events=None, week_start=None):
+    """
+    Weekly plan {'Lunes': [...], ...}. With fixed_events (busy intervals from the calendar cache)
+    the plan is computed locally by modules/scheduler.py; otherwise the LLM lays it out from calendar_context.
+    """
+    if fixed_events is not None:
+        return _local_work_plan(tasks_text, fixed_events, week_start)
+
     client = _get_groq_client()
     prompt = PROMPT_PLANNING.format(
         current_date=datetime.datetime.now().strftime("%Y-%m-%d"),
@@ -1216,6 +1280,17 @@ def process_brain_dump(note_text):
     """
     import datetime
     import json
+
+    local = _local_event_parse(note_text)
+    if local:
+        return {
+            "action": "create_event",
+            "summary": local['summary'],
+            "description": note_text.strip(),
+            "start_time": local['start_time'],
+            "end_time": local['end_time'],
+            "colorId": "11"
+        }
     
     client = _get_groq_client()
     now = datetime.datetime.now()
@@ -1289,7 +1364,7 @@ REGLAS:
 - Respuestas breves para memorizar.
 """
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@cached('llm', ttl=3600)
 def process_study_notes(text, mode="cornell"):
     client = _get_groq_client()
     
@@ -1451,6 +1526,16 @@ def analyze_voice_command(text_command):
     """
     import datetime
     import json
+
+    local = _local_event_parse(text_command)
+    if local:
+        return {"actions": [{"action": "create_event", "params": {
+            "summary": local['summary'],
+            "start_time": local['start_time'],
+            "end_time": local['end_time'],
+            "description": text_command.strip()
+        }}]}
+
     client = _get_groq_client()
     
     curr_date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
@@ -1,12 +1,25 @@
 import os
-import pandas as pd
+import functools
+import threading
 import streamlit as st
 
-# URL pública de tu Google Sheet (Formato CSV)
-from streamlit_gsheets import GSheetsConnection
+# pandas and streamlit_gsheets (gspread) are imported inside the functions that read the sheet:
+# rendering the login page doesn't pay for them.
 
 LICENSE_FILE = ".license_key"
 
+# Every writer below reads the whole users sheet, edits one row and writes it all back:
+# two of them interleaving in this process would drop each other's changes.
+_SHEET_WRITE_LOCK = threading.RLock()
+
+def _serialized_write(fn):
+    """Runs a read-modify-write of the users sheet under the process-wide sheet lock."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with _SHEET_WRITE_LOCK:
+            return fn(*args, **kwargs)
+    return wrapper
+
 def get_billing_info():
     """Retorna información para mostrar en la pantalla de pago."""
     return """
@@ -22,11 +35,13 @@ def get_billing_info():
 
 from datetime import datetime
 
+@_serialized_write
 def login_user(username, password):
     """
     Verifica usuario y contraseña en Google Sheets.
     Retorna (True/False, user_data_dict).
     """
+    import pandas as pd
     if not username or not password: return False, {}
     
     user_clean = username.strip()
@@ -46,6 +61,7 @@ def login_user(username, password):
             sheet_url = st.secrets["private_sheet_url"]
 
         # Conectar
+        from streamlit_gsheets import GSheetsConnection
         conn = st.connection("gsheets", type=GSheetsConnection)
         df = conn.read(spreadsheet=sheet_url, ttl=0)
         df.columns = df.columns.str.lower().str.strip()
@@ -239,6 +255,7 @@ def get_user_history(user_data):
             
     return result
 
+@_serialized_write
 def update_user_history(username, new_items_dict):
     """
     Updates the user's history in Google Sheets with rich objects.
@@ -253,6 +270,7 @@ def update_user_history(username, new_items_dict):
         else:
              sheet_url = st.secrets["private_sheet_url"]
              
+        from streamlit_gsheets import GSheetsConnection
         conn = st.connection("gsheets", type=GSheetsConnection)
         df = conn.read(spreadsheet=sheet_url, ttl=0)
         df.columns = df.columns.str.lower().str.strip()
@@ -340,6 +358,7 @@ def get_all_users():
         else:
              sheet_url = "https://docs.google.com/spreadsheets/d/1DB2whTniVqxaom6x-lPMempJozLnky1c0GTzX2R2-jQ/edit?gid=0#gid=0"
 
+        from streamlit_gsheets import GSheetsConnection
         conn = st.connection("gsheets", type=GSheetsConnection)
         df = conn.read(spreadsheet=sheet_url, ttl=0)
         df.columns = df.columns.str.lower().str.strip()
@@ -392,6 +411,7 @@ def refresh_user_data(username):
         else:
              sheet_url = "https://docs.google.com/spreadsheets/d/1DB2whTniVqxaom6x-lPMempJozLnky1c0GTzX2R2-jQ/edit?gid=0#gid=0"
 
+        from streamlit_gsheets import GSheetsConnection
         conn = st.connection("gsheets", type=GSheetsConnection)
         df = conn.read(spreadsheet=sheet_url, ttl=0)
         df.columns = df.columns.str.lower().str.strip()
@@ -415,10 +435,12 @@ def refresh_user_data(username):
         print(f"Error refreshing user data: {e}")
         return None
 
-def update_user_token(username, token_json):
+@_serialized_write
+def update_user_token(username, token_json, notify=True):
     """
     Guarda el token OAuth actualizado en la columna 'COD_VAL' del Google Sheet.
     Respeta mayúsculas/minúsculas de la hoja original.
+    notify=False: guardado silencioso (renovación automática del token).
     """
     try:
         if "private_sheet_url" in st.secrets:
@@ -427,6 +449,7 @@ def update_user_token(username, token_json):
              # Fallback known URL
              sheet_url = "https://docs.google.com/spreadsheets/d/1DB2whTniVqxaom6x-lPMempJozLnky1c0GTzX2R2-jQ/edit?gid=0#gid=0"
 
+        from streamlit_gsheets import GSheetsConnection
         conn = st.connection("gsheets", type=GSheetsConnection)
         # Read full df
         df = conn.read(spreadsheet=sheet_url, ttl=0)
@@ -464,7 +487,8 @@ def update_user_token(username, token_json):
         # using update() as write() is not supported in this version
         conn.update(spreadsheet=sheet_url, data=df)
         
-        st.toast("🔐 Credenciales guardadas en la nube para futuro acceso.")
+        if notify:
+            st.toast("🔐 Credenciales guardadas en la nube para futuro acceso.")
         return True
         
     except Exception as e:
@@ -473,6 +497,7 @@ def update_user_token(username, token_json):
         print(f"❌ ERROR SAVE TOKEN: {e}")
         return False
 
+@_serialized_write
 def update_user_field(username, field_name, new_value):
     """
     Updates a specific field for a user in the Google Sheet.
@@ -484,6 +509,7 @@ def update_user_field(username, field_name, new_value):
         else:
              sheet_url = "https://docs.google.com/spreadsheets/d/1DB2whTniVqxaom6x-lPMempJozLnky1c0GTzX2R2-jQ/edit?gid=0#gid=0"
 
+        from streamlit_gsheets import GSheetsConnection
         conn = st.connection("gsheets", type=GSheetsConnection)
         df = conn.read(spreadsheet=sheet_url, ttl=0)
         
@@ -520,6 +546,7 @@ def update_user_field(username, field_name, new_value):
     except Exception as e:
         return False, str(e)
 
+@_serialized_write
 def change_password(username, old_password, new_password):
     """
     Cambia la contraseña del usuario en Google Sheets.
@@ -556,6 +583,7 @@ def change_password(username, old_password, new_password):
     except Exception as e:
         return False, f"Error: {e}"
 
+@_serialized_write
 def update_users_batch(edited_df):
     """
     Updates multiple users/fields efficiently in one go.
@@ -568,6 +596,7 @@ def update_users_batch(edited_df):
         else:
              sheet_url = "https://docs.google.com/spreadsheets/d/1DB2whTniVqxaom6x-lPMempJozLnky1c0GTzX2R2-jQ/edit?gid=0#gid=0"
 
+        from streamlit_gsheets import GSheetsConnection
         conn = st.connection("gsheets", type=GSheetsConnection)
         original_df = conn.read(spreadsheet=sheet_url, ttl=0)
         
@@ -630,6 +659,7 @@ def update_users_batch(edited_df):
     except Exception as e:
         return False, f"Batch Error: {str(e)}"
 
+@_serialized_write
 def check_and_update_daily_quota(username, requested_amount=0):
     """
     Gestiona la cuota diaria de correos.
@@ -640,6 +670,7 @@ def check_and_update_daily_quota(username, requested_amount=0):
     2. Si FECHA_USO != Hoy, reinicia USAGE = 0.
     3. Si USAGE + requested <= LIMIT, permite y actualiza.
     """
+    import pandas as pd
     try:
         import datetime
         today_str = datetime.datetime.now().strftime('%Y-%m-%d')
@@ -649,6 +680,7 @@ def check_and_update_daily_quota(username, requested_amount=0):
         else:
             sheet_url = "https://docs.google.com/spreadsheets/d/1DB2whTniVqxaom6x-lPMempJozLnky1c0GTzX2R2-jQ/edit?gid=0#gid=0"
 
+        from streamlit_gsheets import GSheetsConnection
         conn = st.connection("gsheets", type=GSheetsConnection)
         df = conn.read(spreadsheet=sheet_url, ttl=0)
         
@@ -708,6 +740,7 @@ def check_and_update_daily_quota(username, requested_amount=0):
         print(f"Quota Error: {e}")
         return False, 0, 0, 0
 
+@_serialized_write
 def update_history_and_quota(username, new_history_items, quota_amount):
     """
     ATOMIC UPDATE: Updates both user history and daily quota in a single Read-Modify-Write cycle.
@@ -716,6 +749,7 @@ def update_history_and_quota(username, new_history_items, quota_amount):
     new_history_items: {'mail': [...], 'labels': [...]}
     quota_amount: int (number of emails to add to usage)
     """
+    import pandas as pd
     try:
         import datetime
         today_str = datetime.datetime.now().strftime('%Y-%m-%d')
@@ -725,6 +759,7 @@ def update_history_and_quota(username, new_history_items, quota_amount):
         else:
             sheet_url = "https://docs.google.com/spreadsheets/d/1DB2whTniVqxaom6x-lPMempJozLnky1c0GTzX2R2-jQ/edit?gid=0#gid=0"
 
+        from streamlit_gsheets import GSheetsConnection
         conn = st.connection("gsheets", type=GSheetsConnection)
         df = conn.read(spreadsheet=sheet_url, ttl=0)
         df.columns = df.columns.str.lower().str.strip()
@@ -829,6 +864,7 @@ def update_history_and_quota(username, new_history_items, quota_amount):
         st.error(f"Error guardando datos: {e}")
         return False
 
+@_serialized_write
 def create_user(user_data):
     """
     Crea un nuevo usuario en Google Sheets.
@@ -904,6 +940,7 @@ def create_user(user_data):
     except Exception as e:
         return False, f"Error al crear usuario: {str(e)}"
 
+@_serialized_write
 def check_and_update_doc_analysis_quota(username, requested_amount=0):
     """
     Gestiona la cuota diaria de ANALISIS DE DOCUMENTOS (PDF/IMG).
@@ -914,6 +951,7 @@ def check_and_update_doc_analysis_quota(username, requested_amount=0):
     - Usage: 'usos_analisis'
     - Date: 'fecha_analisis'
     """
+    import pandas as pd
     try:
         import datetime
         today_str = datetime.datetime.now().strftime('%Y-%m-%d')
@@ -923,6 +961,7 @@ def check_and_update_doc_analysis_quota(username, requested_amount=0):
         else:
             sheet_url = "https://docs.google.com/spreadsheets/d/1DB2whTniVqxaom6x-lPMempJozLnky1c0GTzX2R2-jQ/edit?gid=0#gid=0"
 
+        from streamlit_gsheets import GSheetsConnection
         conn = st.connection("gsheets", type=GSheetsConnection)
         df = conn.read(spreadsheet=sheet_url, ttl=0)
         
@@ -983,6 +1022,7 @@ def check_and_update_doc_analysis_quota(username, requested_amount=0):
         print(f"Doc Quota Error: {e}")
         return False, 0, 0, 0
 
+@_serialized_write
 def save_calendar_session(username, calendar_id):
     """
     Guarda el Calendar ID en la columna 'sesion_calendar' de Google Sheets.
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import socket
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+# --- CONSTANTS ---
+# Per-namespace limits: default TTL (seconds), entries kept in-process (LRU) and largest value
+# accepted (serialized bytes). Values over max_bytes are simply not cached.
+NAMESPACES = {
+    'llm': {'ttl': 3600, 'max_entries': 2000, 'max_bytes': 256 * 1024},     # ai_core responses
+    'google': {'ttl': 300, 'max_entries': 5000, 'max_bytes': 512 * 1024},   # Per-user lists/maps, encrypted per user
+    'context': {'ttl': 1800, 'max_entries': 200, 'max_bytes': 64 * 1024},   # IP geo, Boostr weather
+    'weather': {'ttl': 1800, 'max_entries': 200, 'max_bytes': 16 * 1024},   # Open-Meteo
+}
+DEFAULT_LIMITS = {'ttl': 600, 'max_entries': 1000, 'max_bytes': 64 * 1024}
+KEY_PREFIX = "agent:"
+RETRY_SECONDS = 30          # Networked backend: pause after a connection error
+SOCKET_TIMEOUT = 0.5        # A slow cache must never be slower than the call it saves
+
+MISS = object()
+
+def _limits(namespaces, namespace):
+    return namespaces.get(namespace, DEFAULT_LIMITS)
+
+def make_key(namespace, key):
+    """Stable key for any JSON-able value; hashed so user emails or prompts never appear in the store."""
+    digest = hashlib.sha256(json.dumps(key, default=str, sort_keys=True).encode('utf-8')).hexdigest()
+    return f"{KEY_PREFIX}{namespace}:{digest}"
+
+class CacheBackend:
+    """
+    Namespaced key-value cache shared by ai_core, google_services, context_services and
+    weather_service. Values are stored as JSON (callers get a fresh copy on every hit).
+    Subclasses implement _get/_set/_delete on serialized bytes.
+    """
+
+    def __init__(self, namespaces=None):
+        self.namespaces = namespaces or NAMESPACES
+
+    def get(self, namespace, key, default=None):
+        raw = self._get(namespace, make_key(namespace, key))
+        if raw is None:
+            return default
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return default
+
+    def set(self, namespace, key, value, ttl=None):
+        """Stores value; False when it can't be serialized or exceeds the namespace size limit."""
+        limits = _limits(self.namespaces, namespace)
+        try:
+            raw = json.dumps(value, default=str).encode('utf-8')
+        except (TypeError, ValueError):
+            return False
+        if len(raw) > limits['max_bytes']:
+            return False
+        self._set(namespace, make_key(namespace, key), raw, ttl or limits['ttl'])
+        return True
+
+    def delete(self, namespace, key):
+        self._delete(namespace, make_key(namespace, key))
+
+class MemoryBackend(CacheBackend):
+    """In-process backend: one LRU per namespace with per-entry expiry. Thread-safe."""
+
+    def __init__(self, namespaces=None):
+        super().__init__(namespaces)
+        self._lock = threading.Lock()
+        self._data = {}   # namespace -> OrderedDict(full_key -> (expires_at, raw))
+
+    def _get(self, namespace, full_key):
+        with self._lock:
+            entries = self._data.get(namespace)
+            if not entries or full_key not in entries:
+                return None
+            expires_at, raw = entries[full_key]
+            if expires_at < time.time():
+                del entries[full_key]
+                return None
+            entries.move_to_end(full_key)
+            return raw
+
+    def _set(self, namespace, full_key, raw, ttl):
+        max_entries = _limits(self.namespaces, namespace)['max_entries']
+        with self._lock:
+            entries = self._data.setdefault(namespace, OrderedDict())
+            entries[full_key] = (time.time() + ttl, raw)
+            entries.move_to_end(full_key)
+            while len(entries) > max_entries:
+                entries.popitem(last=False)
+
+    def _delete(self, namespace, full_key):
+        with self._lock:
+            self._data.get(namespace, {}).pop(full_key, None)
+
+    def size(self, namespace):
+        return len(self._data.get(namespace, {}))
+
+class RedisError(Exception):
+    pass
+
+class RedisBackend(CacheBackend):
+    """
+    Networked backend speaking the Redis protocol (RESP) over a plain socket: Redis, Valkey,
+    KeyDB or any stand-in server with GET / SET PX / DEL. Expiry is enforced by the server (PX);
+    the entry-count limit is left to the server's maxmemory policy. On connection errors it serves
+    from an in-process MemoryBackend for RETRY_SECONDS instead of failing the caller.
+    """
+
+    def __init__(self, url, namespaces=None, timeout=SOCKET_TIMEOUT):
+        super().__init__(namespaces)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.strip('/') or 0)
+        self.timeout = timeout
+        self.fallback = MemoryBackend(namespaces)
+        self._lock = threading.Lock()
+        self._sock = None
+        self._reader = None
+        self._down_until = 0
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._reader = self._sock.makefile('rb')
+        if self.password:
+            self._send('AUTH', self.password)
+        if self.db:
+            self._send('SELECT', self.db)
+
+    def _close(self):
+        for closable in (self._reader, self._sock):
+            try:
+                if closable is not None:
+                    closable.close()
+            except OSError:
+                pass
+        self._sock = self._reader = None
+
+    def _send(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        self._sock.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Cache server closed the connection")
+        kind, body = line[:1], line[1:-2]
+        if kind == b'+':
+            return body.decode()
+        if kind == b'-':
+            raise RedisError(body.decode())
+        if kind == b':':
+            return int(body)
+        if kind == b'$':
+            length = int(body)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            count = int(body)
+            return None if count < 0 else [self._read_reply() for _ in range(count)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def _command(self, *args):
+        """Runs one command; MISS (and fallback mode) when the server is unreachable."""
+        if time.time() < self._down_until:
+            return MISS
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._connect()
+                return self._send(*args)
+            except (OSError, ConnectionError, RedisError, ValueError) as e:
+                print(f"Cache backend unavailable ({self.host}:{self.port}): {e}")
+                self._close()
+                self._down_until = time.time() + RETRY_SECONDS
+                return MISS
+
+    def _get(self, namespace, full_key):
+        reply = self._command('GET', full_key)
+        if reply is MISS:
+            return self.fallback._get(namespace, full_key)
+        return reply
+
+    def _set(self, namespace, full_key, raw, ttl):
+        if self._command('SET', full_key, raw, 'PX', int(ttl * 1000)) is MISS:
+            self.fallback._set(namespace, full_key, raw, ttl)
+
+    def _delete(self, namespace, full_key):
+        self.fallback._delete(namespace, full_key)
+        self._command('DEL', full_key)
+
+def _backend_url():
+    url = os.getenv('CACHE_BACKEND_URL')
+    if not url:
+        try:
+            import streamlit as st
+            url = st.secrets.get('cache_backend_url')
+        except Exception:
+            url = None
+    return url
+
+_BACKEND = None
+
+def get_cache_backend():
+    """Process-wide backend: RedisBackend when CACHE_BACKEND_URL / secrets 'cache_backend_url' is set, else in-process."""
+    global _BACKEND
+    if _BACKEND is None:
+        url = _backend_url()
+        _BACKEND = RedisBackend(url) if url else MemoryBackend()
+    return _BACKEND
+
+def set_cache_backend(backend):
+    """Replaces the process-wide backend (tests, custom deployments)."""
+    global _BACKEND
+    _BACKEND = backend
+
+def cached(namespace, ttl=None):
+    """
+    Drop-in for @st.cache_data on functions with JSON-able arguments and results: the key is the
+    function name plus its arguments, and hits are shared by every process using the same backend.
+    """
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            backend = get_cache_backend()
+            key = [name, args, sorted(kwargs.items())]
+            value = backend.get(namespace, key, MISS)
+            if value is not MISS:
+                return value
+            value = fn(*args, **kwargs)
+            backend.set(namespace, key, value, ttl)
+            return value
+        return wrapper
+    return decorator
@@ -138,7 +138,18 @@ def render_chat_view():
                     # Parse (Handle List or Single Object)
                     data = json.loads(json_str)
                     actions_list = data if isinstance(data, list) else [data]
-                    
+
+                    # Conflict check for every event of the batch (one windowed list), before creating any
+                    batch_events = [a.get('params', {}) for a in actions_list if a.get('action') == 'create_event']
+                    conflict_of = {}
+                    if batch_events:
+                        cal_svc = gs.get_calendar_service()
+                        if cal_svc:
+                            from modules.conflict_detector import describe_conflict
+                            cal_id = st.session_state.get('conf_calendar_id') or st.session_state.get('connected_email') or 'primary'
+                            _, conflicts = gs.screen_event_batch(cal_svc, cal_id, batch_events)
+                            conflict_of = {id(p): describe_conflict(c) for p, c in zip(batch_events, conflicts) if c}
+
                     for action_data in actions_list:
                         action_type = action_data.get('action')
                         params = action_data.get('params', {})
@@ -169,7 +180,11 @@ def render_chat_view():
                                         target_cal = st.session_state.get('conf_calendar_id') or st.session_state.get('connected_email') or 'primary'
                                         ok, msg = gs.add_event_to_calendar(svc, params, calendar_id=target_cal)
                                         if ok: 
-                                            result_msg = f"✅ Evento creado: {params.get('summary')}"
+                                            if id(params) in conflict_of:
+                                                st.warning(f"⚠️ {params.get('summary', 'Evento')}: {conflict_of[id(params)]}")
+                                            # Stable IDs: re-running the same action reports the existing event
+                                            already_existed = "ya existía" in msg
+                                            result_msg = f"✅ Ya estaba agendado: {params.get('summary')}" if already_existed else f"✅ Evento creado: {params.get('summary')}"
                                             action_executed = True
                                             
                                             # Extract event ID from message (format: "Evento creado. ID: xxx")
@@ -177,8 +192,9 @@ def render_chat_view():
                                             if "ID:" in msg:
                                                 event_id = msg.split("ID:")[1].strip()
                                             
-                                            # Store in recent actions
-                                            if event_id:
+                                            # Store in recent actions (only events created now: "Deshacer" must never
+                                            # delete one the user already had)
+                                            if event_id and not already_existed:
                                                 action_record = {
                                                     "type": "event",
                                                     "id": event_id,
@@ -358,8 +374,11 @@ def _get_lite_context():
     # 1. EVENTS (Today + Tomorrow)
     ctx += "\n=== AGENDA REAL ===\n"
     try:
-        # Try Cache First
-        events = st.session_state.get('c_events_cache', [])
+        # Try the planner's event store first (next 48 hours, expanded locally)
+        events = []
+        store = st.session_state.get('event_store')
+        if store is not None and store.covers(now, now + datetime.timedelta(days=2)):
+            events = store.events_between(now, now + datetime.timedelta(days=2))
         
         # If cache empty, force fetch (Critical for Chat accuracy)
         if not events:
@@ -372,9 +391,9 @@ def _get_lite_context():
                 t_max = (now + datetime.timedelta(days=2)).isoformat() + 'Z' # 48 hours window
                 events_result = svc_cal.events().list(
                     calendarId=target_cal, timeMin=t_min, timeMax=t_max, 
-                    singleEvents=True, orderBy='startTime'
+                    singleEvents=True, orderBy='startTime', fields=gs.list_fields('chat_events')
                 ).execute()
-                events = events_result.get('items', [])
+                events = gs.watch_fields(events_result.get('items', []), 'chat_events')
         
         if events:
             count = 0
@@ -401,10 +420,10 @@ def _get_lite_context():
     try:
         svc_tasks = gs.get_tasks_service()
         if svc_tasks:
-            tasks = gs.get_existing_tasks_simple(svc_tasks)
-            # Filter only needing action? API already returns 'needsAction' primarily if showCompleted=False
+            # Served from the per-user snapshot (no API call within the TTL)
+            tasks = gs.get_task_snapshot(svc_tasks).top(5)
             if tasks:
-                for t in tasks[:5]: # Top 5
+                for t in tasks: # Top 5
                    ctx += f"- {t.get('title', 'Tarea')} (ID: {t.get('id')})\n"
             else:
                 ctx += "(Sin tareas pendientes)\n"
@@ -421,13 +440,15 @@ def _get_lite_context():
             
             # Re-use fetch logic but keep it simple/fast
             # Query: unread
-            results = curr_svc.users().messages().list(userId='me', q="is:unread -category:promotions -category:social", maxResults=5).execute()
+            results = curr_svc.users().messages().list(userId='me', q="is:unread -category:promotions -category:social", maxResults=5,
+                                                      fields=gs.list_fields('message_ids', 'messages')).execute()
             msgs = results.get('messages', [])
             
             if msgs:
                 for m in msgs:
-                    # Quick fetch snippet
-                    full = curr_svc.users().messages().get(userId='me', id=m['id'], format='minimal').execute()
+                    # Headers only ('minimal' carries no headers at all)
+                    full = curr_svc.users().messages().get(userId='me', id=m['id'], format='metadata', metadataHeaders=['Subject', 'From'],
+                                                           fields=gs.get_fields('message_headers')).execute()
                     headers = full.get('payload', {}).get('headers', [])
                     subj = next((h['value'] for h in headers if h['name'] == 'Subject'), '(Sin Asunto)')
                     sender = next((h['value'] for h in headers if h['name'] == 'From'), 'Desconocido')
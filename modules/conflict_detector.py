@@ -0,0 +1,182 @@
+import heapq
+import datetime
+
+from modules.scheduler import work_window, free_slots
+
+# --- CONSTANTS ---
+MIN_BREAK_MINUTES = 10        # Gaps shorter than this don't count as a break
+MAX_CHAIN_MINUTES = 180       # Back-to-back blocks longer than this (without a break) are flagged
+DEFAULT_EVENT_MINUTES = 60    # Candidates without end_time (same default as the chat actions)
+SEARCH_WEEKS = 2              # Suggestions look in the candidate's week and the next one
+
+def _local_naive(value, tz_name="America/Santiago"):
+    """ISO string / datetime -> naive local datetime (aware values are converted). None for dates or invalid input."""
+    from zoneinfo import ZoneInfo
+    if not value:
+        return None
+    if isinstance(value, str):
+        if 'T' not in value:
+            return None  # All-day
+        try:
+            value = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime.datetime):
+        return None
+    if value.tzinfo:
+        value = value.astimezone(ZoneInfo(tz_name)).replace(tzinfo=None)
+    return value
+
+def candidate_interval(ev, tz_name="America/Santiago"):
+    """(start, end) of a parsed event dict ('start_time', 'end_time'), or None for tasks / all-day / invalid."""
+    if ev.get('type') == 'task':
+        return None
+    start = _local_naive(ev.get('start_time'), tz_name)
+    if start is None:
+        return None
+    end = _local_naive(ev.get('end_time'), tz_name)
+    if end is None or end <= start:
+        end = start + datetime.timedelta(minutes=DEFAULT_EVENT_MINUTES)
+    return start, end
+
+def _out_of_hours(start, end):
+    if start.weekday() >= 5:
+        return 'fin_de_semana'
+    day_start, day_end = work_window(start.date())
+    if start < day_start or end > day_end:
+        return 'fuera_de_horario'
+    return None
+
+def suggestion_range(starts, tz_name="America/Santiago"):
+    """
+    (first, last) naive local datetimes that _suggest may search for these candidate starts: from the
+    Monday of the earliest week to SEARCH_WEEKS weeks after the Monday of the latest. Busy intervals
+    must be fetched for this whole range, or booked slots outside it would look free.
+    """
+    local = [d for d in (_local_naive(s, tz_name) for s in starts) if d is not None]
+    if not local:
+        return None
+    first, last = min(local).date(), max(local).date()
+    first -= datetime.timedelta(days=first.weekday())
+    last += datetime.timedelta(days=7 * SEARCH_WEEKS - last.weekday())
+    return datetime.datetime.combine(first, datetime.time.min), datetime.datetime.combine(last, datetime.time.min)
+
+def _suggest(start, end, busy, now, window=None):
+    """
+    Nearest start (either direction) of a free working-hours gap that fits the duration, or None.
+    `window` (first, last) limits the search to the range whose busy intervals are known.
+    """
+    need = end - start
+    monday = start.date() - datetime.timedelta(days=start.weekday())
+    pad = datetime.timedelta(minutes=MIN_BREAK_MINUTES)
+    padded = [(s - pad, e + pad) for s, e in busy]
+    best = None
+    for week in range(SEARCH_WEEKS):
+        for slot_start, slot_end in free_slots(monday + datetime.timedelta(weeks=week), padded, now):
+            if window:
+                slot_start, slot_end = max(slot_start, window[0]), min(slot_end, window[1])
+            if slot_end - slot_start < need:
+                continue
+            option = min(max(start, slot_start), slot_end - need)
+            distance = abs(option - start)
+            if best is None or distance < best[0]:
+                best = (distance, option)
+    return (best[1], best[1] + need) if best else None
+
+def detect_conflicts(candidates, busy, now=None, tz_name="America/Santiago", window=None):
+    """
+    Checks a batch of parsed events against the existing busy intervals ([(start, end, title)],
+    see scheduler.busy_from_events) and against each other, with one sort + sweep (O(n log n + overlaps)):
+    overlaps, back-to-back chains without a break, and placements outside working hours.
+    Every flagged candidate gets the nearest free slot of the same duration as a suggestion,
+    searched only inside `window` (first, last) when given (the range `busy` was fetched for).
+
+    Returns:
+        list: same length as candidates; None when clean, otherwise
+              {'overlaps': [titles], 'chain': (start, end) or None, 'out_of_hours': reason or None,
+               'suggestion': (start, end) or None}
+    """
+    results = [None] * len(candidates)
+    spans = {}
+    intervals = []
+    for s, e, title in busy:
+        if e > s:
+            intervals.append((s, e, -1, title))
+    for i, ev in enumerate(candidates):
+        span = candidate_interval(ev, tz_name)
+        if span:
+            spans[i] = span
+            intervals.append((span[0], span[1], i, ev.get('summary', 'Evento')))
+    if not spans:
+        return results
+    intervals.sort(key=lambda iv: (iv[0], iv[1], iv[2]))
+
+    found = {i: {'overlaps': [], 'chain': None, 'out_of_hours': None, 'suggestion': None} for i in spans}
+
+    # Overlaps: the heap holds the intervals still open at the current start
+    active = []
+    for seq, (s, e, idx, title) in enumerate(intervals):
+        while active and active[0][0] <= s:
+            heapq.heappop(active)
+        for _, _, o_idx, o_title in active:
+            if idx >= 0:
+                found[idx]['overlaps'].append(o_title)
+            if o_idx >= 0:
+                found[o_idx]['overlaps'].append(title)
+        heapq.heappush(active, (e, seq, idx, title))
+
+    # Chains: consecutive blocks separated by less than MIN_BREAK_MINUTES
+    min_break = datetime.timedelta(minutes=MIN_BREAK_MINUTES)
+    max_chain = datetime.timedelta(minutes=MAX_CHAIN_MINUTES)
+
+    def close(chain_start, chain_end, members):
+        if len(members) > 1 and chain_end - chain_start > max_chain:
+            for idx in members:
+                if idx >= 0:
+                    found[idx]['chain'] = (chain_start, chain_end)
+
+    chain_start, chain_end, members = None, None, []
+    for s, e, idx, _ in intervals:
+        if chain_end is not None and s - chain_end < min_break:
+            chain_end = max(chain_end, e)
+            members.append(idx)
+            continue
+        if members:
+            close(chain_start, chain_end, members)
+        chain_start, chain_end, members = s, e, [idx]
+    if members:
+        close(chain_start, chain_end, members)
+
+    # Working hours, then suggestions (accepted suggestions block later ones)
+    taken = [(s, e) for s, e, _ in busy]
+    taken += [spans[i] for i in spans]
+    for i in sorted(spans):
+        info = found[i]
+        info['out_of_hours'] = _out_of_hours(*spans[i])
+        if not (info['overlaps'] or info['chain'] or info['out_of_hours']):
+            continue
+        others = [iv for iv in taken if iv is not spans[i]]
+        info['suggestion'] = _suggest(spans[i][0], spans[i][1], others, now, window)
+        if info['suggestion']:
+            taken.append(info['suggestion'])
+        results[i] = info
+    return results
+
+def describe_conflict(info):
+    """One-line Spanish summary of a detect_conflicts entry, for warnings."""
+    parts = []
+    if info['overlaps']:
+        titles = list(dict.fromkeys(info['overlaps']))
+        parts.append("Choca con: " + ", ".join(titles[:3]) + (f" (+{len(titles) - 3})" if len(titles) > 3 else ""))
+    if info['chain']:
+        s, e = info['chain']
+        parts.append(f"Bloque continuo sin pausa {s.strftime('%H:%M')}-{e.strftime('%H:%M')}")
+    if info['out_of_hours'] == 'fin_de_semana':
+        parts.append("Cae en fin de semana")
+    elif info['out_of_hours']:
+        parts.append("Fuera del horario laboral")
+    text = " · ".join(parts)
+    if info['suggestion']:
+        s, e = info['suggestion']
+        text += f" → Sugerencia: {s.strftime('%d/%m %H:%M')}-{e.strftime('%H:%M')}"
+    return text
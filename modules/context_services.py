@@ -2,6 +2,8 @@ import requests
 import datetime
 import streamlit as st
 
+from modules.cache_backend import get_cache_backend
+
 # --- CONSTANTS ---
 HOLIDAYS_2026 = {
   "year": 2026,
@@ -47,11 +49,17 @@ def get_ip_info():
     Nota: En Streamlit Cloud esto devolverá la IP del servidor (USA),
     por lo que se usa principalmente para defaults locales si se corre localmente.
     """
+    backend = get_cache_backend()
+    cached = backend.get('context', 'ip_info')
+    if cached is not None:
+        return cached
     try:
         # Service suggested by user style response
         resp = requests.get("http://ip-api.com/json/", timeout=3)
         if resp.status_code == 200:
-            return resp.json()
+            data = resp.json()
+            backend.set('context', 'ip_info', data)  # Same server IP for every session of a replica
+            return data
     except:
         pass
     return {}
@@ -63,12 +71,17 @@ def get_weather_boostr(city_name="Santiago"):
     """
     code = AIRPORT_CODES.get(city_name, "SCEL") # Default Santiago
     url = f"https://api.boostr.cl/weather/{code}.json"
+    backend = get_cache_backend()
+    cached = backend.get('context', ['boostr', code])
+    if cached is not None:
+        return cached
     
     try:
         resp = requests.get(url, timeout=5)
         if resp.status_code == 200:
             data = resp.json()
             if data.get('status') == 'success':
+                backend.set('context', ['boostr', code], data['data'])  # Failures are not cached
                 return data['data']
     except Exception as e:
         print(f"Weather Error: {e}")
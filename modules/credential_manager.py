@@ -0,0 +1,223 @@
+import json
+import time
+import hashlib
+import datetime
+import threading
+
+# --- CONSTANTS ---
+REFRESH_MARGIN_SECONDS = 300   # Tokens expiring within 5 minutes are refreshed ahead of time
+CHECK_INTERVAL_SECONDS = 60    # Period of the background sweep
+IDLE_SECONDS = 1800            # Entries unused this long (session gone) are dropped instead of refreshed
+APP_USER = '__app__'           # Owner of process-wide credentials (service_account.json / secrets)
+
+def parse_json_field(raw):
+    """JSON kept in a sheet cell, possibly CSV-quoted ('"{""a"": 1}"') -> dict, or None."""
+    if isinstance(raw, dict):
+        return dict(raw)
+    if not isinstance(raw, str) or not raw.strip():
+        return None
+    text = raw.strip()
+    candidates = [text]
+    if text.startswith('"') and text.endswith('"'):
+        candidates.append(text[1:-1])
+    if '""' in text:
+        cleaned = text.replace('""', '"')
+        candidates.append(cleaned[1:-1] if cleaned.startswith('"') and cleaned.endswith('"') else cleaned)
+    for candidate in candidates:
+        try:
+            info = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(info, dict):
+            return info
+    return None
+
+def _identity(kind, info):
+    """Same grant -> same entry: a refreshed token (new access token, same refresh token) is not re-parsed."""
+    if kind == 'sa':
+        parts = (info.get('client_email'), info.get('private_key_id'))
+    else:
+        parts = (info.get('client_id'), info.get('refresh_token') or info.get('token'))
+    return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+
+def _utcnow():
+    # google-auth keeps expiry as naive UTC
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+class CredentialManager:
+    """
+    Parsed Google credentials per user: service accounts ('sa') and OAuth user tokens ('user').
+    Each JSON is parsed once per process, and a daemon thread refreshes access tokens
+    REFRESH_MARGIN_SECONDS before they expire, so requests never pay the refresh round trip.
+    Only entries used within `idle_seconds` are refreshed; older ones are evicted.
+    Refreshed user tokens are never written from here: the owning session collects them with
+    take_pending() and persists them from a worker carrying its script-run context.
+    """
+
+    def __init__(self, scopes, request_factory=None, margin=REFRESH_MARGIN_SECONDS, idle_seconds=IDLE_SECONDS):
+        self.scopes = scopes
+        self.request_factory = request_factory
+        self.margin = margin
+        self.idle_seconds = idle_seconds
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._entries = {}   # (kind, user) -> {'creds', 'identity', 'used', 'pending'}
+        self._busy = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _request(self):
+        if self.request_factory is not None:
+            return self.request_factory()
+        from google.auth.transport.requests import Request
+        return Request()
+
+    def _cached(self, kind, user, identity):
+        with self._lock:
+            entry = self._entries.get((kind, user))
+            if not entry or entry['identity'] != identity:
+                return None
+            entry['used'] = time.time()
+            return entry['creds']
+
+    def _track(self, kind, user, creds, identity):
+        with self._lock:
+            self._entries[(kind, user)] = {'creds': creds, 'identity': identity, 'used': time.time(), 'pending': None}
+        self._start()
+        return creds
+
+    def service_account(self, user, info):
+        """Service-account credentials for `user` from its key JSON (dict), parsed once."""
+        identity = _identity('sa', info)
+        creds = self._cached('sa', user, identity)
+        if creds is None:
+            from google.oauth2 import service_account
+            creds = self._track('sa', user, service_account.Credentials.from_service_account_info(info, scopes=self.scopes), identity)
+        return creds
+
+    def user_credentials(self, user, info):
+        """OAuth user credentials from an authorized-user JSON (dict), parsed once per grant."""
+        identity = _identity('user', info)
+        creds = self._cached('user', user, identity)
+        if creds is None:
+            from google.oauth2.credentials import Credentials
+            creds = self._track('user', user, Credentials.from_authorized_user_info(info, self.scopes), identity)
+        return creds
+
+    def put_user(self, user, creds):
+        """Credentials obtained elsewhere (OAuth flow, session) join the refresh schedule."""
+        with self._lock:
+            entry = self._entries.get(('user', user))
+            if entry and entry['creds'] is creds:
+                entry['used'] = time.time()
+                return creds
+        info = {'client_id': getattr(creds, 'client_id', None), 'refresh_token': getattr(creds, 'refresh_token', None)}
+        return self._track('user', user, creds, _identity('user', info))
+
+    def forget(self, user):
+        """Stops serving and refreshing the credentials of `user` (account unlinked)."""
+        with self._lock:
+            for kind in ('sa', 'user'):
+                self._entries.pop((kind, user), None)
+
+    # --- REFRESH ---
+
+    def _due(self, kind, creds, now):
+        if kind == 'user' and not getattr(creds, 'refresh_token', None):
+            return False  # Nothing to refresh with
+        if not getattr(creds, 'token', None):
+            return True   # Service accounts start without an access token
+        expiry = getattr(creds, 'expiry', None)
+        return expiry is not None and (expiry - now).total_seconds() <= self.margin
+
+    def ensure_fresh(self, kind, user):
+        """
+        Foreground check before use: an already expired token is refreshed now (unavoidable);
+        one about to expire is refreshed in the background while the current token still works.
+        """
+        with self._lock:
+            entry = self._entries.get((kind, user))
+            if entry is not None:
+                entry['used'] = time.time()
+        if entry is None or not self._due(kind, entry['creds'], _utcnow()):
+            return
+        if entry['creds'].token and not entry['creds'].expired:
+            threading.Thread(target=self.refresh, args=(kind, user), daemon=True).start()
+        else:
+            self.refresh(kind, user)
+
+    def take_pending(self, user):
+        """Token JSON refreshed since the last call (to be persisted by the caller), or None."""
+        with self._lock:
+            entry = self._entries.get(('user', user))
+            if entry is None:
+                return None
+            pending, entry['pending'] = entry['pending'], None
+            return pending
+
+    def return_pending(self, user, token_json):
+        """Puts back a token whose write failed, unless a newer refresh is already pending."""
+        with self._lock:
+            entry = self._entries.get(('user', user))
+            if entry is not None and entry['pending'] is None:
+                entry['pending'] = token_json
+
+    def refresh(self, kind, user):
+        """Refreshes one entry in the calling thread; True on success. Concurrent calls are skipped."""
+        with self._lock:
+            entry = self._entries.get((kind, user))
+            if entry is None or (kind, user) in self._busy:
+                return False
+            self._busy.add((kind, user))
+        try:
+            entry['creds'].refresh(self._request())
+            self.refreshes += 1
+        except Exception as e:
+            print(f"Token refresh failed ({kind}): {e}")
+            return False
+        finally:
+            with self._lock:
+                self._busy.discard((kind, user))
+        if kind == 'user':
+            with self._lock:
+                entry['pending'] = entry['creds'].to_json()
+        return True
+
+    def evict_idle(self, now=None):
+        """Drops entries not used for idle_seconds (their sessions are gone). Returns how many."""
+        cutoff = (now or time.time()) - self.idle_seconds
+        with self._lock:
+            idle = [key for key, entry in self._entries.items() if entry['used'] < cutoff and key not in self._busy]
+            for key in idle:
+                del self._entries[key]
+        return len(idle)
+
+    def refresh_due(self, now=None):
+        """Evicts idle entries, then refreshes every remaining token expiring within the margin."""
+        self.evict_idle()
+        now = now or _utcnow()
+        with self._lock:
+            due = [key for key, entry in self._entries.items() if self._due(key[0], entry['creds'], now)]
+        return sum(1 for kind, user in due if self.refresh(kind, user))
+
+    def _start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        def loop():
+            while not self._stop.wait(CHECK_INTERVAL_SECONDS):
+                self.refresh_due()
+        self._thread = threading.Thread(target=loop, name="credential-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+_MANAGER = None
+
+def get_credential_manager(scopes):
+    """Process-wide manager (shared by every session of this process)."""
+    global _MANAGER
+    if _MANAGER is None:
+        _MANAGER = CredentialManager(scopes)
+    return _MANAGER
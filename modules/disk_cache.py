@@ -0,0 +1,142 @@
+import hmac
+import json
+import time
+import base64
+import sqlite3
+import hashlib
+import threading
+
+from cryptography.fernet import Fernet, InvalidToken
+
+# --- CONSTANTS ---
+# Freshness rules (seconds): younger entries are served as-is; older ones are served as a warm
+# start and reconciled with the API in the background.
+FRESHNESS_SECONDS = {
+    'events': 300,       # Same TTL as the in-session event store
+    'tasks': 60,         # Same TTL as the in-session task snapshot
+    'labels': 86400,     # Label maps change rarely (a miss re-lists anyway)
+    'mail_meta': 86400,  # Headers never change; labelIds may
+}
+MAX_AGE_SECONDS = 30 * 86400   # Entries older than this are pruned
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    partition TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (partition, kind, key)
+)
+"""
+
+class DiskCache:
+    """
+    SQLite cache for Google data, partitioned per user and encrypted at rest: every user gets
+    an opaque partition name and a Fernet key, both derived (HMAC-SHA256) from the app secret.
+    Values are JSON documents. Safe to share between threads.
+    """
+
+    def __init__(self, path, secret):
+        if not secret:
+            raise ValueError("DiskCache needs a secret (data is never stored unencrypted)")
+        self.path = path
+        self._secret = secret.encode('utf-8') if isinstance(secret, str) else secret
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA)
+        self._users = {}
+
+    def _user(self, user):
+        """(partition, Fernet) of a user; emails never reach the file in clear."""
+        if user not in self._users:
+            digest = hmac.new(self._secret, f"key:{user}".encode('utf-8'), hashlib.sha256).digest()
+            partition = hmac.new(self._secret, f"partition:{user}".encode('utf-8'), hashlib.sha256).hexdigest()
+            self._users[user] = (partition, Fernet(base64.urlsafe_b64encode(digest)))
+        return self._users[user]
+
+    def get(self, user, kind, key):
+        """(value, age_seconds) or (None, None) when missing/undecryptable."""
+        return self.get_many(user, kind, [key]).get(key, (None, None))
+
+    def get_many(self, user, kind, keys):
+        """{key: (value, age_seconds)} for the keys present."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        partition, fernet = self._user(user)
+        out, broken = {}, []
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), 500):  # SQLite host-parameter limit
+                chunk = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, value, stored_at FROM entries WHERE partition=? AND kind=? AND key IN ({','.join('?' * len(chunk))})",
+                    [partition, kind] + chunk
+                ).fetchall()
+                for key, blob, stored_at in rows:
+                    try:
+                        out[key] = (json.loads(fernet.decrypt(blob)), now - stored_at)
+                    except (InvalidToken, ValueError):
+                        broken.append(key)  # Secret rotated or corrupted row
+            for key in broken:
+                self._conn.execute("DELETE FROM entries WHERE partition=? AND kind=? AND key=?", (partition, kind, key))
+        return out
+
+    def put(self, user, kind, key, value):
+        self.put_many(user, kind, {key: value})
+
+    def put_many(self, user, kind, values):
+        partition, fernet = self._user(user)
+        now = time.time()
+        rows = [(partition, kind, key, fernet.encrypt(json.dumps(value, default=str).encode('utf-8')), now)
+                for key, value in values.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", rows)
+
+    def delete(self, user, kind, key=None):
+        """Drops one entry, or every entry of `kind` when key is None."""
+        partition, _ = self._user(user)
+        with self._lock:
+            if key is None:
+                self._conn.execute("DELETE FROM entries WHERE partition=? AND kind=?", (partition, kind))
+            else:
+                self._conn.execute("DELETE FROM entries WHERE partition=? AND kind=? AND key=?", (partition, kind, key))
+
+    def delete_user(self, user):
+        partition, _ = self._user(user)
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE partition=?", (partition,))
+
+    def seal(self, user, value):
+        """Value encrypted with the user's key, as text (for stores outside this file, e.g. the shared backend)."""
+        _, fernet = self._user(user)
+        return fernet.encrypt(json.dumps(value, default=str).encode('utf-8')).decode('ascii')
+
+    def unseal(self, user, token):
+        """Inverse of seal; None when the token is missing, foreign or undecryptable."""
+        if not isinstance(token, str):
+            return None
+        _, fernet = self._user(user)
+        try:
+            return json.loads(fernet.decrypt(token.encode('ascii')))
+        except (InvalidToken, ValueError):
+            return None
+
+    def prune(self, max_age=MAX_AGE_SECONDS):
+        with self._lock:
+            return self._conn.execute("DELETE FROM entries WHERE stored_at < ?", (time.time() - max_age,)).rowcount
+
+def is_fresh(kind, age):
+    return age is not None and age <= FRESHNESS_SECONDS.get(kind, 0)
+
+_CACHES = {}
+
+def get_disk_cache(path, secret):
+    """Shared DiskCache per file (one connection per process); pruned once when opened."""
+    if path not in _CACHES:
+        cache = DiskCache(path, secret)
+        cache.prune()
+        _CACHES[path] = cache
+    return _CACHES[path]
@@ -0,0 +1,175 @@
+import re
+import unicodedata
+
+# --- CONSTANTS ---
+# Keywords are matched accent/case-insensitively on word boundaries.
+# A trailing '*' turns a keyword into a prefix (e.g. 'reuni*' -> reunión, reuniones).
+DEFAULT_KEYWORDS = {
+    'reuniones_internas': ['reunión', 'reuniones', 'sync', 'standup', 'planning', 'retro', '1:1', 'comité', 'consejo', 'equipo'],
+    'reuniones_externas': ['cliente*', 'proveedor*', 'demo', 'venta*', 'externo*', 'visita'],
+    'trabajo_focalizado': ['desarroll*', 'diseño', 'análisis', 'investigación', 'foco', 'deep work'],
+    'admin': ['admin*', 'correo*', 'review', 'reporte*', 'informe*', 'trámite*'],
+}
+
+# Relative importance of each category when several match the same event
+DEFAULT_CATEGORY_WEIGHTS = {
+    'reuniones_internas': 1.0,
+    'reuniones_externas': 1.2,  # External names are more specific than "reunión"
+    'trabajo_focalizado': 1.0,
+    'admin': 0.8,
+}
+
+TITLE_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+
+# Default Google Calendar color per category (see google_services.COLOR_MAP)
+CATEGORY_COLOR_IDS = {
+    'reuniones_internas': "4",
+    'reuniones_externas': "6",
+    'trabajo_focalizado': "7",
+    'admin': "8",
+}
+
+# --- HELPERS ---
+
+def fold_text(text):
+    """Lowercase + strip accents (reunión -> reunion), keeping ñ distinct from n."""
+    if not text:
+        return ""
+    text = str(text).lower()
+    if text.isascii():
+        return text
+    text = text.replace('ñ', '\x00')
+    text = unicodedata.normalize('NFKD', text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return text.replace('\x00', 'ñ')
+
+def _fold_series(texts):
+    """fold_text over a pandas Series with vectorized string ops."""
+    folded = texts.fillna('').astype(str).str.lower().str.replace('ñ', '\x00', regex=False)
+    folded = folded.str.normalize('NFKD').str.replace('[\u0300-\u036f]', '', regex=True)
+    return folded.str.replace('\x00', 'ñ', regex=False)
+
+class EventClassifier:
+    """
+    Multi-pattern keyword classifier compiled into ONE regex (a single scan per text).
+    Scores every category by weighted keyword hits (title counts more than description)
+    and reports confidence plus the matches that explain the decision.
+    """
+
+    def __init__(self, keywords=None, category_weights=None, extra_keywords=None):
+        self.keywords = {cat: list(words) for cat, words in (keywords or DEFAULT_KEYWORDS).items()}
+        self.category_weights = dict(DEFAULT_CATEGORY_WEIGHTS)
+        if category_weights:
+            self.category_weights.update(category_weights)
+        if extra_keywords:
+            for cat, words in extra_keywords.items():
+                self.keywords.setdefault(cat, []).extend(words)
+        self._compile()
+
+    def add_keywords(self, category, words):
+        """User extension point: adds keywords (or a new category) and recompiles."""
+        self.keywords.setdefault(category, []).extend(words)
+        self._compile()
+
+    def _compile(self):
+        self._lookup = {}
+        self._prefixes = []
+        alternatives = []
+        for cat, words in self.keywords.items():
+            for word in words:
+                is_prefix = word.endswith('*')
+                folded = fold_text(word.rstrip('*')).strip()
+                if not folded:
+                    continue
+                if is_prefix:
+                    self._prefixes.append((folded, cat))
+                    alternatives.append(re.escape(folded) + r'\w*')
+                else:
+                    self._lookup.setdefault(folded, cat)
+                    alternatives.append(re.escape(folded))
+        # Longest first so "deep work" wins over shorter overlapping alternatives
+        alternatives.sort(key=len, reverse=True)
+        self._prefixes.sort(key=lambda p: len(p[0]), reverse=True)
+        self._pattern = re.compile(r'(?<!\w)(?:' + '|'.join(alternatives) + r')(?!\w)') if alternatives else None
+
+    def _keyword_category(self, match_text):
+        cat = self._lookup.get(match_text)
+        if cat:
+            return match_text, cat
+        for prefix, p_cat in self._prefixes:
+            if match_text.startswith(prefix):
+                return prefix + '*', p_cat
+        return match_text, None
+
+    def classify(self, title, description=""):
+        """
+        Returns {'category', 'confidence' (0-1), 'score', 'matches': [(keyword, field, category)]}.
+        Events without hits are 'otros' with confidence 0.
+        """
+        scores = {}
+        matches = []
+        if self._pattern is not None:
+            for field, text, weight in (('title', title, TITLE_WEIGHT), ('description', description, DESCRIPTION_WEIGHT)):
+                if not text:
+                    continue
+                for m in self._pattern.finditer(fold_text(text)):
+                    keyword, cat = self._keyword_category(m.group(0))
+                    if not cat:
+                        continue
+                    scores[cat] = scores.get(cat, 0.0) + weight * self.category_weights.get(cat, 1.0)
+                    matches.append((keyword, field, cat))
+
+        if not scores:
+            return {'category': 'otros', 'confidence': 0.0, 'score': 0.0, 'matches': []}
+
+        # Ties resolved by category declaration order (legacy first-match behaviour)
+        order = list(self.keywords.keys())
+        best = max(scores, key=lambda c: (scores[c], -order.index(c) if c in order else 0))
+        total = sum(scores.values())
+        share = scores[best] / total
+        # A single description-only hit is weak evidence; a title hit is strong
+        strength = min(scores[best] / TITLE_WEIGHT, 1.0)
+        return {
+            'category': best,
+            'confidence': round(share * strength, 3),
+            'score': round(scores[best], 2),
+            'matches': matches
+        }
+
+    def categorize(self, title, description=""):
+        return self.classify(title, description)['category']
+
+    def categorize_series(self, titles, descriptions):
+        """
+        Vectorized categorize() over two aligned pandas Series, for the analytics engine: the same
+        compiled regex, weights and tie-break, scored for every row at once. Returns a Series.
+        """
+        import numpy as np
+        import pandas as pd
+        categories = list(self.keywords.keys())
+        scores = np.zeros((len(titles), len(categories)))
+        if self._pattern is not None and len(titles):
+            column = {cat: i for i, cat in enumerate(categories)}
+            weights = np.array([self.category_weights.get(cat, 1.0) for cat in categories])
+            for texts, weight in ((titles, TITLE_WEIGHT), (descriptions, DESCRIPTION_WEIGHT)):
+                hits = _fold_series(texts.reset_index(drop=True)).str.findall(self._pattern).explode().dropna()
+                if hits.empty:
+                    continue
+                hit_category = {h: self._keyword_category(h)[1] for h in hits.unique()}
+                cols = hits.map(hit_category).map(column).dropna().astype(int)
+                np.add.at(scores, (cols.index.to_numpy(), cols.to_numpy()), weight * weights[cols.to_numpy()])
+        if not categories:
+            return pd.Series('otros', index=titles.index, dtype=object)
+        # argmax keeps the first maximum: ties go to the earlier category, as in classify()
+        best = np.array(categories, dtype=object)[scores.argmax(axis=1)]
+        return pd.Series(np.where(scores.max(axis=1) > 0, best, 'otros'), index=titles.index, dtype=object)
+
+_CLASSIFIERS = {}
+
+def get_classifier(extra_keywords=None):
+    """Shared compiled classifier, memoized per user keyword set (compiling is the costly part)."""
+    key = tuple(sorted((cat, tuple(words)) for cat, words in (extra_keywords or {}).items()))
+    if key not in _CLASSIFIERS:
+        _CLASSIFIERS[key] = EventClassifier(extra_keywords=extra_keywords)
+    return _CLASSIFIERS[key]
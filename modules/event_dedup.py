@@ -0,0 +1,220 @@
+import re
+import zlib
+import base64
+import hashlib
+import datetime as dt
+import numpy as np
+
+from modules.event_classifier import fold_text
+from modules.field_profiles import get_fields
+
+# --- CONSTANTS ---
+SHINGLE_SIZE = 3          # Character shingles over the normalized title
+NUM_PERM = 64             # MinHash signature length
+BANDS = 16                # LSH bands (ROWS = NUM_PERM / BANDS = 4)
+DEFAULT_THRESHOLD = 0.6   # Estimated Jaccard needed to call two events near-duplicates
+DEFAULT_MAX_SHIFT_HOURS = 0.5   # Same 30 min as screen_duplicate_events: repeated blocks in a day are not copies
+TIME_BUCKET_HOURS = 6     # Blocking window; events also register in the previous bucket
+
+LOCAL_TZ = "America/Santiago"  # Naive times are created in this zone (see add_event_to_calendar)
+
+_PRIME = (1 << 61) - 1
+_rng = np.random.RandomState(1234)  # Fixed seed: identical signatures across runs
+_PERM_A = _rng.randint(1, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+
+# --- FEATURES ---
+
+def _normalize(text):
+    return re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', ' ', fold_text(text))).strip()
+
+def shingles(title, description=""):
+    """Character k-shingles of the title plus word bigrams of the description (prefixed to keep them apart)."""
+    t = _normalize(title)
+    out = {t[i:i + SHINGLE_SIZE] for i in range(max(len(t) - SHINGLE_SIZE + 1, 1))} if t else set()
+    words = _normalize(description).split()[:60]
+    out.update("d:" + " ".join(words[i:i + 2]) for i in range(max(len(words) - 1, 0)))
+    return out
+
+def title_numbers(title):
+    """Digit runs of the title ("Sesión 3", "Q3"): events numbered differently are never duplicates."""
+    return frozenset(re.findall(r'\d+', _normalize(title)))
+
+def minhash(shingle_set):
+    """MinHash signature (NUM_PERM uint64 values) using universal hashing over crc32 shingle ids."""
+    if not shingle_set:
+        return np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    ids = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingle_set), dtype=np.uint64, count=len(shingle_set))
+    hashed = (np.outer(ids, _PERM_A) + _PERM_B) % np.uint64(_PRIME)
+    return hashed.min(axis=0)
+
+def _event_start(ev):
+    raw = (ev.get('start') or {}).get('dateTime') or (ev.get('start') or {}).get('date')
+    if not raw:
+        return None
+    try:
+        parsed = dt.datetime.fromisoformat(raw.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if not parsed.tzinfo:
+        parsed = parsed.astimezone()
+    return parsed
+
+def _survivor_key(ev):
+    """Richest, oldest copy wins: attendees, description, location, then earliest 'created'."""
+    return (
+        len(ev.get('attendees') or []),
+        len(ev.get('description') or ''),
+        bool(ev.get('location')),
+        -dt.datetime.fromisoformat(ev['created'].replace('Z', '+00:00')).timestamp() if ev.get('created') else 0,
+    )
+
+# --- CLUSTERING ---
+
+def find_duplicate_clusters(events, threshold=DEFAULT_THRESHOLD, max_shift_hours=DEFAULT_MAX_SHIFT_HOURS):
+    """
+    Near-duplicate clustering in near-linear time: MinHash + LSH banding, blocked by time bucket.
+    Candidate pairs (estimated Jaccard >= threshold, |start shift| <= max_shift_hours) only form
+    candidate groups; each final cluster is anchored on its keeper (the survivor) and every duplicate
+    must match the keeper itself, so chains of similar blocks (9:00, 11:00, 13:00...) don't merge.
+    Instances of the same recurring series, or titles with different numbers, are never duplicates.
+
+    Returns:
+        list: [{'survivor': event, 'duplicates': [events], 'similarity': float}], largest clusters first.
+    """
+    items = []
+    for ev in events:
+        start = _event_start(ev)
+        if start is None or not (ev.get('summary') or '').strip():
+            continue
+        items.append((ev, start, minhash(shingles(ev.get('summary'), ev.get('description', ''))), title_numbers(ev['summary'])))
+    if len(items) < 2:
+        return []
+
+    rows = NUM_PERM // BANDS
+    bucket_s = TIME_BUCKET_HOURS * 3600
+    buckets = {}
+    for idx, (_, start, sig, _) in enumerate(items):
+        t_bucket = int(start.timestamp() // bucket_s)
+        for band in range(BANDS):
+            band_key = sig[band * rows:(band + 1) * rows].tobytes()
+            # Register under own and previous bucket so neighbours across a boundary still meet
+            for tb in (t_bucket, t_bucket - 1):
+                buckets.setdefault((band, band_key, tb), []).append(idx)
+
+    parent = list(range(len(items)))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    max_shift_s = max_shift_hours * 3600
+
+    def similarity(a, b):
+        """Estimated Jaccard, or None when the pair can't be duplicates."""
+        (ev_a, start_a, sig_a, nums_a), (ev_b, start_b, sig_b, nums_b) = items[a], items[b]
+        if abs((start_a - start_b).total_seconds()) > max_shift_s or nums_a != nums_b:
+            return None
+        series = ev_a.get('recurringEventId')
+        if series and series == ev_b.get('recurringEventId'):
+            return None
+        sim = float(np.mean(sig_a == sig_b))
+        return sim if sim >= threshold else None
+
+    seen = set()
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        for pos, a in enumerate(members):
+            for b in members[pos + 1:]:
+                pair = (a, b) if a < b else (b, a)
+                if a == b or pair in seen:
+                    continue
+                seen.add(pair)
+                if similarity(a, b) is not None:
+                    parent[find(a)] = find(b)
+
+    groups = {}
+    for idx in range(len(items)):
+        groups.setdefault(find(idx), []).append(idx)
+
+    clusters = []
+    for members in groups.values():
+        # Richest copy first: it keeps, and takes every remaining member that matches it directly
+        remaining = sorted(members, key=lambda i: _survivor_key(items[i][0]), reverse=True)
+        while len(remaining) > 1:
+            keeper, rest = remaining[0], remaining[1:]
+            sims = {i: similarity(keeper, i) for i in rest}
+            dups = [i for i in rest if sims[i] is not None]
+            remaining = [i for i in rest if sims[i] is None]
+            if dups:
+                clusters.append({
+                    'survivor': items[keeper][0],
+                    'duplicates': [items[i][0] for i in dups],
+                    'similarity': round(min(sims[i] for i in dups), 2),
+                })
+    clusters.sort(key=lambda c: len(c['duplicates']), reverse=True)
+    return clusters
+
+# --- IDEMPOTENT CREATION ---
+
+def _canonical_time(value):
+    """Same instant -> same string: aware/naive datetimes to UTC, all-day dates as YYYY-MM-DD."""
+    if not value:
+        return ""
+    value = value if isinstance(value, str) else value.isoformat()
+    if 'T' not in value:
+        return value[:10]
+    try:
+        parsed = dt.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return value.strip()
+    if not parsed.tzinfo:
+        from zoneinfo import ZoneInfo
+        parsed = parsed.replace(tzinfo=ZoneInfo(LOCAL_TZ))
+    return parsed.astimezone(dt.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def stable_event_id(calendar_id, summary, start, end):
+    """
+    Deterministic Calendar event ID from the normalized (calendar, summary, start, end).
+    Calendar IDs must use base32hex characters (0-9, a-v), 5-1024 long.
+    """
+    key = "|".join([(calendar_id or 'primary').strip().lower(), _normalize(summary),
+                    _canonical_time(start), _canonical_time(end)])
+    digest = hashlib.sha256(key.encode('utf-8')).digest()[:20]
+    return base64.b32hexencode(digest).decode('ascii').lower().rstrip('=')
+
+def _is_conflict(error):
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    return status == 409 or (status is None and "409" in str(error))
+
+def insert_event_idempotent(service, calendar_id, body):
+    """
+    Inserts `body` (which carries a stable 'id'). A 409 means the same event already exists:
+    it counts as success, and a previously deleted (cancelled) copy is restored instead.
+
+    Returns:
+        tuple: (event dict, created bool)
+    """
+    try:
+        return service.events().insert(calendarId=calendar_id, body=body).execute(), True
+    except Exception as e:
+        if not body.get('id') or not _is_conflict(e):
+            raise
+    return resolve_conflict(service, calendar_id, body)
+
+def resolve_conflict(service, calendar_id, body):
+    """
+    After a 409 on `body`'s stable ID: restores the existing copy if it was deleted (cancelled),
+    else reports it as already there.
+
+    Returns:
+        tuple: (event dict, restored bool)
+    """
+    existing = service.events().get(calendarId=calendar_id, eventId=body['id'], fields=get_fields('event_restore')).execute()
+    if existing.get('status') == 'cancelled':
+        restored = dict(body, status='confirmed')
+        return service.events().update(calendarId=calendar_id, eventId=body['id'], body=restored).execute(), True
+    return existing, False
@@ -0,0 +1,217 @@
+import re
+import time
+import datetime
+from zoneinfo import ZoneInfo
+
+from dateutil.rrule import rrulestr
+
+from modules.field_profiles import list_fields
+
+# --- CONSTANTS ---
+STORE_TTL_SECONDS = 300     # Same 5-minute freshness as the old planner cache
+PAGE_SIZE = 2500            # events.list maximum; every page is read (no truncation)
+EVENT_FIELDS = list_fields('event_store')
+DEFAULT_TZ = "America/Santiago"
+
+DATE_VALUE = re.compile(r'^(\d{8})(?:T(\d{6})(Z)?)?$')
+
+def _to_aware(value, tz):
+    """Naive local datetime / date -> aware datetime in tz (aware values are kept)."""
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time.min)
+    return value if value.tzinfo else value.replace(tzinfo=tz)
+
+def _parse_when(when, tz):
+    """API start/end dict -> (aware datetime, all_day). None if missing or invalid."""
+    if not when:
+        return None
+    try:
+        if when.get('dateTime'):
+            parsed = datetime.datetime.fromisoformat(when['dateTime'].replace('Z', '+00:00'))
+            return (parsed if parsed.tzinfo else parsed.replace(tzinfo=tz)), False
+        if when.get('date'):
+            return datetime.datetime.combine(datetime.date.fromisoformat(when['date']), datetime.time.min, tz), True
+    except ValueError:
+        return None
+    return None
+
+def _parse_date_values(line, tz):
+    """'EXDATE;TZID=America/Santiago:20260309T100000,20260316T100000' -> [aware datetimes]."""
+    head, _, values = line.partition(':')
+    m = re.search(r'TZID=([^;:]+)', head)
+    line_tz = ZoneInfo(m.group(1)) if m else tz
+    out = []
+    for value in values.split(','):
+        dm = DATE_VALUE.match(value.strip())
+        if not dm:
+            continue
+        day = datetime.datetime.strptime(dm.group(1), '%Y%m%d')
+        if dm.group(2):
+            day = day.replace(hour=int(dm.group(2)[:2]), minute=int(dm.group(2)[2:4]), second=int(dm.group(2)[4:]))
+        out.append(day.replace(tzinfo=datetime.timezone.utc) if dm.group(3) else day.replace(tzinfo=line_tz))
+    return out
+
+def _utc_until(line, tz):
+    """dateutil needs a UTC UNTIL with an aware DTSTART: dates/local times are converted (dates end at 23:59:59)."""
+    def fix(m):
+        if m.group(3):
+            return m.group(0)
+        day = datetime.datetime.strptime(m.group(1) + (m.group(2) or '235959'), '%Y%m%d%H%M%S').replace(tzinfo=tz)
+        return 'UNTIL=' + day.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    return re.sub(r'UNTIL=(\d{8})(?:T(\d{6}))?(Z)?', fix, line)
+
+def _instance_id(master_id, start, all_day):
+    # Same ID scheme as the API's instances (usable with events().get/update/delete)
+    if all_day:
+        return f"{master_id}_{start.strftime('%Y%m%d')}"
+    return f"{master_id}_{start.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')}"
+
+def _when(start, all_day, tz_name):
+    if all_day:
+        return {'date': start.date().isoformat()}
+    return {'dateTime': start.isoformat(), 'timeZone': tz_name}
+
+class EventStore:
+    """
+    Calendar events of one calendar, downloaded WITHOUT singleEvents: recurring series arrive once
+    (master + RRULE/EXDATE/RDATE) together with their modified/cancelled instances, and are expanded
+    locally only for the window a view asks for.
+    """
+
+    def __init__(self, calendar_id, tz_name=DEFAULT_TZ):
+        self.calendar_id = calendar_id
+        self.tz_name = tz_name
+        self.tz = ZoneInfo(tz_name)
+        self.singles = []        # Non-recurring events
+        self.masters = []        # Recurring series (with 'recurrence')
+        self.exceptions = {}     # (master_id, original start instant) -> modified/cancelled instance
+        self.range = None        # (time_min, time_max) covered by the last sync
+        self.synced_at = None
+        self.downloaded = 0      # Items received in the last sync
+        self._items = []         # Raw items of the last sync (persisted by to_state)
+        self._windows = {}       # (start, end) -> expanded events (memo)
+
+    def is_fresh(self, ttl=STORE_TTL_SECONDS):
+        return self.synced_at is not None and time.time() - self.synced_at <= ttl
+
+    def covers(self, start, end):
+        if self.range is None:
+            return False
+        return _to_aware(start, self.tz) >= self.range[0] and _to_aware(end, self.tz) <= self.range[1]
+
+    def sync(self, service, time_min, time_max, http=None):
+        """
+        Downloads every page of masters + single events + exceptions in [time_min, time_max).
+        `http` executes on a separate connection (worker threads). Raises on API errors.
+        """
+        t_min, t_max = _to_aware(time_min, self.tz), _to_aware(time_max, self.tz)
+        items, token = [], None
+        while True:
+            request = service.events().list(
+                calendarId=self.calendar_id, timeMin=t_min.isoformat(), timeMax=t_max.isoformat(),
+                singleEvents=False, maxResults=PAGE_SIZE, pageToken=token, fields=EVENT_FIELDS
+            )
+            res = request.execute(http=http) if http is not None else request.execute()
+            items.extend(res.get('items', []))
+            token = res.get('nextPageToken')
+            if not token:
+                break
+        return self._load(items, t_min, t_max, time.time())
+
+    def _load(self, items, t_min, t_max, synced_at):
+        singles, masters, exceptions = [], [], {}
+        for ev in items:
+            if ev.get('recurringEventId'):
+                original = _parse_when(ev.get('originalStartTime'), self.tz)
+                if original:
+                    exceptions[(ev['recurringEventId'], original[0])] = ev
+            elif ev.get('recurrence'):
+                masters.append(ev)
+            elif ev.get('status') != 'cancelled':
+                singles.append(ev)
+
+        self.singles, self.masters, self.exceptions = singles, masters, exceptions
+        self.range, self.synced_at, self.downloaded = (t_min, t_max), synced_at, len(items)
+        self._items = items
+        self._windows = {}
+        return self
+
+    # --- PERSISTENCE (disk cache) ---
+
+    def to_state(self):
+        """JSON-serializable copy of the raw API items and the synced range."""
+        return {'calendar_id': self.calendar_id, 'tz_name': self.tz_name, 'items': self._items,
+                'range': [self.range[0].isoformat(), self.range[1].isoformat()], 'synced_at': self.synced_at}
+
+    @classmethod
+    def from_state(cls, state):
+        store = cls(state['calendar_id'], state.get('tz_name', DEFAULT_TZ))
+        t_min, t_max = (datetime.datetime.fromisoformat(v) for v in state['range'])
+        return store._load(state['items'], t_min, t_max, state['synced_at'])
+
+    def _occurrences(self, master, win_start, win_end):
+        """Start instants of a series overlapping [win_start, win_end)."""
+        parsed_start, parsed_end = _parse_when(master.get('start'), self.tz), _parse_when(master.get('end'), self.tz)
+        if not parsed_start:
+            return [], False, datetime.timedelta(0)
+        start, all_day = parsed_start
+        duration = (parsed_end[0] - start) if parsed_end else datetime.timedelta(hours=1)
+        series_tz = ZoneInfo(master['start'].get('timeZone') or self.tz_name) if not all_day else self.tz
+        # Expand in the series' own zone: wall-clock time stays fixed across DST changes
+        dtstart = start.astimezone(series_tz)
+
+        starts, excluded = set(), set()
+        lo, hi = win_start - duration, win_end
+        for line in master.get('recurrence', []):
+            kind = line.split(':', 1)[0].split(';', 1)[0].upper()
+            if kind == 'RRULE':
+                rule = rrulestr(_utc_until(line, series_tz), dtstart=dtstart)
+                starts.update(rule.between(lo, hi, inc=True))
+            elif kind == 'RDATE':
+                starts.update(d for d in _parse_date_values(line, series_tz) if lo <= d <= hi)
+            elif kind == 'EXDATE':
+                excluded.update(_parse_date_values(line, series_tz))
+        if not any(line.upper().startswith('RRULE') for line in master.get('recurrence', [])) and lo <= dtstart <= hi:
+            starts.add(dtstart)
+        return sorted(s for s in starts if s not in excluded and s + duration > win_start and s < win_end), all_day, duration
+
+    def events_between(self, start, end):
+        """
+        Events overlapping [start, end) (naive local datetimes/dates or aware), shaped like
+        singleEvents=True items and sorted by start. Series are expanded here, once per window.
+        """
+        win_start, win_end = _to_aware(start, self.tz), _to_aware(end, self.tz)
+        key = (win_start, win_end)
+        if key in self._windows:
+            return self._windows[key]
+
+        out = []
+        for ev in self.singles:
+            s, e = _parse_when(ev.get('start'), self.tz), _parse_when(ev.get('end'), self.tz)
+            if s and s[0] < win_end and (e[0] if e else s[0]) > win_start:
+                out.append((s[0], ev))
+
+        for master in self.masters:
+            if master.get('status') == 'cancelled':
+                continue
+            occurrences, all_day, duration = self._occurrences(master, win_start, win_end)
+            for occ in occurrences:
+                override = self.exceptions.get((master['id'], occ))
+                if override is not None:
+                    continue  # Emitted below from the exception itself (moved or cancelled)
+                instance = {k: v for k, v in master.items() if k not in ('recurrence', 'start', 'end', 'id')}
+                instance.update(id=_instance_id(master['id'], occ, all_day), recurringEventId=master['id'],
+                                start=_when(occ, all_day, self.tz_name), end=_when(occ + duration, all_day, self.tz_name),
+                                originalStartTime=_when(occ, all_day, self.tz_name))
+                out.append((occ, instance))
+
+        for ev in self.exceptions.values():
+            if ev.get('status') == 'cancelled':
+                continue
+            s, e = _parse_when(ev.get('start'), self.tz), _parse_when(ev.get('end'), self.tz)
+            if s and s[0] < win_end and (e[0] if e else s[0]) > win_start:
+                out.append((s[0], ev))
+
+        events = [ev for _, ev in sorted(out, key=lambda p: p[0])]
+        self._windows[key] = events
+        return events
@@ -0,0 +1,97 @@
+import os
+import warnings
+
+# --- FIELD PROFILES ---
+# Fields each view actually reads from Google API responses. Every list/get call passes the
+# matching partial-response mask (fields=...), so attendees, conference data, HTML descriptions
+# and full MIME trees are only downloaded where something reads them.
+FIELD_PROFILES = {
+    # Calendar
+    'calendar_list': "id,summary,primary",
+    'briefing_events': "id,summary,start",
+    'dashboard_events': "id,summary,start,end,colorId",
+    'manager_events': "id,summary,description,start",
+    'optimizer_events': "id,summary,description,start,colorId",
+    'insights_events': "id,summary,description,start,end",
+    'chat_events': "id,summary,start",
+    'event_ids': "id",
+    'reminder_events': "id,summary,reminders",
+    'conflict_window': "id,summary,start,end,transparency,status",
+    'dedup_events': "id,summary,description,start,end,created,attendees(email),location,recurringEventId",
+    'event_store': ("id,summary,start,end,description,colorId,status,transparency,"
+                    "recurrence,recurringEventId,originalStartTime"),
+    'event_restore': "id,status,summary",
+    # Tasks
+    'task_lists': "id,title",
+    'task_due': "id,due",
+    'task_dedup': "id,title,due",
+    'task_snapshot': "id,title,due,status,deleted,hidden,updated,parent",
+    # Gmail
+    'message_ids': "id",
+    'message_refs': "id,threadId",
+    'message_triage': "id,threadId,internalDate,snippet,labelIds,payload/headers",
+    'message_full': "id,threadId,internalDate,payload(mimeType,filename,headers,body,parts)",
+    'message_headers': "id,payload/headers",
+    'labels': "id,name",
+}
+
+# Set FIELD_PROFILE_DEBUG=1 in development: reads outside a profile emit a warning
+DEBUG = os.getenv('FIELD_PROFILE_DEBUG', '') not in ('', '0', 'false')
+
+def get_fields(profile):
+    """Mask for a single-resource get: the profile itself."""
+    return FIELD_PROFILES[profile]
+
+def list_fields(profile, container='items'):
+    """Mask for a list call: page token plus the profile fields of every item in `container`."""
+    return f"nextPageToken,{container}({FIELD_PROFILES[profile]})"
+
+def top_level_fields(profile):
+    """'id,payload(headers,body),labelIds' -> {'id', 'payload', 'labelIds'}."""
+    names, depth, current = set(), 0, ''
+    for ch in FIELD_PROFILES[profile] + ',':
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        if ch == ',' and depth == 0:
+            names.add(current.split('(')[0].split('/')[0].strip())
+            current = ''
+        else:
+            current += ch
+    return names
+
+_REPORTED = set()
+
+class ProfiledItem(dict):
+    """dict that warns (once per profile/key) when code reads a top-level field the profile doesn't request."""
+
+    def __init__(self, data, profile):
+        super().__init__(data)
+        self.profile = profile
+        self.allowed = top_level_fields(profile)
+
+    def _check(self, key):
+        if key not in self.allowed and (self.profile, key) not in _REPORTED:
+            _REPORTED.add((self.profile, key))
+            warnings.warn(f"Field '{key}' read outside profile '{self.profile}' (add it to FIELD_PROFILES)", stacklevel=3)
+
+    def __getitem__(self, key):
+        self._check(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self._check(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        self._check(key)
+        return super().__contains__(key)
+
+def watch_fields(items, profile, debug=None):
+    """Wraps response items in ProfiledItem when debugging; returns them untouched otherwise."""
+    if not (DEBUG if debug is None else debug):
+        return items
+    if isinstance(items, dict):
+        return ProfiledItem(items, profile)
+    return [ProfiledItem(item, profile) for item in items]
@@ -2,15 +2,24 @@ import os
 import streamlit as st
 import json
 import datetime
-from google.oauth2 import service_account
 from google.oauth2.credentials import Credentials as UserCredentials
 from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
-from bs4 import BeautifulSoup
 import time
+import modules.acta_compiler as acta_compiler
+from modules.event_dedup import stable_event_id, insert_event_idempotent
+from modules.mail_body import extract_body, html_to_body
+from modules.thread_aggregator import message_ids_of
+from modules.label_manager import get_label_manager
+from modules.field_profiles import get_fields, list_fields, watch_fields
+from modules.disk_cache import get_disk_cache, is_fresh, FRESHNESS_SECONDS
+from modules.cache_backend import get_cache_backend
+from modules.credential_manager import get_credential_manager, parse_json_field, APP_USER
 
 # --- CONSTANTS ---
+ARCHIVE_PAGE_SIZE = 500   # messages.list maximum
+ARCHIVE_MAX_PASSES = 3    # Safety cap on re-list passes (see archive_old_emails)
+DISK_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'google_data.db')
 SCOPES = [
     'https://www.googleapis.com/auth/calendar',
     'https://www.googleapis.com/auth/gmail.modify',
@@ -35,51 +44,67 @@ COLOR_MAP = {
 }
 
 # --- SERVICE ACCOUNT HELPER ---
+def _credential_manager():
+    return get_credential_manager(SCOPES)
+
+def _persist_pending_token(manager, user):
+    """
+    Saves a token the manager refreshed since the last rerun without blocking it: the sheet
+    read-modify-write runs in a worker carrying this session's script-run context (auth needs
+    st.connection / st.secrets). One write per user at a time; a failed one is retried next rerun.
+    """
+    job = ('token', user)
+    if _reconciling(job):
+        return   # Newer tokens stay pending until the running write finishes
+    token_json = manager.take_pending(user)
+    if not token_json:
+        return
+
+    def write():
+        import modules.auth as auth_mod
+        if not auth_mod.update_user_token(user, token_json, notify=False):
+            manager.return_pending(user, token_json)
+    _reconcile_in_background(job, write, script_ctx=True)
+
+def forget_credentials():
+    """Drops the parsed/refreshing credentials of the current user (Google account unlinked)."""
+    if 'license_key' in st.session_state:
+        _credential_manager().forget(st.session_state.license_key)
+
 def _load_service_account_creds():
-    """Loads Service Account credentials from available sources with priority."""
+    """Loads Service Account credentials from available sources with priority (parsed once per process)."""
+    manager = _credential_manager()
+    user = st.session_state.get('license_key', APP_USER)
+
     # Priority 0: Session State (Hotfix/Already Loaded)
     if 'current_user_sa_creds' in st.session_state:
         try:
-            return service_account.Credentials.from_service_account_info(
-                st.session_state.current_user_sa_creds, scopes=SCOPES
-            )
+            return manager.service_account(user, st.session_state.current_user_sa_creds)
         except Exception:
             pass
 
     # Priority 1: From "user_data_full" in session (if not parsed yet)
     if 'user_data_full' in st.session_state:
         try:
-            ud = st.session_state.user_data_full
-            if 'clave_cuenta_servicio_admin' in ud:
-                sa_raw = ud['clave_cuenta_servicio_admin']
-                if isinstance(sa_raw, str) and sa_raw.strip():
-                    if '""' in sa_raw: sa_raw = sa_raw.replace('""', '"')
-                    sa_raw = sa_raw.strip()
-                    if sa_raw.startswith('"') and sa_raw.endswith('"'): sa_raw = sa_raw[1:-1]
-                    sa_info = json.loads(sa_raw)
-                    st.session_state.current_user_sa_creds = sa_info # Cache it
-                    return service_account.Credentials.from_service_account_info(
-                        sa_info, scopes=SCOPES
-                    )
+            sa_info = parse_json_field(st.session_state.user_data_full.get('clave_cuenta_servicio_admin'))
+            if sa_info:
+                st.session_state.current_user_sa_creds = sa_info # Cache it
+                return manager.service_account(user, sa_info)
         except Exception:
             pass
 
     # Priority 2: Local File
     if os.path.exists('service_account.json'):
         try:
-            return service_account.Credentials.from_service_account_file(
-                'service_account.json', scopes=SCOPES
-            )
+            with open('service_account.json', encoding='utf-8') as f:
+                return manager.service_account(APP_USER, json.load(f))
         except Exception:
             pass
             
     # Priority 3: Streamlit Secrets
     if "service_account" in st.secrets:
         try:
-            sa_info = dict(st.secrets["service_account"])
-            return service_account.Credentials.from_service_account_info(
-                sa_info, scopes=SCOPES
-            )
+            return manager.service_account(APP_USER, dict(st.secrets["service_account"]))
         except Exception:
             pass
             
@@ -115,14 +140,80 @@ def get_calendar_service(force_service_account=False):
             return None
     return st.session_state.calendar_service
 
+# --- DISK CACHE (encrypted, survives restarts) ---
+
+def _disk_cache():
+    """Shared encrypted cache, or None when no secret is configured (CACHE_SECRET or secrets 'cache_secret')."""
+    secret = os.getenv('CACHE_SECRET')
+    if not secret:
+        try:
+            secret = st.secrets.get('cache_secret')
+        except Exception:
+            secret = None
+    if not secret:
+        return None
+    try:
+        os.makedirs(os.path.dirname(DISK_CACHE_PATH), exist_ok=True)
+        return get_disk_cache(DISK_CACHE_PATH, secret)
+    except Exception as e:
+        print(f"Disk cache unavailable: {e}")
+        return None
+
+def _cache_user():
+    return st.session_state.get('connected_email') or st.session_state.get('license_key')
+
+def _shared_get(kind, owner):
+    """
+    Per-user value from the shared backend, decrypted with the owner's disk-cache key. Without a
+    cache secret per-user data never goes to the shared backend, so this is always a miss.
+    """
+    cache = _disk_cache()
+    if not cache or not owner:
+        return None
+    return cache.unseal(owner, get_cache_backend().get('google', [kind, owner]))
+
+def _shared_set(kind, owner, value, ttl=None):
+    """Stores a per-user value in the shared backend, encrypted with the owner's key (skipped without a secret)."""
+    cache = _disk_cache()
+    if cache and owner:
+        get_cache_backend().set('google', [kind, owner], cache.seal(owner, value), ttl=ttl)
+
+_RECONCILING = {}
+
+def _reconciling(job_key):
+    thread = _RECONCILING.get(job_key)
+    return thread is not None and thread.is_alive()
+
+def _reconcile_in_background(job_key, fn, script_ctx=False):
+    """
+    Runs fn in a daemon thread, one per job_key at a time. fn must not touch st.* unless
+    script_ctx=True, which attaches the calling session's script-run context to the thread.
+    """
+    import threading
+    if _reconciling(job_key):
+        return
+
+    def run():
+        try:
+            fn()
+        except Exception as e:
+            print(f"Background reconcile {job_key[0]} failed: {e}")
+
+    thread = threading.Thread(target=run, daemon=True)
+    if script_ctx:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+        add_script_run_ctx(thread, get_script_run_ctx())
+    _RECONCILING[job_key] = thread
+    thread.start()
+
 def get_calendar_list(service):
     """Returns a list of calendars (id, summary, primary)."""
     try:
         page_token = None
         calendar_list = []
         while True:
-            calendar_list_entry = service.calendarList().list(pageToken=page_token).execute()
-            for calendar_list_entry_item in calendar_list_entry['items']:
+            calendar_list_entry = service.calendarList().list(pageToken=page_token, fields=list_fields('calendar_list')).execute()
+            for calendar_list_entry_item in watch_fields(calendar_list_entry.get('items', []), 'calendar_list'):
                 calendar_list.append({
                     'id': calendar_list_entry_item['id'],
                     'summary': calendar_list_entry_item['summary'],
@@ -222,49 +313,42 @@ def get_gmail_credentials():
             del st.session_state.google_token
         if 'connected_email' in st.session_state:
             del st.session_state.connected_email
+        forget_credentials()
         st.session_state.logout_google = False
         return None
 
     print("DEBUG: Starting get_gmail_credentials")
     creds = None
+    manager = _credential_manager()
+    user = st.session_state.get('license_key')
     # 1. Try to load token from Session State
     if 'google_token' in st.session_state:
         print("DEBUG: Found google_token in session_state")
         creds = st.session_state.google_token
+        if user:
+            manager.put_user(user, creds)
         
     # 2. Try to load token from Google Sheets (Persistent Storage)
     elif 'user_data_full' in st.session_state and 'cod_val' in st.session_state.user_data_full:
          try:
-             token_raw = st.session_state.user_data_full.get('cod_val')
-             if token_raw and isinstance(token_raw, str) and token_raw.strip():
-                 token_raw = token_raw.strip()
-                 found_info = None
-                 
-                 # Attempt 1: Direct JSON parsing
-                 try:
-                     found_info = json.loads(token_raw)
-                 except json.JSONDecodeError:
-                     if token_raw.startswith('"') and token_raw.endswith('"'):
-                         try: found_info = json.loads(token_raw[1:-1])
-                         except: pass
-                 
-                 # Attempt 2: Handle CSV escaping
-                 if not found_info and '""' in token_raw:
-                     try:
-                         cleaned = token_raw.replace('""', '"')
-                         if cleaned.startswith('"') and cleaned.endswith('"'): cleaned = cleaned[1:-1]
-                         found_info = json.loads(cleaned)
-                     except: pass
-                 
-                 if found_info:
+             found_info = parse_json_field(st.session_state.user_data_full.get('cod_val'))
+             if found_info:
+                 # Parsed once per grant and process; other sessions/reruns of this user reuse it
+                 if user:
+                     creds = manager.user_credentials(user, found_info)
+                 else:
                      creds = UserCredentials.from_authorized_user_info(found_info, SCOPES)
-                     st.session_state.google_token = creds # Save to session
-                     st.toast("🔄 Sesión recuperada desde la nube")
+                 st.session_state.google_token = creds # Save to session
+                 st.toast("🔄 Sesión recuperada desde la nube")
          except Exception as e:
              st.error(f"Error crítico recuperando sesión: {e}")
 
-    # 3. Refresh if expired
-    if creds and creds.expired and creds.refresh_token:
+    # 3. Refresh: expired -> now; expiring soon -> background. A token refreshed since the last
+    #    rerun is saved here, on this session's script thread
+    if creds and user:
+        manager.ensure_fresh('user', user)
+        _persist_pending_token(manager, user)
+    elif creds and creds.expired and creds.refresh_token:
         try:
             creds.refresh(Request())
             st.session_state.google_token = creds 
@@ -328,6 +412,7 @@ def get_gmail_credentials():
 
         # Build Flow
         if 'oauth_flow' not in st.session_state:
+            from google_auth_oauthlib.flow import InstalledAppFlow  # Only the OAuth login needs it
             flow = InstalledAppFlow.from_client_config(client_config, SCOPES)
             flow.redirect_uri = 'urn:ietf:wg:oauth:2.0:oob'
             auth_url, _ = flow.authorization_url(prompt='consent', access_type='offline')
@@ -352,6 +437,8 @@ def get_gmail_credentials():
                 flow.fetch_token(code=code)
                 creds = flow.credentials
                 st.session_state.google_token = creds
+                if user:
+                    manager.put_user(user, creds)
                 
                 # Clean up flow from session state
                 if 'oauth_flow' in st.session_state:
@@ -406,89 +493,180 @@ def get_gmail_credentials():
     return creds
 
 def clean_email_body(html_content, max_chars=800):
-    """Parses HTML and returns clean text, truncated for token savings."""
+    """Parses HTML and returns clean text (quotes/signatures stripped), truncated for token savings."""
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        text = soup.get_text(separator=' ', strip=True)
-        return text[:max_chars]
-    except:
+        return html_to_body(html_content, max_chars)
+    except Exception:
         return str(html_content)[:max_chars]
 
+def _collect_ics_texts(service, msg_id, payload):
+    """Finds text/calendar parts and .ics attachments (inline or by attachmentId) and returns their text."""
+    import base64
+    from modules.ical_parser import is_ics_part
+    texts = []
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        stack.extend(part.get('parts', []))
+        if not is_ics_part(part):
+            continue
+        body = part.get('body', {})
+        data = body.get('data')
+        if not data and body.get('attachmentId'):
+            try:
+                att = service.users().messages().attachments().get(
+                    userId='me', messageId=msg_id, id=body['attachmentId']
+                ).execute()
+                data = att.get('data')
+            except Exception as e:
+                print(f"ICS attachment error ({msg_id}): {e}")
+        if data:
+            texts.append(base64.urlsafe_b64decode(data).decode('utf-8', errors='replace'))
+    return texts
+
+def _inbox_query(start_date=None, end_date=None):
+    query_parts = ['-category:promotions', '-category:social']
+    
+    if start_date:
+        query_parts.append(f"after:{start_date.strftime('%Y/%m/%d')}")
+    if end_date:
+        next_day = end_date + datetime.timedelta(days=1)
+        query_parts.append(f"before:{next_day.strftime('%Y/%m/%d')}")
+        
+    return " ".join(query_parts)
+
+def _hydrate_email(service, msg):
+    """Full download + body extraction for one listed message. None on failure."""
+    try:
+        msg_full = watch_fields(service.users().messages().get(userId='me', id=msg['id'], format='full',
+                                                               fields=get_fields('message_full')).execute(), 'message_full')
+        payload = msg_full.get('payload', {})
+        headers = payload.get('headers', [])
+        
+        subject = next((h['value'] for h in headers if h['name'] == 'Subject'), "Sin Asunto")
+        sender = next((h['value'] for h in headers if h['name'] == 'From'), "Desconocido")
+        
+        # New content only (quoted history and signatures stripped), truncated after stripping
+        body = extract_body(payload) or "Sin contenido (Posible adjunto o imagen)"
+
+        email_item = {
+            "id": msg['id'],
+            "threadId": msg.get('threadId', msg['id']), # Add threadId, fallback to id
+            "subject": subject,
+            "sender": sender,
+            "body": body,
+            "ts": msg_full.get('internalDate')  # ms epoch, orders messages inside a thread
+        }
+
+        # Structured invites: parsed locally, these emails skip the LLM
+        from modules.ical_parser import parse_ics, ics_to_candidates, unique_vevents
+        vevents = []
+        for ics_text in _collect_ics_texts(service, msg['id'], payload):
+            vevents.extend(parse_ics(ics_text))
+        ics_events = ics_to_candidates(unique_vevents(vevents), email_item)
+        if ics_events:
+            email_item["ics_events"] = ics_events
+
+        return email_item
+    except:
+        return None
+
 def fetch_emails_batch(service, start_date=None, end_date=None, max_results=15):
     """Fetches emails from inbox within a date range."""
     try:
-        query_parts = ['-category:promotions', '-category:social']
-        
-        if start_date:
-            query_parts.append(f"after:{start_date.strftime('%Y/%m/%d')}")
-        if end_date:
-            next_day = end_date + datetime.timedelta(days=1)
-            query_parts.append(f"before:{next_day.strftime('%Y/%m/%d')}")
-            
-        query = " ".join(query_parts)
-        
-        results = service.users().messages().list(userId='me', q=query, maxResults=max_results).execute()
+        query = _inbox_query(start_date, end_date)
+        results = service.users().messages().list(userId='me', q=query, maxResults=max_results,
+                                                  fields=list_fields('message_refs', 'messages')).execute()
         messages = results.get('messages', [])
         
         email_data = []
         for msg in messages:
-            try:
-                msg_full = service.users().messages().get(userId='me', id=msg['id'], format='full').execute()
-                payload = msg_full.get('payload', {})
-                headers = payload.get('headers', [])
-                
-                subject = next((h['value'] for h in headers if h['name'] == 'Subject'), "Sin Asunto")
-                sender = next((h['value'] for h in headers if h['name'] == 'From'), "Desconocido")
-                
-                # Recursive Body Extraction
-                def get_best_body(payload):
-                    # 1. Plain Text at current level
-                    if 'body' in payload and payload['body'].get('data'):
-                        if payload.get('mimeType') == 'text/plain':
-                            import base64
-                            return base64.urlsafe_b64decode(payload['body']['data']).decode()
-                    
-                    # 2. Search in Parts
-                    if 'parts' in payload:
-                        # Prioritize text/plain
-                        for part in payload['parts']:
-                            if part['mimeType'] == 'text/plain' and part.get('body', {}).get('data'):
-                                import base64
-                                return base64.urlsafe_b64decode(part['body']['data']).decode()
-                        
-                        # Fallback to text/html
-                        for part in payload['parts']:
-                            if part['mimeType'] == 'text/html' and part.get('body', {}).get('data'):
-                                import base64
-                                html = base64.urlsafe_b64decode(part['body']['data']).decode()
-                                return clean_email_body(html) # Helper we already have
-                                
-                        # Recursive deep dive if multipart
-                        for part in payload['parts']:
-                            if 'multipart' in part['mimeType']:
-                                found = get_best_body(part)
-                                if found: return found
-                                
-                    return None
-
-                # Call extraction
-                extracted_body = get_best_body(payload)
-                body = extracted_body if extracted_body else "Sin contenido (Posible adjunto o imagen)"
-
-                email_data.append({
-                    "id": msg['id'],
-                    "threadId": msg.get('threadId', msg['id']), # Add threadId, fallback to id
-                    "subject": subject,
-                    "sender": sender,
-                    "body": clean_email_body(body)
-                })
-            except:
-                pass 
+            email_item = _hydrate_email(service, msg)
+            if email_item:
+                email_data.append(email_item)
         return email_data
     except Exception as e:
         st.error(f"Error Gmail: {e}")
         return []
 
+def _fetch_metadata(service, messages):
+    """format='metadata' (triage headers + snippet + labels) for many messages via batch HTTP (50 per call)."""
+    from modules.mail_triage import TRIAGE_HEADERS
+    metas = {}
+    fetched = {}
+
+    # Metadata seen before (this or a previous process) comes from the disk cache
+    cache, user = _disk_cache(), _cache_user()
+    if cache and user:
+        hits = cache.get_many(user, 'mail_meta', [m['id'] for m in messages])
+        metas.update({mid: meta for mid, (meta, age) in hits.items() if is_fresh('mail_meta', age)})
+    missing = [m for m in messages if m['id'] not in metas]
+
+    def callback(request_id, response, exception):
+        if exception is None and response:
+            metas[request_id] = fetched[request_id] = response
+
+    for i in range(0, len(missing), 50):
+        batch = service.new_batch_http_request(callback=callback)
+        for msg in missing[i:i + 50]:
+            batch.add(
+                service.users().messages().get(userId='me', id=msg['id'], format='metadata', metadataHeaders=TRIAGE_HEADERS,
+                                               fields=get_fields('message_triage')),
+                request_id=msg['id']
+            )
+        batch.execute()
+    if cache and user and fetched:
+        cache.put_many(user, 'mail_meta', fetched)
+    # Keep list order (newest first)
+    return watch_fields([metas[m['id']] for m in messages if m['id'] in metas], 'message_triage')
+
+def fetch_emails_triaged(service, start_date=None, end_date=None, max_results=15, sender_history=None,
+                         threshold=None, skip_ids=None):
+    """
+    Two-phase fetch: metadata-only triage first (List-Unsubscribe, Precedence, no-reply senders,
+    subject patterns, sender history), then full download only for relevant messages.
+    Pages past skipped and already processed messages (up to TRIAGE_MAX_PAGES lists) so a window
+    full of newsletters doesn't hide the real mail behind it.
+
+    Returns:
+        tuple: (emails, report) with report = {'listed', 'hydrated', 'skipped_counts', 'skipped'}.
+    """
+    from modules.mail_triage import triage_messages, DEFAULT_THRESHOLD, TRIAGE_MAX_PAGES
+    report = {'listed': 0, 'hydrated': 0, 'skipped_counts': {}, 'skipped': []}
+    try:
+        query = _inbox_query(start_date, end_date)
+        keep, token = [], None
+        for _ in range(TRIAGE_MAX_PAGES):
+            results = service.users().messages().list(userId='me', q=query, maxResults=max_results, pageToken=token,
+                                                      fields=list_fields('message_refs', 'messages')).execute()
+            messages = [m for m in results.get('messages', []) if m['id'] not in (skip_ids or ())]
+            report['listed'] += len(messages)
+            if messages:
+                metas = _fetch_metadata(service, messages)
+                page_keep, counts, skipped = triage_messages(metas, sender_history, threshold if threshold is not None else DEFAULT_THRESHOLD)
+                keep.extend(page_keep)
+                report['skipped'].extend(skipped)
+                for reason, count in counts.items():
+                    report['skipped_counts'][reason] = report['skipped_counts'].get(reason, 0) + count
+            token = results.get('nextPageToken')
+            if len(keep) >= max_results or not token:
+                break
+        if not keep:
+            return [], report
+
+        email_data = []
+        for meta in keep[:max_results]:
+            email_item = _hydrate_email(service, meta)
+            if email_item:
+                if meta.get('internalDate'):
+                    email_item['date'] = datetime.datetime.fromtimestamp(int(meta['internalDate']) / 1000).strftime('%Y-%m-%d')
+                email_data.append(email_item)
+        report['hydrated'] = len(email_data)
+        return email_data, report
+    except Exception as e:
+        st.error(f"Error Gmail: {e}")
+        return [], report
+
 def create_draft(service, user_id, message_body, to_email=None, subject="(Sin asunto)"):
     """
     Creates a draft email with proper RFC 2822 formatting.
@@ -542,64 +720,157 @@ def archive_message(service, user_id, msg_id):
     """Archives a message by removing the INBOX label."""
     return modify_message_labels(service, user_id, msg_id, remove_ids=['INBOX'])
 
+def _label_identity():
+    """
+    Owner of a label-ID cache: the license plus the mailbox Gmail reported for this session's token
+    (getProfile). None when either is unknown ('me' or a missing email would be shared by every session).
+    """
+    license_key = st.session_state.get('license_key')
+    email = st.session_state.get('connected_email')
+    if not license_key or not email or '@' not in email:
+        return None
+    return f"{license_key}:{email.lower()}"
+
+def _label_manager(user_id='me'):
+    """
+    Label cache of the connected Gmail account, warmed from the disk cache or the shared backend
+    (other replicas) and persisted to both. Without a verified identity nothing is cached.
+    """
+    account = _label_identity()
+    manager = get_label_manager(account)
+    if account and manager.on_change is None:
+        cache = _disk_cache()
+        ids, age = cache.get(account, 'labels', 'map') if cache else (None, None)
+        if not (ids and is_fresh('labels', age)):
+            ids = _shared_get('labels', account) or ids
+        if ids:
+            manager.restore(ids)
+
+        def persist(ids):
+            _shared_set('labels', account, ids, ttl=FRESHNESS_SECONDS['labels'])
+            if cache:
+                cache.put(account, 'labels', 'map', ids)
+        manager.on_change = persist
+    return manager
+
 def get_or_create_label(service, user_id, label_name):
     """Gets label ID by name or creates it if missing."""
     try:
-        # List labels
-        results = service.users().labels().list(userId=user_id).execute()
-        labels = results.get('labels', [])
-        
-        for label in labels:
-            if label['name'].lower() == label_name.lower():
-                return label['id']
-        
-        # Create if not found
-        label_object = {
-            'name': label_name,
-            'labelListVisibility': 'labelShow',
-            'messageListVisibility': 'show'
-        }
-        created_label = service.users().labels().create(userId=user_id, body=label_object).execute()
-        return created_label['id']
+        return _label_manager(user_id).label_id(service, label_name, user_id)
     except Exception as e:
         print(f"Error managing label {label_name}: {e}")
         return None
 
-def archive_old_emails(service, hours_old=720):
-    """Archives 'Promotions' older than X hours (default 30 days)."""
+def _thread_http(service):
+    """Separate authorized connection for a worker thread (httplib2 is not thread-safe). None if unavailable."""
     try:
-        # Calculate date
+        import httplib2
+        import google_auth_httplib2
+        creds = getattr(service._http, 'credentials', None)
+        return google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http()) if creds else None
+    except Exception:
+        return None
+
+def archive_old_emails(service, hours_old=720, state=None, should_cancel=None, on_progress=None):
+    """
+    Archives ALL 'Promotions' older than X hours (default 30 days), streaming the listing:
+    follows nextPageToken and archives in batchModify groups of 1000 while the next page is listed.
+
+    Args:
+        state: a previous report to resume (same frozen query, page token and totals).
+        should_cancel: callable checked before each page; True stops after the current batch.
+        on_progress: callable receiving the report after each page (persist it to resume).
+
+    Returns:
+        dict: {'query', 'page_token', 'archived', 'listed', 'passes', 'seconds', 'per_second',
+               'done', 'cancelled', 'error'}
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from modules.label_manager import batch_modify, BATCH_MODIFY_MAX
+
+    if not state or not state.get('query'):
         cutoff = datetime.datetime.now() - datetime.timedelta(hours=hours_old)
-        date_str = cutoff.strftime('%Y/%m/%d')
-        
-        # Query: category:promotions AND before:YYYY/MM/DD AND in:inbox
-        query = f"category:promotions before:{date_str} in:inbox"
-        
-        # List messages (up to 500 at a time)
-        results = service.users().messages().list(userId='me', q=query, maxResults=500).execute()
-        messages = results.get('messages', [])
-        
-        if not messages:
-            return 0
-            
-        # Batch Modify
-        msg_ids = [m['id'] for m in messages]
-        body = {'removeLabelIds': ['INBOX']}
-        service.users().messages().batchModify(userId='me', body={'ids': msg_ids, 'removeLabelIds': ['INBOX']}).execute()
-        
-        return len(msg_ids)
+        # The cutoff is frozen in the query so a resumed run targets the same messages
+        state = {'query': f"category:promotions before:{cutoff.strftime('%Y/%m/%d')} in:inbox",
+                 'page_token': None, 'archived': 0, 'listed': 0, 'passes': 0, 'seconds': 0.0}
+    state = dict(state, done=False, cancelled=False, error=None)
+
+    worker_http = _thread_http(service)
+    executor = ThreadPoolExecutor(max_workers=1) if worker_http is not None else None
+    started = time.time() - state['seconds']
+    pending = None
+    buffer = []
+    pass_listed = 0
+
+    def archive(ids):
+        batch_modify(service, ids, remove_ids=['INBOX'], http=worker_http)
+        return len(ids)
+
+    def settle():
+        nonlocal pending
+        if pending is not None:
+            done_now = pending.result() if executor else pending
+            pending = None
+            state['archived'] += done_now
+
+    def submit(ids):
+        nonlocal pending
+        settle()
+        pending = executor.submit(archive, ids) if executor else archive(ids)
+
+    def report():
+        state['seconds'] = round(time.time() - started, 2)
+        state['per_second'] = round(state['archived'] / state['seconds'], 1) if state['seconds'] else 0.0
+        if on_progress:
+            on_progress(dict(state))
+
+    try:
+        while True:
+            if should_cancel and should_cancel():
+                state['cancelled'] = True
+                break
+            resp = service.users().messages().list(
+                userId='me', q=state['query'], maxResults=ARCHIVE_PAGE_SIZE,
+                pageToken=state['page_token'], fields=list_fields('message_ids', 'messages')
+            ).execute()
+            ids = [m['id'] for m in resp.get('messages', [])]
+            state['listed'] += len(ids)
+            pass_listed += len(ids)
+            buffer.extend(ids)
+            state['page_token'] = resp.get('nextPageToken')
+
+            while len(buffer) >= BATCH_MODIFY_MAX or (buffer and not state['page_token']):
+                submit(buffer[:BATCH_MODIFY_MAX])
+                buffer = buffer[BATCH_MODIFY_MAX:]
+            report()
+
+            if not state['page_token']:
+                settle()
+                state['passes'] += 1
+                # Archived messages leave the query, which can shift page tokens mid-stream:
+                # a fresh pass picks up anything skipped, and an empty pass means done.
+                if pass_listed == 0 or state['passes'] >= ARCHIVE_MAX_PASSES:
+                    state['done'] = True
+                    break
+                pass_listed = 0
     except Exception as e:
         print(f"Error bulk archiving: {e}")
-        return -1
+        state['error'] = str(e)
+    finally:
+        try:
+            settle()
+        except Exception as e:
+            state['error'] = state['error'] or str(e)
+        if executor:
+            executor.shutdown(wait=True)
+    # Buffered-but-unarchived IDs are still in the inbox: the closing pass of a resume lists them again
+    report()
+    return state
 
 def setup_gtd_labels(service, user_id='me'):
     """Ensures GTD label hierarchy exists."""
     labels = ["@GTD/1-Acción", "@GTD/2-Espera", "@GTD/3-Leer", "@GTD/4-Fiscal"]
-    ids = {}
-    for lbl in labels:
-        lid = get_or_create_label(service, user_id, lbl)
-        if lid: ids[lbl] = lid
-    return ids
+    return _label_manager(user_id).ensure_labels(service, labels, user_id)
 
 def auto_tag_gtd(service, email_results, user_id='me'):
     """Applies GTD labels based on AI analysis."""
@@ -618,7 +889,9 @@ def auto_tag_gtd(service, email_results, user_id='me'):
         
         # Also check Urgency
         
-        count = 0
+        # Group messages by target label: one batchModify per label instead of one call per email
+        groups = {}
+        items_per_label = {}
         for ev in email_results:
             cat = ev.get('category', 'Otro')
             urg = ev.get('urgency', 'Baja')
@@ -632,11 +905,12 @@ def auto_tag_gtd(service, email_results, user_id='me'):
             label_id = label_map.get(target_label_name)
             
             if label_id and ev.get('id'):
-                # Apply Label
-                modify_message_labels(service, user_id, ev['id'], add_ids=[label_id])
-                count += 1
+                # Every message of the analyzed thread gets the label
+                groups.setdefault(label_id, []).extend(message_ids_of(ev))
+                items_per_label[label_id] = items_per_label.get(label_id, 0) + 1
         
-        return count
+        applied = _label_manager(user_id).apply(service, groups, user_id)
+        return sum(items_per_label[lid] for lid in applied)
     except Exception as e:
         print(f"Error Auto-Tagging: {e}")
         return 0
@@ -655,7 +929,8 @@ def delete_events_bulk(service, calendar_id, start_date, end_date):
             timeMin=t_min, 
             timeMax=t_max, 
             singleEvents=True,
-            orderBy='startTime'
+            orderBy='startTime',
+            fields=list_fields('event_ids')
         ).execute()
         events = events_result.get('items', [])
         
@@ -676,7 +951,7 @@ def delete_tasks_bulk(service, tasklist_id, start_date=None, end_date=None, dele
     """Deletes tasks. Optionally filtered by due date."""
     try:
         # List all tasks
-        results = service.tasks().list(tasklist=tasklist_id, showHidden=True).execute()
+        results = service.tasks().list(tasklist=tasklist_id, showHidden=True, fields=list_fields('task_due')).execute()
         tasks = results.get('items', [])
         
         count = 0
@@ -705,18 +980,29 @@ def delete_tasks_bulk(service, tasklist_id, start_date=None, end_date=None, dele
                     if deleted % 10 == 0: time.sleep(0.5)
                 except: pass
                 
+        if deleted:
+            _mark_tasks_stale()
         return deleted
     except Exception as e:
         return f"Error: {e}"
 
 def get_task_lists(service):
-    """Returns a list of task lists."""
+    """Returns a list of task lists (shared cache per user, dropped by create_task_list)."""
+    user = _cache_user()
+    cached = _shared_get('task_lists', user)
+    if cached is not None:
+        return cached
     retries = 3
     for attempt in range(retries):
         try:
-            results = service.tasklists().list(maxResults=10).execute()
-            items = results.get('items', [])
-            return items
+            items, token = [], None
+            while True:
+                results = service.tasklists().list(maxResults=100, pageToken=token, fields=list_fields('task_lists')).execute()
+                items.extend(watch_fields(results.get('items', []), 'task_lists'))
+                token = results.get('nextPageToken')
+                if not token:
+                    _shared_set('task_lists', user, items)
+                    return items
         except Exception as e:
             err_str = str(e).lower()
             if "broken pipe" in err_str or "ssl" in err_str or "connection" in err_str or "500" in err_str or "503" in err_str:
@@ -736,6 +1022,8 @@ def create_task_list(service, title):
         try:
             tasklist = {'title': title}
             result = service.tasklists().insert(body=tasklist).execute()
+            _mark_tasks_stale()
+            forget_shared_user_cache('task_lists')
             return result['id']
         except Exception as e:
             err_str = str(e).lower()
@@ -749,36 +1037,40 @@ def create_task_list(service, title):
                 return None
     return None
 
+def _task_body(title, notes=None, due_date=None, start_date=None):
+    """Tasks API body with start/due as RFC 3339 noon UTC (see add_task_to_google)."""
+    task = {
+        'title': title,
+        'notes': notes
+    }
+    
+    # Add START date if provided (Google Tasks API supports 'start' field)
+    if start_date:
+        # Use same RFC 3339 format as due_date
+        if hasattr(start_date, 'date'):
+            s_str = start_date.date().isoformat()
+        else:
+            s_str = str(start_date)[:10] # Ensure YYYY-MM-DD
+        
+        task['start'] = f"{s_str}T12:00:00.000Z"
+    
+    # Add DUE date if provided
+    if due_date:
+        # Google Tasks 'due' field is strict RFC 3339 timestamp.
+        # To avoid timezone shifts (e.g. 00:00 UTC -> previous day in Chile),
+        # we set it to 12:00:00 UTC (Noon) which safely lands on the correct day globally.
+        if hasattr(due_date, 'date'):
+            d_str = due_date.date().isoformat()
+        else:
+            d_str = str(due_date)[:10] # Ensure YYYY-MM-DD
+        
+        task['due'] = f"{d_str}T12:00:00.000Z"
+    return task
+
 def add_task_to_google(service, tasklist_id, title, notes=None, due_date=None, start_date=None, parent=None):
     """Adds a task to the specified list with optional start and due dates."""
-    print(f"DEBUG: add_task_to_google called for title='{title}'")
     try:
-        task = {
-            'title': title,
-            'notes': notes
-        }
-        
-        # Add START date if provided (Google Tasks API supports 'start' field)
-        if start_date:
-            # Use same RFC 3339 format as due_date
-            if hasattr(start_date, 'date'):
-                s_str = start_date.date().isoformat()
-            else:
-                s_str = str(start_date)[:10] # Ensure YYYY-MM-DD
-            
-            task['start'] = f"{s_str}T12:00:00.000Z"
-        
-        # Add DUE date if provided
-        if due_date:
-            # Google Tasks 'due' field is strict RFC 3339 timestamp.
-            # To avoid timezone shifts (e.g. 00:00 UTC -> previous day in Chile),
-            # we set it to 12:00:00 UTC (Noon) which safely lands on the correct day globally.
-            if hasattr(due_date, 'date'):
-                d_str = due_date.date().isoformat()
-            else:
-                d_str = str(due_date)[:10] # Ensure YYYY-MM-DD
-            
-            task['due'] = f"{d_str}T12:00:00.000Z"
+        task = _task_body(title, notes, due_date, start_date)
         
         if parent:
             task['parent'] = parent
@@ -788,6 +1080,7 @@ def add_task_to_google(service, tasklist_id, title, notes=None, due_date=None, s
         for attempt in range(retries):
             try:
                 result = service.tasks().insert(tasklist=tasklist_id, body=task).execute()
+                _mark_tasks_stale()
                 return result
             except Exception as e:
                 # Check for transient errors
@@ -806,6 +1099,31 @@ def add_task_to_google(service, tasklist_id, title, notes=None, due_date=None, s
         st.error(f"Error adding task: {e}")
         return None
 
+def add_project_tasks(service, tasklist_id, project_title, project_notes, items):
+    """
+    Creates a parent task and its subtasks: the parent first (one call), then the children in
+    batch HTTP chunks with adaptive backoff (modules/task_writer.py).
+
+    Args:
+        items: [{'title', 'notes', 'due_date'}]
+
+    Returns:
+        tuple: (parent task or None, per-item outcomes)
+    """
+    from modules.task_writer import insert_tasks_batched
+    parent_task = add_task_to_google(service, tasklist_id, project_title, project_notes)
+    if not parent_task:
+        return None, []
+    bodies = [_task_body(it['title'], it.get('notes'), it.get('due_date')) for it in items]
+    try:
+        outcomes = insert_tasks_batched(service, tasklist_id, bodies, parent=parent_task['id'])
+    except Exception as e:
+        st.error(f"Error creando subtareas: {e}")
+        outcomes = [{'index': i, 'title': b['title'], 'status': 'failed', 'id': None, 'error': str(e)}
+                    for i, b in enumerate(bodies)]
+    _mark_tasks_stale()
+    return parent_task, outcomes
+
 def delete_task_google(service, tasklist_id, task_id):
     """Deletes a task from the specified list."""
     print(f"DEBUG: delete_task_google called for id='{task_id}'")
@@ -813,6 +1131,7 @@ def delete_task_google(service, tasklist_id, task_id):
     for attempt in range(retries):
         try:
             service.tasks().delete(tasklist=tasklist_id, task=task_id).execute()
+            _mark_tasks_stale()
             return True
         except Exception as e:
             err_str = str(e).lower()
@@ -835,22 +1154,19 @@ def update_task_google(service, tasklist_id, task_id, title=None, notes=None, st
     retries = 3
     for attempt in range(retries):
         try:
-            # First get the existing task to preserve other fields
-            # We also wrap the 'get' in the retry logic implicitly by restarting the loop if it fails? 
-            # Ideally we want granular retries but simplistic block retry is safer for consistency.
-            
-            task = service.tasks().get(tasklist=tasklist_id, task=task_id).execute()
-            
+            # Patch only the changed fields: no read of the full task beforehand
+            task = {}
             if title: task['title'] = title
             if notes: task['notes'] = notes
             if status: task['status'] = status
             
             if due:
                  task['due'] = due.isoformat() + 'Z'
-            elif due == "": # Clear due date logic if needed, but for now basic update
-                 if 'due' in task: del task['due']
+            elif due == "": # Clear due date
+                 task['due'] = None
 
-            result = service.tasks().update(tasklist=tasklist_id, task=task_id, body=task).execute()
+            result = service.tasks().patch(tasklist=tasklist_id, task=task_id, body=task, fields='id').execute()
+            _mark_tasks_stale()
             return result
         except Exception as e:
             err_str = str(e).lower()
@@ -864,38 +1180,118 @@ def update_task_google(service, tasklist_id, task_id, title=None, notes=None, st
                 return None
     return None
 
-def get_existing_tasks_simple(service):
-    """Fetches all tasks from all lists (simplified for AI context)."""
-    retries = 3
-    for attempt in range(retries):
-        try:
-            all_tasks = []
-            tasklists = get_task_lists(service)
-            for tl in tasklists:
-                results = service.tasks().list(tasklist=tl['id'], showCompleted=False, maxResults=100).execute()
-                tasks = results.get('items', [])
-                for t in tasks:
-                    all_tasks.append({
-                        'id': t['id'],
-                        'title': t['title'],
-                        'list_id': tl['id'],
-                        'list_title': tl['title'],
-                        'due': t.get('due', 'No Due Date')
-                    })
-            return all_tasks
-        except Exception as e:
-            # Check for SSL or transient errors
-            err_str = str(e).lower()
-            if "ssl" in err_str or "connection" in err_str:
-                if attempt < retries - 1:
+def _mark_tasks_stale():
+    """Task writes made through the app make the next snapshot read refresh (incrementally)."""
+    snap = st.session_state.get('tasks_snapshot')
+    if snap is not None:
+        snap.mark_stale()
+
+def get_task_snapshot(service, force=False):
+    """
+    Per-user TaskSnapshot kept in session state. Refreshed only when stale or older than the TTL:
+    the first load reads every list in parallel (batch HTTP, all pages), later ones pull changes only.
+    """
+    from modules.task_snapshot import TaskSnapshot
+    cache, user = _disk_cache(), _cache_user()
+    job = ('tasks', user)
+    if 'tasks_snapshot' not in st.session_state:
+        snap = TaskSnapshot()
+        state, age = cache.get(user, 'tasks', 'snapshot') if cache and user else (None, None)
+        if state:
+            # Warm start from disk; an old copy is reconciled (updatedMin delta) in the background
+            snap = TaskSnapshot.from_state(state)
+            snap.stale = False
+            http = _thread_http(service)
+            if not is_fresh('tasks', age) and http is not None:
+                def reconcile():
+                    snap.refresh(service, http=http)
+                    cache.put(user, 'tasks', 'snapshot', snap.to_state())
+                _reconcile_in_background(job, reconcile)
+        st.session_state.tasks_snapshot = snap
+    snap = st.session_state.tasks_snapshot
+    if force or (snap.needs_refresh() and not _reconciling(job)):
+        retries = 3
+        for attempt in range(retries):
+            try:
+                snap.refresh(service)
+                if cache and user:
+                    cache.put(user, 'tasks', 'snapshot', snap.to_state())
+                break
+            except Exception as e:
+                # Check for SSL or transient errors
+                err_str = str(e).lower()
+                if ("ssl" in err_str or "connection" in err_str) and attempt < retries - 1:
                     time.sleep(1 * (attempt + 1))
                     continue
-            st.error(f"Error fetching tasks after {retries} attempts: {e}")
-            return []
-    return []
+                # Serve the last good copy (if any) rather than nothing
+                st.error(f"Error fetching tasks after {attempt + 1} attempts: {e}")
+                break
+    return snap
+
+def load_event_store(service, calendar_id, time_min, time_max):
+    """
+    EventStore for [time_min, time_max): the session copy while fresh, else the encrypted disk copy
+    (warm start in milliseconds, reconciled in the background once older than its freshness rule),
+    else a full sync. Raises on API errors of a foreground sync.
+    """
+    from modules.event_store import EventStore
+    cache, user = _disk_cache(), _cache_user()
+    job = ('events', user, calendar_id)
+
+    store = st.session_state.get('event_store')
+    if store is None or store.calendar_id != calendar_id or not store.covers(time_min, time_max):
+        store = None
+        state, age = cache.get(user, 'events', calendar_id) if cache and user else (None, None)
+        if state:
+            warm = EventStore.from_state(state)
+            if warm.covers(time_min, time_max):
+                store = warm
+                st.session_state.event_store = store
+    if store is not None and (store.is_fresh() or _reconciling(job)):
+        return store
+
+    http = _thread_http(service)
+    if store is not None and http is not None:
+        def reconcile():
+            store.sync(service, time_min, time_max, http=http)
+            if cache and user:
+                cache.put(user, 'events', calendar_id, store.to_state())
+        _reconcile_in_background(job, reconcile)
+        return store
+
+    store = EventStore(calendar_id).sync(service, time_min, time_max)
+    st.session_state.event_store = store
+    if cache and user:
+        cache.put(user, 'events', calendar_id, store.to_state())
+    return store
+
+def clear_event_cache():
+    """Forgets the session and disk copies of the calendar events (manual refresh / calendar change)."""
+    if 'event_store' in st.session_state:
+        del st.session_state['event_store']
+    cache, user = _disk_cache(), _cache_user()
+    if cache and user:
+        cache.delete(user, 'events')
+
+def forget_shared_user_cache(*kinds):
+    """Drops the current user's entries from the shared cache backend (all of them by default)."""
+    user, account = _cache_user(), _label_identity()
+    shared = get_cache_backend()
+    for kind in kinds or ('task_lists', 'labels'):
+        owner = account if kind == 'labels' else user
+        if owner:
+            shared.delete('google', [kind, owner])
+
+def get_existing_tasks_simple(service):
+    """Fetches all pending tasks from all lists (simplified for AI context), via the task snapshot."""
+    return get_task_snapshot(service).all()
 
-def add_event_to_calendar(service, event_data, calendar_id='primary'):
-    """Adds an event to Google Calendar. Expects event_data dict."""
+def add_event_to_calendar(service, event_data, calendar_id='primary', idempotent=True):
+    """
+    Adds an event to Google Calendar. Expects event_data dict.
+    idempotent=True derives a stable event ID from (calendar, summary, start, end), so retries,
+    the Robot fallback and parallel inserts never create duplicates (409 counts as success).
+    """
     try:
         summary = event_data.get('summary', 'Sin Título')
         start_time = event_data.get('start_time')
@@ -973,7 +1369,13 @@ def add_event_to_calendar(service, event_data, calendar_id='primary'):
         if recurrence and isinstance(recurrence, list):
             event_body['recurrence'] = recurrence
             
-        created_event = service.events().insert(calendarId=calendar_id, body=event_body).execute()
+        if idempotent:
+            event_body['id'] = stable_event_id(calendar_id, summary, start_time, end_time)
+            created_event, is_new = insert_event_idempotent(service, calendar_id, event_body)
+            if not is_new:
+                return True, f"Evento ya existía. ID: {created_event.get('id', '')}"
+        else:
+            created_event = service.events().insert(calendarId=calendar_id, body=event_body).execute()
         event_id = created_event.get('id', '')
         return True, f"Evento creado. ID: {event_id}"
 
@@ -987,7 +1389,11 @@ def add_event_to_calendar(service, event_data, calendar_id='primary'):
                 creds_sa = _load_service_account_creds()
                 if creds_sa:
                     service_sa = build('calendar', 'v3', credentials=creds_sa, cache_discovery=False)
-                    created_event = service_sa.events().insert(calendarId=calendar_id, body=event_body).execute()
+                    # Same stable ID as the user attempt: if that insert actually landed, this is a no-op
+                    if event_body.get('id'):
+                        created_event, _ = insert_event_idempotent(service_sa, calendar_id, event_body)
+                    else:
+                        created_event = service_sa.events().insert(calendarId=calendar_id, body=event_body).execute()
                     event_id = created_event.get('id', '')
                     return True, f"Evento creado (Robot). ID: {event_id}"
             except Exception as e_sa:
@@ -996,6 +1402,150 @@ def add_event_to_calendar(service, event_data, calendar_id='primary'):
         return False, str(e)
 
 
+def _parse_event_start(value):
+    """Parses an ISO start (str or datetime) into an aware datetime (naive -> local). None if invalid."""
+    import datetime as dt
+    if not value:
+        return None
+    try:
+        if isinstance(value, str):
+            parsed = dt.datetime.fromisoformat(value.replace('Z', '+00:00'))
+        elif isinstance(value, dt.datetime):
+            parsed = value
+        else:
+            parsed = dt.datetime.combine(value, dt.time.min)
+    except Exception:
+        return None
+    if not parsed.tzinfo:
+        parsed = parsed.astimezone()
+    return parsed
+
+def _normalize_title(title):
+    """Accent/case/punctuation-insensitive title used for duplicate comparisons."""
+    import re
+    from modules.event_classifier import fold_text
+    return re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', ' ', fold_text(title or ''))).strip()
+
+def _titles_similar(a, b, threshold=0.8):
+    """Fast similarity: exact match first, cheap upper bounds before the full ratio."""
+    from difflib import SequenceMatcher
+    if a == b:
+        return True
+    if not a or not b:
+        return False
+    sm = SequenceMatcher(None, a, b)
+    return sm.real_quick_ratio() > threshold and sm.quick_ratio() > threshold and sm.ratio() > threshold
+
+def list_batch_window(service, calendar_id, starts, margin_days=1, extra_range=None):
+    """
+    Existing events in ONE windowed list: ±margin_days around the earliest/latest of `starts`
+    (aware datetimes), widened to cover `extra_range` (aware first, last) if given.
+    The 'conflict_window' profile lets the result also serve conflict checks.
+    """
+    import datetime as dt
+    time_min = min(starts) - dt.timedelta(days=margin_days)
+    time_max = max(starts) + dt.timedelta(days=margin_days)
+    if extra_range:
+        time_min, time_max = min(time_min, extra_range[0]), max(time_max, extra_range[1])
+    time_min, time_max = time_min.isoformat(), time_max.isoformat()
+    events, page_token = [], None
+    while True:
+        res = service.events().list(
+            calendarId=calendar_id, timeMin=time_min, timeMax=time_max,
+            singleEvents=True, maxResults=2500, pageToken=page_token,
+            fields=list_fields('conflict_window')
+        ).execute()
+        events.extend(watch_fields(res.get('items', []), 'conflict_window'))
+        page_token = res.get('nextPageToken')
+        if not page_token:
+            return events
+
+def screen_duplicate_events(service, calendar_id, candidates, existing_events=None, max_minutes=30):
+    """
+    Bulk duplicate screening for a batch of parsed events (dicts with 'summary', 'start_time').
+    Does ONE windowed list covering all candidates (or uses `existing_events`, e.g. the cache),
+    blocks existing events by day and compares titles only inside the nearby blocks.
+
+    Returns:
+        list: same length as candidates; the matching existing event dict, or None.
+    """
+    import datetime as dt
+
+    results = [None] * len(candidates)
+    parsed = []
+    for i, ev in enumerate(candidates):
+        start = _parse_event_start(ev.get('start_time'))
+        title = _normalize_title(ev.get('summary', ''))
+        if start and title:
+            parsed.append((i, start, title))
+    if not parsed:
+        return results
+
+    try:
+        if existing_events is None:
+            existing_events = list_batch_window(service, calendar_id, [p[1] for p in parsed])
+
+        # Block existing events by calendar day
+        blocks = {}
+        for event in existing_events:
+            e_start = _parse_event_start(event.get('start', {}).get('dateTime') or event.get('start', {}).get('date'))
+            e_title = _normalize_title(event.get('summary', ''))
+            if e_start and e_title:
+                blocks.setdefault(e_start.date(), []).append((e_start, e_title, event))
+
+        one_day = dt.timedelta(days=1)
+        for i, start, title in parsed:
+            day = start.date()
+            for block_day in (day, day - one_day, day + one_day):
+                for e_start, e_title, event in blocks.get(block_day, []):
+                    if abs((start - e_start).total_seconds()) / 60 <= max_minutes and _titles_similar(title, e_title):
+                        results[i] = event
+                        break
+                if results[i] is not None:
+                    break
+        return results
+
+    except Exception as e:
+        # If check fails (e.g. 404 Not Found due to invalid email), allow creation (fail-open)
+        if "404" in str(e) or "notFound" in str(e):
+             print(f"DEBUG: 404 in screen_duplicate_events for {calendar_id}. Treating as no duplicate.")
+             return results
+
+        st.warning(f"Error verificando duplicados: {e}")
+        return results
+
+def screen_event_batch(service, calendar_id, candidates):
+    """
+    Duplicate screening + conflict detection for a batch of parsed events, sharing one windowed list.
+    Fails open: on API errors nothing is flagged.
+
+    Returns:
+        tuple: (dupes, conflicts) — both same length as candidates (see screen_duplicate_events
+               and conflict_detector.detect_conflicts)
+    """
+    from zoneinfo import ZoneInfo
+    from modules.conflict_detector import detect_conflicts, suggestion_range
+    from modules.scheduler import busy_from_events
+
+    starts = [s for s in (_parse_event_start(ev.get('start_time')) for ev in candidates) if s]
+    if not starts:
+        return [None] * len(candidates), [None] * len(candidates)
+    # Suggestions search the candidates' weeks and the next ones: busy intervals must cover all of it
+    window = suggestion_range(starts)
+    tz = ZoneInfo("America/Santiago")
+    try:
+        existing = list_batch_window(service, calendar_id, starts,
+                                     extra_range=tuple(d.replace(tzinfo=tz) for d in window) if window else None)
+    except Exception as e:
+        print(f"DEBUG: screen_event_batch list failed for {calendar_id}: {e}")
+        return [None] * len(candidates), [None] * len(candidates)
+    dupes = screen_duplicate_events(service, calendar_id, candidates, existing_events=existing)
+    # An event that already exists would only "conflict" with itself
+    dup_ids = {d.get('id') for d in dupes if d is not None}
+    busy = busy_from_events([ev for ev in existing if ev.get('id') not in dup_ids])
+    conflicts = detect_conflicts(candidates, busy, now=datetime.datetime.now(), window=window)
+    return dupes, [None if d is not None else c for d, c in zip(dupes, conflicts)]
+
 def check_event_exists(service, calendar_id, event_data):
     """
     Checks if a similar event already exists in the calendar.
@@ -1008,102 +1558,7 @@ def check_event_exists(service, calendar_id, event_data):
     Returns:
         bool: True if duplicate found, False otherwise
     """
-    try:
-        import datetime as dt
-        from difflib import SequenceMatcher
-        
-        # Extract new event data
-        new_summary = event_data.get('summary', '').lower().strip()
-        new_start = event_data.get('start_time')
-        
-        if not new_summary or not new_start:
-            return False
-        
-        # Parse start time
-        if isinstance(new_start, str):
-            try:
-                # Ensure it's a datetime object
-                if 'T' in new_start:
-                    new_start_dt = dt.datetime.fromisoformat(new_start.replace('Z', '+00:00'))
-                else: 
-                     # Handle simple date case or malformed
-                     new_start_dt = dt.datetime.fromisoformat(new_start)
-            except:
-                # Fallback
-                return False
-        else:
-            new_start_dt = new_start
-        
-        # Search window: ±1 day from event start
-        # Ensure we produce an offset-aware ISO string
-        time_min_dt = new_start_dt - dt.timedelta(days=1)
-        time_max_dt = new_start_dt + dt.timedelta(days=1)
-        
-        # If naive, make it aware (local) or UTC
-        if not time_min_dt.tzinfo:
-            time_min_dt = time_min_dt.astimezone()
-        if not time_max_dt.tzinfo:
-            time_max_dt = time_max_dt.astimezone()
-            
-        time_min = time_min_dt.isoformat()
-        time_max = time_max_dt.isoformat()
-        
-        # Fetch existing events in time window
-        events_result = service.events().list(
-            calendarId=calendar_id,
-            timeMin=time_min,
-            timeMax=time_max,
-            singleEvents=True,
-            orderBy='startTime',
-            maxResults=50
-        ).execute()
-        
-        existing_events = events_result.get('items', [])
-        
-        # Check each existing event for similarity
-        for event in existing_events:
-            existing_summary = event.get('summary', '').lower().strip()
-            existing_start_raw = event.get('start', {}).get('dateTime') or event.get('start', {}).get('date')
-            
-            if not existing_start_raw:
-                continue
-            
-            try:
-                # Ensure existing is aware
-                if 'T' in existing_start_raw:
-                     # If replace('Z',...) works it's usually UTC, but if naive needs .astimezone()
-                     existing_start_dt = dt.datetime.fromisoformat(existing_start_raw.replace('Z', '+00:00'))
-                     if not existing_start_dt.tzinfo:
-                         existing_start_dt = existing_start_dt.astimezone()
-                else: 
-                     existing_start_dt = dt.datetime.fromisoformat(existing_start_raw).astimezone()
-            except:
-                continue
-            
-            # Ensure new event is aware/consistent BEFORE math
-            match_new_start = new_start_dt
-            if not match_new_start.tzinfo:
-                match_new_start = match_new_start.astimezone()
-
-            # Similarity check
-            title_similarity = SequenceMatcher(None, new_summary, existing_summary).ratio()
-            
-            # Use abs difference
-            time_diff = abs((match_new_start - existing_start_dt).total_seconds() / 60)
-            
-            if title_similarity > 0.8 and time_diff <= 30:
-                return True  # Duplicate found
-        
-        return False  # No duplicate
-        
-    except Exception as e:
-        # If check fails (e.g. 404 Not Found due to invalid email), allow creation (fail-open)
-        if "404" in str(e) or "notFound" in str(e):
-             print(f"DEBUG: 404 in check_event_exists for {calendar_id}. Treating as no duplicate.")
-             return False
-
-        st.warning(f"Error verificando duplicados: {e}")
-        return False
+    return screen_duplicate_events(service, calendar_id, [event_data])[0] is not None
 
 def delete_event(service, event_id):
     """Deletes an event from the primary calendar."""
@@ -1121,9 +1576,8 @@ def update_event_calendar(service, calendar_id, event_id, summary=None, descript
     """Updates an existing Google Calendar event."""
     img_valid_colors = [str(i) for i in range(1, 12)]
     try:
-        # Try with provided service (User)
-        event = service.events().get(calendarId=calendar_id, eventId=event_id).execute()
-        
+        # Patch only the changed fields: no read of the full event (attendees, conference data...) beforehand
+        event = {}
         if summary: event['summary'] = summary
         if description: event['description'] = description
         
@@ -1137,7 +1591,7 @@ def update_event_calendar(service, calendar_id, event_id, summary=None, descript
             event['start'] = {'dateTime': s_iso, 'timeZone': 'America/Santiago'}
             event['end'] = {'dateTime': e_iso, 'timeZone': 'America/Santiago'}
             
-        updated_event = service.events().update(calendarId=calendar_id, eventId=event_id, body=event).execute()
+        service.events().patch(calendarId=calendar_id, eventId=event_id, body=event, fields='id').execute()
         return True, "Evento actualizado"
 
     except Exception as e:
@@ -1151,8 +1605,7 @@ def update_event_calendar(service, calendar_id, event_id, summary=None, descript
                 svc_sa = get_calendar_service(force_service_account=True)
                 if svc_sa:
                     # Retry flow with SA
-                    event = svc_sa.events().get(calendarId=calendar_id, eventId=event_id).execute()
-                    
+                    event = {}
                     if summary: event['summary'] = summary
                     if description: event['description'] = description
                     if color_id and str(color_id) in img_valid_colors: event['colorId'] = str(color_id)
@@ -1160,7 +1613,7 @@ def update_event_calendar(service, calendar_id, event_id, summary=None, descript
                     # Note: start_time logic omitted here for brevity as optimize usually just does color/title, 
                     # but technically we should repeat it. For optimization plan, it's mostly metadata.
                     
-                    svc_sa.events().update(calendarId=calendar_id, eventId=event_id, body=event).execute()
+                    svc_sa.events().patch(calendarId=calendar_id, eventId=event_id, body=event, fields='id').execute()
                     return True, "Evento actualizado (Robot)"
             except Exception as e2:
                 return False, f"Fallo User y Robot: {e2}"
@@ -1194,10 +1647,11 @@ def optimize_event_reminders(service, calendar_id='primary', days_ahead=30):
             timeMax=time_max,
             singleEvents=True,
             orderBy='startTime',
-            maxResults=250
+            maxResults=250,
+            fields=list_fields('reminder_events')
         ).execute()
         
-        events = events_result.get('items', [])
+        events = watch_fields(events_result.get('items', []), 'reminder_events')
         updated_events = []
         
         # Load SA for fallback if needed
@@ -1226,27 +1680,30 @@ def optimize_event_reminders(service, calendar_id='primary', days_ahead=30):
                 new_overrides.append({'method': 'popup', 'minutes': 30})
                 new_overrides.append({'method': 'popup', 'minutes': 1440})
                 
-                event['reminders'] = {
+                # Patch only the reminders (the list call no longer downloads full events)
+                patch_body = {'reminders': {
                     'useDefault': False,
                     'overrides': new_overrides
-                }
+                }}
                 
                 success = False
                 try:
-                    service.events().update(
+                    service.events().patch(
                         calendarId=calendar_id,
                         eventId=event_id,
-                        body=event
+                        body=patch_body,
+                        fields='id'
                     ).execute()
                     success = True
                 except Exception as e:
                     # FALLBACK TO ROBOT
                     if svc_sa and ("403" in str(e) or "404" in str(e)):
                         try:
-                            svc_sa.events().update(
+                            svc_sa.events().patch(
                                 calendarId=calendar_id,
                                 eventId=event_id,
-                                body=event
+                                body=patch_body,
+                                fields='id'
                             ).execute()
                             success = True
                         except: pass
@@ -1269,51 +1726,39 @@ def ensure_label(service, label_name):
     Handles hierarchy (e.g. 'Parent/Child').
     """
     try:
-        # List existing labels
-        results = service.users().labels().list(userId='me').execute()
-        labels = results.get('labels', [])
-        
-        # Check match
-        for l in labels:
-            if l['name'].lower() == label_name.lower():
-                return l['id']
-        
-        # Create if missing
-        label_object = {
-            'name': label_name,
-            'labelListVisibility': 'labelShow',
-            'messageListVisibility': 'show'
-        }
-        created = service.users().labels().create(userId='me', body=label_object).execute()
-        return created['id']
+        return _label_manager().label_id(service, label_name)
     except Exception as e:
-        # Often fails if parent doesn't exist? Gmail API usually handles slashes automatically for hierarchy
-        # But if error "Label name exists" or similar, just ignore
+        # Gmail creates 'Parent/Child' hierarchies from the slash automatically
         print(f"Label Error ({label_name}): {e}")
         return None
 
 def add_label_to_email(service, msg_id, label_id):
     """Adds a specific label to a message."""
-    try:
-        body = {
-            'addLabelIds': [label_id],
-            'removeLabelIds': []
-        }
-        service.users().messages().modify(userId='me', id=msg_id, body=body).execute()
-        return True
-    except Exception as e:
-        print(f"Error labeling email {msg_id}: {e}")
-        return False
+    return bool(apply_labels(service, {label_id: [msg_id]}))
+
+def apply_labels(service, groups, user_id='me'):
+    """Applies {label_id: [message IDs]} with one batchModify per label. Returns {label_id: count}."""
+    return _label_manager(user_id).apply(service, groups, user_id)
 
 # --- DEDUPLICATION HELPERS ---
 
-def deduplicate_calendar_events(service, calendar_id, start_date=None, end_date=None):
+def deduplicate_calendar_events(service, calendar_id, start_date=None, end_date=None, dry_run=False,
+                                threshold=None, max_shift_hours=None, clusters=None):
     """
-    Removes duplicate events based on (summary, start_time).
-    Respects the provided date range (default: last 30 days).
+    Finds near-duplicate events (MinHash/LSH over title + description, time-bucket blocking)
+    within the date range (default: last 30 days to next 365).
+
+    dry_run=True returns the cluster report ([{'survivor', 'duplicates', 'similarity', 'via'}]) without
+    deleting; 'via' records which credentials listed the events ('user' or 'service_account').
+    Otherwise deletes every non-survivor and returns the deleted count; pass the reviewed (and
+    user-filtered) `clusters` to delete exactly those duplicates without re-scanning, through the
+    same credentials that listed them.
     """
+    from modules.event_dedup import find_duplicate_clusters, DEFAULT_THRESHOLD, DEFAULT_MAX_SHIFT_HOURS
     try:
         import datetime as dt
+        if clusters is not None and not dry_run:
+            return _delete_duplicate_clusters(service, calendar_id, clusters)
         
         # Default window: Last 30 days to Next 365 days if no range provided
         if not start_date:
@@ -1323,60 +1768,71 @@ def deduplicate_calendar_events(service, calendar_id, start_date=None, end_date=
             
         t_min = dt.datetime.combine(start_date, dt.time.min).isoformat() + 'Z'
         t_max = dt.datetime.combine(end_date, dt.time.max).isoformat() + 'Z'
-        
+
+        def _list_all(svc):
+            items, page_token = [], None
+            while True:
+                res = svc.events().list(
+                    calendarId=calendar_id,
+                    timeMin=t_min,
+                    timeMax=t_max,
+                    singleEvents=True,
+                    maxResults=2500,
+                    pageToken=page_token,
+                    fields=list_fields('dedup_events')
+                ).execute()
+                items.extend(watch_fields(res.get('items', []), 'dedup_events'))
+                page_token = res.get('nextPageToken')
+                if not page_token:
+                    return items
+        
+        via = 'user'
         try:
-            events_result = service.events().list(
-                calendarId=calendar_id, 
-                timeMin=t_min, 
-                timeMax=t_max, 
-                singleEvents=True, 
-                orderBy='startTime',
-                maxResults=2500 # Reasonable limit
-            ).execute()
+            events = _list_all(service)
         except Exception as e:
             # Fallback to Service Account if 404
             err_str = str(e)
             if "404" in err_str or "Not Found" in err_str or "403" in err_str:
-                 from modules.google_services import get_calendar_service # Local import to avoid circular
                  svc_sa = get_calendar_service(force_service_account=True)
                  if svc_sa:
-                     events_result = svc_sa.events().list(
-                        calendarId=calendar_id, 
-                        timeMin=t_min, 
-                        timeMax=t_max, 
-                        singleEvents=True, 
-                        orderBy='startTime',
-                        maxResults=2500
-                    ).execute()
+                     events = _list_all(svc_sa)
+                     service, via = svc_sa, 'service_account'
                  else: raise e
             else: raise e
         
-        events = events_result.get('items', [])
-        deleted_count = 0
-        
-        # Group by hash key: (summary_lower, start_time)
-        seen = {}
-        for ev in events:
-            summary = ev.get('summary', '').strip().lower()
-            start = ev.get('start', {}).get('dateTime') or ev.get('start', {}).get('date')
-            
-            if not summary or not start: continue
-            
-            key = (summary, start)
-            
-            if key in seen:
-                # Duplicate found! Delete this one.
-                try:
-                    service.events().delete(calendarId=calendar_id, eventId=ev['id']).execute()
-                    deleted_count += 1
-                except: pass
-            else:
-                seen[key] = True
-                
-        return deleted_count
+        clusters = find_duplicate_clusters(
+            events,
+            threshold=threshold or DEFAULT_THRESHOLD,
+            max_shift_hours=max_shift_hours if max_shift_hours is not None else DEFAULT_MAX_SHIFT_HOURS
+        )
+        for cluster in clusters:
+            cluster['via'] = via
+        if dry_run:
+            return clusters
+        return _delete_duplicate_clusters(service, calendar_id, clusters)
     except Exception as e:
         st.error(f"Error deduplicating events: {e}")
-        return 0
+        return [] if dry_run else 0
+
+def _delete_duplicate_clusters(service, calendar_id, clusters):
+    """Deletes every non-survivor of the given clusters, with the credentials that listed them. Returns the deleted count."""
+    deleted_count = 0
+    sa_service = None
+    for cluster in clusters:
+        svc = service
+        if cluster.get('via') == 'service_account':
+            sa_service = sa_service or get_calendar_service(force_service_account=True)
+            svc = sa_service
+        if svc is None:
+            continue
+        for ev in cluster['duplicates']:
+            try:
+                svc.events().delete(calendarId=calendar_id, eventId=ev['id']).execute()
+                deleted_count += 1
+                # Rate limit safety
+                if deleted_count % 10 == 0: time.sleep(0.5)
+            except: pass
+    return deleted_count
 
 def deduplicate_tasks(service):
     """
@@ -1388,7 +1844,8 @@ def deduplicate_tasks(service):
         
         for tl in tasklists:
             # Get all tasks for this list
-            results = service.tasks().list(tasklist=tl['id'], showCompleted=False, maxResults=100).execute()
+            results = service.tasks().list(tasklist=tl['id'], showCompleted=False, maxResults=100,
+                                           fields=list_fields('task_dedup')).execute()
             tasks = results.get('items', [])
             
             seen = {}
@@ -1409,6 +1866,8 @@ def deduplicate_tasks(service):
                 else:
                     seen[key] = True
                     
+        if deleted_count:
+            _mark_tasks_stale()
         return deleted_count
     except Exception as e:
         st.error(f"Error deduplicating tasks: {e}")
@@ -1423,18 +1882,7 @@ def create_meeting_minutes_doc(title, data, raw_transcription=None):
     Creates a Google Doc with a Professional Corporate Format (Tables + Styling).
     Optionally appends raw transcription at the end as an annex.
     """
-    if isinstance(data, str):
-        try:
-            import json
-            data = json.loads(data)
-        except Exception:
-            data = {"asunto": "Acta AI", "desarrollo": data}
-
-    if not isinstance(data, dict):
-        data = {"asunto": "Acta Generada", "desarrollo": str(data)}
-        
-    service = get_docs_service()
-    if not service: return None, "No Docs Service available"
+    data = acta_compiler.normalize_acta_data(data)
 
     # 1. Automatic Filename Generation (Smart Title)
     def _generate_smart_filename(subject, date_str):
@@ -1497,220 +1945,16 @@ def create_meeting_minutes_doc(title, data, raw_transcription=None):
     try:
         doc = service.documents().create(body={'title': title}).execute()
         doc_id = doc.get('documentId')
-        requests = []
-        index = 1
-
-        # --- HELPER: INSERT WITH STYLE (ROBUST CHUNKING) ---
-        def insert_styled(text, font_size=11, bold=False, align='START', color=None, bg_color=None, tab_stops=None, border_bottom=False):
-            nonlocal index
-            if text is None: text = ""
-            if not isinstance(text, str):
-                text = str(text)
-            
-            # Use smaller chunks for extreme safety (10k chars)
-            CHUNK_SIZE_LIMIT = 10000
-            text_lines = text.split('\n')
-            
-            for line_idx, raw_line in enumerate(text_lines):
-                # Ensure each line is managed (it might be empty)
-                line = raw_line or " "
-                
-                # Split extremely long lines if they exist
-                line_chunks = [line[i:i+CHUNK_SIZE_LIMIT] for i in range(0, len(line), CHUNK_SIZE_LIMIT)]
-                
-                for chunk_idx, chunk in enumerate(line_chunks):
-                    # Only add newline if it was originally there or it's the end of our artificial split
-                    is_last_chunk_of_line = (chunk_idx == len(line_chunks) - 1)
-                    is_last_line = (line_idx == len(text_lines) - 1)
-                    
-                    # We add a newline for EVERY original line except maybe the very last one? 
-                    # Google Docs insertText at index 1 usually wants a newline to handle paragraph styles properly.
-                    current_text = chunk
-                    if is_last_chunk_of_line and not is_last_line:
-                        current_text += "\n"
-                    elif is_last_chunk_of_line and is_last_line:
-                        current_text += "\n" # Add terminal newline
-                    
-                    curr_len = len(current_text)
-                    requests.append({
-                        'insertText': {'location': {'index': index}, 'text': current_text}
-                    })
-                    
-                    # Apply Character Styles
-                    text_style = {'fontSize': {'magnitude': font_size, 'unit': 'PT'}, 'bold': bold}
-                    fields = 'fontSize,bold'
-                    if color:
-                        text_style['foregroundColor'] = {'color': {'rgbColor': color}}
-                        fields += ',foregroundColor'
-                    if bg_color:
-                        text_style['backgroundColor'] = {'color': {'rgbColor': bg_color}}
-                        fields += ',backgroundColor'
-
-                    requests.append({
-                        'updateTextStyle': {
-                            'range': {'startIndex': index, 'endIndex': index + len(chunk)},
-                            'textStyle': text_style,
-                            'fields': fields
-                        }
-                    })
-
-                    # Apply Paragraph Styles (only if we have a newline or it's the end of a line)
-                    if "\n" in current_text:
-                        p_style = {'alignment': align}
-                        p_fields = 'alignment'
-                        if border_bottom:
-                            # Borders are expensive in batch, only add if requested
-                            p_style['borderBottom'] = {
-                                'width': {'magnitude': 1.0, 'unit': 'PT'}, 
-                                'padding': {'magnitude': 1.0, 'unit': 'PT'},
-                                'dashStyle': 'SOLID', 
-                                'color': {'color': {'rgbColor': NAVY}}
-                            }
-                            p_fields += ',borderBottom'
-                        
-                        requests.append({
-                            'updateParagraphStyle': {
-                                'range': {'startIndex': index, 'endIndex': index + curr_len},
-                                'paragraphStyle': p_style,
-                                'fields': p_fields
-                            }
-                        })
-
-                    index += curr_len
-
-        # COLORS
-        NAVY = {'red': 0.0, 'green': 0.2, 'blue': 0.4} 
-        CYAN_PALE = {'red': 0.88, 'green': 0.97, 'blue': 1.0} 
-        GRAY_TEXT = {'red': 0.4, 'green': 0.4, 'blue': 0.4}
-
-        # --- CONTENT GENERATION ---
-        insert_styled("ACTA DE REUNIÓN", font_size=20, bold=True, align='CENTER', color=NAVY)
-        insert_styled(f"{data.get('asunto', 'Comité / Reunión General')}", font_size=14, bold=False, align='CENTER', color=GRAY_TEXT)
-        insert_styled(" ", font_size=6) 
-
-        # 2. INFO BAR (Styled Box)
-        # Using tabs to separate label/value
-        meta_tabs = [{'offset': {'magnitude': 100, 'unit': 'PT'}, 'alignment': 'START'}, 
-                     {'offset': {'magnitude': 300, 'unit': 'PT'}, 'alignment': 'START'}]
-        
-        insert_styled(f"FECHA:\t{data.get('fecha', '')}", font_size=10, tab_stops=meta_tabs, border_bottom=True)
-        insert_styled(f"HORA:\t{data.get('hora_inicio')} - {data.get('hora_termino')}", font_size=10, tab_stops=meta_tabs, border_bottom=True)
-        insert_styled(f"LUGAR:\t{data.get('lugar', 'No especificado')}", font_size=10, tab_stops=meta_tabs, border_bottom=True)
-        insert_styled(" ", font_size=10)
-
-        # 3. SECTIONS
-        def section_title(text):
-            insert_styled(text.upper(), font_size=12, bold=True, color=NAVY, border_bottom=True)
-
-        # ASISTENTES
-        section_title("1. Asistentes")
-        for p in data.get('asistentes', []):
-            insert_styled(f"• {p}", font_size=10)
-        insert_styled(" ", font_size=10)
-
-        # PUNTOS A TRATAR (Previously Orden del Día)
-        section_title("2. Puntos a Tratar")
-        for i, p in enumerate(data.get('tabla_puntos', [])):
-             insert_styled(f"{i+1}. {p}", font_size=10)
-        insert_styled(" ", font_size=10)
-
-        # DESARROLLO
-        section_title("3. Desarrollo")
-        desc = data.get('desarrollo', 'Sin desarrollo registrado.')
-        
-        # If development is a list/dict (AI being too organized), convert to professional string
-        if isinstance(desc, list):
-            desc = "\n\n".join([str(item) for item in desc])
-        elif isinstance(desc, dict):
-            new_desc = ""
-            for key, val in desc.items():
-                new_desc += f"{key.upper()}:\n{val}\n\n"
-            desc = new_desc.strip()
-            
-        insert_styled(desc, font_size=10, align='JUSTIFIED')
-        insert_styled(" ", font_size=10)
 
-        # ACUERDOS (The Professional "Table")
-        section_title("4. Acuerdos y Compromisos")
-        
-        # Tabs for "Table": [Desc (0), Resp (250), Plazo (400)]
-        table_tabs = [
-            {'offset': {'magnitude': 260, 'unit': 'PT'}, 'alignment': 'START'}, # Responsable Start
-            {'offset': {'magnitude': 420, 'unit': 'PT'}, 'alignment': 'START'}  # Plazo Start
-        ]
-
-        # Header Row
-        header_text = f"DESCRIPCIÓN\tRESPONSABLE\tPLAZO"
-        insert_styled(header_text, font_size=9, bold=True, bg_color=CYAN_PALE, tab_stops=table_tabs)
-
-        acuerdos = data.get('acuerdos', [])
-        if acuerdos:
-            for ac in acuerdos:
-                if isinstance(ac, str):
-                    d = ac.replace('\t', ' ')
-                    r, p = '(-)', '(-)'
-                elif isinstance(ac, dict):
-                    d = str(ac.get('descripcion', '(-)')).replace('\t', ' ')
-                    r = str(ac.get('responsable', '(-)')).replace('\t', ' ')
-                    p = str(ac.get('plazo', '(-)')).replace('\t', ' ')
-                else:
-                    d, r, p = str(ac), '(-)', '(-)'
-                
-                # Truncate if too long? No, Docs wraps. But tabs might drift if wrap happens text-wise?
-                # Docs tabs usually handle wrap within the tab stop if hanging indent is set, but that's complex.
-                # Simple approach: content
-                line = f"{d}\t{r}\t{p}"
-                insert_styled(line, font_size=9, tab_stops=table_tabs, border_bottom=True)
-        else:
-            insert_styled("No hay acuerdos registrados.", font_size=10, align='CENTER')
-
-        # --- ANEXO: TRANSCRIPCIÓN COMPLETA (if provided) ---
-        if raw_transcription and raw_transcription.strip():
-            insert_styled("\n\n\n", font_size=10)  # Page break effect
-            section_title("ANEXO: TRANSCRIPCIÓN COMPLETA")
-            insert_styled("El siguiente texto corresponde a la transcripción literal del audio de la reunión, sin procesar:", font_size=9, color=GRAY_TEXT)
-            insert_styled(" ", font_size=6)
-            
-            # Split transcription into chunks to avoid API issues with very long text
-            # Google Docs API can handle long text, but we format it nicely
-            transcription_text = raw_transcription.strip()
-            
-            # Insert transcription with slightly smaller font and justified alignment
-            insert_styled(transcription_text, font_size=9, align='JUSTIFIED')
-            insert_styled(" ", font_size=10)
-            insert_styled("--- Fin de la Transcripción ---", font_size=9, align='CENTER', color=GRAY_TEXT)
+        # --- SINGLE-PASS COMPILATION (merged runs + ranged styles + bulk tables) ---
+        blocks = acta_compiler.build_acta_blocks(data, raw_transcription)
+        requests = acta_compiler.compile_docs_requests(blocks)
+        batches = acta_compiler.split_request_batches(requests)
 
-        # SIGNATURES
-        insert_styled("\n\n\n\n", font_size=10)
-        
-        # Signature lines and labels
-        sig_line = "__________________________          __________________________"
-        sig_text = "ENCARGADO DE ACTA                    V°B° JEFATURA"
-        insert_styled(sig_line, align='CENTER', font_size=10)
-        insert_styled(sig_text, align='CENTER', font_size=9, bold=True)
-
-        # --- BATCH EXECUTION (SPLIT TO AVOID PAYLOAD LIMITS + RETRY LOGIC) ---
-        # Execute in chunks of 25 requests to avoid SSL/Timeout issues with massive docs
-        CHUNK_SIZE = 25
-        import time
-        
-        for i in range(0, len(requests), CHUNK_SIZE):
-            chunk = requests[i:i + CHUNK_SIZE]
-            
-            # Retry mechanism for each batch chunk
-            last_error = None
-            for attempt in range(3):
-                try:
-                    service.documents().batchUpdate(documentId=doc_id, body={'requests': chunk}).execute()
-                    break # Success
-                except Exception as batch_err:
-                    last_error = batch_err
-                    time.sleep(1) # Wait a bit before retry
-                    continue
-            else:
-                # If we exhausted retries for a chunk
-                print(f"Failed to execute batch chunk at offset {i} after 3 attempts: {last_error}")
-                # We continue to try next chunks so user gets at least part of the doc
+        ok, err = _execute_docs_batches(service, doc_id, batches, doc.get('revisionId'))
+        if not ok:
+            # Later batches depend on earlier indexes, so we stop; user still gets the partial doc
+            print(f"Docs batchUpdate stopped: {err}")
 
         return f"https://docs.google.com/document/d/{doc_id}/edit", None
 
@@ -1718,6 +1962,38 @@ def create_meeting_minutes_doc(title, data, raw_transcription=None):
         print(f"Error creating Doc: {e}")
         return None, str(e)
 
+def _execute_docs_batches(service, doc_id, batches, revision_id=None, retries=3):
+    """
+    Sends compiled batches in order. Each batch is pinned to the expected revision
+    (writeControl), so a retry after a lost response can never apply the same edits twice.
+    Returns (ok, error_message).
+    """
+    for b_idx, batch in enumerate(batches):
+        body = {'requests': batch}
+        for attempt in range(retries):
+            if revision_id:
+                body['writeControl'] = {'requiredRevisionId': revision_id}
+            try:
+                res = service.documents().batchUpdate(documentId=doc_id, body=body).execute()
+                revision_id = res.get('writeControl', {}).get('requiredRevisionId', revision_id)
+                break
+            except Exception as batch_err:
+                # Did the previous attempt land anyway (timeout after commit)? Then the revision moved.
+                if revision_id:
+                    try:
+                        current = service.documents().get(documentId=doc_id, fields='revisionId').execute()
+                        if current.get('revisionId') and current.get('revisionId') != revision_id:
+                            revision_id = current.get('revisionId')
+                            break
+                    except Exception:
+                        pass
+
+                if attempt < retries - 1:
+                    time.sleep(2 ** attempt)
+                    continue
+                return False, f"Batch {b_idx + 1}/{len(batches)}: {batch_err}"
+    return True, None
+
 # --- VOICE ANALYST EXECUTION ---
 
 def execute_voice_action(action_data):
@@ -1911,6 +2187,7 @@ def create_gmail_label(service, label_name, user_id='me'):
             userId=user_id,
             body=label
         ).execute()
+        _label_manager(user_id).invalidate()
         
         return result
     except Exception as e:
@@ -1918,7 +2195,7 @@ def create_gmail_label(service, label_name, user_id='me'):
         if '409' in str(e) or 'already exists' in str(e).lower():
             # Try to get existing label
             try:
-                labels_result = service.users().labels().list(userId=user_id).execute()
+                labels_result = service.users().labels().list(userId=user_id, fields=f"labels({get_fields('labels')})").execute()
                 labels = labels_result.get('labels', [])
                 for lbl in labels:
                     if lbl['name'] == label_name:
@@ -1973,25 +2250,7 @@ def setup_ai_labels(service, user_id='me'):
     }
     
     try:
-        # Get existing labels
-        labels_result = service.users().labels().list(userId=user_id).execute()
-        labels = labels_result.get('labels', [])
-        
-        for label_name in ai_labels.keys():
-            # Check if label exists
-            found = False
-            for lbl in labels:
-                if lbl['name'] == label_name:
-                    ai_labels[label_name] = lbl['id']
-                    found = True
-                    break
-            
-            # Create if missing
-            if not found:
-                new_label = create_gmail_label(service, label_name, user_id)
-                if new_label:
-                    ai_labels[label_name] = new_label['id']
-        
+        ai_labels.update(_label_manager(user_id).ensure_labels(service, list(ai_labels), user_id))
         return ai_labels
     except Exception as e:
         st.error(f"Error configurando etiquetas IA: {e}")
@@ -0,0 +1,209 @@
+import re
+import datetime
+from zoneinfo import ZoneInfo
+
+# --- CONSTANTS ---
+LOCAL_TZ = "America/Santiago"
+ICS_MIME_TYPES = ('text/calendar', 'application/ics', 'application/x-ics', 'text/x-vcalendar')
+
+# Outlook/Exchange invites use Windows zone names in TZID
+WINDOWS_TZ = {
+    'pacific sa standard time': 'America/Santiago',
+    'sa pacific standard time': 'America/Bogota',
+    'sa western standard time': 'America/La_Paz',
+    'argentina standard time': 'America/Argentina/Buenos_Aires',
+    'e. south america standard time': 'America/Sao_Paulo',
+    'eastern standard time': 'America/New_York',
+    'central standard time': 'America/Chicago',
+    'pacific standard time': 'America/Los_Angeles',
+    'gmt standard time': 'Europe/London',
+    'romance standard time': 'Europe/Paris',
+    'w. europe standard time': 'Europe/Berlin',
+    'utc': 'UTC',
+}
+
+# --- LOW LEVEL ---
+
+def _unfold(text):
+    """RFC 5545 line unfolding: a CRLF followed by a space/tab continues the previous line."""
+    return re.sub(r'\r?\n[ \t]', '', text).splitlines()
+
+def _unescape(value):
+    return (value.replace('\\n', '\n').replace('\\N', '\n')
+                 .replace('\\,', ',').replace('\\;', ';').replace('\\\\', '\\'))
+
+def _split_line(line):
+    """'DTSTART;TZID=X:2026...' -> ('DTSTART', {'TZID': 'X'}, '2026...'). Quoted params may contain ':'."""
+    in_quotes = False
+    for i, ch in enumerate(line):
+        if ch == '"':
+            in_quotes = not in_quotes
+        elif ch == ':' and not in_quotes:
+            head, value = line[:i], line[i + 1:]
+            break
+    else:
+        return None, {}, None
+    name, *params = head.split(';')
+    param_map = {}
+    for p in params:
+        if '=' in p:
+            k, v = p.split('=', 1)
+            param_map[k.upper()] = v.strip('"')
+    return name.upper(), param_map, value
+
+def _zone(tzid):
+    if not tzid:
+        return None
+    tzid = tzid.strip().strip('/')
+    try:
+        return ZoneInfo(WINDOWS_TZ.get(tzid.lower(), tzid))
+    except Exception:
+        return None
+
+def _parse_dt(value, params):
+    """Returns (local naive ISO string, is_all_day). Times are converted to LOCAL_TZ."""
+    value = value.strip()
+    if params.get('VALUE') == 'DATE' or re.fullmatch(r'\d{8}', value):
+        return datetime.datetime.strptime(value[:8], '%Y%m%d').date().isoformat(), True
+    is_utc = value.endswith('Z')
+    dt = datetime.datetime.strptime(value.rstrip('Z')[:15], '%Y%m%dT%H%M%S')
+    zone = ZoneInfo('UTC') if is_utc else _zone(params.get('TZID'))
+    if zone is not None:
+        dt = dt.replace(tzinfo=zone).astimezone(ZoneInfo(LOCAL_TZ)).replace(tzinfo=None)
+    return dt.strftime('%Y-%m-%dT%H:%M:%S'), False
+
+def _parse_duration(value):
+    """ISO 8601 duration (P1DT2H30M, PT45M, P1W) -> timedelta."""
+    m = re.fullmatch(r'([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?', value.strip())
+    if not m:
+        return None
+    sign, w, d, h, mi, s = m.groups()
+    delta = datetime.timedelta(weeks=int(w or 0), days=int(d or 0), hours=int(h or 0), minutes=int(mi or 0), seconds=int(s or 0))
+    return -delta if sign == '-' else delta
+
+# --- PUBLIC API ---
+
+def parse_ics(text):
+    """
+    Parses an iCalendar payload into VEVENT dicts:
+    {'uid', 'recurrence_id', 'summary', 'description', 'location', 'organizer', 'start_time', 'end_time',
+     'all_day', 'recurrence' (RRULE/RDATE/EXDATE lines for the Calendar API), 'status', 'method', 'sequence'}.
+    """
+    if not text:
+        return []
+    events, current, method = [], None, None
+    depth_other = 0  # Skip nested components (VALARM, VTIMEZONE...)
+    for line in _unfold(text):
+        if not line.strip():
+            continue
+        name, params, value = _split_line(line)
+        if name is None:
+            continue
+        if name == 'METHOD':
+            method = value.strip().upper()
+        elif name == 'BEGIN':
+            if value.strip().upper() == 'VEVENT' and current is None:
+                current = {'recurrence': [], '_params': {}}
+            elif current is not None:
+                depth_other += 1
+        elif name == 'END':
+            if value.strip().upper() == 'VEVENT' and current is not None and depth_other == 0:
+                events.append(_finish_event(current, method))
+                current = None
+            elif current is not None and depth_other:
+                depth_other -= 1
+        elif current is not None and depth_other == 0:
+            if name in ('RRULE', 'RDATE', 'EXDATE'):
+                tz = _zone(params.get('TZID'))
+                # Windows/unknown zone names are not valid in the Calendar API: re-express with the IANA name
+                head = name if not params.get('TZID') else (f"{name};TZID={tz.key}" if tz else None)
+                if head:
+                    current['recurrence'].append(f"{head}:{value.strip()}")
+            else:
+                current[name] = value
+                current['_params'][name] = params
+    return [e for e in events if e]
+
+def _finish_event(raw, method):
+    if 'DTSTART' not in raw:
+        return None
+    try:
+        start, all_day = _parse_dt(raw['DTSTART'], raw['_params'].get('DTSTART', {}))
+        if 'DTEND' in raw:
+            end, _ = _parse_dt(raw['DTEND'], raw['_params'].get('DTEND', {}))
+        elif 'DURATION' in raw and _parse_duration(raw['DURATION']) is not None:
+            delta = _parse_duration(raw['DURATION'])
+            if all_day:
+                end = (datetime.date.fromisoformat(start) + delta).isoformat()
+            else:
+                end = (datetime.datetime.fromisoformat(start) + delta).strftime('%Y-%m-%dT%H:%M:%S')
+        else:
+            end = start
+    except ValueError:
+        return None
+    organizer = raw.get('ORGANIZER', '')
+    return {
+        'uid': raw.get('UID', '').strip(),
+        'recurrence_id': raw.get('RECURRENCE-ID', '').strip(),
+        'summary': _unescape(raw.get('SUMMARY', '')).strip() or 'Invitación',
+        'description': _unescape(raw.get('DESCRIPTION', '')).strip(),
+        'location': _unescape(raw.get('LOCATION', '')).strip(),
+        'organizer': organizer.split(':', 1)[-1] if organizer.lower().startswith('mailto:') else organizer,
+        'start_time': start,
+        'end_time': end,
+        'all_day': all_day,
+        'recurrence': raw['recurrence'],
+        'status': raw.get('STATUS', 'CONFIRMED').strip().upper(),
+        'method': method or 'PUBLISH',
+        'sequence': int(raw.get('SEQUENCE', '0') or 0),
+    }
+
+def unique_vevents(vevents):
+    """
+    One VEVENT per (UID, RECURRENCE-ID, DTSTART), keeping the highest SEQUENCE: Google and Outlook
+    send the same VCALENDAR inline (text/calendar) and as invite.ics.
+    """
+    best = {}
+    for ev in vevents:
+        if ev['uid']:
+            key = (ev['uid'], ev['recurrence_id'], ev['start_time'])
+        else:
+            key = ('', ev['summary'], ev['start_time'], ev['end_time'])
+        if key not in best or ev['sequence'] > best[key]['sequence']:
+            best[key] = ev
+    return list(best.values())
+
+def is_ics_part(part):
+    """True for text/calendar-like MIME parts or .ics attachments."""
+    mime = (part.get('mimeType') or '').lower()
+    return mime in ICS_MIME_TYPES or (part.get('filename') or '').lower().endswith('.ics')
+
+def ics_to_candidates(vevents, email):
+    """Maps parsed VEVENTs to the same item shape analyze_emails_ai returns, tagged source='ics'."""
+    items = []
+    for ev in vevents:
+        if ev['method'] == 'CANCEL' or ev['status'] == 'CANCELLED':
+            continue
+        desc_parts = [ev['description']]
+        if ev['location']:
+            desc_parts.append(f"📍 Lugar: {ev['location']}")
+        if ev['organizer']:
+            desc_parts.append(f"👤 Organiza: {ev['organizer']}")
+        desc_parts.append(f"✉️ Invitación recibida: {email.get('subject', '')}")
+        item = {
+            'id': email['id'],
+            'threadId': email.get('threadId', email['id']),
+            'type': 'event',
+            'summary': ev['summary'],
+            'description': "\n".join(p for p in desc_parts if p),
+            'start_time': ev['start_time'],
+            'end_time': ev['end_time'],
+            'category': 'Reunión',
+            'urgency': 'Media',
+            'colorId': '11',
+            'source': 'ics',
+        }
+        if ev['recurrence']:
+            item['recurrence'] = ev['recurrence']
+        items.append(item)
+    return items
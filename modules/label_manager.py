@@ -0,0 +1,128 @@
+from modules.field_profiles import get_fields
+
+# --- CONSTANTS ---
+BATCH_MODIFY_MAX = 1000   # users.messages.batchModify accepts up to 1000 IDs per call
+NEW_LABEL_BODY = {'labelListVisibility': 'labelShow', 'messageListVisibility': 'show'}
+
+def _status(error):
+    return getattr(getattr(error, 'resp', None), 'status', None)
+
+def batch_modify(service, msg_ids, add_ids=None, remove_ids=None, user_id='me', http=None):
+    """
+    Applies the same label change to many messages with batchModify, in chunks of 1000.
+    Duplicate IDs are sent once. `http` executes on a separate connection (worker threads).
+    Returns the number of API calls made.
+    """
+    ids = list(dict.fromkeys(m for m in msg_ids if m))
+    calls = 0
+    for i in range(0, len(ids), BATCH_MODIFY_MAX):
+        body = {'ids': ids[i:i + BATCH_MODIFY_MAX]}
+        if add_ids:
+            body['addLabelIds'] = list(add_ids)
+        if remove_ids:
+            body['removeLabelIds'] = list(remove_ids)
+        request = service.users().messages().batchModify(userId=user_id, body=body)
+        if http is not None:
+            request.execute(http=http)
+        else:
+            request.execute()
+        calls += 1
+    return calls
+
+class LabelManager:
+    """Label name -> ID cache for one Gmail account, plus grouped label application."""
+
+    def __init__(self, account):
+        self.account = account
+        self._ids = None   # lowercase name -> id; None until the first labels().list
+        self.calls = 0     # API calls issued through this manager
+        self.on_change = None  # Called with the name -> id map after a list/create (disk cache)
+
+    def invalidate(self):
+        """Drops the cache (labels renamed/deleted outside the app). Next lookup re-lists."""
+        self._ids = None
+
+    def _load(self, service, user_id):
+        labels = service.users().labels().list(userId=user_id, fields=f"labels({get_fields('labels')})").execute().get('labels', [])
+        self.calls += 1
+        self._ids = {l['name'].lower(): l['id'] for l in labels}
+        self._changed()
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change(dict(self._ids))
+
+    def restore(self, ids):
+        """Warm start from a persisted map. Stale entries self-heal: a 409 on create re-lists, a rejected ID invalidates."""
+        if self._ids is None:
+            self._ids = dict(ids)
+
+    def label_id(self, service, name, user_id='me', create=True):
+        """ID of label `name` (case-insensitive), creating it if missing. None if absent and create=False."""
+        if self._ids is None:
+            self._load(service, user_id)
+        key = name.lower()
+        if key in self._ids or not create:
+            return self._ids.get(key)
+        try:
+            created = service.users().labels().create(userId=user_id, body=dict(NEW_LABEL_BODY, name=name)).execute()
+            self.calls += 1
+        except Exception as e:
+            # Created meanwhile (another session/device): the cache is stale
+            if _status(e) == 409 or 'already exists' in str(e).lower():
+                self._load(service, user_id)
+                return self._ids.get(key)
+            raise
+        self._ids[key] = created['id']
+        self._changed()
+        return created['id']
+
+    def ensure_labels(self, service, names, user_id='me'):
+        """{name: id} for every name (created when missing); one list call at most while cached."""
+        ids = {}
+        for name in names:
+            lid = self.label_id(service, name, user_id)
+            if lid:
+                ids[name] = lid
+        return ids
+
+    def apply(self, service, groups, user_id='me'):
+        """
+        Applies grouped labels: groups maps label_id -> message IDs. One batchModify per label
+        (per 1000 messages). A rejected label invalidates the cache and is skipped.
+
+        Returns:
+            dict: label_id -> number of messages labeled
+        """
+        applied = {}
+        for label_id, msg_ids in groups.items():
+            msg_ids = list(dict.fromkeys(m for m in msg_ids if m))
+            if not label_id or not msg_ids:
+                continue
+            try:
+                self.calls += batch_modify(service, msg_ids, add_ids=[label_id], user_id=user_id)
+                applied[label_id] = len(msg_ids)
+            except Exception as e:
+                if _status(e) in (400, 404):
+                    self.invalidate()
+                print(f"Error applying label {label_id}: {e}")
+        return applied
+
+_MANAGERS = {}
+
+def get_label_manager(account):
+    """
+    Shared manager per account, so the label cache survives across reruns. Label IDs are only
+    valid for one mailbox: without a known account (None/'') a fresh, unshared manager is returned.
+    """
+    if not account:
+        return LabelManager(None)
+    if account not in _MANAGERS:
+        _MANAGERS[account] = LabelManager(account)
+    return _MANAGERS[account]
+
+def invalidate_label_cache(account=None):
+    """Invalidates one account's cache, or every account's when account is None."""
+    for key, manager in _MANAGERS.items():
+        if account is None or key == account:
+            manager.invalidate()
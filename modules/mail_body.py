@@ -0,0 +1,197 @@
+import re
+import base64
+
+import lxml.html
+from lxml import etree
+
+# --- CONSTANTS ---
+DEFAULT_MAX_CHARS = 800
+
+# Elements that never carry message text
+DROP_TAGS = ('script', 'style', 'head', 'title', 'noscript', 'template')
+# Block elements: a line break after each keeps paragraphs/list items apart
+BLOCK_TAGS = {'p', 'div', 'br', 'tr', 'li', 'ul', 'ol', 'table', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'hr', 'section', 'article'}
+# Quoted history / signature containers used by Gmail, Outlook, Apple Mail and Thunderbird
+QUOTE_XPATH = (
+    "//blockquote | //*[contains(concat(' ', normalize-space(@class), ' '), ' gmail_quote ')]"
+    " | //*[contains(concat(' ', normalize-space(@class), ' '), ' gmail_signature ')]"
+    " | //*[@id='Signature'] | //*[contains(@class, 'moz-signature')]"
+)
+# Outlook/Thunderbird reply headers: the quoted history follows as siblings, so cut from here on
+CUT_XPATH = "//*[@id='appendonsend'] | //*[@id='divRplyFwdMsg'] | //*[contains(@class, 'moz-cite-prefix')]"
+
+# A line that starts quoted history: everything from here on is dropped
+REPLY_MARKERS = re.compile(
+    r'^(?:'
+    r'(?:el|on)\s.{0,200}(?:escribi[oó]|wrote)\s*:?\s*$'
+    r'|-{2,}\s*(?:original message|mensaje original)\s*-{2,}'
+    r'|_{10,}'
+    r'|(?:de|from)\s*:.*\s(?:enviado|sent|fecha|date)\s*:'
+    r')',
+    re.IGNORECASE
+)
+OUTLOOK_HEADER_START = re.compile(r'^(?:de|from)\s*:\s*\S', re.IGNORECASE)
+OUTLOOK_HEADER_NEXT = re.compile(r'^(?:enviado|sent|fecha|date|para|to)\s*:', re.IGNORECASE)
+FORWARD_MARKER = re.compile(r'^-{2,}\s*(?:forwarded message|mensaje reenviado|reenviado)\s*-{2,}\s*$|^begin forwarded message:?$', re.IGNORECASE)
+HEADER_LINE = re.compile(r'^(?:de|from|fecha|date|enviado|sent|asunto|subject|para|to|cc|cco|bcc)\s*:', re.IGNORECASE)
+SIGNATURE_DELIM = re.compile(r'^(?:--|—|__)\s*$')
+MOBILE_SIGNATURE = re.compile(r'^(?:enviado desde mi|sent from my|obtener outlook para|get outlook for)\b', re.IGNORECASE)
+SIGN_OFF = re.compile(r'^(?:saludos(?: cordiales)?|atentamente|cordialmente|saluda atentamente|un abrazo|best regards|regards)[,.!]?\s*$', re.IGNORECASE)
+SIGNATURE_MAX_LINES = 6
+SIGNATURE_CONTACT = re.compile(r'https?://|www\.|\S+@\S+\.\w+|\+?\d[\d ()-]{6,}\d')
+SIGNATURE_MAX_WORDS = 6     # Name / role lines: short and not a sentence
+
+# --- DECODING ---
+
+def _part_charset(part):
+    for h in part.get('headers', []):
+        if h.get('name', '').lower() == 'content-type':
+            m = re.search(r'charset="?([\w.:-]+)"?', h.get('value', ''), re.IGNORECASE)
+            if m:
+                return m.group(1)
+    return None
+
+def decode_part(part):
+    """Decodes a Gmail API part body with its declared charset (utf-8, then latin-1 as fallbacks)."""
+    data = part.get('body', {}).get('data')
+    if not data:
+        return ""
+    raw = base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+    for charset in (_part_charset(part), 'utf-8'):
+        if not charset:
+            continue
+        try:
+            return raw.decode(charset)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    return raw.decode('latin-1', errors='replace')
+
+def _find_part(payload, mime_type):
+    """Depth-first search for the first part of a MIME type with inline data."""
+    stack = [payload]
+    while stack:
+        part = stack.pop(0)
+        if part.get('mimeType') == mime_type and part.get('body', {}).get('data') and not part.get('filename'):
+            return part
+        stack[0:0] = part.get('parts', [])
+    return None
+
+# --- CONVERSION ---
+
+def html_to_text(html):
+    """lxml-based HTML -> text: drops scripts/styles and quoted/signature containers, keeps block line breaks."""
+    if not html or not html.strip():
+        return ""
+    try:
+        root = lxml.html.fromstring(html)
+    except (etree.ParserError, ValueError):
+        return re.sub(r'<[^>]+>', ' ', html)
+    etree.strip_elements(root, *DROP_TAGS, etree.Comment, with_tail=False)
+    for el in root.xpath(CUT_XPATH):
+        parent = el.getparent()
+        if parent is None:
+            continue
+        for sibling in list(el.itersiblings()):
+            parent.remove(sibling)
+        el.tail = None
+        parent.remove(el)
+    for el in root.xpath(QUOTE_XPATH):
+        if el.getparent() is not None:
+            el.drop_tree()  # drop_tree keeps the tail text that follows the quote
+    for el in root.iter(*BLOCK_TAGS):
+        el.tail = "\n" + (el.tail or "")
+    return root.text_content()
+
+def _normalize_lines(text):
+    lines = [re.sub(r'[ \t ​]+', ' ', line).strip() for line in text.replace('\r', '').split('\n')]
+    out = []
+    for line in lines:
+        if line or (out and out[-1]):
+            out.append(line)
+    return out
+
+def _signature_line(line):
+    """Name, role, phone, e-mail or URL: contact data, or a few words that don't read as a sentence."""
+    if len(line) > 80:
+        return False
+    if SIGNATURE_CONTACT.search(line):
+        return True
+    return len(line.split()) <= SIGNATURE_MAX_WORDS and not line.rstrip().endswith(('.', '?', '!', ':'))
+
+def strip_quoted(lines):
+    """
+    Keeps only the new content: cuts at reply markers / Outlook header blocks, drops '>' lines,
+    removes forwarded-message header blocks (keeping the forwarded body) and trailing signatures.
+    """
+    out = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if FORWARD_MARKER.match(line):
+            # Skip the forwarded header block (De:/Fecha:/Asunto:/Para:), keep the forwarded text
+            i += 1
+            while i < len(lines) and (not lines[i] or HEADER_LINE.match(lines[i])):
+                i += 1
+            continue
+        if REPLY_MARKERS.match(line):
+            break
+        if OUTLOOK_HEADER_START.match(line) and i + 1 < len(lines) and OUTLOOK_HEADER_NEXT.match(lines[i + 1]):
+            break
+        if line.startswith('>'):
+            i += 1
+            continue
+        if SIGNATURE_DELIM.match(line) or MOBILE_SIGNATURE.match(line):
+            break
+        out.append(line)
+        i += 1
+
+    # Sign-off among the last lines, followed only by signature-like lines (name, role, phone, URL)
+    filled = [j for j, l in enumerate(out) if l]
+    for j in reversed(filled[-(SIGNATURE_MAX_LINES + 1):]):
+        if SIGN_OFF.match(out[j]):
+            if all(_signature_line(l) for l in out[j + 1:] if l):
+                out = out[:j]
+            break
+    while out and not out[-1]:
+        out.pop()
+    return out
+
+# --- PUBLIC API ---
+
+def extract_text(payload):
+    """Best text of a Gmail API payload (text/plain preferred, else text/html), quotes and signature removed."""
+    part = _find_part(payload, 'text/plain')
+    if part is not None:
+        text = decode_part(part)
+        # Some senders put HTML in text/plain
+        if re.search(r'<(?:html|body|div|p|br)\b', text[:500], re.IGNORECASE):
+            text = html_to_text(text)
+    else:
+        part = _find_part(payload, 'text/html')
+        if part is None:
+            return ""
+        text = html_to_text(decode_part(part))
+    return "\n".join(strip_quoted(_normalize_lines(text)))
+
+def _collapse(text, max_chars):
+    # Truncate AFTER stripping so the new content survives the cut
+    return re.sub(r'\s+', ' ', text).strip()[:max_chars]
+
+def extract_body(payload, max_chars=DEFAULT_MAX_CHARS):
+    """extract_text, whitespace-collapsed and truncated to max_chars."""
+    return _collapse(extract_text(payload), max_chars)
+
+def html_to_body(html, max_chars=DEFAULT_MAX_CHARS):
+    """Same as extract_body for a bare HTML string."""
+    return _collapse("\n".join(strip_quoted(_normalize_lines(html_to_text(html)))), max_chars)
+
+def payload_from_message(msg):
+    """Converts an email.message.Message into the Gmail API payload shape (for tests and benchmarks)."""
+    headers = [{'name': k, 'value': str(v)} for k, v in msg.items()]
+    node = {'mimeType': msg.get_content_type(), 'filename': msg.get_filename() or '', 'headers': headers, 'body': {}}
+    if msg.is_multipart():
+        node['parts'] = [payload_from_message(p) for p in msg.get_payload()]
+    else:
+        raw = msg.get_payload(decode=True) or b''
+        node['body'] = {'data': base64.urlsafe_b64encode(raw).decode('ascii'), 'size': len(raw)}
+    return node
@@ -0,0 +1,115 @@
+import re
+from email.utils import parseaddr
+
+from modules.event_classifier import fold_text
+
+# --- CONSTANTS ---
+# Headers requested in the metadata pass (format='metadata')
+TRIAGE_HEADERS = ['From', 'Subject', 'Date', 'List-Unsubscribe', 'List-Id', 'Precedence', 'Auto-Submitted', 'X-Auto-Response-Suppress']
+DEFAULT_THRESHOLD = 0.5
+TRIAGE_MAX_PAGES = 5       # List pages read past skipped/processed messages to fill max_results
+
+# Penalties (reason -> weight). The strongest one is reported as the skip reason.
+PENALTIES = {
+    'boletin': 0.35,          # List-Unsubscribe / List-Id
+    'masivo': 0.55,           # Precedence: bulk/list/junk
+    'no_reply': 0.35,         # no-reply / notifications senders
+    'automatico': 0.3,        # Auto-Submitted / auto responders
+    'promocional': 0.25,      # Subject looks like marketing
+    'categoria_gmail': 0.2,   # CATEGORY_UPDATES / CATEGORY_FORUMS
+    'historial_sin_accion': 0.35,  # Sender never produced events/tasks
+}
+
+REASON_LABELS = {
+    'boletin': "Boletines (List-Unsubscribe)",
+    'masivo': "Envíos masivos (Precedence: bulk)",
+    'no_reply': "Remitentes no-reply",
+    'automatico': "Respuestas automáticas",
+    'promocional': "Asunto promocional",
+    'categoria_gmail': "Categoría Notificaciones/Foros",
+    'historial_sin_accion': "Remitente sin acciones previas",
+}
+
+NOREPLY_SENDER = re.compile(r'(?:^|[._+-])(?:no-?reply|do-?not-?reply|noresponder|no-?responder|notifications?|notificaciones|mailer-daemon|bounce|newsletter|marketing)(?:[._+-]|@|$)')
+PROMO_SUBJECT = re.compile(r'(?<!\w)(?:oferta|ofertas|descuento|dcto|promo|promocion|cyber|black friday|newsletter|boletin|webinar|suscripcion|ultimas horas|gratis|% off|\d+ ?%)(?!\w)')
+SCHEDULING_HINT = re.compile(r'(?<!\w)(?:reunion|citacion|cita|invitacion|invitation|comite|consejo|agenda|plazo|vence|urgente|convocatoria|capacitacion|jornada|sesion|entrevista|audiencia)(?!\w)')
+
+# --- HELPERS ---
+
+def sender_address(from_header):
+    return parseaddr(from_header or '')[1].lower()
+
+def build_sender_history(history_mail):
+    """From history items ({'f': sender, 'a': 1 if actionable}) -> {sender: (seen, actionable)}."""
+    stats = {}
+    for item in history_mail or []:
+        addr = (item.get('f') or '').lower()
+        if not addr:
+            continue
+        seen, actionable = stats.get(addr, (0, 0))
+        stats[addr] = (seen + 1, actionable + (1 if item.get('a') else 0))
+    return stats
+
+def _headers(meta):
+    return {h['name'].lower(): h['value'] for h in meta.get('payload', {}).get('headers', [])}
+
+def score_email(meta, sender_history=None):
+    """
+    Local relevance score (0-1) from a format='metadata' message.
+
+    Returns:
+        tuple: (score, reasons) where reasons lists the penalties that applied, strongest first.
+    """
+    h = _headers(meta)
+    addr = sender_address(h.get('from'))
+    subject = fold_text(h.get('subject', ''))
+    snippet = fold_text(meta.get('snippet', ''))
+    labels = set(meta.get('labelIds', []))
+
+    reasons = []
+    if h.get('list-unsubscribe') or h.get('list-id'):
+        reasons.append('boletin')
+    if h.get('precedence', '').strip().lower() in ('bulk', 'list', 'junk'):
+        reasons.append('masivo')
+    if NOREPLY_SENDER.search(addr.split('@')[0] + '@'):
+        reasons.append('no_reply')
+    auto = h.get('auto-submitted', '').strip().lower()
+    if (auto and auto != 'no') or h.get('x-auto-response-suppress'):
+        reasons.append('automatico')
+    if PROMO_SUBJECT.search(subject):
+        reasons.append('promocional')
+    if labels & {'CATEGORY_UPDATES', 'CATEGORY_FORUMS'}:
+        reasons.append('categoria_gmail')
+
+    seen, actionable = (sender_history or {}).get(addr, (0, 0))
+    if seen >= 3 and actionable == 0:
+        reasons.append('historial_sin_accion')
+
+    score = 1.0 - sum(PENALTIES[r] for r in reasons)
+    if SCHEDULING_HINT.search(subject) or SCHEDULING_HINT.search(snippet):
+        score += 0.35
+    if seen >= 2 and actionable:
+        score += 0.3 * actionable / seen
+    if 'IMPORTANT' in labels or 'STARRED' in labels:
+        score += 0.2
+
+    reasons.sort(key=lambda r: PENALTIES[r], reverse=True)
+    return max(0.0, min(1.0, score)), reasons
+
+def triage_messages(metas, sender_history=None, threshold=DEFAULT_THRESHOLD):
+    """
+    Splits metadata messages into (keep, skipped_counts, skipped). skipped_counts maps the main
+    reason of each skipped message to its count; skipped holds {'id', 'subject', 'sender', 'score', 'reason'}.
+    """
+    keep, skipped, counts = [], [], {}
+    for meta in metas:
+        score, reasons = score_email(meta, sender_history)
+        if score >= threshold:
+            keep.append(meta)
+            continue
+        reason = reasons[0] if reasons else 'promocional'
+        counts[reason] = counts.get(reason, 0) + 1
+        h = _headers(meta)
+        skipped.append({'id': meta['id'], 'subject': h.get('subject', ''), 'sender': h.get('from', ''),
+                        'score': round(score, 2), 'reason': reason})
+    return keep, counts, skipped
@@ -38,6 +38,17 @@ def render_brain_dump_widget():
                  else:
                     st.warning("Escribe algo primero")
 
+def _store_acta_docx(title, struct_data, transcription=None):
+    """Renders the acta locally to DOCX and keeps it in session for the download button."""
+    try:
+        from modules.acta_compiler import render_acta_docx
+        st.session_state.last_acta_docx = {
+            'name': f"{title}.docx",
+            'bytes': render_acta_docx(struct_data, transcription)
+        }
+    except Exception as e:
+        print(f"Error rendering local DOCX: {e}")
+
 def view_notes_page():
     """Main Notes/Inbox Management Page."""
     import json
@@ -92,8 +103,9 @@ def view_notes_page():
                             if "error" in struct_data:
                                 st.error(f"Error AI: {struct_data['error']}")
                             else:
-                                # 2. Doc Generation
+                                # 2. Doc Generation (local DOCX first: instant download + fallback)
                                 final_title = acta_title if acta_title else f"Acta_{datetime.datetime.now().strftime('%Y%m%d')}"
+                                _store_acta_docx(final_title, struct_data, acta_content)
                                 doc_url, error_msg = google_services.create_meeting_minutes_doc(final_title, struct_data, acta_content)
                                 
                                 if doc_url:
@@ -102,6 +114,7 @@ def view_notes_page():
                                     st.balloons()
                                 else:
                                     st.error(f"Error creando el documento: {error_msg}")
+                                    st.info("💾 Puedes descargar el acta en formato Word más abajo.")
                                     if "403" in str(error_msg) or "permission" in str(error_msg).lower():
                                         st.warning("⚠️ Parece que faltan permisos para Google Docs.")
                                         if st.button("🔄 Actualizar Permisos (Re-conectar)", key="fix_perms_txt"):
@@ -154,6 +167,7 @@ def view_notes_page():
                                      else:
                                          # 3. Doc Generation
                                          final_title = acta_title if acta_title else f"Acta_Audio_{datetime.datetime.now().strftime('%Y%m%d')}"
+                                         _store_acta_docx(final_title, struct_data, transcription)
                                          doc_url, error_msg = google_services.create_meeting_minutes_doc(final_title, struct_data, transcription)
                                          
                                          if doc_url:
@@ -162,6 +176,7 @@ def view_notes_page():
                                              st.balloons()
                                          else:
                                              st.error(f"Error creando documento: {error_msg}")
+                                             st.info("💾 Puedes descargar el acta en formato Word más abajo.")
                                              if "403" in str(error_msg) or "permission" in str(error_msg).lower():
                                                 st.warning("⚠️ Parece que faltan permisos para Google Docs.")
                                                 if st.button("🔄 Actualizar Permisos (Re-conectar)", key="fix_perms_audio"):
@@ -174,6 +189,18 @@ def view_notes_page():
                              else:
                                  st.error(f"Falló la transcripción: {transcription}")
 
+            # Local DOCX export (survives reruns, independent of Google Docs)
+            if st.session_state.get('last_acta_docx'):
+                acta_file = st.session_state.last_acta_docx
+                st.download_button(
+                    "⬇️ Descargar Acta (.docx)",
+                    data=acta_file['bytes'],
+                    file_name=acta_file['name'],
+                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                    use_container_width=True,
+                    key="btn_download_acta_docx"
+                )
+
 
 
 
@@ -0,0 +1,142 @@
+import re
+import datetime
+
+from modules.event_classifier import fold_text
+from modules.temporal_parser import WORK_END_HOUR_BY_WEEKDAY, find_dates
+
+# --- CONSTANTS ---
+WORK_START_HOUR = 9
+WORK_DAYS = 5                 # Monday to Friday
+DEFAULT_TASK_MINUTES = 60     # Used when neither the text nor the estimator gives a duration
+MIN_SLOT_MINUTES = 15         # Free gaps shorter than this are ignored
+DAY_NAMES = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"]
+
+TASK_DURATION = re.compile(r'\(?\s*(?P<n>\d+(?:[.,]\d+)?)\s*(?P<unit>h|hrs?|horas?|m|min|mins|minutos)\s*\)?(?!\w)', re.IGNORECASE)
+PRIORITY_HINT = re.compile(r'(?<!\w)(?:urgente|importante|prioridad|critico|!)', re.IGNORECASE)
+BULLET = re.compile(r'^\s*(?:[-*•]|\d+[.)])\s*')
+
+# --- INPUT ---
+
+def parse_task_lines(tasks_text, now=None):
+    """
+    '- Informe (2h) para el jueves' -> {'title', 'minutes' (or None), 'deadline' (date or None), 'priority'}.
+    Durations and deadlines are read from the text; missing durations are left for the estimator.
+    """
+    tasks = []
+    for line in (tasks_text or '').splitlines():
+        line = BULLET.sub('', line).strip()
+        if not line:
+            continue
+        folded = fold_text(line)
+        minutes = None
+        m = TASK_DURATION.search(line)
+        if m:
+            n = float(m.group('n').replace(',', '.'))
+            minutes = int(round(n * 60)) if m.group('unit').lower().startswith('h') else int(n)
+            line = (line[:m.start()] + line[m.end():]).strip()
+        dates = find_dates(folded, now)
+        tasks.append({
+            'title': re.sub(r'\s{2,}', ' ', line).strip(' -,'),
+            'minutes': minutes,
+            'deadline': dates[-1] if dates else None,
+            'priority': 1 if PRIORITY_HINT.search(folded) else 0,
+        })
+    return tasks
+
+def _merge(intervals):
+    merged = []
+    for s, e in sorted(intervals):
+        if merged and s <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], e)
+        else:
+            merged.append([s, e])
+    return merged
+
+def work_window(day):
+    """(start, end) datetimes of the working hours of `day` (Mon-Thu 9-17, Fri 9-16)."""
+    end_hour = WORK_END_HOUR_BY_WEEKDAY.get(day.weekday(), 17)
+    return (datetime.datetime.combine(day, datetime.time(WORK_START_HOUR)),
+            datetime.datetime.combine(day, datetime.time(end_hour)))
+
+def free_slots(week_start, busy, now=None):
+    """Free [start, end] gaps inside working hours for the 5 work days, minus merged busy intervals."""
+    slots = []
+    merged = _merge([(s, e) for s, e in busy if e > s])
+    for offset in range(WORK_DAYS):
+        day = week_start + datetime.timedelta(days=offset)
+        day_start, day_end = work_window(day)
+        if now and now > day_start:
+            day_start = min(max(day_start, now.replace(second=0, microsecond=0)), day_end)
+        cursor = day_start
+        for s, e in merged:
+            if e <= cursor or s >= day_end:
+                continue
+            if s > cursor:
+                slots.append([cursor, min(s, day_end)])
+            cursor = max(cursor, e)
+        if cursor < day_end:
+            slots.append([cursor, day_end])
+    return [s for s in slots if (s[1] - s[0]).total_seconds() >= MIN_SLOT_MINUTES * 60]
+
+# --- SCHEDULING ---
+
+def schedule_tasks(tasks, busy, week_start, now=None):
+    """
+    Greedy earliest-deadline-first placement: tasks are sorted by (deadline, priority, longest first)
+    and each goes whole into the earliest free gap that fits and ends before its deadline.
+    Deterministic, O(tasks x gaps).
+
+    Returns:
+        tuple: (placements [{'title', 'start', 'end', 'deadline'}], unscheduled [{'title', 'minutes', 'reason'}])
+    """
+    slots = free_slots(week_start, busy, now)
+    far = datetime.date.max
+    order = sorted(enumerate(tasks), key=lambda p: (p[1].get('deadline') or far, -p[1].get('priority', 0),
+                                                    -(p[1].get('minutes') or DEFAULT_TASK_MINUTES), p[0]))
+    placements, unscheduled = [], []
+    for _, task in order:
+        need = datetime.timedelta(minutes=task.get('minutes') or DEFAULT_TASK_MINUTES)
+        limit = (datetime.datetime.combine(task['deadline'], datetime.time.max) if task.get('deadline')
+                 else datetime.datetime.max)
+        for slot in slots:
+            if slot[1] - slot[0] >= need and slot[0] + need <= limit:
+                placements.append({'title': task['title'], 'start': slot[0], 'end': slot[0] + need,
+                                   'deadline': task.get('deadline')})
+                slot[0] = slot[0] + need
+                break
+        else:
+            past_deadline = bool(task.get('deadline')) and any(s[1] - s[0] >= need for s in slots)
+            unscheduled.append({'title': task['title'], 'minutes': int(need.total_seconds() // 60),
+                                'reason': 'plazo' if past_deadline else 'sin_espacio'})
+    placements.sort(key=lambda p: p['start'])
+    return placements, unscheduled
+
+def plan_by_day(placements, fixed_events, week_start):
+    """Kanban dict {'Lunes': [...], ...}: fixed events as '[Evento] HH:MM Título', tasks as 'HH:MM-HH:MM Título'."""
+    rows = {name: [] for name in DAY_NAMES}
+    entries = [(s, f"[Evento] {s.strftime('%H:%M')} {title}") for s, _, title in fixed_events]
+    entries += [(p['start'], f"{p['start'].strftime('%H:%M')}-{p['end'].strftime('%H:%M')} {p['title']}") for p in placements]
+    for start, label in sorted(entries):
+        offset = (start.date() - week_start).days
+        if 0 <= offset < WORK_DAYS:
+            rows[DAY_NAMES[offset]].append(label)
+    return rows
+
+def busy_from_events(events, tz_name="America/Santiago"):
+    """Calendar API events -> [(start, end, title)] naive local datetimes. All-day and 'free' events don't block."""
+    from zoneinfo import ZoneInfo
+    tz = ZoneInfo(tz_name)
+    out = []
+    for ev in events or []:
+        start, end = (ev.get('start') or {}).get('dateTime'), (ev.get('end') or {}).get('dateTime')
+        if not start or not end or ev.get('transparency') == 'transparent' or ev.get('status') == 'cancelled':
+            continue
+        try:
+            s = datetime.datetime.fromisoformat(start.replace('Z', '+00:00'))
+            e = datetime.datetime.fromisoformat(end.replace('Z', '+00:00'))
+        except ValueError:
+            continue
+        if s.tzinfo:
+            s, e = s.astimezone(tz).replace(tzinfo=None), e.astimezone(tz).replace(tzinfo=None)
+        out.append((s, e, ev.get('summary', 'Evento')))
+    return out
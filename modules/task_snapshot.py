@@ -0,0 +1,162 @@
+import time
+import datetime
+
+from modules.field_profiles import list_fields
+
+# --- CONSTANTS ---
+SNAPSHOT_TTL_SECONDS = 60   # Reads within this window are served from memory
+BATCH_LIMIT = 50            # Requests per batch HTTP call
+PAGE_SIZE = 100             # tasks.list / tasklists.list maximum
+TASK_FIELDS = list_fields('task_snapshot')
+NO_DUE = 'No Due Date'
+DELTA_MARGIN_SECONDS = 300  # updatedMin overlap: absorbs clock skew and in-flight writes (deltas are idempotent)
+
+def _rfc3339(ts):
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+def _parse_rfc3339(value):
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+class TaskSnapshot:
+    """
+    In-memory copy of the pending tasks of one user. The first refresh reads every list
+    (batch HTTP, all pages); later refreshes only pull tasks changed since the last sync (updatedMin).
+    The delta cursor is the newest 'updated' seen (Google's clock, not ours), minus DELTA_MARGIN_SECONDS.
+    """
+
+    def __init__(self):
+        self.lists = {}          # list_id -> title (API order)
+        self.tasks = {}          # task_id -> {'id', 'title', 'list_id', 'list_title', 'due', 'parent'}
+        self.synced_at = None    # time.time() of the last successful sync start
+        self.cursor = None       # Newest 'updated' seen (RFC 3339, server clock)
+        self.stale = True
+        self.calls = 0           # HTTP round trips (a batch counts once)
+
+    def mark_stale(self):
+        """A write happened through the app: the next read refreshes (incrementally)."""
+        self.stale = True
+
+    def needs_refresh(self, ttl=SNAPSHOT_TTL_SECONDS):
+        return self.stale or self.synced_at is None or time.time() - self.synced_at > ttl
+
+    def _fetch_lists(self, service, http=None):
+        lists, token = {}, None
+        while True:
+            request = service.tasklists().list(maxResults=PAGE_SIZE, pageToken=token, fields=list_fields('task_lists'))
+            resp = request.execute(http=http) if http is not None else request.execute()
+            self.calls += 1
+            for tl in resp.get('items', []):
+                lists[tl['id']] = tl.get('title', '')
+            token = resp.get('nextPageToken')
+            if not token:
+                return lists
+
+    def _fetch_tasks(self, service, list_params, http=None):
+        """
+        list_params: {list_id: extra tasks.list kwargs}. Pages of all lists travel together in
+        batch requests; lists with a nextPageToken go into the next round. Returns {list_id: items}.
+        """
+        items = {lid: [] for lid in list_params}
+        pending = {lid: None for lid in list_params}
+        errors = []
+
+        def callback(request_id, response, exception):
+            if exception is not None:
+                errors.append(exception)
+                return
+            items[request_id].extend(response.get('items', []))
+            if response.get('nextPageToken'):
+                pending[request_id] = response['nextPageToken']
+
+        while pending:
+            round_ids = list(pending.items())
+            pending = {}
+            for i in range(0, len(round_ids), BATCH_LIMIT):
+                batch = service.new_batch_http_request(callback=callback)
+                for lid, token in round_ids[i:i + BATCH_LIMIT]:
+                    batch.add(service.tasks().list(tasklist=lid, maxResults=PAGE_SIZE, pageToken=token,
+                                                   fields=TASK_FIELDS, **list_params[lid]), request_id=lid)
+                batch.execute(http=http)
+                self.calls += 1
+            if errors:
+                raise errors[0]
+        return items
+
+    def _updated_min(self):
+        """Server-clock cursor when known; else the local sync time. Either way a margin of minutes."""
+        base = _parse_rfc3339(self.cursor) if self.cursor else self.synced_at
+        return _rfc3339(base - DELTA_MARGIN_SECONDS)
+
+    def refresh(self, service, force_full=False, http=None):
+        """
+        Full load on first use (or force_full), otherwise an updatedMin delta. `http` executes on a
+        separate connection (worker threads). Raises on API errors.
+        """
+        started = time.time()
+        lists = self._fetch_lists(service, http)
+        full = force_full or self.synced_at is None
+        # Deltas must see completions/deletions to drop them; new lists are read in full
+        delta = {'updatedMin': self._updated_min() if not full else None,
+                 'showCompleted': True, 'showDeleted': True, 'showHidden': True}
+        params = {lid: ({'showCompleted': False} if full or lid not in self.lists else delta) for lid in lists}
+        fetched = self._fetch_tasks(service, params, http)
+
+        tasks = {} if full else {tid: t for tid, t in self.tasks.items() if t['list_id'] in lists}
+        cursor = None if full else self.cursor
+        for lid, items in fetched.items():
+            for t in items:
+                if t.get('updated') and (cursor is None or t['updated'] > cursor):
+                    cursor = t['updated']
+                if t.get('deleted') or t.get('hidden') or t.get('status') == 'completed':
+                    tasks.pop(t['id'], None)
+                    continue
+                tasks[t['id']] = {
+                    'id': t['id'],
+                    'title': t.get('title', ''),
+                    'list_id': lid,
+                    'list_title': lists[lid],
+                    'due': t.get('due', NO_DUE),
+                    'parent': t.get('parent'),
+                }
+        for t in tasks.values():
+            t['list_title'] = lists.get(t['list_id'], t['list_title'])  # Renamed lists
+
+        self.lists, self.tasks, self.cursor = lists, tasks, cursor
+        self.synced_at, self.stale = started, False
+        return self
+
+    # --- PERSISTENCE (disk cache) ---
+
+    def to_state(self):
+        return {'lists': self.lists, 'tasks': self.tasks, 'synced_at': self.synced_at, 'cursor': self.cursor}
+
+    @classmethod
+    def from_state(cls, state):
+        """Warm copy from disk: usable at once; the next refresh is an updatedMin delta."""
+        snap = cls()
+        snap.lists, snap.tasks, snap.synced_at = state['lists'], state['tasks'], state['synced_at']
+        snap.cursor = state.get('cursor')
+        return snap
+
+    # --- QUERIES (memory only) ---
+
+    def all(self):
+        return list(self.tasks.values())
+
+    def count(self):
+        return len(self.tasks)
+
+    def top(self, n=5):
+        """First n tasks: dated ones by due date, then undated in list order."""
+        return sorted(self.tasks.values(), key=lambda t: (t['due'] == NO_DUE, t['due']))[:n]
+
+    def by_due(self, start=None, end=None):
+        """Tasks due within [start, end] (dates, inclusive), sorted by due date."""
+        out = []
+        for t in self.tasks.values():
+            if t['due'] == NO_DUE:
+                continue
+            day = datetime.date.fromisoformat(t['due'][:10])
+            if (start is None or day >= start) and (end is None or day <= end):
+                out.append(t)
+        return sorted(out, key=lambda t: t['due'])
@@ -0,0 +1,126 @@
+import time
+
+# --- CONSTANTS ---
+BATCH_LIMIT = 50                         # Requests per batch HTTP call
+RETRYABLE_STATUS = {429, 500, 502, 503}
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')  # The only retryable 403s
+MAX_ROUNDS = 5
+BASE_DELAY = 1.0
+MAX_DELAY = 16.0
+
+def _status(error):
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    return int(status) if status is not None else None
+
+def is_retryable(error):
+    """Throttling and transient server errors; a 403 only when its reason is a rate limit (not a permission error)."""
+    status = _status(error)
+    if status in RETRYABLE_STATUS:
+        return True
+    if status != 403:
+        return False
+    content = getattr(error, 'content', b'') or b''
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='replace')
+    return any(reason in f"{content} {error}" for reason in RATE_LIMIT_REASONS)
+
+def _execute_batched(service, requests, callback, size):
+    """requests: [(request_id, request)] sent size per batch HTTP call."""
+    for i in range(0, len(requests), size):
+        batch = service.new_batch_http_request(callback=callback)
+        for request_id, request in requests[i:i + size]:
+            batch.add(request, request_id=request_id)
+        batch.execute()
+
+def restore_order(service, tasklist_id, task_ids, parent=None, chunk_size=BATCH_LIMIT):
+    """
+    Makes task_ids appear in the given order. Google doesn't guarantee execution order inside a
+    batch (and retries land in later rounds), so the actual positions are read back in one batch
+    and only misplaced tasks are moved, sequentially, each right after its predecessor.
+
+    Returns:
+        int: number of tasks.move calls made
+    """
+    positions = {}
+
+    def callback(request_id, response, exception):
+        if exception is None:
+            positions[request_id] = response.get('position', '')
+
+    _execute_batched(service, [(tid, service.tasks().get(tasklist=tasklist_id, task=tid, fields='id,position'))
+                               for tid in task_ids], callback, max(1, min(chunk_size, BATCH_LIMIT)))
+    wanted = [tid for tid in task_ids if tid in positions]
+    actual = sorted(wanted, key=lambda tid: positions[tid])
+    moves = 0
+    for i, tid in enumerate(wanted):
+        previous = wanted[i - 1] if i else None
+        at = actual.index(tid)
+        if (actual[at - 1] if at else None) == previous:
+            continue
+        kwargs = {'tasklist': tasklist_id, 'task': tid}
+        if parent:
+            kwargs['parent'] = parent
+        if previous:
+            kwargs['previous'] = previous
+        service.tasks().move(**kwargs).execute()
+        moves += 1
+        actual.remove(tid)
+        actual.insert(actual.index(previous) + 1 if previous else 0, tid)
+    return moves
+
+def insert_tasks_batched(service, tasklist_id, bodies, parent=None, chunk_size=BATCH_LIMIT, sleep=time.sleep):
+    """
+    Inserts many tasks through batch HTTP requests (chunk_size per round trip), optionally as
+    subtasks of `parent`. Items failing with a retryable status are retried in later rounds with
+    adaptive backoff: the delay doubles and the chunk halves after throttling, and recover on success.
+    The created tasks are then put in input order (restore_order).
+
+    Returns:
+        list: one outcome per body, in input order:
+              {'index', 'title', 'status': 'created'|'failed', 'id', 'error'}
+    """
+    outcomes = [{'index': i, 'title': b.get('title', ''), 'status': 'failed', 'id': None, 'error': None}
+                for i, b in enumerate(bodies)]
+    pending = list(range(len(bodies)))
+    delay, size = 0.0, max(1, min(chunk_size, BATCH_LIMIT))
+
+    for _ in range(MAX_ROUNDS):
+        if not pending:
+            break
+        if delay:
+            sleep(delay)
+        retry = []
+
+        def callback(request_id, response, exception):
+            idx = int(request_id)
+            if exception is None:
+                outcomes[idx].update(status='created', id=response.get('id'), error=None)
+                return
+            outcomes[idx]['error'] = str(exception)
+            if is_retryable(exception):
+                retry.append(idx)
+
+        # Reverse order: an insert without 'previous' lands on top of its siblings, so when the
+        # batch runs in sequence (the usual case) no move is needed afterwards
+        requests = []
+        for idx in pending[::-1]:
+            kwargs = {'tasklist': tasklist_id, 'body': bodies[idx]}
+            if parent:
+                kwargs['parent'] = parent
+            requests.append((str(idx), service.tasks().insert(**kwargs)))
+        _execute_batched(service, requests, callback, size)
+
+        if retry:
+            delay = min(max(delay * 2, BASE_DELAY), MAX_DELAY)
+            size = max(1, size // 2)
+        else:
+            delay, size = 0.0, max(1, min(chunk_size, BATCH_LIMIT))
+        pending = sorted(retry)
+
+    created = [o['id'] for o in outcomes if o['status'] == 'created' and o['id']]
+    if len(created) > 1:
+        try:
+            restore_order(service, tasklist_id, created, parent=parent, chunk_size=chunk_size)
+        except Exception as e:
+            print(f"Error ordering tasks: {e}")
+    return outcomes
@@ -0,0 +1,299 @@
+import re
+import datetime
+
+from modules.event_classifier import fold_text
+
+# --- CONSTANTS ---
+DEFAULT_DURATION_HOURS = 2
+# Work-hour end limits (Mon-Thu 17:00, Fri 16:00); events starting later keep the full default
+WORK_END_HOUR_BY_WEEKDAY = {0: 17, 1: 17, 2: 17, 3: 17, 4: 16}
+MAX_FAST_PATH_CHARS = 160
+
+WEEKDAYS = {'lunes': 0, 'martes': 1, 'miercoles': 2, 'jueves': 3, 'viernes': 4, 'sabado': 5, 'domingo': 6}
+MONTHS = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6, 'julio': 7,
+    'agosto': 8, 'septiembre': 9, 'setiembre': 9, 'octubre': 10, 'noviembre': 11, 'diciembre': 12,
+    'ene': 1, 'feb': 2, 'abr': 4, 'jun': 6, 'jul': 7, 'ago': 8, 'sep': 9, 'sept': 9, 'oct': 10, 'nov': 11, 'dic': 12,
+}
+
+# Words that make a text something other than one plain event (tasks, email, recurrence, vague periods,
+# questions about the agenda, rescheduling/cancelling an existing event)
+AMBIGUOUS_WORDS = re.compile(
+    r'(?<!\w)(?:tarea|tareas|correo|email|mail|enviar|envia|escribe|responde|recuerdame|cada|todos los|todas las|'
+    r'semana|semanas|mes|meses|cancela|cancelar|elimina|borra|mueve|mover|cambia|tarde|noche|temprano|'
+    r'luego|despues|antes|o|'
+    r'que tengo|tengo algo|cuando|muestra|muestrame|mostrar|muestre|'
+    r'posponer|pospon|pospone|postergar|posterga|reagendar|reagenda|reprogramar|reprograma|anula|anular)(?!\w)'
+)
+QUESTION_MARKS = ('?', '¿')
+# Negated requests ("No agendar reunión mañana a las 10") are never a new event
+NEGATION = re.compile(r'(?<!\w)(?:no|ni|nunca|tampoco)(?!\w)')
+# Bare hours read as afternoon ("a las 3" -> 15:00); 6 and 7 could be either, so they go to the LLM
+AFTERNOON_BARE_HOURS = range(1, 6)
+AMBIGUOUS_BARE_HOURS = (6, 7)
+
+_WD = r'(?P<wd>lunes|martes|miercoles|jueves|viernes|sabado|domingo)'
+_MONTH = r'(?P<month>' + '|'.join(sorted(MONTHS, key=len, reverse=True)) + r')\.?'
+_YEAR = r'(?:\s*,?\s*(?:de\s+|del\s+)?(?P<year>\d{4}))?'
+
+# Ordered: the first pattern that matches at a position wins (most specific first)
+DATE_PATTERNS = [
+    ('iso', re.compile(r'(?<!\d)(?P<year>\d{4})-(?P<m>\d{1,2})-(?P<d>\d{1,2})(?!\d)')),
+    ('day_month', re.compile(r'(?:' + _WD + r'\s*,?\s*)?(?<!\d)(?P<d>\d{1,2})\s+(?:de\s+)?' + _MONTH + r'(?!\w)' + _YEAR)),
+    ('month_day', re.compile(_MONTH + r'\s*,?\s*(?:' + _WD + r'\s+)?(?P<d>\d{1,2})(?![\d:])' + _YEAR)),
+    ('numeric', re.compile(r'(?:' + _WD + r'\s*,?\s*)?(?<![\d:])(?P<d>\d{1,2})[/-](?P<m>\d{1,2})(?:[/-](?P<year>\d{2,4}))?(?![\d:])')),
+    ('pasado_manana', re.compile(r'pasado\s+(?:mañana|manana)(?!\w)')),
+    ('hoy', re.compile(r'(?<!\w)hoy(?!\w)')),
+    ('manana', re.compile(r'(?<!la )(?<!\w)(?:mañana|manana)(?!\w)')),
+    ('in_days', re.compile(r'(?<!\w)en\s+(?P<n>\d{1,2})\s+dias(?!\w)')),
+    ('weekday_day', re.compile(_WD + r'\s+(?P<d>\d{1,2})(?!\s*(?::|\d|hrs|hr|h\b|horas|am|pm|a\.?\s?m|p\.?\s?m))')),
+    ('weekday', re.compile(r'(?<!\w)(?:(?:el|este|esta)\s+)?(?:proximo\s+)?' + _WD + r'(?:\s+(?:proximo|que\s+viene))?(?!\w)')),
+]
+
+_TIME = (
+    r'(?P<{0}_h>\d{{1,2}})(?:(?::|\.)(?P<{0}_min>\d{{2}}))?'
+    r'(?:\s*(?P<{0}_unit>hrs|hr|horas|h)(?!\w)\.?)?'
+    r'(?:\s*(?P<{0}_mer>am|pm|a\.\s?m\.?|p\.\s?m\.?))?'
+    r'(?:\s+de\s+la\s+(?P<{0}_per>manana|mañana|tarde|noche))?'
+)
+
+TIME_RANGE = re.compile(
+    r'(?:(?P<rpre>de|desde|entre)\s+(?:las?\s+)?)?(?:horario\s+)?' + _TIME.format('a') +
+    r'\s*(?:a|-|–|hasta|y)\s*(?:las?\s+)?' + _TIME.format('b') + r'(?!\w)'
+)
+TIME_SINGLE = re.compile(r'(?:(?P<pre>a\s+las?|las?)\s+)?' + _TIME.format('a') + r'(?![\w/])')
+NOON = re.compile(r'(?:a\s+)?(?:el\s+)?mediodia(?!\w)')
+DURATION = re.compile(
+    r'(?:por|durante)\s+(?P<n>\d+(?:[.,]\d+)?|una|un|media)\s+(?P<unit>horas?|hrs?|minutos|mins?)(?:\s+y\s+media)?(?!\w)'
+)
+ALL_DAY = re.compile(r'(?<!\w)todo\s+el\s+dia(?!\w)')
+
+FILLER = re.compile(
+    r'(?<!\w)(?:el|la|los|las|para|a|de|del|en|desde|hasta|entre|horario|a las|este|esta|proximo)(?!\w)'
+)
+
+# --- HELPERS ---
+
+def default_end_time(start_dt):
+    """2-hour default capped at the work-day end (Mon-Thu 17:00, Fri 16:00) when starting before it."""
+    default_end = start_dt + datetime.timedelta(hours=DEFAULT_DURATION_HOURS)
+    limit_hour = WORK_END_HOUR_BY_WEEKDAY.get(start_dt.weekday(), 17)
+    limit_dt = start_dt.replace(hour=limit_hour, minute=0, second=0, microsecond=0)
+    if start_dt < limit_dt and default_end > limit_dt:
+        return limit_dt
+    return default_end
+
+def _upcoming(now, month, day, year=None):
+    """Builds the date; without an explicit year, past dates roll over to next year."""
+    if year is not None:
+        year = int(year)
+        if year < 100:
+            year += 2000
+        return datetime.date(year, month, day)
+    candidate = datetime.date(now.year, month, day)
+    if candidate < now.date():
+        candidate = datetime.date(now.year + 1, month, day)
+    return candidate
+
+def _resolve_date(kind, m, now):
+    """Returns (date, exact) for a date match; exact=False flags a weekday/day mismatch."""
+    today = now.date()
+    g = m.groupdict()
+    if kind == 'iso':
+        return datetime.date(int(g['year']), int(g['m']), int(g['d'])), True
+    if kind in ('day_month', 'month_day', 'numeric'):
+        month = MONTHS[g['month']] if g.get('month') else int(g['m'])
+        date = _upcoming(now, month, int(g['d']), g.get('year'))
+        return date, not g.get('wd') or WEEKDAYS[g['wd']] == date.weekday()
+    if kind == 'hoy':
+        return today, True
+    if kind == 'manana':
+        return today + datetime.timedelta(days=1), True
+    if kind == 'pasado_manana':
+        return today + datetime.timedelta(days=2), True
+    if kind == 'in_days':
+        return today + datetime.timedelta(days=int(g['n'])), True
+    if kind == 'weekday_day':
+        day = int(g['d'])
+        date = None
+        for offset in range(0, 3):
+            month = (today.month - 1 + offset) % 12 + 1
+            year = today.year + (today.month - 1 + offset) // 12
+            try:
+                date = datetime.date(year, month, day)
+            except ValueError:
+                continue
+            if date >= today:
+                break
+        return date, date is not None and WEEKDAYS[g['wd']] == date.weekday()
+    if kind == 'weekday':
+        days_ahead = (WEEKDAYS[g['wd']] - today.weekday()) % 7 or 7
+        return today + datetime.timedelta(days=days_ahead), True
+    return None, False
+
+def _hour(g, prefix, has_pre=False):
+    """(hour, minute) from a time match group set, or None if it isn't clearly a time."""
+    h = int(g[prefix + '_h'])
+    minute_str, unit = g.get(prefix + '_min'), g.get(prefix + '_unit')
+    meridiem = (g.get(prefix + '_mer') or '').replace('.', '').replace(' ', '')
+    period = g.get(prefix + '_per')
+    minute = int(minute_str) if minute_str else 0
+    if not (minute_str or unit or meridiem or period or has_pre):
+        return None
+    if meridiem == 'pm' or period in ('tarde', 'noche'):
+        if h < 12:
+            h += 12
+    elif meridiem == 'am' or period in ('manana', 'mañana'):
+        if h == 12:
+            h = 0
+    elif not minute_str and not unit:
+        if h in AMBIGUOUS_BARE_HOURS:
+            return None  # "a las 6": a 06:00 flight as likely as an 18:00 meeting
+        if h in AFTERNOON_BARE_HOURS:
+            h += 12  # "a las 3" in a work context means 15:00
+    if h > 23 or minute > 59:
+        return None
+    return h, minute
+
+def _overlaps(span, spans):
+    return any(span[0] < e and s < span[1] for s, e in spans)
+
+def _find_dates(folded, now):
+    found, taken = [], []
+    for kind, pattern in DATE_PATTERNS:
+        for m in pattern.finditer(folded):
+            if _overlaps(m.span(), taken):
+                continue
+            try:
+                date, exact = _resolve_date(kind, m, now)
+            except (ValueError, KeyError):
+                continue
+            if date is None:
+                continue
+            found.append((m.span(), date, exact))
+            taken.append(m.span())
+    return found
+
+def _find_times(folded, blocked):
+    """Returns (spans, start (h, m), end (h, m) or None, count) for time expressions outside `blocked`."""
+    spans, times = [], []
+    for m in TIME_RANGE.finditer(folded):
+        if _overlaps(m.span(), blocked + spans):
+            continue
+        g = m.groupdict()
+        # Bare "10 a 12" only counts with a lead-in ("de", "desde", "entre"); otherwise need a clear time marker
+        explicit = g['rpre'] or any(g[f'{p}_{k}'] for p in 'ab' for k in ('min', 'unit', 'mer', 'per'))
+        start, end = _hour(g, 'a', True), _hour(g, 'b', True)
+        if start and end and explicit:
+            spans.append(m.span())
+            times.append((start, end))
+    for m in TIME_SINGLE.finditer(folded):
+        if _overlaps(m.span(), blocked + spans):
+            continue
+        start = _hour(m.groupdict(), 'a', bool(m.group('pre')))
+        if start:
+            spans.append(m.span())
+            times.append((start, None))
+    for m in NOON.finditer(folded):
+        if not _overlaps(m.span(), blocked + spans):
+            spans.append(m.span())
+            times.append(((12, 0), None))
+    return spans, times
+
+def _strip_fillers(words, leading):
+    """Drops filler words ("el", "a las", "de"...) left dangling next to a removed expression."""
+    while words:
+        word = words[0] if leading else words[-1]
+        bare = fold_text(word).strip(' ,.;:-–')
+        if bare and not FILLER.fullmatch(bare):
+            break
+        words.pop(0 if leading else -1)
+    return words
+
+def _summary(text, folded, spans):
+    """Original text minus temporal spans and their dangling fillers, tidied into a title."""
+    source = text if len(text) == len(folded) else folded
+    pieces, last = [], 0
+    for s, e in sorted(spans):
+        pieces.append(source[last:s])
+        last = e
+    pieces.append(source[last:])
+    words = []
+    for i, piece in enumerate(pieces):
+        piece_words = piece.split()
+        if i < len(pieces) - 1:
+            piece_words = _strip_fillers(piece_words, leading=False)
+        words.extend(piece_words)
+    words = _strip_fillers(_strip_fillers(words, leading=True), leading=False)
+    title = " ".join(words).strip(' ,.;:-–')
+    title = re.sub(r'\s+([,.;:])', r'\1', title)
+    return title[:1].upper() + title[1:]
+
+# --- PUBLIC API ---
+
+def parse_temporal(text, now=None):
+    """
+    Deterministic Spanish date/time extraction for one short event description.
+
+    Returns:
+        dict: {'summary', 'start_time', 'end_time', 'all_day'} when the text resolves with high
+        confidence (one date, at most one time/range, a non-empty title, nothing ambiguous); else None.
+    """
+    if not text or len(text) > MAX_FAST_PATH_CHARS or '\n' in text.strip():
+        return None
+    now = now or datetime.datetime.now()
+    folded = fold_text(text)
+    if any(mark in text for mark in QUESTION_MARKS) or NEGATION.search(folded):
+        return None
+    if AMBIGUOUS_WORDS.search(folded.replace('de la tarde', '').replace('de la noche', '')):
+        return None
+
+    dates = _find_dates(folded, now)
+    if len(dates) != 1 or not dates[0][2]:
+        return None
+    date_span, date, _ = dates[0]
+
+    duration = DURATION.search(folded)
+    blocked = [date_span] + ([duration.span()] if duration else [])
+    time_spans, times = _find_times(folded, blocked)
+    all_day = ALL_DAY.search(folded)
+    if len(times) > 1 or (not times and not all_day):
+        return None
+
+    spans = [date_span] + time_spans + ([duration.span()] if duration else []) + ([all_day.span()] if all_day else [])
+    summary = _summary(text, folded, spans)
+    # Leftover digits mean something temporal we did not understand
+    if not summary or re.search(r'\d', fold_text(summary)):
+        return None
+
+    if not times:
+        return {'summary': summary, 'start_time': date.isoformat(), 'end_time': date.isoformat(), 'all_day': True}
+
+    (sh, sm), end = times[0]
+    start_dt = datetime.datetime.combine(date, datetime.time(sh, sm))
+    if end:
+        end_dt = datetime.datetime.combine(date, datetime.time(*end))
+        if end_dt <= start_dt:
+            return None
+    elif duration:
+        n, unit = duration.group('n'), duration.group('unit')
+        amount = {'una': 1.0, 'un': 1.0, 'media': 0.5}.get(n) or float(n.replace(',', '.'))
+        if duration.group(0).endswith('y media'):
+            amount += 0.5
+        hours = amount if unit.startswith('h') else amount / 60.0
+        end_dt = start_dt + datetime.timedelta(hours=hours)
+    else:
+        end_dt = default_end_time(start_dt)
+
+    return {
+        'summary': summary,
+        'start_time': start_dt.strftime("%Y-%m-%dT%H:%M:%S"),
+        'end_time': end_dt.strftime("%Y-%m-%dT%H:%M:%S"),
+        'all_day': False,
+    }
+
+def find_dates(text, now=None):
+    """All dates mentioned in `text` (exact matches only), in order of appearance."""
+    now = now or datetime.datetime.now()
+    found = [(span, date) for span, date, exact in _find_dates(fold_text(text or ''), now) if exact]
+    return [date for _, date in sorted(found)]
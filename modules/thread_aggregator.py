@@ -0,0 +1,92 @@
+import re
+import datetime
+
+from modules.event_classifier import fold_text
+
+# --- CONSTANTS ---
+THREAD_MAX_CHARS = 4000   # Same cap analyze_emails_ai applies per item
+MIN_SENTENCE_CHARS = 12   # Shorter sentences ("Ok.", "Gracias.") are never treated as repeats
+SUBJECT_PREFIX = re.compile(r'^\s*(?:(?:re|rv|fw|fwd|res|enc)\s*:\s*)+', re.IGNORECASE)
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\s+\|\s+')
+
+# --- HELPERS ---
+
+def clean_subject(subject):
+    """'RE: Fwd: Reunión' -> 'Reunión'."""
+    return SUBJECT_PREFIX.sub('', subject or '').strip() or (subject or '')
+
+def _chronological(messages):
+    # Gmail lists newest first: without internalDate, reversed list order is chronological
+    indexed = list(enumerate(messages))
+    indexed.sort(key=lambda p: (int(p[1].get('ts') or 0), -p[0]))
+    return [m for _, m in indexed]
+
+def _new_sentences(body, seen):
+    """Sentences of body not already said earlier in the thread (seen is updated in place)."""
+    kept = []
+    for sentence in SENTENCE_SPLIT.split(body or ''):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        key = re.sub(r'\s+', ' ', fold_text(sentence))
+        if len(key) >= MIN_SENTENCE_CHARS:
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(sentence)
+    return " ".join(kept)
+
+def _stamp(message):
+    if message.get('ts'):
+        return datetime.datetime.fromtimestamp(int(message['ts']) / 1000).strftime('%d/%m %H:%M')
+    return message.get('date', '')
+
+# --- PUBLIC API ---
+
+def group_by_thread(emails, max_chars=THREAD_MAX_CHARS):
+    """
+    Collapses messages sharing a threadId into one item, in chronological order, keeping only
+    the new content of each message. The item keeps the latest message's id/sender and lists
+    every member in 'message_ids'. Single-message threads pass through (with 'message_ids').
+    """
+    threads = {}
+    for e in emails:
+        threads.setdefault(e.get('threadId') or e['id'], []).append(e)
+
+    items = []
+    for thread_id, messages in threads.items():
+        if len(messages) == 1:
+            items.append(dict(messages[0], message_ids=[messages[0]['id']]))
+            continue
+        ordered = _chronological(messages)
+        seen = set()
+        parts = []
+        for m in ordered:
+            text = _new_sentences(m.get('body', ''), seen)
+            if text:
+                parts.append(f"[{_stamp(m)}] {m.get('sender', '')}: {text}")
+
+        # Over budget: keep the opening message (usually the original request) and the newest replies
+        if len(" || ".join(parts)) > max_chars and len(parts) > 1:
+            head, tail = parts[0], []
+            budget = max_chars - len(head) - 4
+            for p in reversed(parts[1:]):
+                if len(p) + 4 > budget:
+                    break
+                tail.insert(0, p)
+                budget -= len(p) + 4
+            parts = [head] + tail
+
+        latest = ordered[-1]
+        items.append(dict(
+            latest,
+            threadId=thread_id,
+            subject=clean_subject(ordered[0].get('subject', latest.get('subject', ''))),
+            body=" || ".join(parts)[:max_chars],
+            message_ids=[m['id'] for m in ordered],
+        ))
+    return items
+
+def message_ids_of(item):
+    """All message IDs an analyzed item stands for (falls back to its own id)."""
+    return item.get('message_ids') or ([item['id']] if item.get('id') else [])
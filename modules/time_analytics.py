@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+
+# --- CONSTANTS ---
+LOCAL_TZ = "America/Santiago"
+CATEGORY_ORDER = ['reuniones_internas', 'reuniones_externas', 'trabajo_focalizado', 'admin', 'otros']
+MAX_EVENT_HOURS = 12  # Same cap as calc_event_duration_hours
+
+# Work-hour rules (end limits match _calculate_default_end_time: Mon-Thu 17:00, Fri 16:00)
+WORK_START_HOUR = 8
+WORK_END_HOUR_BY_WEEKDAY = np.array([17, 17, 17, 17, 16, 0, 0])  # Sat/Sun: no work window
+
+WEEKDAY_LABELS = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
+
+# --- LOADING (COLUMNAR) ---
+
+def _raw_times(events, key):
+    return [(e.get(key) or {}).get('dateTime') or (e.get(key) or {}).get('date') for e in events]
+
+def _to_local(series):
+    """Vectorized ISO parsing: aware datetimes converted, naive ones treated as local time."""
+    s = pd.Series(series, dtype="object")
+    is_aware = s.str.contains(r'(?:Z|[+-]\d{2}:?\d{2})$', regex=True, na=False)
+    out = pd.Series(pd.NaT, index=s.index, dtype=f"datetime64[ns, {LOCAL_TZ}]")
+    if is_aware.any():
+        aware = pd.to_datetime(s[is_aware], utc=True, format='ISO8601', errors='coerce')
+        out[is_aware] = aware.dt.tz_convert(LOCAL_TZ)
+    naive_mask = ~is_aware & s.notna()
+    if naive_mask.any():
+        naive = pd.to_datetime(s[naive_mask], format='ISO8601', errors='coerce')
+        out[naive_mask] = naive.dt.tz_localize(LOCAL_TZ, ambiguous='NaT', nonexistent='shift_forward')
+    return out
+
+def events_to_frame(events, classify=None):
+    """
+    Loads raw Calendar events into a columnar DataFrame:
+    start/end (local tz), all_day, duration_h (capped), work_h (clipped to work window), category.
+    `classify` (titles Series, descriptions Series -> categories), by default the shared
+    EventClassifier's categorize_series.
+    """
+    if not events:
+        return pd.DataFrame(columns=['summary', 'start', 'end', 'all_day', 'duration_h', 'work_h', 'category'])
+
+    starts_raw = _raw_times(events, 'start')
+    df = pd.DataFrame({
+        'summary': [e.get('summary', '') or '' for e in events],
+        'description': [e.get('description', '') or '' for e in events],
+        'start_raw': starts_raw,
+    })
+    df['all_day'] = [bool(s) and 'T' not in s for s in starts_raw]
+    df['start'] = _to_local(starts_raw)
+    df['end'] = _to_local(_raw_times(events, 'end'))
+    df = df[df['start'].notna() & df['end'].notna()].copy()
+
+    dur = (df['end'] - df['start']).dt.total_seconds().to_numpy() / 3600.0
+    df['duration_h'] = np.clip(dur, 0, MAX_EVENT_HOURS)
+
+    # Work-hour clipping (clipped to the start day's window; multi-day spans are capped anyway)
+    weekday = df['start'].dt.weekday.to_numpy()
+    day0 = df['start'].dt.normalize()
+    win_start = day0 + pd.to_timedelta(WORK_START_HOUR, unit='h')
+    win_end = day0 + pd.to_timedelta(WORK_END_HOUR_BY_WEEKDAY[weekday], unit='h')
+    clipped_start = np.maximum(df['start'].to_numpy(), win_start.to_numpy())
+    clipped_end = np.minimum(df['end'].to_numpy(), win_end.to_numpy())
+    work = (clipped_end - clipped_start) / np.timedelta64(1, 'h')
+    df['work_h'] = np.where(df['all_day'].to_numpy(), 0.0, np.clip(work, 0, None))
+
+    if classify is None:
+        from modules.event_classifier import get_classifier
+        classify = get_classifier().categorize_series
+    df['category'] = np.asarray(classify(df['summary'], df['description']), dtype=object)
+    return df.drop(columns=['start_raw'])
+
+# --- AGGREGATION (ONE PASS) ---
+
+def _category_columns(df):
+    """CATEGORY_ORDER first, then any other category present (user-defined keywords), sorted."""
+    extra = set(df['category'].dropna()) - set(CATEGORY_ORDER) if not df.empty else set()
+    return CATEGORY_ORDER + sorted(extra)
+
+def _hour_heatmap(df):
+    """Hours busy per (weekday, hour) cell, spreading each timed event over the bins it covers."""
+    grid = np.zeros((7, 24))
+    timed = df[~df['all_day'] & (df['duration_h'] > 0)]
+    if timed.empty:
+        return grid
+
+    start_h = (timed['start'].dt.hour + timed['start'].dt.minute / 60.0).to_numpy()
+    end_h = start_h + timed['duration_h'].to_numpy()
+    weekday = timed['start'].dt.weekday.to_numpy()
+
+    first_bin = np.floor(start_h).astype(int)
+    n_bins = (np.ceil(end_h) - first_bin).astype(int).clip(min=1)
+    idx = np.repeat(np.arange(len(timed)), n_bins)
+    offset = np.arange(n_bins.sum()) - np.repeat(np.cumsum(n_bins) - n_bins, n_bins)
+    bins = first_bin[idx] + offset
+    overlap = np.minimum(end_h[idx], bins + 1) - np.maximum(start_h[idx], bins)
+
+    day = (weekday[idx] + bins // 24) % 7
+    np.add.at(grid, (day, bins % 24), np.clip(overlap, 0, 1))
+    return grid
+
+def compute_time_analytics(df, days):
+    """
+    Aggregates a loaded frame in one pass: category stats (same shape as the
+    legacy analyze_time_leaks_weekly output), week-over-week trend and hour/weekday heatmap.
+    """
+    total_hours = float(df['duration_h'].sum()) if not df.empty else 0.0
+
+    columns = _category_columns(df)
+    by_cat = df.groupby('category')['duration_h'].agg(['sum', 'count']) if not df.empty else None
+    stats = {}
+    for cat in columns:
+        hours = float(by_cat.loc[cat, 'sum']) if by_cat is not None and cat in by_cat.index else 0.0
+        count = int(by_cat.loc[cat, 'count']) if by_cat is not None and cat in by_cat.index else 0
+        stats[cat] = {
+            'hours': round(hours, 1),
+            'percentage': round((hours / total_hours * 100) if total_hours > 0 else 0, 1),
+            'count': count
+        }
+
+    weekly = pd.DataFrame()
+    trend = {}
+    if not df.empty:
+        week = df['start'].dt.tz_localize(None).dt.to_period('W-SUN').dt.start_time
+        weekly = df.assign(week=week).pivot_table(
+            index='week', columns='category', values='duration_h', aggfunc='sum', fill_value=0.0
+        ).reindex(columns=columns, fill_value=0.0)
+        weekly['total'] = weekly.sum(axis=1)
+        if len(weekly) >= 2:
+            last, prev = weekly.iloc[-1], weekly.iloc[-2]
+            trend = {col: round(float(last[col] - prev[col]), 1) for col in weekly.columns}
+
+    categories = {cat: [] for cat in columns}
+    for title, dur, cat in zip(df['summary'], df['duration_h'], df['category']):
+        categories.setdefault(cat, []).append({'title': title, 'duration': float(dur)})
+
+    work_hours = float(df['work_h'].sum()) if not df.empty else 0.0
+    return {
+        'stats': stats,
+        'total_hours': round(total_hours, 1),
+        'work_hours': round(work_hours, 1),
+        'outside_hours': round(max(total_hours - work_hours, 0.0), 1),
+        'days': days,
+        'event_count': int(len(df)),
+        'weekly': weekly,
+        'trend_wow': trend,
+        'heatmap': _hour_heatmap(df),
+        'categories': categories
+    }
+
+def summarize_for_prompt(analytics):
+    """Compact, already-aggregated text for the LLM (no raw events)."""
+    s = analytics['stats']
+    lines = [
+        f"TOTAL: {analytics['total_hours']:.1f}h ({analytics['days']} días, {analytics['event_count']} eventos)",
+        f"Dentro de jornada: {analytics['work_hours']}h | Fuera de jornada: {analytics['outside_hours']}h",
+        f"- Reuniones Internas: {s['reuniones_internas']['percentage']}% ({s['reuniones_internas']['hours']}h, {s['reuniones_internas']['count']} reuniones)",
+        f"- Reuniones Externas: {s['reuniones_externas']['percentage']}% ({s['reuniones_externas']['hours']}h)",
+        f"- Trabajo Focalizado: {s['trabajo_focalizado']['percentage']}% ({s['trabajo_focalizado']['hours']}h)",
+        f"- Admin/Otros: {s['admin']['percentage']}% + {s['otros']['percentage']}%",
+    ]
+    for cat in s:
+        if cat not in CATEGORY_ORDER:
+            lines.append(f"- {cat.replace('_', ' ').title()}: {s[cat]['percentage']}% ({s[cat]['hours']}h)")
+    if analytics['trend_wow']:
+        t = analytics['trend_wow']
+        lines.append(
+            f"Tendencia vs semana anterior: total {t['total']:+.1f}h, internas {t['reuniones_internas']:+.1f}h, "
+            f"externas {t['reuniones_externas']:+.1f}h, foco {t['trabajo_focalizado']:+.1f}h"
+        )
+    grid = analytics['heatmap']
+    if grid.any():
+        day, hour = np.unravel_index(np.argmax(grid), grid.shape)
+        lines.append(f"Franja más cargada: {WEEKDAY_LABELS[day]} {hour:02d}:00 ({grid[day, hour]:.1f}h acumuladas)")
+    return "\n".join(lines)
@@ -1,6 +1,7 @@
 import requests
 import streamlit as st
-import datetime
+
+from modules.cache_backend import get_cache_backend
 
 def get_user_location():
     """
@@ -57,8 +58,13 @@ def get_user_location():
 
 def get_weather_data(lat, lon):
     """
-    Fetches current weather from Open-Meteo.
+    Fetches current weather from Open-Meteo (shared cache per coordinates; failures are not cached).
     """
+    backend = get_cache_backend()
+    cache_key = ['open_meteo', round(lat, 2), round(lon, 2)]
+    cached = backend.get('weather', cache_key)
+    if cached is not None:
+        return cached
     try:
         url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current=temperature_2m,weather_code&timezone=auto"
         response = requests.get(url, timeout=3)
@@ -90,11 +96,13 @@ def get_weather_data(lat, lon):
                 condition = "Tormenta"
                 icon = "thunderstorm"
                 
-            return {
+            result = {
                 'temp': temp,
                 'condition': condition,
                 'icon': icon
             }
+            backend.set('weather', cache_key, result)
+            return result
     except Exception as e:
         print(f"Weather Error: {e}")
         
@@ -106,24 +114,13 @@ def get_weather_data(lat, lon):
 
 def get_dashboard_weather_context():
     """
-    Orchestrates location and weather fetching with caching to be nice to APIs.
+    Orchestrates location and weather fetching. The weather itself is cached in the shared
+    backend (get_weather_data), so every session and replica reuses one Open-Meteo call.
     """
-    # Cache key based on hour to refresh hourly
-    now_str = datetime.datetime.now().strftime('%Y-%m-%d-%H')
-    cache_key = f"weather_context_{now_str}"
-    
-    if cache_key in st.session_state:
-        return st.session_state[cache_key]
-        
-    # Fetch
     loc = get_user_location()
     weather = get_weather_data(loc['lat'], loc['lon'])
     
-    result = {
+    return {
         'location': loc,
         'weather': weather
     }
-    
-    # Save to session
-    st.session_state[cache_key] = result
-    return result
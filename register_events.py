@@ -2,12 +2,18 @@
 import os
 import datetime
 import json
+import sys
+import time
+import argparse
 import logging
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterator, List, Optional, Tuple
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from groq import Groq
 from dotenv import load_dotenv
+from modules.event_dedup import stable_event_id, insert_event_idempotent, resolve_conflict
+from modules.task_writer import is_retryable
 
 # Configure logging
 logging.basicConfig(
@@ -26,6 +32,16 @@ load_dotenv()
 SERVICE_ACCOUNT_FILE = os.getenv('GOOGLE_APPLICATION_CREDENTIALS', 'service_account.json')
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
 SCOPES = ['https://www.googleapis.com/auth/calendar']
+MIN_COMPLETION_TOKENS = 1024
+MAX_COMPLETION_TOKENS = 32768   # Model's output limit
+MIN_SPLIT_CHARS = 200           # Truncated replies of shorter texts are not split further
+
+class TruncatedReply(Exception):
+    """The model hit max_tokens: its JSON is cut off and can't be parsed."""
+
+def completion_tokens_for(text: str) -> int:
+    """Output budget for a text: the event JSON runs about one token per input character."""
+    return max(MIN_COMPLETION_TOKENS, min(MAX_COMPLETION_TOKENS, len(text)))
 
 def get_calendar_service():
     """Authenticates and returns the Google Calendar service."""
@@ -40,7 +56,7 @@ def get_calendar_service():
         logging.error(f"Error authenticating: {e}")
         raise
 
-def parse_events_with_groq(text_input: str) -> List[dict]:
+def parse_events_with_groq(text_input: str, raise_errors: bool = False) -> List[dict]:
     """Uses Groq to parse natural language text into structured event data."""
     if not GROQ_API_KEY:
         raise ValueError("GROQ_API_KEY not found in environment variables.")
@@ -86,9 +102,11 @@ def parse_events_with_groq(text_input: str) -> List[dict]:
             ],
             model="llama-3.3-70b-versatile",
             temperature=0.1,
-            max_tokens=1024,
+            max_tokens=completion_tokens_for(text_input),
         )
-        
+
+        if chat_completion.choices[0].finish_reason == 'length':
+            raise TruncatedReply(f"Reply truncated at {completion_tokens_for(text_input)} tokens ({len(text_input)} chars of input)")
         content = chat_completion.choices[0].message.content.strip()
         # Clean up if the model includes markdown code blocks despite instructions
         if content.startswith("```json"):
@@ -104,10 +122,37 @@ def parse_events_with_groq(text_input: str) -> List[dict]:
     except Exception as e:
         logging.error(f"Error parsing text with Groq: {e}")
         logging.error(f"Raw output: {content if 'content' in locals() else 'N/A'}")
+        if raise_errors:
+            raise
         return []
 
-def create_event(service, event_data: dict, calendar_id: str = 'primary'):
-    """Creates an event in the specified calendar."""
+def split_text(text: str) -> Optional[Tuple[str, str]]:
+    """Two halves of similar size, cut at a paragraph (else line) boundary. None if it can't be cut."""
+    for sep in ("\n\n", "\n"):
+        parts = text.split(sep)
+        if len(parts) < 2:
+            continue
+        sizes, total = 0, len(text)
+        for i, part in enumerate(parts[:-1]):
+            sizes += len(part) + len(sep)
+            if sizes >= total / 2:
+                break
+        return sep.join(parts[:i + 1]), sep.join(parts[i + 1:])
+    return None
+
+def parse_chunk(text: str) -> List[dict]:
+    """parse_events_with_groq, splitting the text in half (recursively) when the reply is truncated."""
+    try:
+        return parse_events_with_groq(text, raise_errors=True)
+    except TruncatedReply:
+        halves = split_text(text) if len(text) >= MIN_SPLIT_CHARS else None
+        if not halves:
+            raise
+        logging.info(f"Reply truncated: splitting a {len(text)}-character chunk in two")
+        return parse_chunk(halves[0]) + parse_chunk(halves[1])
+
+def build_event_body(event_data: dict, calendar_id: str = 'primary') -> dict:
+    """Builds the Calendar API body (with its stable ID) for a parsed event."""
     
     # Handle ISO format vs Date only format
     start = {}
@@ -123,7 +168,9 @@ def create_event(service, event_data: dict, calendar_id: str = 'primary'):
     else:
         end = {'date': event_data['end_time']}
 
-    event = {
+    return {
+        # Stable ID: re-running the script over the same input never duplicates events
+        'id': stable_event_id(calendar_id, event_data.get('summary', 'No Title'), event_data['start_time'], event_data['end_time']),
         'summary': event_data.get('summary', 'No Title'),
         'description': event_data.get('description', ''),
         'start': start,
@@ -137,14 +184,248 @@ def create_event(service, event_data: dict, calendar_id: str = 'primary'):
         }
     }
 
+def create_event(service, event_data: dict, calendar_id: str = 'primary'):
+    """Creates an event in the specified calendar."""
+    event = build_event_body(event_data, calendar_id)
+
     try:
-        created_event = service.events().insert(calendarId=calendar_id, body=event).execute()
-        logging.info(f"Event created: {created_event.get('htmlLink')}")
-        print(f"Success: Created event '{event['summary']}'")
+        created_event, is_new = insert_event_idempotent(service, calendar_id, event)
+        if is_new:
+            logging.info(f"Event created: {created_event.get('htmlLink')}")
+            print(f"Success: Created event '{event['summary']}'")
+        else:
+            logging.info(f"Event already exists: {created_event.get('htmlLink')}")
+            print(f"Skipped: Event '{event['summary']}' already exists")
     except Exception as e:
         logging.error(f"Error creating event '{event.get('summary')}': {e}")
         print(f"Error: Failed to create event '{event.get('summary')}'")
 
+
+# --- BATCH MODE ---
+
+BATCH_SIZE = 50          # Calendar batch HTTP requests per round trip (API limit: 1000)
+MAX_INSERT_RETRIES = 4
+
+def iter_paragraph_chunks(path: str, max_chars: int = 4000) -> Iterator[Tuple[int, str]]:
+    """Streams a text file as (chunk_index, text): blank-line paragraphs grouped up to max_chars."""
+    chunk, size, index = [], 0, 0
+    paragraph = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                paragraph.append(line.rstrip('\n'))
+                continue
+            if paragraph:
+                text = "\n".join(paragraph)
+                paragraph = []
+                if chunk and size + len(text) > max_chars:
+                    yield index, "\n\n".join(chunk)
+                    index += 1
+                    chunk, size = [], 0
+                chunk.append(text)
+                size += len(text)
+    if paragraph:
+        text = "\n".join(paragraph)
+        if chunk and size + len(text) > max_chars:
+            yield index, "\n\n".join(chunk)
+            index += 1
+            chunk = []
+        chunk.append(text)
+    if chunk:
+        yield index, "\n\n".join(chunk)
+
+def complete_event(event_data: dict) -> Optional[dict]:
+    """
+    Validates a parsed event, filling a missing end: 1 hour later, or the next day for all-day
+    events (Calendar's all-day end date is exclusive, so end == start is rejected). None if unusable.
+    """
+    start = event_data.get('start_time')
+    if not start or not isinstance(start, str):
+        return None
+    end = event_data.get('end_time')
+    if 'T' in start:
+        if not end:
+            try:
+                end = (datetime.datetime.fromisoformat(start) + datetime.timedelta(hours=1)).isoformat()
+            except ValueError:
+                return None
+    elif not end or ('T' not in end and end <= start):
+        try:
+            end = (datetime.date.fromisoformat(start) + datetime.timedelta(days=1)).isoformat()
+        except ValueError:
+            return None
+    event_data['end_time'] = end
+    return event_data
+
+def load_checkpoint(path: str, input_path: str, chunk_chars: int = 4000) -> dict:
+    """
+    Loads the resume state for this input file (fresh state if missing or for another file).
+    Chunk indices only line up with the same chunk size: a checkpoint saved with another
+    chunk_chars raises ValueError instead of skipping the wrong chunks.
+    """
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('input') == os.path.abspath(input_path):
+            if state.get('chunk_chars') != chunk_chars:
+                raise ValueError(f"Checkpoint {path} was saved with --chunk-chars {state.get('chunk_chars')}; "
+                                 f"re-run with that value or delete the checkpoint.")
+            return state
+    return {'input': os.path.abspath(input_path), 'chunk_chars': chunk_chars, 'done_chunks': []}
+
+def save_checkpoint(path: str, state: dict):
+    """Atomic write so an interrupted run never leaves a corrupt checkpoint."""
+    if not path:
+        return
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+def insert_events_batched(service, bodies: List[dict], calendar_id: str) -> List[Tuple[str, str]]:
+    """
+    Inserts bodies through Calendar batch HTTP requests (BATCH_SIZE per round trip).
+    A 409 (stable IDs) counts as 'exists' unless the existing copy was deleted, which is restored
+    ('created'); rate-limit 403/429 and 5xx failures are retried with backoff (is_retryable).
+
+    Returns:
+        list: (status, detail) per body, status in 'created' | 'exists' | 'error'.
+    """
+    results = [None] * len(bodies)
+    pending = list(range(len(bodies)))
+    conflicts = []
+    for attempt in range(MAX_INSERT_RETRIES):
+        retry = []
+        for start in range(0, len(pending), BATCH_SIZE):
+            group = pending[start:start + BATCH_SIZE]
+
+            def callback(request_id, response, exception):
+                idx = int(request_id)
+                if exception is None:
+                    results[idx] = ('created', response.get('htmlLink', ''))
+                    return
+                status = getattr(getattr(exception, 'resp', None), 'status', None)
+                if status == 409:
+                    conflicts.append(idx)
+                elif is_retryable(exception):
+                    retry.append(idx)
+                else:
+                    results[idx] = ('error', str(exception))
+
+            batch = service.new_batch_http_request(callback=callback)
+            for idx in group:
+                batch.add(service.events().insert(calendarId=calendar_id, body=bodies[idx]), request_id=str(idx))
+            batch.execute()
+        if not retry:
+            break
+        pending = sorted(retry)
+        time.sleep(2 ** attempt)
+    for idx in pending:
+        if results[idx] is None and idx not in conflicts:
+            results[idx] = ('error', 'rate limited')
+    for idx in sorted(conflicts):
+        # A deleted event keeps its ID as a cancelled copy: bring it back instead of skipping it
+        try:
+            event, restored = resolve_conflict(service, calendar_id, bodies[idx])
+            results[idx] = ('created', event.get('htmlLink', '')) if restored else ('exists', bodies[idx]['id'])
+        except Exception as e:
+            results[idx] = ('error', str(e))
+    return results
+
+def run_batch(input_path: str, calendar_id: str = 'primary', dry_run: bool = False, jsonl_path: Optional[str] = None,
+              checkpoint_path: Optional[str] = None, workers: int = 4, chunk_chars: int = 4000) -> dict:
+    """
+    Non-interactive import: streams the input in paragraph chunks, parses them concurrently with Groq,
+    inserts each chunk's events through batched requests and checkpoints chunks whose events were all
+    created (or already existed). Stable event IDs make re-running a half-finished chunk harmless.
+    """
+    state = load_checkpoint(checkpoint_path, input_path, chunk_chars)
+    done = set(state['done_chunks'])
+    stats = {'chunks': 0, 'events': 0, 'created': 0, 'exists': 0, 'error': 0, 'invalid': 0, 'dry_run': 0, 'failed_chunks': 0}
+    service = None if dry_run else get_calendar_service()
+    out = None
+    if jsonl_path:
+        out = sys.stdout if jsonl_path == '-' else open(jsonl_path, 'a', encoding='utf-8')
+
+    def emit(record):
+        if out:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def handle(index, events):
+        bodies, records = [], []
+        for ev in events:
+            ev = complete_event(ev) if isinstance(ev, dict) else None
+            if not ev:
+                stats['invalid'] += 1
+                continue
+            body = build_event_body(ev, calendar_id)
+            bodies.append(body)
+            records.append({'chunk': index, 'id': body['id'], 'summary': body['summary'],
+                            'start_time': ev['start_time'], 'end_time': ev['end_time']})
+        outcomes = [('dry_run', '')] * len(bodies) if dry_run else insert_events_batched(service, bodies, calendar_id)
+        for record, (status, detail) in zip(records, outcomes):
+            stats[status] += 1
+            emit(dict(record, status=status, detail=detail))
+        stats['events'] += len(bodies)
+        stats['chunks'] += 1
+        if dry_run:
+            return
+        if any(status not in ('created', 'exists') for status, _ in outcomes):
+            # Not checkpointed: the next run retries the failed events (the others answer 409)
+            stats['failed_chunks'] += 1
+        else:
+            state['done_chunks'].append(index)
+            save_checkpoint(checkpoint_path, state)
+
+    t0 = time.time()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            in_flight = {}
+            chunks = ((i, text) for i, text in iter_paragraph_chunks(input_path, chunk_chars) if i not in done)
+            exhausted = False
+            while in_flight or not exhausted:
+                # Keep a bounded window of parses in flight so huge files stay streaming
+                while not exhausted and len(in_flight) < workers * 2:
+                    nxt = next(chunks, None)
+                    if nxt is None:
+                        exhausted = True
+                        break
+                    in_flight[pool.submit(parse_chunk, nxt[1])] = nxt[0]
+                if not in_flight:
+                    break
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    index = in_flight.pop(fut)
+                    try:
+                        events = fut.result()
+                    except Exception as e:
+                        # Not checkpointed: the next run retries this chunk
+                        stats['failed_chunks'] += 1
+                        emit({'chunk': index, 'status': 'parse_error', 'detail': str(e)})
+                        continue
+                    handle(index, events)
+                elapsed = time.time() - t0
+                logging.info(f"Progress: {stats['chunks']} chunks, {stats['events']} events ({stats['events'] / max(elapsed, 1e-6):.1f} events/s)")
+    finally:
+        if out and out is not sys.stdout:
+            out.close()
+
+    elapsed = time.time() - t0
+    stats['seconds'] = round(elapsed, 2)
+    stats['events_per_second'] = round(stats['events'] / elapsed, 2) if elapsed > 0 else 0.0
+    return stats
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Google Calendar Event Registrar")
+    parser.add_argument('--batch', metavar='FILE', help="Non-interactive mode: import events from a text file")
+    parser.add_argument('--calendar', default='primary', help="Target calendar ID (default: primary)")
+    parser.add_argument('--dry-run', action='store_true', help="Parse and report without creating events")
+    parser.add_argument('--jsonl', metavar='FILE', help="Write one JSON line per event ('-' for stdout)")
+    parser.add_argument('--checkpoint', metavar='FILE', help="Resumable checkpoint (default: <input>.checkpoint.json)")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent parsing requests")
+    parser.add_argument('--chunk-chars', type=int, default=4000, help="Max characters per parsing chunk")
+    return parser.parse_args(argv)
+
 def main():
     print("--- Google Calendar Event Registrar ---")
     
@@ -190,8 +471,11 @@ def main():
         
     # 3. Process
     print("\nProcessing with AI...")
-    events = parse_events_with_groq(text_input)
-    
+    try:
+        events = parse_chunk(text_input)
+    except Exception:
+        events = []   # Already logged by parse_events_with_groq
+
     if not events:
         print("No events could be parsed.")
         return
@@ -205,4 +489,20 @@ def main():
     print("\nDone. Check the log file for details.")
 
 if __name__ == '__main__':
-    main()
+    args = parse_args()
+    if args.batch:
+        try:
+            result = run_batch(
+                args.batch, calendar_id=args.calendar, dry_run=args.dry_run, jsonl_path=args.jsonl,
+                checkpoint_path=args.checkpoint or args.batch + '.checkpoint.json',
+                workers=args.workers, chunk_chars=args.chunk_chars
+            )
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(2)
+        logging.info(f"Batch finished: {json.dumps(result)}")
+        print(f"\nDone: {result['events']} events in {result['seconds']}s ({result['events_per_second']} events/s). "
+              f"Created {result['created']}, existing {result['exists']}, errors {result['error']}, invalid {result['invalid']}, "
+              f"failed chunks {result['failed_chunks']} (re-run to resume).")
+    else:
+        main()
@@ -0,0 +1,54 @@
+"""
+Benchmark: previous body extraction (first text part + BeautifulSoup + [:800]) vs modules.mail_body.
+Run with: python tests/bench_mail_body.py
+"""
+import os
+import sys
+import glob
+import time
+import email
+import base64
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from modules.mail_body import extract_body, payload_from_message
+
+ROUNDS = 200
+
+def legacy_body(payload):
+    """The pre-mail_body path: utf-8 decode of the first text part, soup.get_text, cut at 800."""
+    def best(p):
+        for part in [p] + p.get('parts', []):
+            if part.get('mimeType') == 'text/plain' and part.get('body', {}).get('data'):
+                return base64.urlsafe_b64decode(part['body']['data']).decode(errors='replace')
+        for part in [p] + p.get('parts', []):
+            if part.get('mimeType') == 'text/html' and part.get('body', {}).get('data'):
+                return base64.urlsafe_b64decode(part['body']['data']).decode(errors='replace')
+        for part in p.get('parts', []):
+            found = best(part)
+            if found:
+                return found
+        return ""
+    return BeautifulSoup(best(payload), 'html.parser').get_text(separator=' ', strip=True)[:800]
+
+def main():
+    samples = {}
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'mime_samples', '*.eml'))):
+        with open(path, 'rb') as f:
+            samples[os.path.basename(path)] = payload_from_message(email.message_from_bytes(f.read()))
+
+    print(f"{'sample':<24}{'legacy chars':>14}{'new chars':>11}")
+    for name, payload in samples.items():
+        print(f"{name:<24}{len(legacy_body(payload)):>14}{len(extract_body(payload)):>11}")
+
+    for label, fn in (("legacy", legacy_body), ("mail_body", extract_body)):
+        t0 = time.perf_counter()
+        for _ in range(ROUNDS):
+            for payload in samples.values():
+                fn(payload)
+        elapsed = time.perf_counter() - t0
+        print(f"{label:<10} {elapsed / (ROUNDS * len(samples)) * 1e6:8.1f} µs/email")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: cold import of app.py (what every new session / script start pays before the login
+page renders) and the one-time cost of each lazily imported page dependency.
+Run with: python tests/bench_startup.py [rounds]
+Exits with status 1 when the app import exceeds IMPORT_BUDGET_MS or pulls in a heavy module.
+"""
+import os
+import sys
+import json
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROUNDS = 5
+IMPORT_BUDGET_MS = 250     # import app, on top of streamlit itself (was ~1000 ms with eager imports)
+
+# Must not be imported until a page needs them (counted only when streamlit itself didn't load them)
+HEAVY_MODULES = ('pandas', 'plotly.express', 'plotly.graph_objects', 'googleapiclient', 'google_auth_oauthlib',
+                 'groq', 'gspread', 'streamlit_gsheets', 'modules.google_services', 'modules.ai_core',
+                 'modules.chat_view', 'modules.notes_view')
+
+# Loaded on first use of a page (paid once per process, then kept in sys.modules)
+LAZY_IMPORTS = ('pandas', 'plotly.express', 'modules.google_services', 'modules.ai_core',
+                'modules.chat_view', 'modules.notes_view')
+
+PROBE = """
+import sys, time, json, logging, importlib
+logging.disable(logging.CRITICAL)
+import streamlit
+target = sys.argv[1]
+before = set(sys.modules)
+t0 = time.perf_counter()
+importlib.import_module(target)
+elapsed = (time.perf_counter() - t0) * 1000
+print(json.dumps({'ms': elapsed, 'modules': sorted(set(sys.modules) - before)}))
+"""
+
+def measure(target, setup_app=False):
+    """Fresh interpreter: ms to import `target` after streamlit (and app, for lazy imports), plus the modules it added."""
+    code = PROBE if not setup_app else PROBE.replace("import streamlit\n", "import streamlit\nimport app\n")
+    out = subprocess.run([sys.executable, '-c', code, target], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def heavy_loaded(modules):
+    return sorted(m for m in HEAVY_MODULES if m in modules)
+
+def main(rounds=ROUNDS):
+    runs = [measure('app') for _ in range(rounds)]
+    app_ms = statistics.median(r['ms'] for r in runs)
+    leaked = heavy_loaded(runs[-1]['modules'])
+
+    print(f"{'import':<40}{'median ms':>10}")
+    print(f"{'app (login page)':<40}{app_ms:>10.1f}   budget {IMPORT_BUDGET_MS} ms")
+    for target in LAZY_IMPORTS:
+        ms = statistics.median(measure(target, setup_app=True)['ms'] for _ in range(rounds))
+        print(f"{'  first use: ' + target:<40}{ms:>10.1f}")
+
+    ok = True
+    if leaked:
+        print(f"FAIL: app imports {', '.join(leaked)} at startup")
+        ok = False
+    if app_ms > IMPORT_BUDGET_MS:
+        print(f"FAIL: app import {app_ms:.1f} ms > {IMPORT_BUDGET_MS} ms")
+        ok = False
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else ROUNDS))
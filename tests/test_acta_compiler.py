@@ -0,0 +1,62 @@
+import unittest
+from modules.acta_compiler import (
+    build_acta_blocks, compile_docs_requests, split_request_batches, render_acta_docx,
+    _table_cell_index
+)
+
+SAMPLE_ACTA = {
+    "asunto": "Comité de Calidad",
+    "fecha": "05/03/2026",
+    "hora_inicio": "10:00",
+    "hora_termino": "11:30",
+    "lugar": "Sala 2",
+    "asistentes": ["Ana - Jefa", "Luis - Técnico"],
+    "tabla_puntos": ["Presupuesto", "Plazos"],
+    "desarrollo": "TEMA 1: Presupuesto\nSe revisó 😀 el avance.",
+    "acuerdos": [{"descripcion": "Enviar informe", "responsable": "Ana", "plazo": "10/03"}]
+}
+
+class TestActaCompiler(unittest.TestCase):
+
+    def test_single_insert_text(self):
+        reqs = compile_docs_requests(build_acta_blocks(SAMPLE_ACTA, "hola"))
+        inserts = [r for r in reqs if 'insertText' in r and r['insertText']['location']['index'] == 1]
+        self.assertEqual(len(inserts), 1)
+        self.assertIn("ACTA DE REUNIÓN", inserts[0]['insertText']['text'])
+
+    def test_style_ranges_use_utf16_units(self):
+        blocks = [{'type': 'paragraph', 'text': "😀", 'size': 10, 'bold': False,
+                   'align': 'START', 'color': None, 'bg': None, 'border_bottom': False}]
+        reqs = compile_docs_requests(blocks)
+        rng = reqs[1]['updateTextStyle']['range']
+        self.assertEqual((rng['startIndex'], rng['endIndex']), (1, 4))  # emoji (2) + newline
+
+    def test_adjacent_styles_are_merged(self):
+        para = {'type': 'paragraph', 'text': "• Ana", 'size': 10, 'bold': False,
+                'align': 'START', 'color': None, 'bg': None, 'border_bottom': False}
+        reqs = compile_docs_requests([dict(para), dict(para), dict(para)])
+        self.assertEqual(len([r for r in reqs if 'updateTextStyle' in r]), 1)
+        self.assertEqual(len([r for r in reqs if 'updateParagraphStyle' in r]), 0)
+
+    def test_table_cell_index(self):
+        # 2x2 table inserted at index 1: cell contents at 5, 7, 10, 12
+        self.assertEqual([_table_cell_index(1, 2, r, c) for r in range(2) for c in range(2)], [5, 7, 10, 12])
+
+    def test_batches_preserve_order(self):
+        reqs = [{'insertText': {'location': {'index': 1}, 'text': 'x' * 100}} for _ in range(10)]
+        batches = split_request_batches(reqs, max_bytes=300)
+        self.assertGreater(len(batches), 1)
+        self.assertEqual(sum(batches, []), reqs)
+
+    def test_render_docx_offline(self):
+        import io
+        from docx import Document
+        doc = Document(io.BytesIO(render_acta_docx(SAMPLE_ACTA, "Linea uno\nLinea dos")))
+        self.assertEqual(len(doc.tables), 2)
+        self.assertEqual(doc.tables[1].cell(1, 1).text, "Ana")
+        texts = [p.text for p in doc.paragraphs]
+        self.assertIn("ACTA DE REUNIÓN", texts)
+        self.assertIn("Linea dos", texts)
+
+if __name__ == '__main__':
+    unittest.main()
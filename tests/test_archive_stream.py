@@ -0,0 +1,80 @@
+import unittest
+from modules.google_services import archive_old_emails
+
+class _Req:
+    def __init__(self, fn):
+        self.fn = fn
+    def execute(self, http=None):
+        return self.fn()
+
+class FakeMailbox:
+    """Inbox whose listing shrinks as messages are archived; page tokens are plain offsets,
+    so archiving mid-stream makes later pages skip messages (like a live query)."""
+    def __init__(self, n):
+        self.inbox = [f"m{i}" for i in range(n)]
+        self.list_calls = 0
+        self.modify_calls = 0
+        self.batch_sizes = []
+
+    def users(self):
+        return self
+    def messages(self):
+        return self
+
+    def list(self, userId, q, maxResults, pageToken=None, fields=None):
+        self.list_calls += 1
+        def run():
+            start = int(pageToken or 0)
+            page = self.inbox[start:start + maxResults]
+            resp = {'messages': [{'id': m} for m in page]} if page else {}
+            if start + maxResults < len(self.inbox):
+                resp['nextPageToken'] = str(start + maxResults)
+            return resp
+        return _Req(run)
+
+    def batchModify(self, userId, body):
+        self.modify_calls += 1
+        self.batch_sizes.append(len(body['ids']))
+        def run():
+            gone = set(body['ids'])
+            self.inbox = [m for m in self.inbox if m not in gone]
+        return _Req(run)
+
+class TestArchiveStream(unittest.TestCase):
+    def test_archives_everything_in_1000_groups(self):
+        box = FakeMailbox(5200)
+        rep = archive_old_emails(box)
+        self.assertTrue(rep['done'])
+        self.assertEqual(box.inbox, [])
+        self.assertEqual(rep['archived'], 5200)
+        self.assertTrue(all(size <= 1000 for size in box.batch_sizes))
+        self.assertIn("category:promotions", rep['query'])
+
+    def test_cancel_and_resume(self):
+        box = FakeMailbox(3000)
+        checkpoints = []
+        rep = archive_old_emails(box, should_cancel=lambda: len(checkpoints) >= 2, on_progress=checkpoints.append)
+        self.assertTrue(rep['cancelled'])
+        self.assertFalse(rep['done'])
+        self.assertEqual(rep['archived'], 1000)
+        resumed = archive_old_emails(box, state=rep)
+        self.assertTrue(resumed['done'])
+        self.assertEqual(resumed['query'], rep['query'])
+        self.assertEqual(box.inbox, [])
+        self.assertEqual(resumed['archived'], 3000)
+
+    def test_empty_mailbox(self):
+        box = FakeMailbox(0)
+        rep = archive_old_emails(box)
+        self.assertTrue(rep['done'])
+        self.assertEqual((rep['archived'], box.list_calls, box.modify_calls), (0, 1, 0))
+
+    def test_error_is_reported(self):
+        box = FakeMailbox(10)
+        box.list = lambda **kw: _Req(lambda: (_ for _ in ()).throw(RuntimeError("quota")))
+        rep = archive_old_emails(box)
+        self.assertEqual(rep['error'], "quota")
+        self.assertFalse(rep['done'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import time
+import socket
+import threading
+import unittest
+import socketserver
+import modules.cache_backend as cb
+from modules.cache_backend import MemoryBackend, RedisBackend, cached, set_cache_backend
+
+class StandInServer(socketserver.ThreadingTCPServer):
+    """Local stand-in for the shared key-value server: GET / SET [PX ms] / DEL / AUTH / SELECT over RESP."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, password=None):
+        self.store = {}   # key -> (expires_at or None, value)
+        self.password = password
+        self.commands = []
+        super().__init__(('127.0.0.1', 0), _Handler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        auth = f":{self.password}@" if self.password else ""
+        return f"redis://{auth}127.0.0.1:{self.server_address[1]}/0"
+
+class _Handler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        header = self.rfile.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        server, authed = self.server, self.server.password is None
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            cmd = args[0].decode().upper()
+            server.commands.append(cmd)
+            if cmd == 'AUTH':
+                authed = args[1].decode() == server.password
+                self.wfile.write(b"+OK\r\n" if authed else b"-WRONGPASS\r\n")
+            elif not authed:
+                self.wfile.write(b"-NOAUTH\r\n")
+            elif cmd == 'SELECT':
+                self.wfile.write(b"+OK\r\n")
+            elif cmd == 'SET':
+                ttl = int(args[4]) / 1000 if len(args) > 4 and args[3].upper() == b'PX' else None
+                server.store[args[1]] = (time.time() + ttl if ttl else None, args[2])
+                self.wfile.write(b"+OK\r\n")
+            elif cmd == 'GET':
+                expires_at, value = server.store.get(args[1], (None, None))
+                if value is None or (expires_at and expires_at < time.time()):
+                    self.wfile.write(b"$-1\r\n")
+                else:
+                    self.wfile.write(b"$%d\r\n%s\r\n" % (len(value), value))
+            elif cmd == 'DEL':
+                self.wfile.write(b":%d\r\n" % (1 if server.store.pop(args[1], None) else 0))
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+LIMITS = {'test': {'ttl': 60, 'max_entries': 3, 'max_bytes': 100}}
+
+class TestMemoryBackend(unittest.TestCase):
+    def test_roundtrip_returns_copies(self):
+        backend = MemoryBackend(LIMITS)
+        value = {'plan': ['a']}
+        backend.set('test', ('k', 1), value)
+        hit = backend.get('test', ('k', 1))
+        self.assertEqual(hit, value)
+        hit['plan'].append('b')
+        self.assertEqual(backend.get('test', ('k', 1)), {'plan': ['a']})
+        self.assertIsNone(backend.get('test', 'otra'))
+
+    def test_ttl_and_lru_limits(self):
+        backend = MemoryBackend(LIMITS)
+        backend.set('test', 'corto', 1, ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(backend.get('test', 'corto'))
+        for i in range(3):
+            backend.set('test', i, i)
+        backend.get('test', 0)          # 0 is now the most recently used
+        backend.set('test', 3, 3)
+        self.assertEqual(backend.size('test'), 3)
+        self.assertIsNone(backend.get('test', 1))
+        self.assertEqual(backend.get('test', 0), 0)
+
+    def test_size_limit_and_unserializable(self):
+        backend = MemoryBackend(LIMITS)
+        self.assertFalse(backend.set('test', 'grande', 'x' * 200))
+        circular = []
+        circular.append(circular)
+        self.assertFalse(backend.set('test', 'raro', circular))
+        self.assertIsNone(backend.get('test', 'grande'))
+
+class TestRedisBackend(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer(password='clave')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_replicas_share_entries(self):
+        replica_a, replica_b = RedisBackend(self.server.url), RedisBackend(self.server.url)
+        replica_a.set('llm', ['resumen', 'texto'], {'score': 7})
+        self.assertEqual(replica_b.get('llm', ['resumen', 'texto']), {'score': 7})
+        replica_b.delete('llm', ['resumen', 'texto'])
+        self.assertIsNone(replica_a.get('llm', ['resumen', 'texto']))
+        self.assertEqual(self.server.commands[0], 'AUTH')
+
+    def test_keys_are_hashed_and_ttl_sent(self):
+        backend = RedisBackend(self.server.url)
+        backend.set('google', ['task_lists', 'ana@empresa.cl'], [{'id': 'L1'}], ttl=0.05)
+        (key,) = self.server.store
+        self.assertTrue(key.startswith(b"agent:google:"))
+        self.assertNotIn(b'ana@empresa.cl', key)
+        time.sleep(0.06)
+        self.assertIsNone(backend.get('google', ['task_lists', 'ana@empresa.cl']))
+
+    def test_unreachable_server_falls_back_to_memory(self):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        backend = RedisBackend(f"redis://127.0.0.1:{port}")
+        started = time.time()
+        backend.set('weather', 'scel', {'temp': 18})
+        self.assertEqual(backend.get('weather', 'scel'), {'temp': 18})
+        self.assertLess(time.time() - started, 2)
+        self.assertGreater(backend._down_until, time.time())
+
+class TestCachedDecorator(unittest.TestCase):
+    def tearDown(self):
+        set_cache_backend(None)
+
+    def test_calls_are_shared_through_the_backend(self):
+        server = StandInServer()
+        try:
+            calls = []
+
+            @cached('llm', ttl=60)
+            def summarize(text, mode="breve"):
+                calls.append(text)
+                return {'text': text.upper(), 'mode': mode}
+
+            set_cache_backend(RedisBackend(server.url))
+            self.assertEqual(summarize("hola"), {'text': 'HOLA', 'mode': 'breve'})
+            set_cache_backend(RedisBackend(server.url))   # Another replica
+            self.assertEqual(summarize("hola"), {'text': 'HOLA', 'mode': 'breve'})
+            summarize("hola", mode="largo")
+            self.assertEqual(calls, ["hola", "hola"])
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_default_backend_is_in_process(self):
+        set_cache_backend(None)
+        cb_url = cb._backend_url
+        cb._backend_url = lambda: None
+        try:
+            self.assertIsInstance(cb.get_cache_backend(), MemoryBackend)
+        finally:
+            cb._backend_url = cb_url
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import time
+import random
+import datetime
+import unittest
+from modules.conflict_detector import detect_conflicts, candidate_interval, describe_conflict, suggestion_range
+
+MONDAY = datetime.date(2026, 3, 2)
+NOW = datetime.datetime(2026, 3, 1, 20, 0)  # Sunday evening
+
+def at(day_offset, h, m=0):
+    return datetime.datetime.combine(MONDAY + datetime.timedelta(days=day_offset), datetime.time(h, m))
+
+def ev(summary, start, end=None):
+    return {'summary': summary, 'start_time': start.isoformat(), 'end_time': end.isoformat() if end else None}
+
+class TestConflictDetector(unittest.TestCase):
+    def test_clean_batch(self):
+        busy = [(at(0, 9), at(0, 10), 'Daily')]
+        res = detect_conflicts([ev('Revisión', at(0, 11), at(0, 12))], busy, NOW)
+        self.assertEqual(res, [None])
+
+    def test_overlap_with_busy_and_suggestion(self):
+        busy = [(at(0, 10), at(0, 11), 'Comité')]
+        res = detect_conflicts([ev('Revisión', at(0, 10, 30), at(0, 11, 30))], busy, NOW)
+        self.assertEqual(res[0]['overlaps'], ['Comité'])
+        s, e = res[0]['suggestion']
+        self.assertEqual(e - s, datetime.timedelta(hours=1))
+        self.assertEqual(s, at(0, 11, 10))  # Nearest start after the meeting plus a break
+        self.assertIn("Choca con: Comité", describe_conflict(res[0]))
+
+    def test_overlap_inside_batch(self):
+        res = detect_conflicts([ev('A', at(1, 10), at(1, 11)), ev('B', at(1, 10, 30), at(1, 11, 30))], [], NOW)
+        self.assertEqual(res[0]['overlaps'], ['B'])
+        self.assertEqual(res[1]['overlaps'], ['A'])
+        self.assertNotEqual(res[0]['suggestion'], res[1]['suggestion'])
+
+    def test_back_to_back_chain(self):
+        busy = [(at(2, 9), at(2, 10), 'Uno'), (at(2, 10), at(2, 11), 'Dos'), (at(2, 11, 5), at(2, 12), 'Tres')]
+        res = detect_conflicts([ev('Cuatro', at(2, 12), at(2, 13))], busy, NOW)
+        self.assertEqual(res[0]['overlaps'], [])
+        self.assertEqual(res[0]['chain'], (at(2, 9), at(2, 13)))
+
+    def test_out_of_hours_and_weekend(self):
+        res = detect_conflicts([ev('Tarde', at(4, 16), at(4, 17)), ev('Sábado', at(5, 10))], [], NOW)
+        self.assertEqual(res[0]['out_of_hours'], 'fuera_de_horario')  # Friday ends at 16:00
+        self.assertEqual(res[1]['out_of_hours'], 'fin_de_semana')
+        self.assertLessEqual(res[0]['suggestion'][1], at(4, 16))
+        self.assertLess(res[1]['suggestion'][0].weekday(), 5)
+
+    def test_skips_tasks_all_day_and_defaults_end(self):
+        self.assertIsNone(candidate_interval({'type': 'task', 'start_time': at(0, 10).isoformat()}))
+        self.assertIsNone(candidate_interval({'start_time': '2026-03-02'}))
+        self.assertEqual(candidate_interval({'start_time': at(0, 10).isoformat()}), (at(0, 10), at(0, 11)))
+        aware = candidate_interval({'start_time': '2026-03-02T13:00:00Z', 'end_time': '2026-03-02T14:00:00Z'})
+        self.assertEqual(aware, (at(0, 10), at(0, 11)))  # UTC-3 in March
+
+    def test_sweep_scales(self):
+        rng = random.Random(7)
+        busy = []
+        for _ in range(5000):
+            s = at(rng.randrange(5), rng.randrange(8, 18), rng.choice([0, 15, 30, 45]))
+            busy.append((s, s + datetime.timedelta(minutes=30), 'x'))
+        cands = [ev(f'c{i}', at(i % 5, 20)) for i in range(200)]  # Out of hours, no busy overlap
+        t0 = time.perf_counter()
+        res = detect_conflicts(cands, busy, NOW)
+        self.assertLess(time.perf_counter() - t0, 5)
+        self.assertTrue(all(r['out_of_hours'] for r in res))
+
+    def test_suggestion_range_covers_search_weeks(self):
+        first, last = suggestion_range([at(2, 10), at(9, 15)])
+        self.assertEqual(first, at(0, 0))                                # Monday of the earliest week
+        self.assertEqual(last, at(21, 0))                                # Two weeks after the latest week's Monday
+        self.assertIsNone(suggestion_range(['2026-03-02']))              # All-day only: nothing to search
+
+    def test_suggestion_stays_inside_fetched_window(self):
+        # Whole Monday booked: without a window the nearest slot is Tuesday, outside what was fetched
+        busy = [(at(0, 8), at(0, 20), 'Taller')]
+        cand = ev('Revisión', at(0, 10), at(0, 11))
+        self.assertEqual(detect_conflicts([cand], busy, NOW)[0]['suggestion'][0].date(), at(1, 0).date())
+        res = detect_conflicts([cand], busy, NOW, window=(at(0, 0), at(1, 0)))
+        self.assertIsNone(res[0]['suggestion'])
+
+if __name__ == '__main__':
+    unittest.main()
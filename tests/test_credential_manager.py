@@ -0,0 +1,124 @@
+import time
+import datetime
+import unittest
+from unittest import mock
+from modules.credential_manager import CredentialManager, parse_json_field, _utcnow
+
+TOKEN = {'token': 'ya29.viejo', 'refresh_token': '1//refresh', 'client_id': 'cid.apps.googleusercontent.com',
+         'client_secret': 'secreto', 'token_uri': 'https://oauth2.googleapis.com/token'}
+
+class FakeCreds:
+    """Credentials double: refresh() swaps the token and pushes expiry one hour ahead."""
+    def __init__(self, minutes_left, refresh_token='1//refresh', fail=False):
+        self.token = 'viejo'
+        self.refresh_token = refresh_token
+        self.client_id = 'cid'
+        self.expiry = _utcnow() + datetime.timedelta(minutes=minutes_left)
+        self.fail = fail
+        self.requests = []
+
+    @property
+    def expired(self):
+        return self.expiry <= _utcnow()
+
+    def refresh(self, request):
+        self.requests.append(request)
+        if self.fail:
+            raise RuntimeError("invalid_grant")
+        self.token, self.expiry = 'nuevo', _utcnow() + datetime.timedelta(hours=1)
+
+    def to_json(self):
+        return '{"token": "%s"}' % self.token
+
+def manager():
+    m = CredentialManager(['scope'], request_factory=lambda: 'req')
+    m._start = lambda: None   # No sweeper thread in tests: refresh_due() is called directly
+    return m
+
+def wait_for(predicate, timeout=2):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+class TestParseJsonField(unittest.TestCase):
+    def test_sheet_cell_variants(self):
+        self.assertEqual(parse_json_field('{"a": 1}'), {'a': 1})
+        self.assertEqual(parse_json_field('"{""a"": 1}"'), {'a': 1})
+        self.assertEqual(parse_json_field({'a': 1}), {'a': 1})
+        self.assertIsNone(parse_json_field('  '))
+        self.assertIsNone(parse_json_field('no json'))
+
+class TestCredentialManager(unittest.TestCase):
+    def test_user_token_is_parsed_once_per_grant(self):
+        m = manager()
+        first = m.user_credentials('lic-1', TOKEN)
+        self.assertIs(m.user_credentials('lic-1', dict(TOKEN, token='ya29.refrescado')), first)
+        other = m.user_credentials('lic-1', dict(TOKEN, refresh_token='1//otro'))
+        self.assertIsNot(other, first)
+
+    def test_sweep_refreshes_only_tokens_about_to_expire(self):
+        m = manager()
+        soon, later, no_refresh = FakeCreds(2), FakeCreds(50), FakeCreds(1, refresh_token=None)
+        m.put_user('ana', soon)
+        m.put_user('beto', later)
+        m.put_user('carla', no_refresh)
+        self.assertEqual(m.refresh_due(), 1)
+        self.assertEqual(soon.token, 'nuevo')
+        self.assertEqual(later.token, 'viejo')
+        # Nothing is written from the sweep: the owning session takes the new token once
+        self.assertEqual(m.take_pending('ana'), '{"token": "nuevo"}')
+        self.assertIsNone(m.take_pending('ana'))
+        self.assertIsNone(m.take_pending('beto'))
+
+    def test_ensure_fresh_backgrounds_near_expiry_and_blocks_when_expired(self):
+        m = manager()
+        near, gone = FakeCreds(2), FakeCreds(-1)
+        m.put_user('ana', near)
+        m.put_user('beto', gone)
+        m.ensure_fresh('user', 'beto')
+        self.assertEqual(gone.token, 'nuevo')          # Synchronous: the old token is unusable
+        m.ensure_fresh('user', 'ana')
+        self.assertTrue(wait_for(lambda: near.token == 'nuevo'))
+
+    def test_failed_refresh_is_not_persisted_and_forget_stops_refreshing(self):
+        m = manager()
+        broken = FakeCreds(1, fail=True)
+        m.put_user('ana', broken)
+        self.assertEqual(m.refresh_due(), 0)
+        m.forget('ana')
+        self.assertEqual(m.refresh_due(), 0)
+        self.assertEqual(len(broken.requests), 1)
+        self.assertIsNone(m.take_pending('ana'))
+
+    def test_idle_entries_are_evicted_instead_of_refreshed(self):
+        m = manager()
+        idle, active = FakeCreds(1), FakeCreds(1)
+        m.put_user('ana', idle)
+        m.put_user('beto', active)
+        m._entries[('user', 'ana')]['used'] -= m.idle_seconds + 1   # Session closed long ago
+        self.assertEqual(m.refresh_due(), 1)
+        self.assertEqual(idle.requests, [])
+        self.assertEqual(active.token, 'nuevo')
+        self.assertNotIn(('user', 'ana'), m._entries)
+
+    def test_pending_token_is_written_off_the_rerun_and_kept_on_failure(self):
+        from modules import auth, google_services
+        m = manager()
+        m.put_user('ana', FakeCreds(2))
+        m.refresh_due()
+        writes = []
+
+        def update(user, token_json, notify=True):
+            writes.append((user, token_json, notify))
+            return len(writes) > 1     # First write fails (sheet unavailable)
+        with mock.patch.object(auth, 'update_user_token', update):
+            google_services._persist_pending_token(m, 'ana')
+            google_services._RECONCILING[('token', 'ana')].join(2)
+            google_services._persist_pending_token(m, 'ana')    # Next rerun retries the same token
+            google_services._RECONCILING[('token', 'ana')].join(2)
+        self.assertEqual(writes, [('ana', '{"token": "nuevo"}', False)] * 2)
+        self.assertIsNone(m.take_pending('ana'))
+
+if __name__ == '__main__':
+    unittest.main()
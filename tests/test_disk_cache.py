@@ -0,0 +1,124 @@
+import os
+import time
+import datetime
+import tempfile
+import unittest
+from modules.disk_cache import DiskCache, is_fresh
+from modules.event_store import EventStore
+from modules.task_snapshot import TaskSnapshot
+from modules.label_manager import LabelManager
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'cache.db')
+        self.cache = DiskCache(self.path, 'secreto-de-prueba')
+
+    def tearDown(self):
+        self.cache._conn.close()
+        self.tmp.cleanup()
+
+    def test_roundtrip_returns_age(self):
+        self.cache.put('ana@empresa.cl', 'labels', 'map', {'Urgente': 'Label_1'})
+        value, age = self.cache.get('ana@empresa.cl', 'labels', 'map')
+        self.assertEqual(value, {'Urgente': 'Label_1'})
+        self.assertLess(age, 5)
+        self.assertEqual(self.cache.get('ana@empresa.cl', 'labels', 'otro'), (None, None))
+
+    def test_nothing_readable_on_disk(self):
+        self.cache.put('ana@empresa.cl', 'mail_meta', 'm1', {'subject': 'Comité confidencial'})
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        if os.path.exists(self.path + '-wal'):
+            with open(self.path + '-wal', 'rb') as f:
+                raw += f.read()
+        self.assertNotIn(b'confidencial', raw)
+        self.assertNotIn(b'ana@empresa.cl', raw)
+
+    def test_sealed_values_are_per_user(self):
+        token = self.cache.seal('ana@empresa.cl', [{'title': 'Proyecto confidencial'}])
+        self.assertNotIn('confidencial', token)
+        self.assertEqual(self.cache.unseal('ana@empresa.cl', token), [{'title': 'Proyecto confidencial'}])
+        self.assertIsNone(self.cache.unseal('beto@empresa.cl', token))
+        self.assertIsNone(self.cache.unseal('ana@empresa.cl', None))
+
+    def test_users_are_isolated(self):
+        self.cache.put('ana@empresa.cl', 'tasks', 'snapshot', {'n': 1})
+        self.assertEqual(self.cache.get('beto@empresa.cl', 'tasks', 'snapshot'), (None, None))
+        self.cache.delete_user('ana@empresa.cl')
+        self.assertEqual(self.cache.get('ana@empresa.cl', 'tasks', 'snapshot'), (None, None))
+
+    def test_other_secret_is_a_miss_and_drops_the_row(self):
+        self.cache.put('ana@empresa.cl', 'tasks', 'snapshot', {'n': 1})
+        # Same partition name is only derivable with the same secret: force it to test decryption
+        rotated = DiskCache(self.path, 'otro-secreto')
+        rotated._users['ana@empresa.cl'] = (self.cache._user('ana@empresa.cl')[0], rotated._user('x')[1])
+        self.assertEqual(rotated.get('ana@empresa.cl', 'tasks', 'snapshot'), (None, None))
+        self.assertEqual(self.cache.get('ana@empresa.cl', 'tasks', 'snapshot'), (None, None))
+        rotated._conn.close()
+
+    def test_get_many_and_delete(self):
+        self.cache.put_many('ana@empresa.cl', 'mail_meta', {f'm{i}': {'i': i} for i in range(1200)})
+        hits = self.cache.get_many('ana@empresa.cl', 'mail_meta', [f'm{i}' for i in range(1300)])
+        self.assertEqual(len(hits), 1200)
+        self.assertEqual(hits['m1199'][0], {'i': 1199})
+        self.cache.delete('ana@empresa.cl', 'mail_meta', 'm0')
+        self.assertEqual(self.cache.get('ana@empresa.cl', 'mail_meta', 'm0'), (None, None))
+        self.cache.delete('ana@empresa.cl', 'mail_meta')
+        self.assertEqual(self.cache.get_many('ana@empresa.cl', 'mail_meta', ['m1', 'm2']), {})
+
+    def test_prune_and_freshness(self):
+        self.cache.put('ana@empresa.cl', 'events', 'cal', {'n': 1})
+        self.cache._conn.execute("UPDATE entries SET stored_at = ?", (time.time() - 3600,))
+        _, age = self.cache.get('ana@empresa.cl', 'events', 'cal')
+        self.assertFalse(is_fresh('events', age))
+        self.assertTrue(is_fresh('labels', age))
+        self.assertFalse(is_fresh('events', None))
+        self.assertEqual(self.cache.prune(max_age=60), 1)
+
+    def test_requires_secret(self):
+        with self.assertRaises(ValueError):
+            DiskCache(os.path.join(self.tmp.name, 'x.db'), '')
+
+class TestWarmState(unittest.TestCase):
+    def test_event_store_state_roundtrip(self):
+        store = EventStore('cal')._load(
+            [{'id': 'w', 'summary': 'Comité', 'recurrence': ['RRULE:FREQ=WEEKLY;COUNT=3'],
+              'start': {'dateTime': '2026-03-02T10:00:00-03:00', 'timeZone': 'America/Santiago'},
+              'end': {'dateTime': '2026-03-02T11:00:00-03:00', 'timeZone': 'America/Santiago'}}],
+            datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2026, 6, 1, tzinfo=datetime.timezone.utc), 123.0)
+        warm = EventStore.from_state(_json_roundtrip(store.to_state()))
+        window = (datetime.date(2026, 3, 1), datetime.date(2026, 4, 1))
+        self.assertEqual(warm.events_between(*window), store.events_between(*window))
+        self.assertTrue(warm.covers(datetime.datetime(2026, 2, 1), datetime.datetime(2026, 3, 1)))
+        self.assertFalse(warm.is_fresh())
+
+    def test_task_snapshot_state_roundtrip(self):
+        snap = TaskSnapshot()
+        snap.lists = {'L1': 'Inbox'}
+        snap.tasks = {'t1': {'id': 't1', 'title': 'Informe', 'list_id': 'L1', 'list_title': 'Inbox',
+                             'due': '2026-03-10T00:00:00.000Z', 'parent': None}}
+        snap.synced_at = 100.0
+        warm = TaskSnapshot.from_state(_json_roundtrip(snap.to_state()))
+        self.assertEqual(warm.tasks, snap.tasks)
+        self.assertEqual(warm.synced_at, 100.0)
+        self.assertTrue(warm.needs_refresh())
+
+    def test_label_manager_restore_and_on_change(self):
+        seen = []
+        manager = LabelManager('ana@empresa.cl')
+        manager.on_change = seen.append
+        manager.restore({'urgente': 'Label_1'})
+        manager.restore({'otro': 'Label_9'})  # Ignored: already warm
+        self.assertEqual(manager._ids, {'urgente': 'Label_1'})
+        manager._changed()
+        self.assertEqual(seen, [{'urgente': 'Label_1'}])
+
+def _json_roundtrip(state):
+    """What comes back from the disk cache (JSON roundtrip)."""
+    import json
+    return json.loads(json.dumps(state, default=str))
+
+if __name__ == '__main__':
+    unittest.main()
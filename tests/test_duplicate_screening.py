@@ -0,0 +1,49 @@
+import unittest
+from modules.google_services import screen_duplicate_events
+
+class _FakeEvents:
+    def __init__(self, items):
+        self.items = items
+        self.calls = 0
+
+    def list(self, **kwargs):
+        self.calls += 1
+        return self
+
+    def execute(self):
+        return {'items': self.items}
+
+class _FakeService:
+    def __init__(self, items):
+        self._events = _FakeEvents(items)
+
+    def events(self):
+        return self._events
+
+EXISTING = [
+    {'id': 'a', 'summary': 'Reunión de Presupuesto', 'start': {'dateTime': '2026-03-02T10:00:00-03:00'}},
+    {'id': 'b', 'summary': 'Dentista', 'start': {'dateTime': '2026-03-05T16:00:00-03:00'}},
+]
+
+class TestDuplicateScreening(unittest.TestCase):
+
+    def test_single_call_for_batch(self):
+        svc = _FakeService(EXISTING)
+        candidates = [
+            {'summary': 'reunion de presupuesto', 'start_time': '2026-03-02T10:15:00-03:00'},
+            {'summary': 'Dentista', 'start_time': '2026-03-05T18:00:00-03:00'},  # >30 min away
+            {'summary': 'Almuerzo', 'start_time': '2026-03-04T13:00:00-03:00'},
+        ] * 10
+        res = screen_duplicate_events(svc, 'primary', candidates)
+        self.assertEqual(svc.events().calls, 1)
+        self.assertEqual([r['id'] if r else None for r in res[:3]], ['a', None, None])
+        self.assertEqual(len(res), 30)
+
+    def test_uses_cached_events(self):
+        svc = _FakeService([])
+        res = screen_duplicate_events(svc, 'primary', [{'summary': 'Dentista', 'start_time': '2026-03-05T16:00:00-03:00'}], existing_events=EXISTING)
+        self.assertEqual(svc.events().calls, 0)
+        self.assertEqual(res[0]['id'], 'b')
+
+if __name__ == '__main__':
+    unittest.main()
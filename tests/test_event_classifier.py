@@ -0,0 +1,44 @@
+import unittest
+from modules.event_classifier import EventClassifier, fold_text
+
+class TestEventClassifier(unittest.TestCase):
+
+    def setUp(self):
+        self.clf = EventClassifier()
+
+    def test_accent_insensitive(self):
+        self.assertEqual(fold_text("REUNIÓN Diseño"), "reunion diseño")
+        self.assertEqual(self.clf.categorize("reunion de coordinacion"), 'reuniones_internas')
+        self.assertEqual(self.clf.categorize("ANÁLISIS de datos"), 'trabajo_focalizado')
+
+    def test_word_boundaries(self):
+        # 'demo' must not fire inside 'democracia'; 'retro' not inside 'retroalimentación'
+        self.assertEqual(self.clf.categorize("Charla sobre democracia"), 'otros')
+        self.assertEqual(self.clf.categorize("retroalimentación"), 'otros')
+
+    def test_prefix_keywords(self):
+        self.assertEqual(self.clf.categorize("Visita a Clientes"), 'reuniones_externas')
+
+    def test_explanations_and_confidence(self):
+        res = self.clf.classify("Reunión con cliente", "demo del producto")
+        self.assertEqual(res['category'], 'reuniones_externas')
+        self.assertIn(('demo', 'description', 'reuniones_externas'), res['matches'])
+        self.assertLess(res['confidence'], 1.0)
+        self.assertEqual(self.clf.classify("Standup")['confidence'], 1.0)
+
+    def test_series_matches_classify(self):
+        import pandas as pd
+        rows = [("Reunión con cliente", "demo del producto"), ("Standup", ""), ("Almuerzo", None),
+                ("Charla sobre democracia", "informe"), ("Diseño UX", "reunión de equipo"), ("", "")]
+        titles = pd.Series([t for t, _ in rows], index=range(10, 16))
+        descriptions = pd.Series([d for _, d in rows], index=range(10, 16))
+        result = self.clf.categorize_series(titles, descriptions)
+        self.assertEqual(list(result.index), list(range(10, 16)))
+        self.assertEqual(list(result), [self.clf.categorize(t, d or "") for t, d in rows])
+
+    def test_user_extension(self):
+        self.clf.add_keywords('salud', ['kinesiólogo'])
+        self.assertEqual(self.clf.categorize("Hora kinesiologo"), 'salud')
+
+if __name__ == '__main__':
+    unittest.main()
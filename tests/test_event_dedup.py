@@ -0,0 +1,132 @@
+import time
+import unittest
+import datetime as dt
+from modules.event_dedup import find_duplicate_clusters, stable_event_id, insert_event_idempotent
+
+def _ev(i, summary, start, description="", created=None, attendees=None, series=None):
+    ev = {'id': str(i), 'summary': summary, 'description': description, 'start': {'dateTime': start}}
+    if created: ev['created'] = created
+    if attendees: ev['attendees'] = attendees
+    if series: ev['recurringEventId'] = series
+    return ev
+
+class _Conflict(Exception):
+    class resp:
+        status = 409
+
+class _FakeEvents:
+    def __init__(self):
+        self.store = {}
+
+    def insert(self, calendarId, body):
+        def run():
+            if body['id'] in self.store:
+                raise _Conflict()
+            self.store[body['id']] = dict(body)
+            return self.store[body['id']]
+        return type('R', (), {'execute': staticmethod(run)})
+
+    def get(self, calendarId, eventId, fields=None):
+        return type('R', (), {'execute': staticmethod(lambda: self.store[eventId])})
+
+    def update(self, calendarId, eventId, body):
+        def run():
+            self.store[eventId] = dict(body)
+            return self.store[eventId]
+        return type('R', (), {'execute': staticmethod(run)})
+
+class _FakeService:
+    def __init__(self):
+        self._events = _FakeEvents()
+
+    def events(self):
+        return self._events
+
+class TestEventDedup(unittest.TestCase):
+
+    def test_near_duplicates_clustered(self):
+        events = [
+            _ev(1, "Reunión de Presupuesto Q3", "2026-03-02T10:00:00-03:00", created="2026-01-01T00:00:00Z"),
+            _ev(2, "Reunion de presupuesto Q3.", "2026-03-02T10:15:00-03:00", created="2026-02-01T00:00:00Z"),
+            _ev(3, "Dentista", "2026-03-02T10:00:00-03:00"),
+        ]
+        clusters = find_duplicate_clusters(events)
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual(clusters[0]['survivor']['id'], '1')  # Oldest copy survives
+        self.assertEqual([d['id'] for d in clusters[0]['duplicates']], ['2'])
+
+    def test_time_blocking(self):
+        # Same title a week apart is a legitimate recurring meeting, not a duplicate
+        events = [_ev(1, "Standup", "2026-03-02T09:00:00-03:00"), _ev(2, "Standup", "2026-03-09T09:00:00-03:00")]
+        self.assertEqual(find_duplicate_clusters(events), [])
+
+    def test_chains_do_not_merge_through_neighbours(self):
+        # Each copy is within 30 min of the next, but only direct matches of the keeper join its cluster
+        events = [_ev(i, "Clase", f"2026-03-02T09:{20 * i:02d}:00-03:00") for i in range(3)]
+        clusters = find_duplicate_clusters(events)
+        self.assertTrue(all(len(c['duplicates']) == 1 for c in clusters))
+        for c in clusters:
+            shift = abs(int(c['survivor']['id']) - int(c['duplicates'][0]['id'])) * 20
+            self.assertLessEqual(shift, 30)
+
+    def test_repeated_blocks_in_a_day_are_not_duplicates(self):
+        events = [
+            _ev(1, "Atención público", "2026-03-02T09:00:00-03:00"),
+            _ev(2, "Atención público", "2026-03-02T11:00:00-03:00"),
+            _ev(3, "Reunión equipo", "2026-03-02T10:00:00-03:00"),
+            _ev(4, "Reunión equipo", "2026-03-02T15:00:00-03:00"),
+        ]
+        self.assertEqual(find_duplicate_clusters(events), [])
+
+    def test_series_instances_and_numbered_titles_are_not_duplicates(self):
+        events = [
+            _ev(1, "Clase", "2026-03-02T09:00:00-03:00", series="s1"),
+            _ev(2, "Clase", "2026-03-02T11:00:00-03:00", series="s1"),
+            _ev(3, "Sesión 3 comité", "2026-03-03T09:00:00-03:00"),
+            _ev(4, "Sesión 4 comité", "2026-03-03T11:00:00-03:00"),
+        ]
+        self.assertEqual(find_duplicate_clusters(events), [])
+
+    def test_survivor_prefers_richer_event(self):
+        events = [
+            _ev(1, "Comité", "2026-03-02T09:00:00-03:00"),
+            _ev(2, "Comité", "2026-03-02T09:00:00-03:00", attendees=[{'email': 'a@x.cl'}]),
+        ]
+        self.assertEqual(find_duplicate_clusters(events)[0]['survivor']['id'], '2')
+
+    def test_year_scale(self):
+        base = dt.datetime(2026, 1, 1, 9, tzinfo=dt.timezone.utc)
+        events = [_ev(i, f"Evento {i} proyecto", (base + dt.timedelta(hours=3 * i)).isoformat()) for i in range(2500)]
+        # One planted copy every 50 events: same title modulo case/punctuation, 30 min later
+        events += [_ev(f"d{i}", f"evento {i} proyecto.", (base + dt.timedelta(hours=3 * i, minutes=30)).isoformat())
+                   for i in range(0, 2500, 50)]
+        t0 = time.time()
+        clusters = find_duplicate_clusters(events)
+        self.assertLess(time.time() - t0, 5)
+        found = sorted((c['survivor']['id'], [d['id'] for d in c['duplicates']]) for c in clusters)
+        self.assertEqual(found, sorted((str(i), [f"d{i}"]) for i in range(0, 2500, 50)))
+
+class TestStableEventId(unittest.TestCase):
+
+    def test_normalized_and_valid(self):
+        a = stable_event_id('primary', "Reunión  Presupuesto", "2026-03-02T10:00:00", "2026-03-02T11:00:00")
+        b = stable_event_id('PRIMARY', "reunion presupuesto", "2026-03-02T13:00:00Z", "2026-03-02T14:00:00+00:00")
+        self.assertEqual(a, b)  # Naive times are Santiago (UTC-3 in March)
+        self.assertRegex(a, r'^[0-9a-v]{5,1024}$')
+        self.assertNotEqual(a, stable_event_id('otro@x.cl', "Reunión Presupuesto", "2026-03-02T10:00:00", "2026-03-02T11:00:00"))
+
+    def test_conflict_is_success_and_restores_cancelled(self):
+        svc = _FakeService()
+        body = {'id': stable_event_id('primary', 'x', '2026-03-02', '2026-03-03'), 'summary': 'x'}
+        _, created = insert_event_idempotent(svc, 'primary', body)
+        self.assertTrue(created)
+        _, created = insert_event_idempotent(svc, 'primary', body)
+        self.assertFalse(created)
+        svc.events().store[body['id']]['status'] = 'cancelled'
+        ev, created = insert_event_idempotent(svc, 'primary', body)
+        self.assertTrue(created)
+        self.assertEqual(ev['status'], 'confirmed')
+        self.assertEqual(len(svc.events().store), 1)
+
+if __name__ == '__main__':
+    unittest.main()
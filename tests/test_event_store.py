@@ -0,0 +1,96 @@
+import datetime
+import unittest
+from modules.event_store import EventStore
+
+class _Req:
+    def __init__(self, res):
+        self.res = res
+    def execute(self):
+        return self.res
+
+class FakeCalendar:
+    """events().list fake with pagination; records the kwargs of each call."""
+    def __init__(self, items, page=2500):
+        self.items, self.page, self.calls = items, page, []
+    def events(self):
+        return self
+    def list(self, pageToken=None, **kw):
+        self.calls.append(kw)
+        start = int(pageToken or 0)
+        res = {'items': self.items[start:start + self.page]}
+        if start + self.page < len(self.items):
+            res['nextPageToken'] = str(start + self.page)
+        return _Req(res)
+
+WEEKLY = {
+    'id': 'weekly', 'summary': 'Comité', 'status': 'confirmed',
+    'start': {'dateTime': '2026-03-02T10:00:00-03:00', 'timeZone': 'America/Santiago'},
+    'end': {'dateTime': '2026-03-02T11:00:00-03:00', 'timeZone': 'America/Santiago'},
+    'recurrence': ['RRULE:FREQ=WEEKLY;BYDAY=MO;UNTIL=20260601T035959Z',
+                   'EXDATE;TZID=America/Santiago:20260316T100000'],
+}
+
+def sync(items, page=2500):
+    cal = FakeCalendar(items, page)
+    store = EventStore('cal').sync(cal, datetime.date(2026, 1, 1), datetime.date(2027, 1, 1))
+    return store, cal
+
+class TestEventStore(unittest.TestCase):
+    def test_fetches_masters_without_single_events(self):
+        store, cal = sync([WEEKLY])
+        self.assertFalse(cal.calls[0]['singleEvents'])
+        self.assertEqual(store.downloaded, 1)
+        self.assertEqual(len(store.masters), 1)
+
+    def test_expands_only_the_requested_window(self):
+        store, _ = sync([WEEKLY])
+        march = store.events_between(datetime.date(2026, 3, 1), datetime.date(2026, 4, 1))
+        # 2, 9, 23, 30 (16 is an EXDATE)
+        self.assertEqual([e['start']['dateTime'][:10] for e in march], ['2026-03-02', '2026-03-09', '2026-03-23', '2026-03-30'])
+        self.assertEqual(march[0]['id'], 'weekly_20260302T130000Z')
+        self.assertEqual(march[0]['recurringEventId'], 'weekly')
+        self.assertNotIn('recurrence', march[0])
+        self.assertEqual(store.events_between(datetime.date(2026, 7, 1), datetime.date(2026, 8, 1)), [])  # After UNTIL
+
+    def test_dst_keeps_wall_clock(self):
+        store, _ = sync([WEEKLY])
+        # Chile leaves DST on 2026-04-05: the 10:00 meeting moves from -03:00 to -04:00
+        april = store.events_between(datetime.date(2026, 4, 6), datetime.date(2026, 4, 7))
+        self.assertEqual(april[0]['start']['dateTime'], '2026-04-06T10:00:00-04:00')
+
+    def test_exceptions_move_and_cancel(self):
+        moved = {'id': 'weekly_20260309T130000Z', 'recurringEventId': 'weekly', 'summary': 'Comité (movido)',
+                 'originalStartTime': {'dateTime': '2026-03-09T10:00:00-03:00'},
+                 'start': {'dateTime': '2026-03-10T15:00:00-03:00'}, 'end': {'dateTime': '2026-03-10T16:00:00-03:00'}}
+        cancelled = {'id': 'weekly_20260323T130000Z', 'recurringEventId': 'weekly', 'status': 'cancelled',
+                     'originalStartTime': {'dateTime': '2026-03-23T13:00:00Z'}}
+        store, _ = sync([WEEKLY, moved, cancelled])
+        march = store.events_between(datetime.date(2026, 3, 1), datetime.date(2026, 4, 1))
+        self.assertEqual([e['summary'] for e in march], ['Comité', 'Comité (movido)', 'Comité'])
+        self.assertEqual(march[1]['start']['dateTime'], '2026-03-10T15:00:00-03:00')
+
+    def test_single_and_all_day_events(self):
+        single = {'id': 's1', 'summary': 'Auditoría', 'start': {'dateTime': '2026-03-04T09:00:00-03:00'},
+                  'end': {'dateTime': '2026-03-04T12:00:00-03:00'}}
+        yearly = {'id': 'y1', 'summary': 'Aniversario', 'start': {'date': '2025-03-05'}, 'end': {'date': '2025-03-06'},
+                  'recurrence': ['RRULE:FREQ=YEARLY;UNTIL=20300101']}
+        store, _ = sync([single, yearly])
+        week = store.events_between(datetime.date(2026, 3, 2), datetime.date(2026, 3, 9))
+        self.assertEqual([e['summary'] for e in week], ['Auditoría', 'Aniversario'])
+        self.assertEqual(week[1]['start'], {'date': '2026-03-05'})
+        self.assertEqual(week[1]['id'], 'y1_20260305')
+
+    def test_reads_every_page(self):
+        items = [{'id': f'e{i}', 'summary': str(i), 'start': {'dateTime': f'2026-05-{1 + i % 28:02d}T10:00:00-04:00'},
+                  'end': {'dateTime': f'2026-05-{1 + i % 28:02d}T10:30:00-04:00'}} for i in range(5000)]
+        store, cal = sync(items, page=2500)
+        self.assertEqual(len(cal.calls), 2)
+        self.assertEqual(len(store.events_between(datetime.date(2026, 5, 1), datetime.date(2026, 6, 1))), 5000)
+
+    def test_covers(self):
+        store, _ = sync([])
+        self.assertTrue(store.covers(datetime.datetime(2026, 2, 1), datetime.datetime(2026, 3, 1)))
+        self.assertFalse(store.covers(datetime.datetime(2025, 12, 1), datetime.datetime(2026, 3, 1)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import warnings
+import unittest
+import modules.field_profiles as fp
+from modules.field_profiles import FIELD_PROFILES, list_fields, get_fields, top_level_fields, watch_fields
+
+EVENT = {'id': 'e1', 'summary': 'Comité de gestión', 'description': 'Revisión mensual',
+         'start': {'dateTime': '2026-03-02T10:00:00-03:00'}, 'end': {'dateTime': '2026-03-02T11:00:00-03:00'},
+         'created': '2026-02-01T10:00:00Z', 'location': 'Sala 1', 'attendees': [{'email': 'a@b.cl'}],
+         'colorId': '7', 'status': 'confirmed', 'transparency': 'opaque'}
+
+def trimmed(item, profile):
+    """What the API returns for `item` under the profile's mask (top level only)."""
+    return {k: v for k, v in item.items() if k in top_level_fields(profile)}
+
+class TestFieldProfiles(unittest.TestCase):
+    def setUp(self):
+        fp._REPORTED.clear()
+
+    def test_masks(self):
+        self.assertEqual(list_fields('event_ids'), "nextPageToken,items(id)")
+        self.assertEqual(list_fields('message_refs', 'messages'), "nextPageToken,messages(id,threadId)")
+        self.assertEqual(get_fields('labels'), "id,name")
+
+    def test_profiles_are_well_formed(self):
+        for name, fields in FIELD_PROFILES.items():
+            self.assertEqual(fields.count('('), fields.count(')'), name)
+            self.assertNotIn('', top_level_fields(name), name)
+        self.assertEqual(top_level_fields('message_full'), {'id', 'threadId', 'internalDate', 'payload'})
+        self.assertEqual(top_level_fields('message_triage'), {'id', 'threadId', 'internalDate', 'snippet', 'labelIds', 'payload'})
+
+    def test_passthrough_outside_debug(self):
+        items = [dict(EVENT)]
+        self.assertIs(watch_fields(items, 'chat_events', debug=False), items)
+
+    def test_warns_once_on_reads_outside_profile(self):
+        item = watch_fields(trimmed(EVENT, 'chat_events'), 'chat_events', debug=True)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            item.get('summary')
+            item.get('description')
+            item.get('description')
+            'location' in item
+        self.assertEqual(len(caught), 2)
+        self.assertIn("'description'", str(caught[0].message))
+
+    def test_profiles_cover_their_consumers(self):
+        from modules.time_analytics import events_to_frame
+        from modules.event_classifier import EventClassifier
+        from modules.event_dedup import find_duplicate_clusters
+        from modules.scheduler import busy_from_events
+        from modules.mail_triage import score_email
+
+        meta = {'id': 'm1', 'threadId': 't1', 'internalDate': '1', 'snippet': 'reunión', 'labelIds': ['INBOX'],
+                'payload': {'headers': [{'name': 'From', 'value': 'a@b.cl'}, {'name': 'Subject', 'value': 'Comité'}]}}
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            events_to_frame(watch_fields([trimmed(EVENT, 'insights_events')], 'insights_events', debug=True),
+                            EventClassifier(keywords={'admin': ['comite']}).categorize_series)
+            find_duplicate_clusters(watch_fields([trimmed(EVENT, 'dedup_events')] * 2, 'dedup_events', debug=True))
+            busy_from_events(watch_fields([trimmed(EVENT, 'conflict_window')], 'conflict_window', debug=True))
+            score_email(watch_fields(meta, 'message_triage', debug=True))
+        self.assertEqual([str(w.message) for w in caught], [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from modules.ical_parser import parse_ics, ics_to_candidates, is_ics_part, unique_vevents
+
+OUTLOOK_INVITE = "\r\n".join([
+    "BEGIN:VCALENDAR",
+    "METHOD:REQUEST",
+    "BEGIN:VTIMEZONE",
+    "TZID:Pacific SA Standard Time",
+    "BEGIN:STANDARD",
+    "DTSTART:16010101T000000",
+    "END:STANDARD",
+    "END:VTIMEZONE",
+    "BEGIN:VEVENT",
+    "UID:abc-123",
+    "SUMMARY:Comité de Calidad\\, sesión mensual",
+    "DESCRIPTION:Revisar indicadores.\\nTraer informe.",
+    "LOCATION:Sala 2",
+    "ORGANIZER;CN=\"Ana: Jefa\":mailto:ana@x.cl",
+    "DTSTART;TZID=Pacific SA Standard Time:20260302T100000",
+    "DTEND;TZID=Pacific SA Standard Time:20260302T113000",
+    "RRULE:FREQ=MONTHLY;BYDAY=1MO;COUNT=6",
+    "EXDATE;TZID=Pacific SA Standard Time:20260406T100000",
+    "BEGIN:VALARM",
+    "TRIGGER:-PT15M",
+    "DESCRIPTION:Recordatorio",
+    "END:VALARM",
+    "END:VEVENT",
+    "END:VCALENDAR",
+])
+
+class TestIcalParser(unittest.TestCase):
+
+    def test_outlook_invite(self):
+        ev = parse_ics(OUTLOOK_INVITE)[0]
+        self.assertEqual(ev['summary'], "Comité de Calidad, sesión mensual")
+        self.assertEqual(ev['description'], "Revisar indicadores.\nTraer informe.")  # VALARM text ignored
+        self.assertEqual((ev['start_time'], ev['end_time']), ("2026-03-02T10:00:00", "2026-03-02T11:30:00"))
+        self.assertEqual(ev['organizer'], "ana@x.cl")
+        self.assertEqual(ev['recurrence'], ["RRULE:FREQ=MONTHLY;BYDAY=1MO;COUNT=6",
+                                            "EXDATE;TZID=America/Santiago:20260406T100000"])
+
+    def test_utc_folding_and_duration(self):
+        text = "BEGIN:VEVENT\nSUMMARY:Demo con cli\n ente\nDTSTART:20260115T130000Z\nDURATION:PT45M\nEND:VEVENT"
+        ev = parse_ics(text)[0]
+        self.assertEqual(ev['summary'], "Demo con cliente")
+        # 13:00Z is 10:00 in Santiago (UTC-3 in January)
+        self.assertEqual((ev['start_time'], ev['end_time']), ("2026-01-15T10:00:00", "2026-01-15T10:45:00"))
+
+    def test_all_day_and_cancel(self):
+        text = "METHOD:CANCEL\nBEGIN:VEVENT\nSUMMARY:Feriado\nDTSTART;VALUE=DATE:20260918\nEND:VEVENT"
+        ev = parse_ics(text)[0]
+        self.assertTrue(ev['all_day'])
+        self.assertEqual(ics_to_candidates([ev], {'id': 'm1', 'subject': 'x'}), [])
+
+    def test_candidate_shape(self):
+        items = ics_to_candidates(parse_ics(OUTLOOK_INVITE), {'id': 'm1', 'threadId': 't1', 'subject': 'Invitación'})
+        self.assertEqual(items[0]['id'], 'm1')
+        self.assertEqual(items[0]['type'], 'event')
+        self.assertIn("Sala 2", items[0]['description'])
+        self.assertTrue(is_ics_part({'mimeType': 'application/octet-stream', 'filename': 'invite.ICS'}))
+
+    def test_inline_part_and_attachment_count_once(self):
+        moved = OUTLOOK_INVITE.replace("RRULE:FREQ=MONTHLY;BYDAY=1MO;COUNT=6\r\n", "RECURRENCE-ID;TZID=Pacific SA Standard Time:20260504T100000\r\n")
+        moved = moved.replace("20260302T1", "20260505T1")
+        vevents = parse_ics(OUTLOOK_INVITE) + parse_ics(OUTLOOK_INVITE) + parse_ics(moved)
+        unique = unique_vevents(vevents)
+        self.assertEqual(len(unique), 2)   # The series once, plus its moved occurrence
+        self.assertEqual(sorted(ev['recurrence_id'] for ev in unique), ['', '20260504T100000'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+from modules.label_manager import LabelManager, batch_modify, get_label_manager, invalidate_label_cache
+
+class _Req:
+    def __init__(self, fn):
+        self.fn = fn
+    def execute(self):
+        return self.fn()
+
+class FakeGmail:
+    """Minimal users().labels()/messages() fake that records every API call."""
+    def __init__(self, labels):
+        self.labels_store = dict(labels)  # name -> id
+        self.log = []
+        self.modified = {}
+
+    def users(self):
+        return self
+    def labels(self):
+        return self
+    def messages(self):
+        return self
+
+    def list(self, userId, fields=None):
+        self.log.append('list')
+        return _Req(lambda: {'labels': [{'name': n, 'id': i} for n, i in self.labels_store.items()]})
+
+    def create(self, userId, body):
+        self.log.append('create')
+        def run():
+            lid = f"Label_{len(self.labels_store) + 1}"
+            self.labels_store[body['name']] = lid
+            return {'id': lid, 'name': body['name']}
+        return _Req(run)
+
+    def batchModify(self, userId, body):
+        self.log.append('batchModify')
+        def run():
+            for mid in body['ids']:
+                self.modified.setdefault(mid, set()).update(body.get('addLabelIds', []))
+            return None
+        return _Req(run)
+
+class TestLabelManager(unittest.TestCase):
+    def test_cache_lists_once(self):
+        svc = FakeGmail({'@GTD/1-Acción': 'L1', '@GTD/3-Leer': 'L3'})
+        mgr = LabelManager('a@x.cl')
+        names = ["@GTD/1-Acción", "@GTD/2-Espera", "@GTD/3-Leer", "@GTD/4-Fiscal"]
+        ids = mgr.ensure_labels(svc, names)
+        self.assertEqual(set(ids), set(names))
+        self.assertEqual(svc.log, ['list', 'create', 'create'])
+        svc.log.clear()
+        self.assertEqual(mgr.ensure_labels(svc, names), ids)
+        self.assertEqual(svc.log, [])
+
+    def test_invalidate_relists(self):
+        svc = FakeGmail({'A': 'L1'})
+        mgr = LabelManager('a@x.cl')
+        mgr.label_id(svc, 'a')
+        svc.labels_store['A'] = 'L9'  # Renamed/recreated elsewhere
+        mgr.invalidate()
+        self.assertEqual(mgr.label_id(svc, 'A'), 'L9')
+        self.assertEqual(svc.log.count('list'), 2)
+
+    def test_tagging_50_emails_is_grouped(self):
+        svc = FakeGmail({'@GTD/1-Acción': 'L1', '@GTD/3-Leer': 'L3', '@GTD/4-Fiscal': 'L4'})
+        mgr = LabelManager('a@x.cl')
+        mgr.ensure_labels(svc, ['@GTD/1-Acción', '@GTD/3-Leer', '@GTD/4-Fiscal'])
+        svc.log.clear()
+        groups = {}
+        for i in range(50):
+            groups.setdefault(['L1', 'L3', 'L4'][i % 3], []).append(f"m{i}")
+        applied = mgr.apply(svc, groups)
+        self.assertEqual(sum(applied.values()), 50)
+        self.assertEqual(svc.log, ['batchModify'] * 3)
+        self.assertEqual(svc.modified['m4'], {'L3'})
+
+    def test_batch_modify_chunks_and_dedupes(self):
+        svc = FakeGmail({})
+        ids = [f"m{i}" for i in range(2500)] + ['m0', None]
+        self.assertEqual(batch_modify(svc, ids, remove_ids=['INBOX']), 3)
+        self.assertEqual(len(svc.modified), 2500)
+
+    def test_registry_per_account(self):
+        a = get_label_manager('test-a@x.cl')
+        self.assertIs(a, get_label_manager('test-a@x.cl'))
+        self.assertIsNot(a, get_label_manager('test-b@x.cl'))
+        a._ids = {'x': '1'}
+        invalidate_label_cache('test-a@x.cl')
+        self.assertIsNone(a._ids)
+
+    def test_unknown_account_is_never_shared(self):
+        a, b = get_label_manager(None), get_label_manager('')
+        a._ids = {'x': 'Label_1'}
+        self.assertIsNot(a, b)
+        self.assertIsNone(get_label_manager(None)._ids)
+
+if __name__ == '__main__':
+    unittest.main()
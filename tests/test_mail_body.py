@@ -0,0 +1,84 @@
+import os
+import email
+import base64
+import unittest
+from modules.mail_body import extract_body, extract_text, html_to_text, decode_part, payload_from_message, strip_quoted
+
+SAMPLES = os.path.join(os.path.dirname(__file__), 'mime_samples')
+
+def load_sample(name):
+    with open(os.path.join(SAMPLES, name), 'rb') as f:
+        return payload_from_message(email.message_from_bytes(f.read()))
+
+class TestMailBodySamples(unittest.TestCase):
+    def test_gmail_reply_drops_quote_and_signature(self):
+        body = extract_body(load_sample('gmail_reply.eml'))
+        self.assertTrue(body.startswith("Marcela, confirmo asistencia"))
+        self.assertNotIn("escribió", body)
+        self.assertNotIn("Carlos Muñoz", body)
+        self.assertNotIn("ANUAL año 2026", body)
+
+    def test_outlook_reply_cuts_at_reply_header(self):
+        body = extract_body(load_sample('outlook_reply.eml'))
+        self.assertIn("viernes 6 de febrero a las 10:00", body)
+        self.assertNotIn("Texto anterior", body)
+        self.assertNotIn("Dirección Cesfam", body)
+
+    def test_forward_keeps_forwarded_body(self):
+        body = extract_body(load_sample('forwarded.eml'))
+        self.assertTrue(body.startswith("FYI, agendar por favor."))
+        self.assertIn("martes 20 de enero a las 14:30", body)
+        self.assertNotIn("Subject:", body)
+
+    def test_latin1_plain_text_signature(self):
+        body = extract_body(load_sample('latin1_signature.eml'))
+        self.assertIn("capacitación de mañana", body)
+        self.assertNotIn("Juan Pérez", body)
+
+    def test_mobile_signature_and_quote(self):
+        self.assertEqual(extract_body(load_sample('mobile_reply.eml')), "Ok, nos vemos el lunes a las 15:00.")
+
+    def test_newsletter_html_only(self):
+        body = extract_body(load_sample('newsletter.eml'))
+        self.assertIn("Producto 0", body)
+        self.assertNotIn("var x", body)
+        self.assertLessEqual(len(body), 800)
+
+    def test_new_content_survives_long_quote(self):
+        """Truncation happens after stripping: a short reply over a long quote is kept whole."""
+        payload = load_sample('gmail_reply.eml')
+        self.assertIn("capacitaciones pendientes", extract_body(payload, max_chars=200))
+
+class TestMailBodyHelpers(unittest.TestCase):
+    def test_decode_part_wrong_charset_falls_back(self):
+        raw = "Reunión mañana".encode('utf-8')
+        part = {'headers': [{'name': 'Content-Type', 'value': 'text/plain; charset="us-ascii"'}],
+                'body': {'data': base64.urlsafe_b64encode(raw).decode().rstrip('=')}}
+        self.assertEqual(decode_part(part), "Reunión mañana")
+
+    def test_html_in_text_plain(self):
+        raw = "<div>Hola<br>equipo</div>".encode('utf-8')
+        payload = {'mimeType': 'text/plain', 'body': {'data': base64.urlsafe_b64encode(raw).decode()}}
+        self.assertEqual(extract_text(payload), "Hola\nequipo")
+
+    def test_html_to_text_block_breaks(self):
+        text = html_to_text("<p>Uno</p><p>Dos</p><script>x()</script>")
+        self.assertEqual(text.split(), ["Uno", "Dos"])
+
+    def test_long_sign_off_tail_is_kept(self):
+        lines = ["Gracias", "Pero necesito que revisen el informe completo antes del viernes, " * 2]
+        self.assertEqual(strip_quoted(lines), lines)
+
+    def test_thanks_near_the_top_keeps_the_message(self):
+        lines = "Hola equipo,\nGracias.\nLa reunión queda para el martes 10:00 en sala 3.\nConfirmen asistencia.".split("\n")
+        self.assertEqual(strip_quoted(lines), lines)
+
+    def test_sign_off_with_contact_block_is_cut(self):
+        lines = ["Nos vemos el martes.", "", "Saludos,", "Ana Pérez", "Jefa de Proyectos", "+56 9 1234 5678", "www.empresa.cl"]
+        self.assertEqual(strip_quoted(lines), ["Nos vemos el martes."])
+
+    def test_empty_payload(self):
+        self.assertEqual(extract_body({'mimeType': 'multipart/mixed', 'parts': []}), "")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from unittest import mock
+from modules import google_services
+from modules.mail_triage import score_email, triage_messages, build_sender_history
+
+def _meta(msg_id, sender, subject, extra_headers=None, labels=None, snippet=""):
+    headers = [{'name': 'From', 'value': sender}, {'name': 'Subject', 'value': subject}]
+    headers += [{'name': k, 'value': v} for k, v in (extra_headers or {}).items()]
+    return {'id': msg_id, 'snippet': snippet, 'labelIds': labels or ['INBOX'], 'payload': {'headers': headers}}
+
+class TestMailTriage(unittest.TestCase):
+
+    def test_newsletter_skipped(self):
+        meta = _meta('1', 'Tienda <no-reply@tienda.cl>', '¡50% de descuento solo hoy!', {'List-Unsubscribe': '<mailto:u@t.cl>'})
+        score, reasons = score_email(meta)
+        self.assertLess(score, 0.5)
+        self.assertEqual(reasons[0], 'boletin')
+
+    def test_bulk_precedence_alone_skips(self):
+        self.assertLess(score_email(_meta('1', 'a@x.cl', 'Aviso', {'Precedence': 'bulk'}))[0], 0.5)
+
+    def test_scheduling_mail_kept_even_from_list(self):
+        meta = _meta('1', 'Comité <comite@salud.cl>', 'Citación reunión comité', {'List-Id': '<comite.salud.cl>'})
+        self.assertGreaterEqual(score_email(meta)[0], 0.5)
+
+    def test_sender_history(self):
+        history = build_sender_history([{'f': 'boss@x.cl', 'a': 1}, {'f': 'boss@x.cl', 'a': 1},
+                                        {'f': 'spam@y.cl'}, {'f': 'spam@y.cl'}, {'f': 'spam@y.cl'}])
+        self.assertEqual(history['boss@x.cl'], (2, 2))
+        keep, counts, skipped = triage_messages([
+            _meta('1', 'Jefe <boss@x.cl>', 'Hola', {'List-Unsubscribe': 'x'}, labels=['CATEGORY_UPDATES']),
+            _meta('2', 'spam@y.cl', 'Novedades', labels=['CATEGORY_UPDATES']),
+        ], history)
+        self.assertEqual([m['id'] for m in keep], ['1'])
+        self.assertEqual(counts, {'historial_sin_accion': 1})
+        self.assertEqual(skipped[0]['id'], '2')
+
+    def test_spanish_verb_sale_is_not_promotional(self):
+        self.assertNotIn('promocional', score_email(_meta('1', 'ana@x.cl', 'Sale el vuelo hoy a las 18:00'))[1])
+
+class _FakeMessages:
+    """messages().list over pages of `page` ids, newest first."""
+    def __init__(self, ids, page):
+        self.ids, self.page, self.calls = ids, page, []
+
+    def list(self, userId, q, maxResults, pageToken=None, fields=None):
+        self.calls.append(pageToken)
+        start = int(pageToken or 0)
+        chunk = self.ids[start:start + self.page]
+        result = {'messages': [{'id': i} for i in chunk]}
+        if start + self.page < len(self.ids):
+            result['nextPageToken'] = str(start + self.page)
+        return mock.Mock(execute=lambda: result)
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+class TestTriagedFetch(unittest.TestCase):
+    def fetch(self, service, **kwargs):
+        def metadata(svc, messages):
+            # 'n*' ids are bulk newsletters, 'r*' ids real mail
+            return [_meta(m['id'], 'news@tienda.cl', 'Boletín', {'Precedence': 'bulk'}) if m['id'].startswith('n')
+                    else _meta(m['id'], 'ana@x.cl', 'Reunión') for m in messages]
+        with mock.patch.object(google_services, '_fetch_metadata', metadata), \
+                mock.patch.object(google_services, '_hydrate_email', lambda svc, meta: {'id': meta['id']}):
+            return google_services.fetch_emails_triaged(service, max_results=3, **kwargs)
+
+    def test_pages_past_skipped_messages(self):
+        service = _FakeMessages(['n1', 'n2', 'n3', 'n4', 'r1', 'n5', 'r2', 'r3', 'r4'], page=3)
+        emails, report = self.fetch(service)
+        self.assertEqual([e['id'] for e in emails], ['r1', 'r2', 'r3'])
+        self.assertEqual(service.calls, [None, '3', '6'])
+        self.assertEqual(report['skipped_counts'], {'masivo': 5})
+
+    def test_processed_ids_do_not_fill_the_window(self):
+        service = _FakeMessages(['r1', 'r2', 'r3', 'r4'], page=3)
+        emails, report = self.fetch(service, skip_ids={'r1', 'r2', 'r3'})
+        self.assertEqual([e['id'] for e in emails], ['r4'])
+        self.assertEqual(report['listed'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,218 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import register_events as re_mod
+
+class _HttpError(Exception):
+    def __init__(self, status, reason=''):
+        super().__init__(f"HTTP {status}")
+        self.resp = type('Resp', (), {'status': status})()
+        self.content = ('{"error": {"errors": [{"reason": "%s"}]}}' % reason).encode()
+
+class _FakeBatch:
+    def __init__(self, service, callback):
+        self.service, self.callback, self.items = service, callback, []
+
+    def add(self, request, request_id):
+        self.items.append((request_id, request))
+
+    def execute(self):
+        self.service.round_trips += 1
+        for request_id, body in self.items:
+            try:
+                self.callback(request_id, self.service.insert(body), None)
+            except _HttpError as e:
+                self.callback(request_id, None, e)
+
+class _Call:
+    def __init__(self, fn):
+        self.execute = fn
+
+class _FakeService:
+    """
+    Calendar double: events().insert returns the body (run by new_batch_http_request, in order);
+    events().get / update act on the stored copies directly.
+    """
+    def __init__(self, failures=None):
+        self.store = {}
+        self.round_trips = 0
+        self.failures = dict(failures or {})   # summary -> list of statuses / (status, reason) raised before succeeding
+
+    def events(self):
+        service = self
+
+        class Events:
+            def insert(self, calendarId, body):
+                return body
+
+            def get(self, calendarId, eventId, fields=None):
+                return _Call(lambda: dict(service.store[eventId]))
+
+            def update(self, calendarId, eventId, body):
+                service.store[eventId] = body
+                return _Call(lambda: {'htmlLink': 'https://calendar/' + eventId})
+        return Events()
+
+    def new_batch_http_request(self, callback):
+        return _FakeBatch(self, callback)
+
+    def insert(self, body):
+        queued = self.failures.get(body['summary'])
+        if queued:
+            failure = queued.pop(0)
+            raise _HttpError(*failure) if isinstance(failure, tuple) else _HttpError(failure)
+        if body['id'] in self.store:
+            raise _HttpError(409)
+        self.store[body['id']] = body
+        return {'htmlLink': 'https://calendar/' + body['id']}
+
+def _event(summary, start, end=None):
+    return {'summary': summary, 'start_time': start, 'end_time': end}
+
+class TestChunksAndEvents(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, text):
+        path = os.path.join(self.dir, 'input.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_paragraph_chunks_respect_max_chars(self):
+        path = self.write("a1\na2\n\n\nbbbb\n\ncc\n")
+        self.assertEqual(list(re_mod.iter_paragraph_chunks(path, max_chars=5)), [(0, "a1\na2"), (1, "bbbb"), (2, "cc")])
+        self.assertEqual(list(re_mod.iter_paragraph_chunks(path, max_chars=100)), [(0, "a1\na2\n\nbbbb\n\ncc")])
+
+    def test_complete_event(self):
+        self.assertEqual(re_mod.complete_event(_event('x', '2026-03-02T09:00:00'))['end_time'], '2026-03-02T10:00:00')
+        # All-day: Calendar's end date is exclusive, so a missing or equal end becomes the next day
+        self.assertEqual(re_mod.complete_event(_event('x', '2026-03-31'))['end_time'], '2026-04-01')
+        self.assertEqual(re_mod.complete_event(_event('x', '2026-03-02', '2026-03-02'))['end_time'], '2026-03-03')
+        self.assertEqual(re_mod.complete_event(_event('x', '2026-03-02', '2026-03-05'))['end_time'], '2026-03-05')
+        self.assertIsNone(re_mod.complete_event(_event('x', None)))
+        self.assertIsNone(re_mod.complete_event(_event('x', 'mañana')))
+
+class TestBatchedInsert(unittest.TestCase):
+    def setUp(self):
+        sleep = mock.patch.object(re_mod.time, 'sleep', lambda s: None)
+        sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def bodies(self, n):
+        return [re_mod.build_event_body(_event(f"Evento {i}", f"2026-03-{i + 1:02d}T09:00:00", f"2026-03-{i + 1:02d}T10:00:00"))
+                for i in range(n)]
+
+    def test_groups_requests_and_reports_existing(self):
+        service, bodies = _FakeService(), self.bodies(3)
+        with mock.patch.object(re_mod, 'BATCH_SIZE', 2):
+            first = re_mod.insert_events_batched(service, bodies, 'primary')
+            again = re_mod.insert_events_batched(service, bodies, 'primary')
+        self.assertEqual([status for status, _ in first], ['created'] * 3)
+        self.assertEqual([status for status, _ in again], ['exists'] * 3)
+        self.assertEqual(service.round_trips, 4)
+
+    def test_only_rate_limit_403_is_retried(self):
+        service = _FakeService({'Evento 0': [(403, 'rateLimitExceeded')], 'Evento 1': [(403, 'forbidden')]})
+        outcomes = re_mod.insert_events_batched(service, self.bodies(2), 'primary')
+        self.assertEqual([status for status, _ in outcomes], ['created', 'error'])
+        self.assertEqual(service.round_trips, 2)
+
+    def test_deleted_event_is_restored(self):
+        service, bodies = _FakeService(), self.bodies(2)
+        re_mod.insert_events_batched(service, bodies, 'primary')
+        service.store[bodies[0]['id']]['status'] = 'cancelled'    # Deleted by the user since
+        again = re_mod.insert_events_batched(service, bodies, 'primary')
+        self.assertEqual([status for status, _ in again], ['created', 'exists'])
+        self.assertEqual(service.store[bodies[0]['id']]['status'], 'confirmed')
+
+    def test_retries_rate_limits_and_gives_up(self):
+        service = _FakeService({'Evento 0': [429, 503], 'Evento 1': [429] * 10, 'Evento 2': [400]})
+        outcomes = re_mod.insert_events_batched(service, self.bodies(3), 'primary')
+        self.assertEqual(outcomes[0][0], 'created')
+        self.assertEqual(outcomes[1], ('error', 'rate limited'))
+        self.assertEqual(outcomes[2][0], 'error')
+
+class _FakeGroq:
+    """chat.completions.create double: one event per paragraph, TOKENS_PER_EVENT each; cut off past max_tokens."""
+    TOKENS_PER_EVENT = 150
+
+    def __init__(self, api_key=None):
+        self.chat = self.completions = self
+        self.budgets = []
+
+    def create(self, messages, model, temperature, max_tokens):
+        self.budgets.append(max_tokens)
+        paragraphs = messages[1]['content'].split("\n\n")
+        events = [_event(p.split()[0], '2026-03-02') for p in paragraphs]
+        truncated = len(events) * self.TOKENS_PER_EVENT > max_tokens
+        choice = mock.Mock(finish_reason='length' if truncated else 'stop')
+        choice.message.content = json.dumps(events)[:max_tokens] if truncated else json.dumps(events)
+        return mock.Mock(choices=[choice])
+
+class TestTruncatedReplies(unittest.TestCase):
+    def test_long_chunk_is_split_until_replies_fit(self):
+        client = _FakeGroq()
+        text = "\n\n".join(f"Evento{i} " + "x" * 90 for i in range(40))   # ~4000 chars, the default chunk size
+        with mock.patch.object(re_mod, 'GROQ_API_KEY', 'clave'), mock.patch.object(re_mod, 'Groq', lambda api_key: client):
+            events = re_mod.parse_chunk(text)
+        self.assertEqual([e['summary'] for e in events], [f"Evento{i}" for i in range(40)])
+        self.assertEqual(client.budgets[0], len(text))        # Output budget grows with the chunk
+        self.assertGreater(len(client.budgets), 1)
+
+    def test_split_text_prefers_paragraphs(self):
+        self.assertEqual(re_mod.split_text("a\n\nb\nc\n\nd"), ("a\n\nb\nc", "d"))
+        self.assertEqual(re_mod.split_text("a\nb"), ("a", "b"))
+        self.assertIsNone(re_mod.split_text("abc"))
+
+class TestCheckpointResume(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.input = os.path.join(self.dir, 'input.txt')
+        self.checkpoint = os.path.join(self.dir, 'input.txt.checkpoint.json')
+        with open(self.input, 'w', encoding='utf-8') as f:
+            f.write("uno\n\ndos\n")
+        self.parsed = []
+
+        def parse(text, raise_errors=False):
+            self.parsed.append(text)
+            return [_event(text, '2026-03-02')]
+        for target, value in (('parse_events_with_groq', parse), ('time', mock.Mock(sleep=lambda s: None, time=lambda: 0))):
+            patcher = mock.patch.object(re_mod, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def run_batch(self, service, chunk_chars=3):
+        with mock.patch.object(re_mod, 'get_calendar_service', lambda: service):
+            return re_mod.run_batch(self.input, checkpoint_path=self.checkpoint, workers=1, chunk_chars=chunk_chars)
+
+    def test_failed_chunks_are_retried_on_resume(self):
+        service = _FakeService({'dos': [400]})
+        stats = self.run_batch(service)
+        self.assertEqual((stats['created'], stats['error'], stats['failed_chunks']), (1, 1, 1))
+        with open(self.checkpoint, encoding='utf-8') as f:
+            state = json.load(f)
+        self.assertEqual((state['done_chunks'], state['chunk_chars']), ([0], 3))
+
+        self.parsed = []
+        stats = self.run_batch(service)
+        self.assertEqual(self.parsed, ['dos'])          # Only the failed chunk is parsed again
+        self.assertEqual((stats['created'], stats['failed_chunks']), (1, 0))
+        self.assertEqual(sorted(b['end']['date'] for b in service.store.values()), ['2026-03-03', '2026-03-03'])
+
+    def test_resume_with_another_chunk_size_is_refused(self):
+        self.run_batch(_FakeService())
+        with self.assertRaises(ValueError):
+            self.run_batch(_FakeService(), chunk_chars=4000)
+
+if __name__ == '__main__':
+    unittest.main()
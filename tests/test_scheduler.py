@@ -0,0 +1,67 @@
+import time
+import datetime
+import unittest
+from modules.scheduler import parse_task_lines, free_slots, schedule_tasks, plan_by_day, busy_from_events
+
+MONDAY = datetime.date(2026, 3, 2)
+NOW = datetime.datetime(2026, 3, 1, 20, 0)  # Sunday evening
+
+def at(day_offset, h, m=0):
+    return datetime.datetime.combine(MONDAY + datetime.timedelta(days=day_offset), datetime.time(h, m))
+
+class TestScheduler(unittest.TestCase):
+    def test_parse_task_lines(self):
+        tasks = parse_task_lines("- Informe de gestión (2h) para el miércoles 4 de marzo\n* Llamar proveedor 30 min\n\n1. Revisar actas urgente", NOW)
+        self.assertEqual([t['minutes'] for t in tasks], [120, 30, None])
+        self.assertEqual(tasks[0]['deadline'], datetime.date(2026, 3, 4))
+        self.assertEqual(tasks[0]['title'], "Informe de gestión para el miércoles 4 de marzo")
+        self.assertEqual(tasks[2]['priority'], 1)
+
+    def test_free_slots_respect_work_hours(self):
+        busy = [(at(0, 10), at(0, 12)), (at(0, 11), at(0, 13))]  # overlapping -> merged
+        slots = free_slots(MONDAY, busy)
+        self.assertEqual(slots[0], [at(0, 9), at(0, 10)])
+        self.assertEqual(slots[1], [at(0, 13), at(0, 17)])
+        self.assertEqual(slots[-1], [at(4, 9), at(4, 16)])  # Friday ends at 16:00
+
+    def test_edf_placement_never_overlaps(self):
+        busy = [(at(d, 9), at(d, 16)) for d in range(5)]  # Only 16-17 free Mon-Thu
+        tasks = [
+            {'title': 'Sin plazo', 'minutes': 60, 'deadline': None},
+            {'title': 'Urgente martes', 'minutes': 60, 'deadline': MONDAY + datetime.timedelta(days=1)},
+            {'title': 'Muy larga', 'minutes': 120, 'deadline': None},
+        ]
+        placements, unscheduled = schedule_tasks(tasks, busy, MONDAY)
+        self.assertEqual(placements[0], {'title': 'Urgente martes', 'start': at(0, 16), 'end': at(0, 17), 'deadline': MONDAY + datetime.timedelta(days=1)})
+        self.assertEqual(placements[1]['title'], 'Sin plazo')
+        self.assertEqual([u['title'] for u in unscheduled], ['Muy larga'])
+        for p in placements:
+            self.assertFalse(any(s < p['end'] and p['start'] < e for s, e in busy))
+
+    def test_deadline_too_early_is_reported(self):
+        busy = [(at(0, 9), at(0, 17))]
+        _, unscheduled = schedule_tasks([{'title': 'Hoy', 'minutes': 30, 'deadline': MONDAY}], busy, MONDAY)
+        self.assertEqual(unscheduled[0]['reason'], 'plazo')
+
+    def test_plan_by_day_and_busy_from_events(self):
+        events = [
+            {'summary': 'Comité', 'start': {'dateTime': '2026-03-03T13:00:00Z'}, 'end': {'dateTime': '2026-03-03T14:00:00Z'}},
+            {'summary': 'Feriado', 'start': {'date': '2026-03-04'}, 'end': {'date': '2026-03-05'}},
+            {'summary': 'Libre', 'transparency': 'transparent', 'start': {'dateTime': '2026-03-03T15:00:00-03:00'}, 'end': {'dateTime': '2026-03-03T16:00:00-03:00'}},
+        ]
+        fixed = busy_from_events(events)
+        self.assertEqual(fixed, [(at(1, 10), at(1, 11), 'Comité')])
+        placements, _ = schedule_tasks([{'title': 'Acta', 'minutes': 90, 'deadline': None}], [(s, e) for s, e, _ in fixed], MONDAY)
+        plan = plan_by_day(placements, fixed, MONDAY)
+        self.assertEqual(plan['Lunes'], ['09:00-10:30 Acta'])
+        self.assertEqual(plan['Martes'], ['[Evento] 10:00 Comité'])
+
+    def test_speed(self):
+        busy = [(at(d, h), at(d, h, 30)) for d in range(5) for h in range(9, 16, 2)]
+        tasks = [{'title': f"T{i}", 'minutes': 15 + (i % 4) * 15, 'deadline': None} for i in range(60)]
+        t0 = time.perf_counter()
+        schedule_tasks(tasks, busy, MONDAY)
+        self.assertLess(time.perf_counter() - t0, 0.05)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,15 @@
+import unittest
+from bench_startup import measure, heavy_loaded
+
+class TestStartup(unittest.TestCase):
+    def test_login_page_imports_no_heavy_module(self):
+        # Timing is checked by tests/bench_startup.py; here only what app.py pulls in at import
+        self.assertEqual(heavy_loaded(measure('app')['modules']), [])
+
+    def test_views_still_resolve_their_modules(self):
+        loaded = measure('modules.chat_view', setup_app=True)['modules']
+        self.assertIn('modules.google_services', loaded)
+        self.assertIn('modules.ai_core', loaded)
+
+if __name__ == '__main__':
+    unittest.main()
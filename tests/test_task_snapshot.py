@@ -0,0 +1,119 @@
+import unittest
+from modules.task_snapshot import TaskSnapshot, NO_DUE
+import datetime
+
+class _Req:
+    def __init__(self, fn):
+        self.fn = fn
+    def execute(self):
+        return self.fn()
+
+class _Batch:
+    def __init__(self, owner, callback):
+        self.owner, self.callback, self.reqs = owner, callback, []
+    def add(self, req, request_id):
+        self.reqs.append((req, request_id))
+    def execute(self, http=None):
+        self.owner.batches += 1
+        for req, rid in self.reqs:
+            self.callback(rid, req.execute(), None)
+
+class FakeTasks:
+    """Tasks API fake: lists of tasks, 'updated' counters, pagination by offset."""
+    def __init__(self, lists, page=2):
+        self.data = lists      # list_id -> {'title', 'items': [task dicts]}
+        self.page = page
+        self.batches = 0
+        self.list_kwargs = []
+        self.clock = 1000.0
+
+    def tasklists(self):
+        return self
+    def tasks(self):
+        return self
+    def new_batch_http_request(self, callback):
+        return _Batch(self, callback)
+
+    def list(self, tasklist=None, maxResults=100, pageToken=None, **kw):
+        if tasklist is None:
+            return _Req(lambda: {'items': [{'id': lid, 'title': d['title']} for lid, d in self.data.items()]})
+        self.list_kwargs.append(kw)
+        def run():
+            items = self.data[tasklist]['items']
+            if kw.get('updatedMin'):
+                items = [t for t in items if t['updated'] >= kw['updatedMin']]
+            if not kw.get('showCompleted', True):
+                items = [t for t in items if t.get('status') != 'completed']
+            start = int(pageToken or 0)
+            resp = {'items': items[start:start + self.page]}
+            if start + self.page < len(items):
+                resp['nextPageToken'] = str(start + self.page)
+            return resp
+        return _Req(run)
+
+def task(tid, title, due=None, updated='2020-01-01T00:00:00.000Z', **kw):
+    t = {'id': tid, 'title': title, 'updated': updated, 'status': 'needsAction'}
+    if due:
+        t['due'] = due
+    t.update(kw)
+    return t
+
+class TestTaskSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.svc = FakeTasks({
+            'L1': {'title': 'Inbox', 'items': [task(f't{i}', f'Tarea {i}') for i in range(5)]},
+            'L2': {'title': 'Proyectos', 'items': [task('p1', 'Informe', due='2026-03-10T00:00:00.000Z'),
+                                                    task('p2', 'Hecha', status='completed'),
+                                                    task('p3', 'Acta', due='2026-03-02T00:00:00.000Z')]},
+        })
+
+    def test_full_load_follows_pages_in_batches(self):
+        snap = TaskSnapshot().refresh(self.svc)
+        self.assertEqual(snap.count(), 7)
+        # 3 rounds (5 tasks / page 2) for the longest list, all lists per round in one batch
+        self.assertEqual(self.svc.batches, 3)
+        self.assertEqual(snap.tasks['p1']['list_title'], 'Proyectos')
+
+    def test_incremental_refresh_applies_changes(self):
+        snap = TaskSnapshot().refresh(self.svc)
+        future = '2999-01-01T00:00:00.000Z'
+        items = self.svc.data['L1']['items']
+        items[0].update(status='completed', updated=future)
+        items[1].update(title='Renombrada', updated=future)
+        items.append(task('t9', 'Nueva', updated=future))
+        self.svc.data['L2']['items'][0].update(deleted=True, updated=future)
+        self.svc.batches = 0
+        self.svc.page = 100
+        snap.mark_stale()
+        self.assertTrue(snap.needs_refresh())
+        snap.refresh(self.svc)
+        self.assertEqual(self.svc.batches, 1)
+        self.assertTrue(all(kw.get('updatedMin') for kw in self.svc.list_kwargs[-2:]))
+        self.assertNotIn('t0', snap.tasks)
+        self.assertNotIn('p1', snap.tasks)
+        self.assertEqual(snap.tasks['t1']['title'], 'Renombrada')
+        self.assertIn('t9', snap.tasks)
+        self.assertFalse(snap.needs_refresh())
+
+    def test_delta_cursor_uses_server_updated_times(self):
+        # Local clock far ahead of Google's: a change stamped by the server after the sync must still arrive
+        self.svc.data['L1']['items'][0]['updated'] = '2026-03-01T12:00:00.000Z'
+        snap = TaskSnapshot().refresh(self.svc)
+        snap.synced_at += 3600
+        self.assertEqual(snap.cursor, '2026-03-01T12:00:00.000Z')
+        self.svc.data['L1']['items'][1].update(title='Editada', updated='2026-03-01T12:00:30.000Z')
+        snap.mark_stale()
+        snap.refresh(self.svc)
+        self.assertEqual(self.svc.list_kwargs[-1]['updatedMin'], '2026-03-01T11:55:00.000Z')
+        self.assertEqual(snap.tasks['t1']['title'], 'Editada')
+        self.assertEqual(TaskSnapshot.from_state(snap.to_state()).cursor, '2026-03-01T12:00:30.000Z')
+
+    def test_queries_from_memory(self):
+        snap = TaskSnapshot().refresh(self.svc)
+        self.assertEqual([t['id'] for t in snap.top(2)], ['p3', 'p1'])
+        march = snap.by_due(datetime.date(2026, 3, 1), datetime.date(2026, 3, 5))
+        self.assertEqual([t['id'] for t in march], ['p3'])
+        self.assertEqual(snap.tasks['t0']['due'], NO_DUE)
+
+if __name__ == '__main__':
+    unittest.main()
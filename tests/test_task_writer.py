@@ -0,0 +1,118 @@
+import unittest
+from modules.task_writer import insert_tasks_batched
+
+class _HttpError(Exception):
+    def __init__(self, status, reason=''):
+        super().__init__(f"HTTP {status}")
+        self.resp = type('Resp', (), {'status': status})()
+        self.content = ('{"error": {"errors": [{"reason": "%s"}]}}' % reason).encode()
+
+class _Insert:
+    def __init__(self, kwargs):
+        self.kwargs = kwargs
+
+class _Get:
+    def __init__(self, owner, task):
+        self.owner, self.task = owner, task
+    def execute(self):
+        return {'id': self.task, 'position': f"{self.owner.order.index(self.task):020d}"}
+
+class _Move:
+    def __init__(self, owner, kwargs):
+        self.owner, self.kwargs = owner, kwargs
+    def execute(self):
+        order, task = self.owner.order, self.kwargs['task']
+        self.owner.moves.append(task)
+        order.remove(task)
+        previous = self.kwargs.get('previous')
+        order.insert(order.index(previous) + 1 if previous else 0, task)
+        return {'id': task}
+
+class _Batch:
+    def __init__(self, owner, callback):
+        self.owner, self.callback, self.reqs = owner, callback, []
+    def add(self, req, request_id):
+        self.reqs.append((req, request_id))
+    def execute(self):
+        self.owner.round_trips += 1
+        self.owner.batch_sizes.append(len(self.reqs))
+        # Google may run the parts of a batch in any order
+        for req, rid in (self.reqs[::-1] if self.owner.shuffle else self.reqs):
+            if isinstance(req, _Get):
+                self.callback(rid, req.execute(), None)
+                continue
+            title = req.kwargs['body']['title']
+            fail = self.owner.failures.get(title)
+            if fail:
+                self.owner.failures[title] = fail[1:]
+                if fail[0]:
+                    self.callback(rid, None, _HttpError(*fail[0]) if isinstance(fail[0], tuple) else _HttpError(fail[0]))
+                    continue
+            self.owner.created.append(req.kwargs)
+            self.owner.order.insert(0, f"id-{title}")   # No 'previous': lands on top
+            self.callback(rid, {'id': f"id-{title}"}, None)
+
+class FakeTasks:
+    def __init__(self, failures=None, shuffle=False):
+        self.failures = dict(failures or {})  # title -> [status or (status, reason), ...] (0 = succeed)
+        self.shuffle = shuffle
+        self.round_trips = 0
+        self.batch_sizes = []
+        self.created = []
+        self.order = []     # Task IDs top to bottom
+        self.moves = []
+    def tasks(self):
+        return self
+    def insert(self, **kwargs):
+        return _Insert(kwargs)
+    def get(self, tasklist, task, fields=None):
+        return _Get(self, task)
+    def move(self, **kwargs):
+        return _Move(self, kwargs)
+    def new_batch_http_request(self, callback):
+        return _Batch(self, callback)
+
+class TestTaskWriter(unittest.TestCase):
+    def test_forty_subtasks_in_one_insert_round_trip(self):
+        svc = FakeTasks()
+        bodies = [{'title': f"Paso {i}"} for i in range(40)]
+        outcomes = insert_tasks_batched(svc, '@default', bodies, parent='P1', sleep=lambda s: None)
+        self.assertEqual(svc.round_trips, 2)   # Inserts + one order check, no moves
+        self.assertEqual(svc.moves, [])
+        self.assertEqual(svc.order, [f"id-Paso {i}" for i in range(40)])
+        self.assertTrue(all(o['status'] == 'created' for o in outcomes))
+        self.assertEqual([o['id'] for o in outcomes[:2]], ['id-Paso 0', 'id-Paso 1'])
+        self.assertTrue(all(c['parent'] == 'P1' for c in svc.created))
+
+    def test_throttled_items_retry_with_backoff(self):
+        svc = FakeTasks({'Paso 3': [429, 429], 'Paso 7': [503]})
+        sleeps = []
+        bodies = [{'title': f"Paso {i}"} for i in range(10)]
+        outcomes = insert_tasks_batched(svc, '@default', bodies, sleep=sleeps.append)
+        self.assertTrue(all(o['status'] == 'created' for o in outcomes))
+        self.assertEqual(sleeps, [1.0, 2.0])
+        self.assertEqual(svc.batch_sizes[:3], [10, 2, 1])  # chunk halves while throttled
+        self.assertEqual(svc.order, [f"id-Paso {i}" for i in range(10)])   # Retried items moved back in place
+
+    def test_order_does_not_depend_on_batch_execution_order(self):
+        svc = FakeTasks(shuffle=True)
+        bodies = [{'title': f"Paso {i}"} for i in range(6)]
+        insert_tasks_batched(svc, '@default', bodies, parent='P1', sleep=lambda s: None)
+        self.assertEqual(svc.order, [f"id-Paso {i}" for i in range(6)])
+        self.assertEqual(len(svc.moves), 5)
+
+    def test_only_rate_limit_403_is_retried(self):
+        svc = FakeTasks({'Cuota': [(403, 'userRateLimitExceeded')], 'Prohibido': [(403, 'forbidden')]})
+        outcomes = insert_tasks_batched(svc, '@default', [{'title': 'Cuota'}, {'title': 'Prohibido'}], sleep=lambda s: None)
+        self.assertEqual([o['status'] for o in outcomes], ['created', 'failed'])
+        self.assertEqual(svc.batch_sizes[:2], [2, 1])
+
+    def test_permanent_error_is_reported(self):
+        svc = FakeTasks({'Malo': [400]})
+        outcomes = insert_tasks_batched(svc, '@default', [{'title': 'Bueno'}, {'title': 'Malo'}], sleep=lambda s: None)
+        self.assertEqual([o['status'] for o in outcomes], ['created', 'failed'])
+        self.assertIn("400", outcomes[1]['error'])
+        self.assertEqual(svc.round_trips, 1)   # A single created task needs no order check
+
+if __name__ == '__main__':
+    unittest.main()
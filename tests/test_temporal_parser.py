@@ -0,0 +1,86 @@
+import time
+import unittest
+import datetime
+from modules.temporal_parser import parse_temporal, default_end_time
+
+# Reference "now": the date of the test_parsing.py email (Tue 2 Dec 2025, 16:00)
+NOW = datetime.datetime(2025, 12, 2, 16, 0)
+
+# (input, expected start, expected end) -- None means "not confident, go to the LLM".
+# Items are drawn from test_parsing.py, test_parsing_pipes.py, test_duration.py and input_events.txt.
+CORPUS = [
+    ("Comité de Capacitación jueves 22 de enero, horario 14:00 a 17 hrs", "2026-01-22T14:00:00", "2026-01-22T17:00:00"),
+    ("Comité de Capacitación jueves 19 de marzo, horario 14:00 a 17 hrs", "2026-03-19T14:00:00", "2026-03-19T17:00:00"),
+    ("Comité de Capacitación jueves 15 octubre, horario 14:00 a 17 hrs", "2026-10-15T14:00:00", "2026-10-15T17:00:00"),
+    ("Comité Salud Intercultural ENERO, MARTES 20 a las 14:30", "2026-01-20T14:30:00", "2026-01-20T16:30:00"),
+    ("Reunión mañana a las 10:00", "2025-12-03T10:00:00", "2025-12-03T12:00:00"),
+    ("Reunión con el equipo de marketing el lunes 2 de febrero a las 10am para revisar la campaña.",
+     "2026-02-02T10:00:00", "2026-02-02T12:00:00"),
+    ("Cita médica el martes 3 de febrero a las 4pm.", "2026-02-03T16:00:00", "2026-02-03T17:00:00"),
+    ("Comprar insumos el viernes todo el día.", "2025-12-05", "2025-12-05"),
+    ("reunión mañana a las 15:00", "2025-12-03T15:00:00", "2025-12-03T17:00:00"),
+    ("Almuerzo con Ana el 5/02 de 13:00 a 14:30", "2026-02-05T13:00:00", "2026-02-05T14:30:00"),
+    ("Sesión pasado mañana a las 9 de la mañana por 1 hora", "2025-12-04T09:00:00", "2025-12-04T10:00:00"),
+    ("Taller el 2026-03-10 a las 3", "2026-03-10T15:00:00", "2026-03-10T17:00:00"),
+    # Ambiguous: must fall through to the LLM
+    ("Se cita a reunión para esta tarde a contar de las 14:30 horas", None, None),
+    ("ENERO,MARTES 20 |MARZO,MARTES 03|MAYO,MARTES 05", None, None),
+    ("Reunión y enviar correo mañana 10:00", None, None),
+    ("reunión todos los lunes a las 9", None, None),
+    ("Reunión mañana", None, None),
+    ("Llamar a Pedro", None, None),
+    ("Jueves 23 de enero a las 10:00 revisión", None, None),  # weekday/date mismatch
+    # Questions and changes to existing events are not new events
+    ("¿Qué tengo mañana a las 10?", None, None),
+    ("que tengo mañana a las 10", None, None),
+    ("Reunión mañana a las 10?", None, None),
+    ("¿Cuándo es la reunión del lunes a las 10", None, None),
+    ("Posponer la reunión del lunes a las 10", None, None),
+    ("Reagendar reunión para mañana a las 15", None, None),
+    ("Mover la reunión de mañana a las 11", None, None),
+    ("Cancelar reunión mañana a las 10", None, None),
+    ("Muéstrame la agenda del viernes a las 9", None, None),
+    # Bare 6/7 could be morning or evening; negations are not requests to create
+    ("Vuelo a Santiago mañana a las 6", None, None),
+    ("Turno el viernes a las 7", None, None),
+    ("No agendar reunión mañana a las 10", None, None),
+    ("Reunión mañana a las 5", "2025-12-03T17:00:00", "2025-12-03T19:00:00"),
+    ("Vuelo a Santiago mañana a las 6 de la mañana", "2025-12-03T06:00:00", "2025-12-03T08:00:00"),
+]
+
+class TestTemporalParser(unittest.TestCase):
+
+    def test_corpus_accuracy(self):
+        for text, start, end in CORPUS:
+            with self.subTest(text=text):
+                res = parse_temporal(text, NOW)
+                if start is None:
+                    self.assertIsNone(res)
+                else:
+                    self.assertIsNotNone(res)
+                    self.assertEqual((res['start_time'], res['end_time']), (start, end))
+
+    def test_summary_strips_temporal_words(self):
+        res = parse_temporal("Reunión con el equipo de marketing el lunes 2 de febrero a las 10am para revisar la campaña.", NOW)
+        self.assertEqual(res['summary'], "Reunión con el equipo de marketing para revisar la campaña")
+        self.assertEqual(parse_temporal("Revisión entre las 10 y las 12 del lunes", NOW)['summary'], "Revisión")
+
+    def test_work_hour_defaults(self):
+        # Same cases as test_work_hours.py
+        self.assertEqual(default_end_time(datetime.datetime(2026, 2, 2, 14, 30)).hour, 16)
+        self.assertEqual(default_end_time(datetime.datetime(2026, 2, 2, 15, 30)), datetime.datetime(2026, 2, 2, 17, 0))
+        self.assertEqual(default_end_time(datetime.datetime(2026, 2, 6, 14, 30)), datetime.datetime(2026, 2, 6, 16, 0))
+        self.assertEqual(default_end_time(datetime.datetime(2026, 2, 2, 18, 0)), datetime.datetime(2026, 2, 2, 20, 0))
+
+    def test_benchmark(self):
+        texts = [c[0] for c in CORPUS]
+        rounds = 200
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for text in texts:
+                parse_temporal(text, NOW)
+        per_call_us = (time.perf_counter() - t0) / (rounds * len(texts)) * 1e6
+        self.assertLess(per_call_us, 2000)
+
+if __name__ == '__main__':
+    unittest.main()
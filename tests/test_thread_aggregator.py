@@ -0,0 +1,53 @@
+import unittest
+from modules.thread_aggregator import group_by_thread, clean_subject, message_ids_of
+
+def msg(mid, thread, ts, body, sender="Ana <ana@x.cl>", subject="Reunión"):
+    return {'id': mid, 'threadId': thread, 'ts': str(ts), 'body': body, 'sender': sender, 'subject': subject}
+
+class TestThreadAggregator(unittest.TestCase):
+    def test_thread_collapses_to_one_item(self):
+        emails = [  # Gmail order: newest first
+            msg('m3', 't1', 3000, "Confirmado, nos vemos el jueves a las 10:00 en sala 2.", subject="RE: RE: Reunión"),
+            msg('m2', 't1', 2000, "¿Puede ser el jueves a las 10:00? El miércoles no puedo.", sender="Luis <l@x.cl>", subject="RE: Reunión"),
+            msg('m1', 't1', 1000, "Propongo reunión de comité el miércoles a las 15:00."),
+            msg('m9', 't2', 1500, "Favor enviar cotización antes del viernes."),
+        ]
+        items = group_by_thread(emails)
+        self.assertEqual(len(items), 2)
+        thread = next(i for i in items if i['threadId'] == 't1')
+        self.assertEqual(thread['id'], 'm3')
+        self.assertEqual(thread['message_ids'], ['m1', 'm2', 'm3'])
+        self.assertEqual(thread['subject'], "Reunión")
+        body = thread['body']
+        self.assertLess(body.index("miércoles a las 15:00"), body.index("jueves a las 10:00?"))
+        self.assertLess(body.index("jueves a las 10:00?"), body.index("Confirmado"))
+        single = next(i for i in items if i['threadId'] == 't2')
+        self.assertEqual(single['message_ids'], ['m9'])
+
+    def test_repeated_sentences_are_sent_once(self):
+        quoted = "Se cita a reunión del Comité de Calidad el martes 20 de enero."
+        emails = [
+            msg('a', 't', 1, quoted),
+            msg('b', 't', 2, "Ok. " + quoted),
+            msg('c', 't', 3, "Ok. Asistiré. " + quoted),
+        ]
+        body = group_by_thread(emails)[0]['body']
+        self.assertEqual(body.count("Comité de Calidad"), 1)
+        self.assertEqual(body.count("Ok."), 2)
+
+    def test_budget_keeps_first_and_latest(self):
+        emails = [msg(f'm{i}', 't', i, f"Mensaje {i}: " + "texto distinto %d " % i * 40) for i in range(10)]
+        item = group_by_thread(emails, max_chars=2000)[0]
+        self.assertLessEqual(len(item['body']), 2000)
+        self.assertIn("Mensaje 0:", item['body'])
+        self.assertIn("Mensaje 9:", item['body'])
+        self.assertNotIn("Mensaje 3:", item['body'])
+        self.assertEqual(len(item['message_ids']), 10)
+
+    def test_helpers(self):
+        self.assertEqual(clean_subject("RV: Fwd: Citación"), "Citación")
+        self.assertEqual(message_ids_of({'id': 'x'}), ['x'])
+        self.assertEqual(message_ids_of({'id': 'x', 'message_ids': ['a', 'x']}), ['a', 'x'])
+
+if __name__ == '__main__':
+    unittest.main()
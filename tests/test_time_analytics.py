@@ -0,0 +1,62 @@
+import unittest
+from modules.time_analytics import events_to_frame, compute_time_analytics, summarize_for_prompt
+from modules.event_classifier import EventClassifier
+
+KEYWORDS = {
+    'reuniones_internas': ['reunión'],
+    'reuniones_externas': ['cliente'],
+    'trabajo_focalizado': ['desarrollo'],
+    'admin': ['correo'],
+}
+CLASSIFY = EventClassifier(keywords=KEYWORDS).categorize_series
+
+def _ev(summary, start, end):
+    return {'summary': summary, 'start': {'dateTime': start}, 'end': {'dateTime': end}}
+
+class TestTimeAnalytics(unittest.TestCase):
+
+    def test_work_hours_clipped_on_friday(self):
+        # Friday 2026-02-06, 15:00-18:00 -> only 1h inside the 16:00 limit
+        df = events_to_frame([_ev("Reunión", "2026-02-06T15:00:00-03:00", "2026-02-06T18:00:00-03:00")], CLASSIFY)
+        self.assertAlmostEqual(df['duration_h'].iloc[0], 3.0)
+        self.assertAlmostEqual(df['work_h'].iloc[0], 1.0)
+
+    def test_categories_and_stats(self):
+        events = [
+            _ev("Reunión equipo", "2026-02-02T09:00:00", "2026-02-02T10:00:00"),
+            _ev("Demo cliente", "2026-02-03T09:00:00", "2026-02-03T11:00:00"),
+            _ev("Almuerzo", "2026-02-03T13:00:00", "2026-02-03T14:00:00"),
+        ]
+        a = compute_time_analytics(events_to_frame(events, CLASSIFY), 7)
+        self.assertEqual(a['total_hours'], 4.0)
+        self.assertEqual(a['stats']['reuniones_externas']['hours'], 2.0)
+        self.assertEqual(a['stats']['otros']['count'], 1)
+
+    def test_heatmap_spreads_partial_hours(self):
+        # Monday 09:30-11:00 -> 0.5h in the 09 bin, 1h in the 10 bin
+        a = compute_time_analytics(events_to_frame([_ev("x", "2026-02-02T09:30:00", "2026-02-02T11:00:00")], CLASSIFY), 7)
+        self.assertAlmostEqual(a['heatmap'][0, 9], 0.5)
+        self.assertAlmostEqual(a['heatmap'][0, 10], 1.0)
+
+    def test_week_over_week_trend(self):
+        events = [
+            _ev("Reunión", "2026-02-02T09:00:00", "2026-02-02T10:00:00"),
+            _ev("Reunión", "2026-02-09T09:00:00", "2026-02-09T12:00:00"),
+        ]
+        a = compute_time_analytics(events_to_frame(events, CLASSIFY), 14)
+        self.assertEqual(a['trend_wow']['reuniones_internas'], 2.0)
+
+    def test_user_defined_categories_are_kept(self):
+        classify = EventClassifier(keywords=KEYWORDS, extra_keywords={'docencia': ['clase']}).categorize_series
+        events = [
+            _ev("Clase de cálculo", "2026-02-02T09:00:00", "2026-02-02T11:00:00"),
+            _ev("Reunión", "2026-02-09T09:00:00", "2026-02-09T10:00:00"),
+        ]
+        a = compute_time_analytics(events_to_frame(events, classify), 14)
+        self.assertEqual(a['stats']['docencia'], {'hours': 2.0, 'percentage': 66.7, 'count': 1})
+        self.assertEqual(list(a['weekly'].columns[-2:]), ['docencia', 'total'])
+        self.assertEqual(a['trend_wow']['docencia'], -2.0)
+        self.assertIn("Docencia: 66.7%", summarize_for_prompt(a))
+
+if __name__ == '__main__':
+    unittest.main()